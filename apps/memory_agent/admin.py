@@ -1,23 +1,240 @@
+import os
 from django.contrib import admin
-from apps.memory_agent.models import Source, Message
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html
+from apps.memory_agent.db.routers import read_database
+from apps.memory_agent.models import (
+    Source, Recipient, Message, Attachment, MessageArchive, CompressionDictionary, MediaHash, MediaTransfer,
+    DeadLetterMediaTransfer, DetachedDriveFile, MediaProcessingProfile, PendingDriveDeletion, RequestProfile
+)
+from apps.memory_agent.profiler import merge_folded
+from apps.memory_agent.selectors.media_transfer_selector import MediaTransferSelector
+from apps.memory_agent.selectors.profile_selector import ProfileSelector
+from apps.memory_agent.selectors.recipient_selector import RecipientSelector
+
+
+class MediaProcessingProfileInline(admin.StackedInline):
+    model = MediaProcessingProfile
+    can_delete = False
+    extra = 0
+    readonly_fields = ['id', 'created_at', 'updated_at']
+
+
+class AttachmentInline(admin.TabularInline):
+    model = Attachment
+    extra = 0
+    fields = ['position', 'file_type', 'file_name', 'file_url', 'google_drive_id', 'google_drive_link',
+              'original_google_drive_id']
+    ordering = ['position']
+
+
+class ReplicaChangeListMixin:
+    """
+    Lee el listado (GET) desde la réplica si la hay
+
+    Las acciones (POST) y los formularios de edición siguen usando el primario
+    para no modificar ni mostrar datos desactualizados.
+    """
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)  # type: ignore
+        match = request.resolver_match
+        if request.method == 'GET' and match and match.url_name and match.url_name.endswith('_changelist'):
+            return queryset.using(read_database())
+        return queryset
 
 
 @admin.register(Source)
 class SourceAdmin(admin.ModelAdmin):
-    list_display = ['name', 'is_active', 'created_at', 'updated_at']
+    list_display = ['name', 'is_active', 'retention_days', 'created_at', 'updated_at']
     list_filter = ['is_active', 'created_at']
     search_fields = ['name']
     readonly_fields = ['id', 'created_at', 'updated_at']
+    inlines = [MediaProcessingProfileInline]
+
+
+@admin.register(Recipient)
+class RecipientAdmin(ReplicaChangeListMixin, admin.ModelAdmin):
+    list_display = ['identifier', 'source', 'message_count', 'retention_days', 'last_message_at', 'created_at']
+    list_filter = ['source']
+    search_fields = ['identifier']
+    readonly_fields = ['id', 'message_count', 'last_message_at', 'created_at', 'updated_at']
+    list_select_related = ['source']
+    ordering = ['-last_message_at']
 
 
 @admin.register(Message)
-class MessageAdmin(admin.ModelAdmin):
+class MessageAdmin(ReplicaChangeListMixin, admin.ModelAdmin):
     list_display = ['content_short', 'source', 'recipient', 'is_command', 'command_type', 'created_at']
     list_filter = ['source', 'is_command', 'command_type', 'created_at']
-    search_fields = ['content', 'recipient']
-    readonly_fields = ['id', 'created_at', 'updated_at']
+    search_fields = ['content', 'content_preview', 'recipient__identifier']
+    readonly_fields = ['id', 'content_preview', 'created_at', 'updated_at']
+    raw_id_fields = ['recipient']
+    list_select_related = ['source', 'recipient']
     ordering = ['-created_at']
+    inlines = [AttachmentInline]
     
     def content_short(self, obj):
-        return obj.content[:50] + '...' if len(obj.content) > 50 else obj.content
-    content_short.short_description = 'Contenido'
\ No newline at end of file
+        # Con vista previa no se descomprime el contenido
+        content = obj.content_preview or obj.content
+        return content[:50] + '...' if obj.content_preview or len(content) > 50 else content
+    content_short.short_description = 'Contenido'
+
+    # El ETag del listado de la API es la versión del destinatario (contador y
+    # updated_at): los cambios hechos desde el admin deben recalcularla
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Incluye el destinatario anterior si el mensaje se reasignó
+        RecipientSelector.refresh_counters({form.instance.recipient_id, form.initial.get('recipient')} - {None})
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        RecipientSelector.refresh_counters([obj.recipient_id])
+
+    def delete_queryset(self, request, queryset):
+        recipient_ids = set(queryset.values_list('recipient_id', flat=True))
+        super().delete_queryset(request, queryset)
+        RecipientSelector.refresh_counters(recipient_ids)
+
+
+@admin.register(MessageArchive)
+class MessageArchiveAdmin(ReplicaChangeListMixin, admin.ModelAdmin):
+    list_display = ['recipient', 'month', 'row_count', 'message_count', 'size_bytes', 'created_at']
+    search_fields = ['recipient__identifier', 'file_path']
+    readonly_fields = [field.name for field in MessageArchive._meta.fields]
+    raw_id_fields = ['recipient']
+    list_select_related = ['recipient']
+    ordering = ['-month']
+
+
+@admin.register(CompressionDictionary)
+class CompressionDictionaryAdmin(admin.ModelAdmin):
+    list_display = ['dict_id', 'is_active', 'sample_count', 'sample_bytes', 'created_at']
+    list_filter = ['is_active']
+    readonly_fields = ['id', 'dict_id', 'sample_count', 'sample_bytes', 'created_at', 'updated_at']
+    exclude = ['data']
+    ordering = ['-created_at']
+
+
+@admin.register(MediaHash)
+class MediaHashAdmin(ReplicaChangeListMixin, admin.ModelAdmin):
+    list_display = ['sha256', 'file_name', 'mime_type', 'size', 'hit_count', 'created_at']
+    list_filter = ['mime_type', 'created_at']
+    search_fields = ['sha256', 'file_name', 'google_drive_id', 'original_google_drive_id']
+    readonly_fields = ['id', 'created_at', 'updated_at']
+    ordering = ['-created_at']
+
+
+@admin.register(PendingDriveDeletion)
+class PendingDriveDeletionAdmin(admin.ModelAdmin):
+    list_display = ['google_drive_id', 'attempts', 'created_at', 'updated_at']
+    search_fields = ['google_drive_id']
+    readonly_fields = ['id', 'google_drive_id', 'attempts', 'created_at', 'updated_at']
+    ordering = ['created_at']
+
+
+@admin.register(DetachedDriveFile)
+class DetachedDriveFileAdmin(admin.ModelAdmin):
+    list_display = ['google_drive_id', 'partition', 'created_at']
+    list_filter = ['partition']
+    search_fields = ['google_drive_id']
+    readonly_fields = ['id', 'partition', 'google_drive_id', 'created_at', 'updated_at']
+    ordering = ['partition']
+
+
+@admin.register(MediaTransfer)
+class MediaTransferAdmin(admin.ModelAdmin):
+    list_display = ['file_name', 'source', 'recipient', 'status', 'attempts', 'progress', 'bytes_saved', 'next_attempt_at', 'created_at']
+    list_filter = ['status', 'source', 'created_at']
+    search_fields = ['file_name', 'recipient', 'file_url']
+    readonly_fields = ['id', 'created_at', 'updated_at', 'completed_at',
+                       'content_sha256', 'upload_session_uri', 'upload_offset', 'upload_total_bytes', 'bytes_saved']
+    raw_id_fields = ['message', 'attachment']
+    list_select_related = ['source']
+    ordering = ['-created_at']
+    
+    def progress(self, obj):
+        return f"{obj.upload_progress}%" if obj.upload_progress is not None else '-'
+    progress.short_description = 'Progreso'
+
+
+@admin.register(DeadLetterMediaTransfer)
+class DeadLetterMediaTransferAdmin(admin.ModelAdmin):
+    list_display = ['file_name', 'source', 'recipient', 'attempts', 'last_error', 'updated_at']
+    list_filter = ['source', 'file_type']
+    search_fields = ['file_name', 'recipient', 'file_url']
+    readonly_fields = ['id', 'created_at', 'updated_at', 'completed_at']
+    raw_id_fields = ['message']
+    list_select_related = ['source']
+    ordering = ['-updated_at']
+    actions = ['retry_transfers']
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).filter(status=MediaTransfer.STATUS_DEAD)
+    
+    def has_add_permission(self, request):
+        return False
+    
+    @admin.action(description='Reintentar transferencias seleccionadas')
+    def retry_transfers(self, request, queryset):
+        count = MediaTransferSelector.requeue(list(queryset.values_list('pk', flat=True)))
+        self.message_user(request, f"{count} transferencias encoladas nuevamente.")
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ['label', 'source_name', 'trigger', 'status_code', 'duration_ms', 'sample_count', 'created_at', 'download']
+    list_filter = ['label', 'source_name', 'trigger', 'created_at']
+    search_fields = ['path', 'file_path']
+    readonly_fields = ['id', 'created_at', 'updated_at', 'label', 'source_name', 'path', 'status_code',
+                       'trigger', 'duration_ms', 'sample_count', 'file_path']
+    ordering = ['-created_at']
+    actions = ['download_merged', 'delete_with_files']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def get_actions(self, request):
+        # El borrado debe eliminar también los archivos
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+    
+    def get_urls(self):
+        urls = [
+            path('<uuid:profile_id>/download/', self.admin_site.admin_view(self.download_view),
+                 name='memory_agent_requestprofile_download'),
+        ]
+        return urls + super().get_urls()
+    
+    def download(self, obj):
+        url = reverse('admin:memory_agent_requestprofile_download', args=[obj.pk])
+        return format_html('<a href="{}">.folded</a>', url)
+    download.short_description = 'Descargar'
+    
+    def download_view(self, request, profile_id):
+        profile = get_object_or_404(RequestProfile, pk=profile_id)
+        return self._folded_response(ProfileSelector.read_folded(profile), os.path.basename(profile.file_path))
+    
+    @admin.action(description='Descargar perfiles combinados (flamegraph)')
+    def download_merged(self, request, queryset):
+        labels = sorted(set(queryset.values_list('label', flat=True)))
+        filename = '_'.join(label.strip('/') for label in labels) or 'profiles'
+        merged = merge_folded(ProfileSelector.read_folded(profile) for profile in queryset)
+        return self._folded_response(merged, f"{filename}.folded")
+    
+    @admin.action(description='Eliminar perfiles seleccionados y sus archivos')
+    def delete_with_files(self, request, queryset):
+        count = ProfileSelector.delete_profiles(queryset)
+        self.message_user(request, f"{count} perfiles eliminados.")
+    
+    def delete_model(self, request, obj):
+        ProfileSelector.delete_profiles([obj])
+    
+    def _folded_response(self, content, filename):
+        response = HttpResponse(content, content_type='text/plain; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class MemoryAgentConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"  # type: ignore
     name = "apps.memory_agent"
+
+    def ready(self):
+        from apps.memory_agent import signals  # noqa: F401
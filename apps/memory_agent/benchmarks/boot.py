@@ -0,0 +1,129 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+# SDKs de proveedores que no deben cargarse al arrancar un proceso: se importan
+# en el primer uso (envío por Twilio, subida a Drive, compresión de imágenes)
+HEAVY_MODULES = ('twilio', 'googleapiclient', 'google_auth_oauthlib', 'google.oauth2', 'PIL', 'redis', 'pyarrow', 'zstandard')
+
+# Código que ejecuta cada proceso hijo. Mide desde antes de django.setup() hasta
+# dejar el proceso listo para atender (web) o para procesar el outbox (worker).
+BOOT_CODE = {
+    'web': (
+        "import django; django.setup()\n"
+        "from django.core.wsgi import get_wsgi_application\n"
+        "from django.urls import get_resolver\n"
+        "get_wsgi_application()\n"
+        "get_resolver().url_patterns\n"
+    ),
+    'worker': (
+        "import django; django.setup()\n"
+        "from django.core.management import load_command_class\n"
+        "load_command_class('apps.memory_agent', 'process_media_transfers')\n"
+    ),
+    # Arranque web más los SDKs que se cargan al primer envío / primera subida:
+    # equivale al costo de arranque cuando los SDKs se importaban a nivel de módulo
+    'web+sdks': (
+        "import django; django.setup()\n"
+        "from django.core.wsgi import get_wsgi_application\n"
+        "from django.urls import get_resolver\n"
+        "get_wsgi_application()\n"
+        "get_resolver().url_patterns\n"
+        "import twilio.rest, googleapiclient.discovery, googleapiclient.http, google_auth_oauthlib.flow\n"
+    ),
+}
+
+CHILD_TEMPLATE = """
+import json, sys, time, resource
+started = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - started
+rss_kb = None
+try:
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                rss_kb = int(line.split()[1])
+except OSError:
+    pass
+print(json.dumps({{
+    'boot_ms': elapsed * 1000,
+    'rss_kb': rss_kb,
+    'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'heavy_modules': [name for name in {heavy!r} if name in sys.modules],
+    'module_count': len(sys.modules),
+}}))
+"""
+
+
+def parse_importtime(stderr: str) -> Dict[str, float]:
+    """
+    Tiempo propio (ms) de los imports agrupado por paquete de primer nivel
+
+    Se suma el tiempo "self" de cada módulo en lugar del acumulado para no contar
+    dos veces los submódulos.
+    """
+    totals: Dict[str, float] = defaultdict(float)
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        # Formato: "import time: <self us> | <acumulado us> | <módulo>"
+        try:
+            self_part, _, name = line.split('|', 2)
+            self_us = int(self_part.split(':', 1)[1])
+        except ValueError:
+            continue
+        totals[name.strip().split('.')[0]] += self_us / 1000
+    return dict(totals)
+
+
+class BootReport:
+    """
+    Tiempo de arranque, imports y memoria de los procesos web y worker
+
+    Cada medición arranca un intérprete nuevo con `python -X importtime`, por lo
+    que incluye el costo real de un cold start (sin módulos en caché del proceso).
+    Se reporta la mediana de `runs` arranques.
+    """
+
+    def __init__(self, runs: int = 5, top: int = 10):
+        self.runs = runs
+        self.top = top
+
+    def measure(self, target: str) -> Dict[str, Any]:
+        code = CHILD_TEMPLATE.format(code=BOOT_CODE[target], heavy=HEAVY_MODULES)
+        samples: List[Dict[str, Any]] = []
+        packages: Dict[str, List[float]] = defaultdict(list)
+
+        for _ in range(self.runs):
+            completed = subprocess.run(
+                [sys.executable, '-X', 'importtime', '-c', code],
+                capture_output=True, text=True, env=os.environ.copy(), check=False
+            )
+            if completed.returncode != 0:
+                raise RuntimeError(f"El arranque '{target}' falló:\n{completed.stderr[-2000:]}")
+            samples.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+            for package, elapsed in parse_importtime(completed.stderr).items():
+                packages[package].append(elapsed)
+
+        import_ms = {package: statistics.median(values) for package, values in packages.items()}
+        top = sorted(import_ms.items(), key=lambda item: item[1], reverse=True)[:self.top]
+        rss = [sample['rss_kb'] for sample in samples if sample['rss_kb'] is not None]
+
+        return {
+            'boot_ms': round(statistics.median(sample['boot_ms'] for sample in samples), 1),
+            'boot_min_ms': round(min(sample['boot_ms'] for sample in samples), 1),
+            'import_ms': round(sum(import_ms.values()), 1),
+            'rss_mb': round(statistics.median(rss) / 1024, 1) if rss else None,
+            'max_rss_mb': round(statistics.median(sample['max_rss_kb'] for sample in samples) / 1024, 1),
+            'module_count': samples[-1]['module_count'],
+            'heavy_modules': samples[-1]['heavy_modules'],
+            'top_packages': [{'package': package, 'import_ms': round(elapsed, 1)} for package, elapsed in top],
+        }
+
+    def run(self, targets: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+        return {target: self.measure(target) for target in (targets or list(BOOT_CODE))}
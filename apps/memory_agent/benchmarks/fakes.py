@@ -0,0 +1,231 @@
+import sys
+import json
+import time
+import uuid
+import hashlib
+import threading
+from contextlib import contextmanager
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, Optional
+from urllib.parse import urlparse, parse_qs
+from unittest import mock
+
+import httplib2
+from twilio.http.http_client import TwilioHttpClient
+
+TWILIO_API_URL = 'https://api.twilio.com'
+
+
+class _ProviderHandler(BaseHTTPRequestHandler):
+    """Responde como Twilio, la API de Google Drive y el host de archivos de WhatsApp"""
+
+    protocol_version = 'HTTP/1.1'
+    # Sin TCP_NODELAY, en conexiones keep-alive Nagle + delayed ACK agregan ~40 ms
+    # por respuesta (los headers y el cuerpo se escriben por separado)
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path.startswith('/media/'):
+            self._delay('media')
+            return self._media(path)
+        if path.startswith('/drive/v3/files'):
+            self._delay('drive')
+            return self._json(200, {'files': [{'id': 'fake-folder'}]})
+        self._json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        body = self._read_body()
+
+        if path.startswith('/2010-04-01/Accounts/'):
+            self._delay('twilio')
+            return self._json(201, {
+                'sid': f"SM{uuid.uuid4().hex}",
+                'status': 'queued',
+                'direction': 'outbound-api',
+                'body': parse_qs(body.decode('utf-8')).get('Body', [''])[0],
+            })
+        if path.startswith('/upload/drive/v3/files'):
+            self._delay('drive')
+            session_id = uuid.uuid4().hex
+            self.server.upload_sessions[session_id] = 0  # type: ignore
+            return self._empty(200, {'Location': f"{self.server.base_url}/upload/session/{session_id}"})  # type: ignore
+        if path.startswith('/drive/v3/files'):
+            self._delay('drive')
+            return self._json(200, {'id': f"folder-{uuid.uuid4().hex[:8]}"})
+        self._json(404, {'error': 'not found'})
+
+    def do_PUT(self):
+        path = urlparse(self.path).path
+        body = self._read_body()
+        self._delay('drive')
+
+        session_id = path.rsplit('/', 1)[-1]
+        sessions = self.server.upload_sessions  # type: ignore
+        if not path.startswith('/upload/session/') or session_id not in sessions:
+            return self._json(404, {'error': 'session not found'})
+
+        sessions[session_id] += len(body)
+        content_range = self.headers.get('Content-Range', '')
+        total = content_range.rsplit('/', 1)[-1] if '/' in content_range else '*'
+
+        if total != '*' and sessions[session_id] >= int(total):
+            del sessions[session_id]
+            return self._json(200, {
+                'id': f"file-{session_id[:12]}",
+                'name': 'fake',
+                'webViewLink': f"https://drive.example/file/{session_id[:12]}",
+                'size': total,
+            })
+
+        headers = {'Range': f"bytes=0-{sessions[session_id] - 1}"} if sessions[session_id] else {}
+        self._empty(308, headers)
+
+    def _media(self, path: str):
+        query = parse_qs(urlparse(self.path).query)
+        size = int(query.get('size', ['65536'])[0])
+        content_type = query.get('type', ['image/jpeg'])[0]
+
+        # Contenido determinístico por nombre, así los reenvíos son duplicados reales
+        seed = hashlib.sha256(path.encode('utf-8')).digest()
+        content = (seed * (size // len(seed) + 1))[:size]
+
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(size))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _delay(self, provider: str):
+        self.server.request_counts[provider] += 1  # type: ignore
+        latency = self.server.latencies.get(provider, 0)  # type: ignore
+        if latency:
+            time.sleep(latency)
+
+    def _json(self, status: int, payload: Dict):
+        content = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _empty(self, status: int, headers: Dict[str, str]):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    """Ignora los cortes de conexión del cliente (ej. descargas interrumpidas por el prefiltro)"""
+
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+
+class FakeProviderServer:
+    """
+    Servidor HTTP local que reemplaza a Twilio, Google Drive y las URLs de archivos
+
+    Args:
+        twilio_latency: Segundos de latencia por petición a Twilio
+        drive_latency: Segundos de latencia por petición a Google Drive
+        media_latency: Segundos de latencia por descarga de archivo
+    """
+
+    def __init__(self, twilio_latency: float = 0.0, drive_latency: float = 0.0, media_latency: float = 0.0):
+        self.httpd = _QuietHTTPServer(('127.0.0.1', 0), _ProviderHandler)
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.httpd.base_url = self.base_url  # type: ignore
+        self.httpd.latencies = {  # type: ignore
+            'twilio': twilio_latency,
+            'drive': drive_latency,
+            'media': media_latency,
+        }
+        self.httpd.request_counts = Counter()  # type: ignore
+        self.httpd.upload_sessions = {}  # type: ignore
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def request_counts(self) -> Counter:
+        return self.httpd.request_counts  # type: ignore
+
+    def media_url(self, name: str, size: int, content_type: str) -> str:
+        return f"{self.base_url}/media/{name}?size={size}&type={content_type}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class RedirectingTwilioHttpClient(TwilioHttpClient):
+    """Cliente HTTP de Twilio que envía las peticiones al servidor falso"""
+
+    def __init__(self, base_url: str):
+        super().__init__()
+        self.base_url = base_url
+
+    def request(self, method, url, *args, **kwargs):
+        return super().request(method, url.replace(TWILIO_API_URL, self.base_url), *args, **kwargs)
+
+
+class RedirectingHttp(httplib2.Http):
+    """Transporte de googleapiclient que envía las peticiones al servidor falso por HTTP"""
+
+    def __init__(self, base_url: str):
+        super().__init__()
+        self.base_url = base_url
+        self.netloc = urlparse(base_url).netloc
+
+    def request(self, uri, *args, **kwargs):
+        uri = uri.replace(f"https://{self.netloc}", self.base_url)
+        return super().request(uri, *args, **kwargs)
+
+
+@contextmanager
+def fake_providers(server: FakeProviderServer) -> Iterator[FakeProviderServer]:
+    """Redirige los clientes de Twilio y Google Drive al servidor falso"""
+    from googleapiclient.discovery import build
+    from twilio.rest import Client
+    from apps.memory_agent.services.google_drive_service import GoogleDriveService
+    from apps.memory_agent.services.twilio_service import TwilioService
+
+    def twilio_client(account_sid, auth_token):
+        return Client(account_sid, auth_token, http_client=RedirectingTwilioHttpClient(server.base_url))
+
+    def authenticate(drive_service):
+        drive_service.service = build(
+            'drive', 'v3',
+            developerKey='benchmark',
+            http=RedirectingHttp(server.base_url),
+            client_options={'api_endpoint': f"{server.base_url}/drive/v3/"},
+            static_discovery=True
+        )
+
+    # Los clientes de Twilio se reutilizan por proceso: se descartan los reales
+    # antes y los falsos después
+    TwilioService.clear_clients()
+    with mock.patch('twilio.rest.Client', twilio_client), \
+            mock.patch.object(GoogleDriveService, '_authenticate', authenticate):
+        try:
+            yield server
+        finally:
+            TwilioService.clear_clients()
@@ -0,0 +1,177 @@
+import random
+import statistics
+import timeit
+from collections import Counter
+from datetime import timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from django.utils import timezone
+
+from apps.memory_agent.benchmarks.payloads import COMMANDS, MEDIA_SAMPLES, SAMPLE_IDEAS, PayloadFactory
+
+# Palabras de relleno para variar la longitud y el tema de los mensajes sintéticos
+FILLER_WORDS = [
+    'mañana', 'revisar', 'pendiente', 'nota', 'rápido', 'lista', 'semana', 'tiempo',
+    'llamar', 'comprar', 'enviar', 'correo', 'reunión', 'plan', 'detalle', 'cambio',
+]
+
+
+def build_corpus(size: int, seed: int = 42) -> List[str]:
+    """
+    Contenidos de mensajes sintéticos: ideas de ejemplo con texto adicional de largo
+    variable (algunos superan los 100 caracteres que truncan los resúmenes)
+    """
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        idea = rng.choice(SAMPLE_IDEAS)
+        extra = ' '.join(rng.choice(FILLER_WORDS) for _ in range(rng.randint(0, 25)))
+        corpus.append(f"{idea} {extra}".strip())
+    return corpus
+
+
+class CorpusSelector:
+    """Reemplaza a MessageSelector con mensajes en memoria (sin base de datos)"""
+
+    def __init__(self, messages: List[Any]):
+        self.messages = messages
+
+    def get_messages_by_recipient(self, recipient_id: int, period: str = 'all',
+                                  limit: Optional[int] = None) -> List[Any]:
+        return self.messages[:limit]
+
+    def search_messages(self, recipient_id: int, search_term: str, limit: int = 10) -> List[Any]:
+        term = search_term.lower()
+        return [message for message in self.messages if term in message.content.lower()][:limit]
+
+    def get_recipient(self, recipient_id: int) -> Any:
+        from apps.memory_agent.models import Recipient
+
+        return Recipient(id=recipient_id, identifier='whatsapp:+573000000000', message_count=len(self.messages))
+
+
+class EmptyArchiveService:
+    """Reemplaza a MessageArchiveService: sin ideas archivadas (no lee la base de datos ni el storage)"""
+
+    def theme_counts(self, recipient_id: int) -> Counter:
+        return Counter()
+
+    def search_messages(self, recipient_id: int, search_term: str, limit: int = 10,
+                        max_files: Optional[int] = None) -> List[Any]:
+        return []
+
+
+class HotPathBenchmark:
+    """
+    Microbenchmarks de las funciones Python puras del procesamiento de mensajes
+
+    Cada caso se mide con timeit (GC desactivado): se calibra la cantidad de
+    ejecuciones para que cada repetición dure al menos `min_time` segundos y se
+    reporta el tiempo por operación (mínimo, mediana y desviación) en microsegundos.
+    Los casos de resúmenes usan corpus de distintos tamaños (`sizes`).
+    """
+
+    def __init__(self, sizes: Tuple[int, ...] = (10, 100, 1000), repeat: int = 7, min_time: float = 0.05,
+                 seed: int = 42, name_filter: Optional[str] = None):
+        self.sizes = sizes
+        self.repeat = repeat
+        self.min_time = min_time
+        self.seed = seed
+        self.name_filter = name_filter
+
+    def cases(self) -> List[Tuple[str, Callable[[], Any]]]:
+        """Lista de (nombre, función sin argumentos) a medir"""
+        from apps.memory_agent.models import Message, Source
+        from apps.memory_agent.services.summary_service import SummaryService
+        from apps.memory_agent.strategies.message_strategies import WhatsAppStrategy, TelegramStrategy
+
+        factory = PayloadFactory(lambda name, size, content_type: f"https://api.twilio.com/media/{name}",
+                                 recipients=50, seed=self.seed)
+        whatsapp = WhatsAppStrategy(Source(name='WhatsApp'))
+        telegram = TelegramStrategy(Source(name='Telegram'))
+
+        text_payload = factory.twilio_text()
+        media_payload = factory.twilio_media()
+        telegram_payload = factory.telegram_text()
+        bodies = [factory.twilio_command()['Body'] if index % 5 == 0 else factory.twilio_text()['Body']
+                  for index in range(100)]
+
+        cases: List[Tuple[str, Callable[[], Any]]] = [
+            ('whatsapp.process_message[text]', lambda: whatsapp.process_message(text_payload)),
+            ('whatsapp.process_message[media]', lambda: whatsapp.process_message(media_payload)),
+            ('whatsapp.extract_file_info', lambda: whatsapp._extract_file_info(media_payload)),
+            ('whatsapp.generate_filename', lambda: whatsapp._generate_filename(MEDIA_SAMPLES[0][0], 'SM123')),
+            ('telegram.process_message', lambda: telegram.process_message(telegram_payload)),
+            ('detect_command[x100]', lambda: [whatsapp._detect_command(body) for body in bodies]),
+        ]
+
+        now = timezone.now()
+        for size in self.sizes:
+            messages = [
+                Message(content=content, created_at=now - timedelta(minutes=index))
+                for index, content in enumerate(build_corpus(size, self.seed))
+            ]
+            service = SummaryService()
+            service.selector = service.recipient_selector = CorpusSelector(messages)  # type: ignore
+            service.archive_service = EmptyArchiveService()  # type: ignore
+            term = COMMANDS[-1].split()[-1]
+
+            cases += [
+                (f'summary.organize_by_themes[{size}]', lambda service=service, messages=messages:
+                    service._organize_by_themes(messages)),
+                (f'summary.generate_summary[{size}]', lambda service=service:
+                    service.generate_summary(1, 'all')),
+                (f'summary.search_messages[{size}]', lambda service=service, term=term:
+                    service.search_messages(1, term)),
+            ]
+
+        if self.name_filter:
+            cases = [(name, func) for name, func in cases if self.name_filter in name]
+        return cases
+
+    def run(self, only: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Ejecuta los casos y retorna las estadísticas por caso
+
+        Args:
+            only: Nombres de los casos a ejecutar (por defecto todos)
+        """
+        results = {}
+        for name, func in self.cases():
+            if only is not None and name not in only:
+                continue
+            timer = timeit.Timer(func)
+            number, elapsed = timer.autorange()
+            if elapsed < self.min_time:
+                number = max(1, int(number * self.min_time / max(elapsed, 1e-9)))
+
+            per_op = [total / number * 1e6 for total in timer.repeat(repeat=self.repeat, number=number)]
+            results[name] = {
+                'number': number,
+                'min_us': round(min(per_op), 3),
+                'median_us': round(statistics.median(per_op), 3),
+                'stdev_us': round(statistics.stdev(per_op), 3) if len(per_op) > 1 else 0.0,
+                'ops_per_second': round(1e6 / statistics.median(per_op), 1),
+            }
+        return results
+
+
+def compare_hotpaths(results: Dict[str, Any], baseline: Dict[str, Any], max_regression: float) -> List[str]:
+    """
+    Compara el tiempo mínimo por operación de cada caso con la línea base
+
+    Se usa el mínimo (no la mediana) porque es el menos afectado por el ruido de
+    otros procesos de la máquina.
+
+    Returns:
+        Lista de casos que empeoraron más de max_regression (en %)
+    """
+    regressions = []
+    for name, current in results['cases'].items():
+        previous = baseline.get('cases', {}).get(name)
+        if not previous or not previous.get('min_us'):
+            continue
+        change = (current['min_us'] - previous['min_us']) / previous['min_us'] * 100
+        if change > max_regression:
+            regressions.append(f"{name}: {previous['min_us']} -> {current['min_us']} µs ({change:+.1f}%)")
+    return regressions
@@ -0,0 +1,147 @@
+import json
+import os
+import queue
+import threading
+import time
+from http.client import HTTPConnection, HTTPException
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from apps.memory_agent.benchmarks.payloads import PayloadFactory
+from apps.memory_agent.benchmarks.webhook_bench import percentile
+
+
+def process_tree(pid: int) -> List[int]:
+    """PID del proceso y de todos sus descendientes (Linux, vía /proc)"""
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as stat:
+                # El nombre del proceso va entre paréntesis y puede tener espacios
+                ppid = int(stat.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    tree, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        tree.append(current)
+        pending.extend(children.get(current, []))
+    return tree
+
+
+def process_memory(pid: int) -> Dict[str, Any]:
+    """
+    Memoria del proceso y sus hijos (ej: maestro y workers de gunicorn)
+
+    RSS cuenta varias veces las páginas compartidas por copy-on-write; PSS las
+    reparte entre los procesos que las comparten, por lo que su suma es la
+    memoria real usada por el servidor.
+    """
+    rss_kb = pss_kb = 0
+    pids = process_tree(pid)
+    for current in pids:
+        try:
+            with open(f'/proc/{current}/smaps_rollup') as rollup:
+                for line in rollup:
+                    if line.startswith('Rss:'):
+                        rss_kb += int(line.split()[1])
+                    elif line.startswith('Pss:'):
+                        pss_kb += int(line.split()[1])
+        except OSError:
+            continue
+    return {'processes': len(pids), 'rss_mb': round(rss_kb / 1024, 1), 'pss_mb': round(pss_kb / 1024, 1)}
+
+
+class HttpLoadBenchmark:
+    """
+    Carga HTTP contra un servidor en ejecución (runserver, gunicorn)
+
+    A diferencia de bench_webhooks, las peticiones pasan por el servidor real,
+    por lo que se mide también el costo del servidor (procesos, hilos, DEBUG).
+    Solo se envían mensajes de Telegram (texto y comandos): su estrategia no
+    llama a proveedores externos, así el resultado no depende de Twilio.
+    Cada hilo reutiliza su conexión (keep-alive) mientras el servidor lo permita.
+    """
+
+    def __init__(self, url: str, requests: int = 2000, concurrency: int = 8,
+                 command_share: float = 0.1, recipients: int = 50, seed: int = 42):
+        parts = urlsplit(url)
+        self.host = parts.hostname or '127.0.0.1'
+        self.port = parts.port or 80
+        self.path = '/api/v1/webhook/Telegram/'
+        self.requests = requests
+        self.concurrency = concurrency
+        self.command_share = command_share
+        self.factory = PayloadFactory(lambda *args: '', recipients=recipients, seed=seed)
+
+    def run(self, pid: Optional[int] = None) -> Dict[str, Any]:
+        memory_before = process_memory(pid) if pid else None
+
+        # La primera petición muestra el costo de un worker sin calentar
+        first_ms = self._timed_request(HTTPConnection(self.host, self.port, timeout=30))[0] * 1000
+
+        pending: queue.Queue = queue.Queue()
+        for _ in range(self.requests):
+            command = self.factory.random.random() < self.command_share
+            pending.put(self.factory.telegram_command() if command else self.factory.telegram_text())
+
+        samples: List[float] = []
+        errors = [0]
+        lock = threading.Lock()
+
+        def worker():
+            connection = HTTPConnection(self.host, self.port, timeout=30)
+            while True:
+                try:
+                    payload = pending.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    latency, status = self._timed_request(connection, payload)
+                except (OSError, HTTPException):
+                    connection.close()
+                    with lock:
+                        errors[0] += 1
+                    continue
+                with lock:
+                    samples.append(latency * 1000)
+                    if status >= 400:
+                        errors[0] += 1
+            connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(self.concurrency)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall_seconds = time.perf_counter() - started
+
+        return {
+            'requests': len(samples),
+            'errors': errors[0],
+            'concurrency': self.concurrency,
+            'throughput_rps': round(len(samples) / wall_seconds, 2) if wall_seconds else 0.0,
+            'first_request_ms': round(first_ms, 2),
+            'p50_ms': round(percentile(samples, 50), 2),
+            'p95_ms': round(percentile(samples, 95), 2),
+            'p99_ms': round(percentile(samples, 99), 2),
+            'wall_seconds': round(wall_seconds, 3),
+            'memory_before': memory_before,
+            'memory_after': process_memory(pid) if pid else None,
+        }
+
+    def _timed_request(self, connection: HTTPConnection, payload: Optional[Dict[str, Any]] = None):
+        body = json.dumps(payload or self.factory.telegram_text())
+        started = time.perf_counter()
+        connection.request('POST', self.path, body=body, headers={'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        response.read()
+        latency = time.perf_counter() - started
+        if response.getheader('Connection', '').lower() == 'close':
+            connection.close()
+        return latency, response.status
@@ -0,0 +1,148 @@
+import random
+import uuid
+from typing import Dict, Any, List, Tuple
+
+# Ideas de ejemplo para los mensajes de texto sintéticos
+SAMPLE_IDEAS = [
+    "Tengo una idea para una app móvil que organice las compras de la casa",
+    "Revisar el proyecto de la oficina antes del viernes",
+    "Empezar el curso de estadística y terminar el libro de arquitectura",
+    "Llamar a la familia el domingo y planear la visita de los amigos",
+    "Rutina de ejercicio: correr 5 km y ajustar la dieta con el médico",
+    "Crear un prototipo para innovar en el proceso de facturación de la empresa",
+    "Comprar regalo de cumpleaños",
+    "Aprender a tocar guitarra con videos cortos cada mañana",
+]
+
+COMMANDS = ['/resumen', '/hoy', '/semana', '/buscar idea']
+
+# (tipo MIME, tamaño en bytes) de los archivos sintéticos
+MEDIA_SAMPLES = [
+    ('image/jpeg', 180 * 1024),
+    ('image/jpeg', 950 * 1024),
+    ('image/png', 420 * 1024),
+    ('application/pdf', 300 * 1024),
+    ('audio/ogg', 60 * 1024),
+    ('video/mp4', 6 * 1024 * 1024),
+]
+
+MESSAGE_TYPES = ['text', 'command', 'media']
+
+
+class PayloadFactory:
+    """
+    Genera payloads realistas de los webhooks de Twilio (form-encoded) y Telegram (JSON)
+
+    Args:
+        media_url: Callable(nombre, tamaño, content_type) que construye la URL del archivo
+        recipients: Cantidad de usuarios distintos
+        duplicate_ratio: Proporción de archivos reenviados (mismo contenido)
+        seed: Semilla para que las corridas sean reproducibles
+    """
+
+    def __init__(self, media_url, recipients: int = 50, duplicate_ratio: float = 0.2, seed: int = 42):
+        self.random = random.Random(seed)
+        self.media_url = media_url
+        self.duplicate_ratio = duplicate_ratio
+        self.phone_numbers = [f"+57300{index:07d}" for index in range(recipients)]
+        self.chat_ids = [str(100000000 + index) for index in range(recipients)]
+        self.media_sent: List[Tuple[str, str, int]] = []
+
+    def twilio_text(self) -> Dict[str, Any]:
+        return self._twilio_base(self.random.choice(SAMPLE_IDEAS))
+
+    def twilio_command(self) -> Dict[str, Any]:
+        return self._twilio_base(self.random.choice(COMMANDS))
+
+    def twilio_media(self) -> Dict[str, Any]:
+        if self.media_sent and self.random.random() < self.duplicate_ratio:
+            name, content_type, size = self.random.choice(self.media_sent)
+        else:
+            content_type, size = self.random.choice(MEDIA_SAMPLES)
+            name = uuid.UUID(int=self.random.getrandbits(128)).hex
+            self.media_sent.append((name, content_type, size))
+
+        payload = self._twilio_base('')
+        payload.update({
+            'NumMedia': '1',
+            'MediaContentType0': content_type,
+            'MediaUrl0': self.media_url(name, size, content_type),
+        })
+        return payload
+
+    def telegram_text(self) -> Dict[str, Any]:
+        return self._telegram_base(self.random.choice(SAMPLE_IDEAS))
+
+    def telegram_command(self) -> Dict[str, Any]:
+        return self._telegram_base(self.random.choice(COMMANDS))
+
+    def _twilio_base(self, body: str) -> Dict[str, Any]:
+        message_sid = f"SM{uuid.UUID(int=self.random.getrandbits(128)).hex}"
+        phone = self.random.choice(self.phone_numbers)
+        return {
+            'SmsMessageSid': message_sid,
+            'NumMedia': '0',
+            'ProfileName': 'Benchmark',
+            'MessageType': 'text',
+            'SmsSid': message_sid,
+            'WaId': phone.lstrip('+'),
+            'SmsStatus': 'received',
+            'Body': body,
+            'To': 'whatsapp:+14155238886',
+            'NumSegments': '1',
+            'ReferralNumMedia': '0',
+            'MessageSid': message_sid,
+            'AccountSid': 'ACbenchmark',
+            'From': f"whatsapp:{phone}",
+            'ApiVersion': '2010-04-01',
+        }
+
+    def _telegram_base(self, text: str) -> Dict[str, Any]:
+        chat_id = int(self.random.choice(self.chat_ids))
+        update_id = self.random.randint(1, 10 ** 9)
+        return {
+            'update_id': update_id,
+            'message': {
+                'message_id': update_id % 100000,
+                'from': {'id': chat_id, 'is_bot': False, 'first_name': 'Benchmark'},
+                'chat': {'id': chat_id, 'type': 'private', 'first_name': 'Benchmark'},
+                'date': 1700000000,
+                'text': text,
+            },
+        }
+
+    def build_workload(self, total: int, mix: Dict[str, float], telegram_share: float) -> List[Dict[str, Any]]:
+        """
+        Construye la lista de peticiones a enviar
+
+        Args:
+            total: Cantidad de peticiones
+            mix: Peso relativo de cada tipo de mensaje (text, command, media)
+            telegram_share: Proporción de texto/comandos enviados por Telegram
+
+        Returns:
+            Lista de dicts con message_type, source_name, content_type y payload
+        """
+        types = list(mix)
+        weights = [mix[message_type] for message_type in types]
+        workload = []
+
+        for _ in range(total):
+            message_type = self.random.choices(types, weights)[0]
+            # Telegram no envía archivos en la estrategia actual
+            use_telegram = message_type != 'media' and self.random.random() < telegram_share
+
+            if use_telegram:
+                payload = self.telegram_text() if message_type == 'text' else self.telegram_command()
+                workload.append({'message_type': message_type, 'source_name': 'Telegram',
+                                 'content_type': 'application/json', 'payload': payload})
+            else:
+                payload = {
+                    'text': self.twilio_text,
+                    'command': self.twilio_command,
+                    'media': self.twilio_media,
+                }[message_type]()
+                workload.append({'message_type': message_type, 'source_name': 'WhatsApp',
+                                 'content_type': 'application/x-www-form-urlencoded', 'payload': payload})
+
+        return workload
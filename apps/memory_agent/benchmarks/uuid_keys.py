@@ -0,0 +1,128 @@
+import io
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List
+
+from django.db import connection
+
+from utils.uuid7 import uuid7
+
+GENERATORS: Dict[str, Callable[[], uuid.UUID]] = {
+    'uuid4': uuid.uuid4,
+    'uuid7': uuid7,
+}
+
+
+class UuidKeyBenchmark:
+    """
+    Inserciones en una tabla con la forma de Message usando claves UUID v4 o v7 (PostgreSQL)
+
+    Las filas se cargan con COPY en lotes; cada lote es una transacción. Se mide el
+    throughput a medida que la tabla crece, el tamaño final de la tabla y del índice
+    de la clave primaria y el WAL generado. Con uuid4 cada inserción cae en una hoja
+    aleatoria del índice: cuando el índice deja de caber en shared_buffers el
+    throughput cae y las hojas divididas quedan a medio llenar.
+    """
+
+    def __init__(self, rows: int = 10_000_000, batch_size: int = 50_000, checkpoints: int = 10,
+                 content_size: int = 120):
+        self.rows = rows
+        self.batch_size = batch_size
+        self.checkpoints = max(1, checkpoints)
+        self.content = 'x' * content_size
+
+    def run(self, variants: List[str]) -> Dict[str, Any]:
+        with connection.cursor() as cursor:
+            cursor.execute('SHOW shared_buffers')
+            shared_buffers = cursor.fetchone()[0]
+        return {
+            'meta': {'rows': self.rows, 'batch_size': self.batch_size, 'shared_buffers': shared_buffers},
+            'variants': {variant: self._run_variant(variant) for variant in variants},
+        }
+
+    def _run_variant(self, variant: str) -> Dict[str, Any]:
+        table = f'bench_uuid_keys_{variant}'
+        generate = GENERATORS[variant]
+        quoted = connection.ops.quote_name(table)
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {quoted}')
+            cursor.execute(
+                f'CREATE TABLE {quoted} (id uuid PRIMARY KEY, created_at timestamptz NOT NULL, '
+                f'recipient varchar(100) NOT NULL, content text NOT NULL)'
+            )
+            cursor.execute('SELECT pg_current_wal_lsn()')
+            wal_start = cursor.fetchone()[0]
+
+        every = max(self.batch_size, self.rows // self.checkpoints)
+        started_at = datetime.now(timezone.utc)
+        progress = []
+        inserted = 0
+        generate_seconds = copy_seconds = interval_seconds = 0.0
+        interval_rows = 0
+
+        try:
+            while inserted < self.rows:
+                size = min(self.batch_size, self.rows - inserted)
+
+                started = time.perf_counter()
+                buffer = io.StringIO()
+                for index in range(inserted, inserted + size):
+                    created_at = started_at + timedelta(milliseconds=index)
+                    buffer.write(f'{generate()}\t{created_at.isoformat()}\twhatsapp:+57300{index % 5000:07d}\t'
+                                 f'{self.content}\n')
+                buffer.seek(0)
+                generate_seconds += time.perf_counter() - started
+
+                started = time.perf_counter()
+                with connection.cursor() as cursor:
+                    cursor.copy_expert(f'COPY {quoted} (id, created_at, recipient, content) FROM STDIN', buffer)
+                elapsed = time.perf_counter() - started
+
+                copy_seconds += elapsed
+                interval_seconds += elapsed
+                interval_rows += size
+                inserted += size
+
+                if inserted % every < size or inserted == self.rows:
+                    progress.append({
+                        'rows': inserted,
+                        'rows_per_second': round(interval_rows / interval_seconds) if interval_seconds else 0,
+                    })
+                    interval_seconds, interval_rows = 0.0, 0
+
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT pg_relation_size(%s), pg_relation_size(%s), '
+                    'pg_wal_lsn_diff(pg_current_wal_lsn(), %s)',
+                    [table, f'{table}_pkey', wal_start]
+                )
+                table_bytes, index_bytes, wal_bytes = cursor.fetchone()
+            leaf_density = self._leaf_density(f'{table}_pkey')
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute(f'DROP TABLE IF EXISTS {quoted}')
+
+        mb = 1024 * 1024
+        return {
+            'rows_per_second': round(inserted / copy_seconds) if copy_seconds else 0,
+            'copy_seconds': round(copy_seconds, 2),
+            'generate_us_per_row': round(generate_seconds / inserted * 1e6, 2) if inserted else 0.0,
+            'table_mb': round(table_bytes / mb, 1),
+            'index_mb': round(index_bytes / mb, 1),
+            'wal_mb': round(float(wal_bytes) / mb, 1),
+            'leaf_density': leaf_density,
+            'progress': progress,
+        }
+
+    @staticmethod
+    def _leaf_density(index: str):
+        """Ocupación media de las hojas del índice (requiere la extensión pgstattuple)"""
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('CREATE EXTENSION IF NOT EXISTS pgstattuple')
+                cursor.execute('SELECT avg_leaf_density FROM pgstatindex(%s)', [index])
+                return float(cursor.fetchone()[0])
+        except Exception:
+            return None
@@ -0,0 +1,315 @@
+import json
+import time
+import queue
+import platform
+import threading
+from collections import defaultdict
+from datetime import timedelta
+from typing import Dict, Any, List, Optional
+from urllib.parse import urlencode
+
+import django
+from django.db import close_old_connections, connection
+from django.test import Client
+from django.utils import timezone
+from prometheus_client import REGISTRY
+
+from apps.memory_agent.benchmarks.fakes import FakeProviderServer, fake_providers
+from apps.memory_agent.benchmarks.payloads import PayloadFactory, SAMPLE_IDEAS, MESSAGE_TYPES
+from apps.memory_agent.query_budget import get_budget, record_queries, webhook_label
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Percentil por rango más cercano"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(samples: List[Dict[str, Any]], wall_seconds: float) -> Dict[str, Any]:
+    """Resume latencias (ms), throughput y consultas SQL de un grupo de peticiones"""
+    latencies = [sample['latency'] * 1000 for sample in samples]
+    queries = [sample['queries'] for sample in samples]
+    return {
+        'requests': len(samples),
+        'errors': sum(1 for sample in samples if sample['status'] >= 400),
+        'throughput_rps': round(len(samples) / wall_seconds, 2) if wall_seconds else 0.0,
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'queries_avg': round(sum(queries) / len(queries), 2) if queries else 0.0,
+        'queries_max': max(queries) if queries else 0,
+    }
+
+
+def connection_stats(alias: str = 'default') -> Dict[str, float]:
+    """Contadores actuales de las métricas de conexiones del backend (ver apps.memory_agent.db)"""
+    labels = {'alias': alias}
+    return {
+        'opened': REGISTRY.get_sample_value('memory_agent_db_connect_seconds_count', labels) or 0.0,
+        'connect_seconds': REGISTRY.get_sample_value('memory_agent_db_connect_seconds_sum', labels) or 0.0,
+        'reused': REGISTRY.get_sample_value('memory_agent_db_connection_age_seconds_count', labels) or 0.0,
+        'health_check_failures': REGISTRY.get_sample_value(
+            'memory_agent_db_health_check_failures_total', labels) or 0.0,
+    }
+
+
+def summarize_connections(before: Dict[str, float], after: Dict[str, float], requests: int) -> Dict[str, Any]:
+    """
+    Conexiones abiertas y reutilizadas durante la corrida
+
+    Con CONN_MAX_AGE = 0 cada petición abre su conexión (opened ≈ requests);
+    con conexiones persistentes solo se abre una por hilo.
+    """
+    opened = int(after['opened'] - before['opened'])
+    reused = int(after['reused'] - before['reused'])
+    connect_seconds = after['connect_seconds'] - before['connect_seconds']
+    return {
+        'conn_max_age': connection.settings_dict.get('CONN_MAX_AGE'),
+        'opened': opened,
+        'reused': reused,
+        'reuse_ratio': round(reused / requests, 3) if requests else 0.0,
+        'connect_ms_avg': round(connect_seconds * 1000 / opened, 2) if opened else 0.0,
+        'health_check_failures': int(after['health_check_failures'] - before['health_check_failures']),
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], max_regression: float) -> List[str]:
+    """
+    Compara una corrida con la línea base
+
+    Returns:
+        Lista de regresiones que superan max_regression (en %)
+    """
+    regressions = []
+    groups = {'overall': (results['overall'], baseline.get('overall', {}))}
+    for message_type, current in results['by_type'].items():
+        groups[message_type] = (current, baseline.get('by_type', {}).get(message_type, {}))
+
+    for group, (current, previous) in groups.items():
+        # (métrica, True si un valor mayor es peor)
+        for metric, higher_is_worse in [('p95_ms', True), ('p99_ms', True),
+                                        ('throughput_rps', False), ('queries_avg', True)]:
+            before, after = previous.get(metric), current.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before * 100
+            if (change if higher_is_worse else -change) > max_regression:
+                regressions.append(f"{group}.{metric}: {before} -> {after} ({change:+.1f}%)")
+
+    return regressions
+
+
+class WebhookBenchmark:
+    """
+    Reproduce tráfico de webhooks contra AgentWebhookView con proveedores falsos
+
+    Twilio, la API de Google Drive y las URLs de archivos se reemplazan por un
+    servidor HTTP local con latencia configurable. Cada petición se mide en el
+    mismo proceso (Django test Client), registrando latencia y consultas SQL.
+    """
+
+    def __init__(self, requests: int = 500, concurrency: int = 8, mix: Optional[Dict[str, float]] = None,
+                 telegram_share: float = 0.3, recipients: int = 50, seed_messages: int = 1000,
+                 twilio_latency: float = 0.05, drive_latency: float = 0.1, media_latency: float = 0.05,
+                 drain: bool = True, seed: int = 42):
+        self.requests = requests
+        self.concurrency = concurrency
+        self.mix = mix or {'text': 70, 'command': 10, 'media': 20}
+        self.telegram_share = telegram_share
+        self.recipients = recipients
+        self.seed_messages = seed_messages
+        self.latencies = {'twilio': twilio_latency, 'drive': drive_latency, 'media': media_latency}
+        self.drain = drain
+        self.seed = seed
+
+    def run(self) -> Dict[str, Any]:
+        """Ejecuta el benchmark y retorna los resultados"""
+        server = FakeProviderServer(
+            twilio_latency=self.latencies['twilio'],
+            drive_latency=self.latencies['drive'],
+            media_latency=self.latencies['media']
+        )
+        server.start()
+
+        try:
+            with fake_providers(server):
+                factory = PayloadFactory(server.media_url, recipients=self.recipients, seed=self.seed)
+                self._prepare_data(factory)
+                workload = factory.build_workload(self.requests, self.mix, self.telegram_share)
+
+                connections_before = connection_stats()
+                started = time.perf_counter()
+                samples = self._replay(workload)
+                wall_seconds = time.perf_counter() - started
+                connections_after = connection_stats()
+
+                drain = self._drain() if self.drain and self.mix.get('media') else None
+        finally:
+            server.stop()
+
+        by_type = defaultdict(list)
+        violations = {}
+        for sample in samples:
+            by_type[sample['message_type']].append(sample)
+            # Un reporte por tipo de webhook/comando es suficiente para ubicar el origen
+            violation = sample['budget_violation']
+            if violation and violation['label'] not in violations:
+                violations[violation['label']] = violation
+
+        return {
+            'meta': {
+                'timestamp': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'requests': self.requests,
+                'concurrency': self.concurrency,
+                'mix': self.mix,
+                'telegram_share': self.telegram_share,
+                'seed_messages': self.seed_messages,
+                'provider_latency_ms': {name: value * 1000 for name, value in self.latencies.items()},
+            },
+            'overall': dict(summarize(samples, wall_seconds), wall_seconds=round(wall_seconds, 3)),
+            'by_type': {
+                message_type: summarize(by_type[message_type], wall_seconds)
+                for message_type in MESSAGE_TYPES if by_type[message_type]
+            },
+            'connections': summarize_connections(connections_before, connections_after, len(samples)),
+            'drain': drain,
+            'budget_violations': list(violations.values()),
+            'provider_requests': dict(server.request_counts),
+        }
+
+    def _prepare_data(self, factory: PayloadFactory):
+        """Crea las fuentes y un historial de ideas para que los comandos tengan datos"""
+        from apps.memory_agent.models import Source, Message, Recipient
+        from apps.memory_agent.selectors.recipient_selector import RecipientSelector
+
+        whatsapp, _ = Source.objects.update_or_create(  # type: ignore
+            name='WhatsApp',
+            defaults={'additional1': 'ACbenchmark', 'additional2': 'benchmark-token', 'is_active': True}
+        )
+        telegram, _ = Source.objects.update_or_create(  # type: ignore
+            name='Telegram',
+            defaults={'is_active': True}
+        )
+
+        now = timezone.now()
+        recipients = Recipient.objects.bulk_create(  # type: ignore
+            [Recipient(source=whatsapp, identifier=f"whatsapp:{phone}") for phone in factory.phone_numbers]
+            + [Recipient(source=telegram, identifier=chat_id) for chat_id in factory.chat_ids]
+        )
+        RecipientSelector.clear_recipient_cache()
+
+        messages = []
+        for index in range(self.seed_messages):
+            recipient = recipients[index % len(recipients)]
+            messages.append(Message(
+                content=SAMPLE_IDEAS[index % len(SAMPLE_IDEAS)],
+                source=recipient.source,
+                recipient=recipient,
+            ))
+        Message.objects.bulk_create(messages, batch_size=1000)  # type: ignore
+
+        # Repartir el historial en los últimos 30 días (auto_now_add ignora el valor en bulk_create)
+        for offset, message in enumerate(messages):
+            message.created_at = now - timedelta(minutes=offset * 43200 // max(len(messages), 1))
+        Message.objects.bulk_update(messages, ['created_at'], batch_size=1000)  # type: ignore
+        RecipientSelector.refresh_counters()
+
+    def _replay(self, workload: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Envía las peticiones con `concurrency` hilos, cada uno con su conexión a BD"""
+        pending: queue.Queue = queue.Queue()
+        for item in workload:
+            pending.put(item)
+
+        samples: List[Dict[str, Any]] = []
+        lock = threading.Lock()
+
+        def worker():
+            client = Client()
+            try:
+                while True:
+                    try:
+                        item = pending.get_nowait()
+                    except queue.Empty:
+                        return
+                    sample = self._send(client, item)
+                    with lock:
+                        samples.append(sample)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return samples
+
+    def _send(self, client: Client, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Envía una petición y mide su latencia y consultas SQL"""
+        url = f"/api/v1/webhook/{item['source_name']}/"
+        if item['content_type'] == 'application/json':
+            body = json.dumps(item['payload'])
+        else:
+            body = urlencode(item['payload'])
+
+        # El cliente de pruebas desconecta close_old_connections de las señales de la
+        # petición; se llama como lo haría el handler WSGI para respetar CONN_MAX_AGE
+        close_old_connections()
+        with record_queries() as recorder:
+            started = time.perf_counter()
+            response = client.post(url, data=body, content_type=item['content_type'])
+            latency = time.perf_counter() - started
+        close_old_connections()
+
+        # Presupuesto de consultas según el resultado (texto, archivo o comando)
+        data = getattr(response, 'data', None)
+        label = webhook_label(data.get('result') if isinstance(data, dict) else None)
+        budget = get_budget(label) if label else None
+
+        return {
+            'message_type': item['message_type'],
+            'source_name': item['source_name'],
+            'status': response.status_code,
+            'latency': latency,
+            'queries': recorder.count,
+            'budget_violation': (
+                {'label': label, 'queries': recorder.count, 'budget': budget,
+                 'report': recorder.report(label, budget)}
+                if budget is not None and recorder.count > budget else None
+            ),
+        }
+
+    def _drain(self) -> Dict[str, Any]:
+        """Procesa el outbox de transferencias generado por los mensajes con archivos"""
+        from apps.memory_agent.models import MediaTransfer
+        from apps.memory_agent.services.media_transfer_service import MediaTransferService
+
+        service = MediaTransferService()
+        totals = defaultdict(int)
+
+        started = time.perf_counter()
+        while True:
+            counts = service.process_due(batch_size=self.concurrency * 2, max_workers=self.concurrency)
+            if not counts['claimed']:
+                break
+            for key, value in counts.items():
+                totals[key] += value
+        wall_seconds = time.perf_counter() - started
+
+        return {
+            'transfers': totals['claimed'],
+            'done': totals['done'],
+            'retry': totals['retry'],
+            'dead': totals['dead'],
+            'lost': totals['lost'],
+            'wall_seconds': round(wall_seconds, 3),
+            'throughput_tps': round(totals['done'] / wall_seconds, 2) if wall_seconds else 0.0,
+            'pending': MediaTransfer.objects.exclude(status=MediaTransfer.STATUS_DONE).count(),  # type: ignore
+        }
@@ -0,0 +1,149 @@
+import re
+from dataclasses import dataclass, field
+from datetime import datetime
+from itertools import chain
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+# Encabezado de cada mensaje de un chat exportado de WhatsApp:
+#   Android: "31/12/23, 21:41 - Ana: texto" o "12/31/23, 9:41 p. m. - Ana: texto"
+#   iOS:     "[31/12/23, 21:41:05] Ana: texto"
+# Las líneas que no empiezan así continúan el mensaje anterior
+HEADER = re.compile(
+    r'^\[?(\d{1,2})[/.\-](\d{1,2})[/.\-](\d{2,4}),?\s+(\d{1,2}):(\d{2})(?::(\d{2}))?'
+    r'\s*(?:([ap])\.?\s*m\.?)?\s*(?:\]\s*|[-–]\s+)(.*)$',
+    re.IGNORECASE
+)
+# Android: "IMG-20231231-WA0001.jpg (archivo adjunto)"; iOS: "<adjunto: 00000012-PHOTO-....jpg>"
+ATTACHED_ANDROID = re.compile(r'^(.+?\.\w{1,5}) \((?:file attached|archivo adjunto)\)$', re.IGNORECASE)
+ATTACHED_IOS = re.compile(r'^<(?:attached|adjunto): (.+?)>$', re.IGNORECASE)
+MEDIA_OMITTED = {'<media omitted>', '<multimedia omitido>', '<archivo omitido>'}
+DELETED = {
+    'this message was deleted', 'you deleted this message',
+    'se eliminó este mensaje.', 'eliminaste este mensaje.',
+}
+EDITED_SUFFIX = re.compile(r'\s*<(?:this message was edited|se editó este mensaje\.)>$', re.IGNORECASE)
+# Marcas de dirección y espacios especiales que WhatsApp agrega según el idioma
+# (translate es lento: solo se aplica a las líneas que los tienen)
+INVISIBLE = str.maketrans({'\u200e': None, '\u200f': None, '\ufeff': None, '\u202f': ' ', '\u00a0': ' '})
+INVISIBLE_CHARS = re.compile('[\u200e\u200f\ufeff\u202f\u00a0]')
+
+# Encabezados que se leen para decidir si la fecha es día/mes o mes/día
+DATE_ORDER_SAMPLE = 500
+
+
+def _clean(line: str) -> str:
+    line = line.rstrip('\r\n')
+    return line.translate(INVISIBLE) if INVISIBLE_CHARS.search(line) else line
+
+
+@dataclass
+class ChatMessage:
+    timestamp: datetime  # Hora local del teléfono que exportó el chat
+    author: Optional[str]  # None en los mensajes del sistema (cifrado, cambios de grupo)
+    text: str
+    attachments: List[str] = field(default_factory=list)  # Nombres de los archivos adjuntos
+    media_omitted: bool = False  # Exportado "sin archivos": el adjunto no tiene nombre
+    deleted: bool = False
+
+
+class WhatsAppExportParser:
+    """
+    Lee el .txt de "Exportar chat" de WhatsApp (Android o iOS, español o inglés)
+
+    Recorre las líneas una vez sin cargar el archivo: solo guarda el mensaje en
+    curso (los mensajes de varias líneas se unen) y, al comienzo, los primeros
+    encabezados para decidir el orden de la fecha. Sin `dayfirst` el orden se
+    deduce de las fechas (un 13 o más en la primera posición es día/mes, en la
+    segunda mes/día); si todas son ambiguas se asume día/mes.
+    """
+
+    def __init__(self, dayfirst: Optional[bool] = None):
+        self.dayfirst = dayfirst
+
+    def parse(self, lines: Iterable[str]) -> Iterator[ChatMessage]:
+        lines, dayfirst = self._date_order(lines)
+        current = None
+        for line in lines:
+            line = _clean(line)
+            match = HEADER.match(line)
+            timestamp = self._timestamp(match, dayfirst) if match else None
+            if timestamp is None:
+                if current is not None:
+                    current[2].append(line)
+                continue
+            if current is not None:
+                yield self._build(*current)
+            current = (timestamp, match.group(8), [])
+        if current is not None:
+            yield self._build(*current)
+
+    def timestamps(self, lines: Iterable[str]) -> Iterator[datetime]:
+        """Solo la fecha de cada mensaje (más rápido que parse: no arma los mensajes)"""
+        lines, dayfirst = self._date_order(lines)
+        for line in lines:
+            match = HEADER.match(_clean(line))
+            timestamp = self._timestamp(match, dayfirst) if match else None
+            if timestamp is not None:
+                yield timestamp
+
+    def _date_order(self, lines: Iterable[str]) -> Tuple[Iterator[str], bool]:
+        lines = iter(lines)
+        if self.dayfirst is not None:
+            return lines, self.dayfirst
+        sample: List[str] = []
+        dayfirst = self._detect_dayfirst(lines, sample)
+        return chain(sample, lines), dayfirst
+
+    def _detect_dayfirst(self, lines: Iterator[str], sample: List[str]) -> bool:
+        """Lee hasta DATE_ORDER_SAMPLE encabezados (quedan en `sample` para procesarlos después)"""
+        headers = 0
+        for line in lines:
+            sample.append(line)
+            match = HEADER.match(_clean(line))
+            if match is None:
+                continue
+            if int(match.group(1)) > 12:
+                return True
+            if int(match.group(2)) > 12:
+                return False
+            headers += 1
+            if headers >= DATE_ORDER_SAMPLE:
+                break
+        return True
+
+    def _timestamp(self, match: re.Match, dayfirst: bool) -> Optional[datetime]:
+        """None si la fecha no existe: la línea es texto que empieza como un encabezado"""
+        first, second, year, hour, minute, second_of_minute, meridiem = match.group(1, 2, 3, 4, 5, 6, 7)
+        day, month = (first, second) if dayfirst else (second, first)
+        year, hour = int(year), int(hour)
+        if year < 100:
+            year += 2000
+        if meridiem:
+            hour = hour % 12 + (12 if meridiem.lower() == 'p' else 0)
+        try:
+            return datetime(year, int(month), int(day), hour, int(minute), int(second_of_minute or 0))
+        except ValueError:
+            return None
+
+    def _build(self, timestamp: datetime, rest: str, continuation: List[str]) -> ChatMessage:
+        author, separator, text = rest.partition(': ')
+        if not separator:
+            return ChatMessage(timestamp=timestamp, author=None, text='\n'.join([rest, *continuation]))
+
+        message = ChatMessage(timestamp=timestamp, author=author, text='')
+        lowered = text.strip().lower()
+        if lowered in MEDIA_OMITTED:
+            message.media_omitted = True
+            text = ''
+        elif lowered in DELETED:
+            message.deleted = True
+            text = ''
+        else:
+            attached = ATTACHED_ANDROID.match(text) or ATTACHED_IOS.match(text)
+            if attached:
+                message.attachments.append(attached.group(1))
+                text = ''
+
+        # El pie de foto de un adjunto de Android viene en las líneas siguientes
+        message.text = EDITED_SUFFIX.sub('', '\n'.join([text, *continuation])).strip()
+        return message
@@ -0,0 +1,42 @@
+from functools import lru_cache
+from typing import Iterable, Tuple
+
+# Temas de los resúmenes en orden de prioridad: si un mensaje tiene palabras de
+# varios temas, gana el primero de la lista
+THEME_KEYWORDS: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ('Trabajo', ('trabajo', 'proyecto', 'oficina', 'empresa')),
+    ('Personal', ('personal', 'familia', 'amigos', 'casa')),
+    ('Ideas', ('idea', 'invento', 'crear', 'innovar')),
+    ('Educación', ('estudio', 'aprender', 'curso', 'libro')),
+    ('Salud', ('salud', 'ejercicio', 'dieta', 'médico')),
+)
+DEFAULT_THEME = 'General'
+
+
+class ThemeClassifier:
+    """
+    Clasifica un texto por tema según palabras clave
+
+    Las reglas se compilan en una sola tupla plana (palabra, tema) en orden de
+    prioridad, de modo que clasificar es un único recorrido con búsquedas de
+    substring en C, sin generadores por tema. El resultado es el mismo que
+    recorrer los temas en orden y buscar cualquiera de sus palabras.
+    """
+
+    def __init__(self, themes: Iterable[Tuple[str, Tuple[str, ...]]] = THEME_KEYWORDS,
+                 default: str = DEFAULT_THEME):
+        self.rules = tuple((word, theme) for theme, words in themes for word in words)
+        self.default = default
+
+    def classify(self, text: str) -> str:
+        lowered = text.lower()
+        for word, theme in self.rules:
+            if word in lowered:
+                return theme
+        return self.default
+
+
+@lru_cache(maxsize=None)
+def get_theme_classifier() -> ThemeClassifier:
+    """Clasificador compartido por el proceso (se compila en el primer uso o en el warm-up)"""
+    return ThemeClassifier()
@@ -0,0 +1,161 @@
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from django.conf import settings
+from django.db import models
+from django.db.models.query_utils import DeferredAttribute
+
+# Caracteres de los contenidos comprimidos que se guardan en content_preview (resúmenes y búsquedas)
+PREVIEW_LENGTH = 100
+
+# Segundos que un proceso usa el diccionario activo antes de volver a consultarlo
+ACTIVE_DICTIONARY_TTL = 300
+
+# Diccionarios por dict_id (no cambian: se guardan sin expirar) y el activo para
+# comprimir por nivel: {nivel: (expira_en, diccionario preparado o None)}
+_dictionaries: Dict[int, Any] = {}
+_active: Dict[int, Tuple[float, Any]] = {}
+_lock = threading.Lock()
+
+
+def _dictionary(dict_id: int):
+    """ZstdCompressionDict de un diccionario guardado (se carga una vez por proceso)"""
+    dictionary = _dictionaries.get(dict_id)
+    if dictionary is None:
+        import zstandard
+        from apps.memory_agent.models import CompressionDictionary
+
+        data = CompressionDictionary.objects.values_list('data', flat=True).get(dict_id=dict_id)  # type: ignore
+        dictionary = zstandard.ZstdCompressionDict(bytes(data))
+        with _lock:
+            _dictionaries[dict_id] = dictionary
+    return dictionary
+
+
+def _active_dictionary(level: int):
+    """
+    Diccionario activo para comprimir (None: zstd sin diccionario)
+
+    Se prepara una vez para el nivel (precompute_compress): sin eso cada
+    ZstdCompressor vuelve a procesar el diccionario y comprimir es 6 veces más lento.
+    """
+    cached = _active.get(level)
+    if cached is None or cached[0] < time.monotonic():
+        from apps.memory_agent.models import CompressionDictionary
+
+        dict_id = CompressionDictionary.objects.filter(  # type: ignore
+            is_active=True
+        ).order_by('-created_at').values_list('dict_id', flat=True).first()
+        dictionary = _dictionary(dict_id) if dict_id is not None else None
+        if dictionary is not None:
+            dictionary.precompute_compress(level=level)
+        cached = (time.monotonic() + ACTIVE_DICTIONARY_TTL, dictionary)
+        _active[level] = cached
+    return cached[1]
+
+
+def clear_dictionary_cache() -> None:
+    _active.clear()
+    with _lock:
+        _dictionaries.clear()
+
+
+def compress_text(text: str) -> Optional[bytes]:
+    """
+    Comprime el texto con zstd y el diccionario activo
+
+    None si la compresión está desactivada, el texto no supera
+    MESSAGE_COMPRESSION_MIN_BYTES o no se achica. El frame lleva el dict_id:
+    se puede descomprimir aunque después se entrene otro diccionario.
+    """
+    if not getattr(settings, 'MESSAGE_COMPRESSION_ENABLED', False):
+        return None
+    data = text.encode('utf-8')
+    if len(data) < getattr(settings, 'MESSAGE_COMPRESSION_MIN_BYTES', 2048):
+        return None
+
+    import zstandard
+
+    level = getattr(settings, 'MESSAGE_COMPRESSION_LEVEL', 3)
+    compressor = zstandard.ZstdCompressor(level=level, dict_data=_active_dictionary(level))
+    compressed = compressor.compress(data)
+    return compressed if len(compressed) < len(data) else None
+
+
+def decompress_text(data: bytes) -> str:
+    import zstandard
+
+    data = bytes(data)
+    dict_id = zstandard.get_frame_parameters(data).dict_id
+    decompressor = zstandard.ZstdDecompressor(dict_data=_dictionary(dict_id) if dict_id else None)
+    return decompressor.decompress(data).decode('utf-8')
+
+
+def stored_content(text: str) -> Dict[str, Any]:
+    """
+    Columnas con las que se guarda un contenido: content, content_zstd y content_preview
+
+    Solo los contenidos comprimidos llevan vista previa: los demás se recortan al
+    leerlos (Message.preview). Para las inserciones que no pasan por save() (COPY);
+    save() y bulk_create lo aplican en CompressedTextField.pre_save.
+    """
+    compressed = compress_text(text)
+    if compressed is None:
+        return {'content': text, 'content_zstd': None, 'content_preview': None}
+    return {'content': '', 'content_zstd': compressed, 'content_preview': text[:PREVIEW_LENGTH]}
+
+
+def load_content(content: str, content_zstd: Optional[bytes]) -> str:
+    """Texto de una fila leída con values()/values_list() (que no pasan por el modelo)"""
+    return decompress_text(content_zstd) if content_zstd is not None and not content else content
+
+
+class CompressedContentDescriptor(DeferredAttribute):
+    """
+    Acceso a `content` que descomprime content_zstd al leerlo
+
+    La columna content queda vacía en las filas comprimidas. El texto se
+    descomprime en el primer acceso y queda en la instancia; los resúmenes y
+    búsquedas difieren content_zstd, usan content_preview y nunca descomprimen.
+    """
+
+    def __get__(self, instance, cls=None):
+        if instance is None:
+            return self
+        value = super().__get__(instance, cls)
+        if value:
+            return value
+        data = instance.__dict__
+        if 'content_zstd' in data:
+            compressed = data['content_zstd']
+        elif data.get('content_preview', '') is not None:
+            # content_zstd diferido (defer/only): se lee solo si la fila puede estar
+            # comprimida, no para cada mensaje vacío (archivos sin texto)
+            compressed = instance.content_zstd
+        else:
+            compressed = None
+        if compressed is not None:
+            value = decompress_text(compressed)
+            data[self.field.attname] = value
+        return value
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.field.attname] = value
+
+
+class CompressedTextField(models.TextField):
+    """
+    TextField del contenido de Message con compresión opcional (ver compress_text)
+
+    Al guardar (save, create, bulk_create) decide si el texto se comprime y
+    completa content_zstd y content_preview de la misma instancia. Esos campos
+    se definen después de `content` en el modelo: Django arma los valores de
+    la consulta en el orden de los campos y llama a pre_save antes de leerlos.
+    """
+    descriptor_class = CompressedContentDescriptor
+
+    def pre_save(self, model_instance, add):
+        stored = stored_content(getattr(model_instance, self.attname) or '')
+        model_instance.content_zstd = stored['content_zstd']
+        model_instance.content_preview = stored['content_preview']
+        return stored['content']
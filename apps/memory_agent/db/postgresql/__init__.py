@@ -0,0 +1 @@
+# PostgreSQL backend package
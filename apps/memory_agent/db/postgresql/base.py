@@ -0,0 +1,49 @@
+import time
+from django.db.backends.postgresql import base
+
+from apps.memory_agent.metrics import (
+    DB_CONNECT_LATENCY, DB_CONNECTION_AGE, DB_CONNECTION_REQUESTS, DB_HEALTH_CHECK_FAILURES
+)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    Backend de PostgreSQL de Django con métricas de sus conexiones
+
+    Mide cuánto tarda abrir cada conexión, cuántas peticiones atiende antes de
+    cerrarse y cuántas conexiones persistentes fallan el health check. Con
+    CONN_MAX_AGE > 0 sirve para confirmar que los workers reutilizan sus conexiones.
+    """
+
+    connected_at = None
+    requests_served = 0
+
+    def connect(self):
+        started = time.perf_counter()
+        super().connect()
+        DB_CONNECT_LATENCY.labels(alias=self.alias).observe(time.perf_counter() - started)
+        self.connected_at = time.monotonic()
+        self.requests_served = 1
+
+    def close(self):
+        if self.connection is not None and self.connected_at is not None:
+            DB_CONNECTION_REQUESTS.labels(alias=self.alias).observe(self.requests_served)
+            self.connected_at = None
+        super().close()
+
+    def close_if_health_check_failed(self):
+        was_open = self.connection is not None
+        super().close_if_health_check_failed()
+        if was_open and self.connection is None:
+            DB_HEALTH_CHECK_FAILURES.labels(alias=self.alias).inc()
+
+    def request_started(self):
+        """
+        Registra la reutilización de la conexión en una petición nueva (ver signals.py)
+
+        Se llama después de close_old_connections de Django: si la conexión sigue
+        abierta es porque no superó CONN_MAX_AGE ni quedó inutilizable.
+        """
+        if self.connection is not None and self.connected_at is not None:
+            self.requests_served += 1
+            DB_CONNECTION_AGE.labels(alias=self.alias).observe(time.monotonic() - self.connected_at)
@@ -0,0 +1,200 @@
+import time
+import logging
+import threading
+from typing import Dict, Optional
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+from apps.memory_agent.metrics import DB_READ_ROUTING
+
+logger = logging.getLogger(__name__)
+
+PRIMARY_DATABASE = 'default'
+REPLICA_DATABASE = 'replica'
+
+KEY_PREFIX = 'memory_agent:recent_write'
+
+# Segundos de retraso de la réplica; 0 si ya aplicó todo lo recibido del primario
+# (en un primario ambas funciones retornan NULL)
+REPLICA_LAG_SQL = """
+SELECT CASE
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+END
+"""
+
+
+class _LocalWrites:
+    """Escrituras recientes por destinatario en memoria del proceso"""
+
+    def __init__(self):
+        self._expires: Dict[str, float] = {}
+
+    def mark(self, recipient: str, seconds: float):
+        now = time.monotonic()
+        # Limpieza ocasional para que el diccionario no crezca sin límite
+        if len(self._expires) > 10000:
+            self._expires = {key: expires for key, expires in self._expires.items() if expires > now}
+        self._expires[recipient] = now + seconds
+
+    def recent(self, recipient: str) -> bool:
+        expires = self._expires.get(recipient)
+        return expires is not None and expires > time.monotonic()
+
+    def clear(self):
+        self._expires.clear()
+
+
+class _RedisWrites:
+    """Escrituras recientes compartidas entre workers a través de Redis"""
+
+    def __init__(self, redis_url: str):
+        import redis
+
+        self.client = redis.Redis.from_url(redis_url)
+
+    def mark(self, recipient: str, seconds: float):
+        self.client.set(f'{KEY_PREFIX}:{recipient}', 1, px=max(1, int(seconds * 1000)))
+
+    def recent(self, recipient: str) -> bool:
+        return bool(self.client.exists(f'{KEY_PREFIX}:{recipient}'))
+
+    def clear(self):
+        for key in self.client.scan_iter(f'{KEY_PREFIX}:*'):
+            self.client.delete(key)
+
+
+class ReplicaRouter:
+    """
+    Router de lecturas hacia la réplica de PostgreSQL (alias `replica`)
+
+    Las escrituras y las migraciones siempre van al primario. Las lecturas no se
+    envían a la réplica por defecto: las consultas que toleran un pequeño retraso
+    (resúmenes, búsquedas, listados del admin, exportaciones) eligen su base de
+    datos con `read_database()`, que protege las lecturas de un destinatario que
+    acaba de escribir y descarta la réplica si está atrasada o caída.
+    """
+
+    def db_for_read(self, model, **hints):
+        return None
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY_DATABASE
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # La réplica tiene los mismos datos que el primario
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA_DATABASE
+
+
+_writes = None
+_writes_lock = threading.Lock()
+# (siguiente chequeo, retraso en segundos o None si la réplica no responde)
+_replica_lag = (0.0, None)
+
+
+def _recent_writes():
+    global _writes
+    if _writes is None:
+        with _writes_lock:
+            if _writes is None:
+                redis_url = getattr(settings, 'REDIS_URL', '')
+                _writes = _RedisWrites(redis_url) if redis_url else _LocalWrites()
+    return _writes
+
+
+def replica_configured() -> bool:
+    return REPLICA_DATABASE in settings.DATABASES
+
+
+def mark_write(recipient: str) -> None:
+    """
+    Registra que el destinatario acaba de escribir
+
+    Durante REPLICA_READ_YOUR_WRITES_SECONDS sus lecturas van al primario. Con
+    REDIS_URL el registro se comparte entre workers; sin Redis solo lo ve el
+    proceso que atendió la escritura.
+    """
+    if not replica_configured() or not recipient:
+        return
+    seconds = getattr(settings, 'REPLICA_READ_YOUR_WRITES_SECONDS', 5)
+    try:
+        _recent_writes().mark(recipient, seconds)
+    except Exception as e:
+        logger.warning(f"No se pudo registrar la escritura reciente de {recipient}: {str(e)}")
+
+
+def replica_lag() -> Optional[float]:
+    """Retraso de la réplica en segundos (se consulta cada REPLICA_LAG_CHECK_INTERVAL segundos)"""
+    global _replica_lag
+    next_check, lag = _replica_lag
+    now = time.monotonic()
+    if now < next_check:
+        return lag
+
+    connection = connections[REPLICA_DATABASE]
+    try:
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(REPLICA_LAG_SQL)
+                lag = float(cursor.fetchone()[0] or 0)
+        else:
+            lag = 0.0
+    except DatabaseError as e:
+        logger.warning(f"Réplica no disponible, las lecturas van al primario: {str(e)}")
+        lag = None
+
+    _replica_lag = (now + getattr(settings, 'REPLICA_LAG_CHECK_INTERVAL', 2.0), lag)
+    return lag
+
+
+def read_database(recipient: Optional[str] = None) -> str:
+    """
+    Base de datos para una lectura que tolera un pequeño retraso
+
+    Usa el primario si no hay réplica, si la consulta corre dentro de una
+    transacción del primario, si el destinatario escribió hace menos de
+    REPLICA_READ_YOUR_WRITES_SECONDS o si la réplica está atrasada más de
+    REPLICA_MAX_LAG_SECONDS (o no responde).
+
+    Args:
+        recipient: Destinatario cuyas escrituras recientes deben verse
+    """
+    if not replica_configured():
+        return PRIMARY_DATABASE
+
+    if connections[PRIMARY_DATABASE].in_atomic_block:
+        reason = 'transaction'
+    elif recipient and _recent_read_your_writes(recipient):
+        reason = 'recent_write'
+    else:
+        lag = replica_lag()
+        if lag is None:
+            reason = 'unavailable'
+        elif lag > getattr(settings, 'REPLICA_MAX_LAG_SECONDS', 5.0):
+            reason = 'lag'
+        else:
+            DB_READ_ROUTING.labels(database=REPLICA_DATABASE, reason='replica').inc()
+            return REPLICA_DATABASE
+
+    DB_READ_ROUTING.labels(database=PRIMARY_DATABASE, reason=reason).inc()
+    return PRIMARY_DATABASE
+
+
+def _recent_read_your_writes(recipient: str) -> bool:
+    try:
+        return _recent_writes().recent(recipient)
+    except Exception as e:
+        # Sin el registro no se sabe si la réplica ya tiene la escritura
+        logger.warning(f"No se pudo consultar las escrituras recientes de {recipient}: {str(e)}")
+        return True
+
+
+def reset_replica_state() -> None:
+    """Olvida las escrituras recientes y el último retraso medido"""
+    global _replica_lag
+    _replica_lag = (0.0, None)
+    if _writes is not None:
+        _writes.clear()
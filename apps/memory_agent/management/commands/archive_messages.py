@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.memory_agent.models import MessageArchive
+from apps.memory_agent.services.archive_service import MessageArchiveService
+
+
+class Command(BaseCommand):
+    help = 'Mueve los mensajes de meses antiguos a archivos Parquet por destinatario y mes (capa fría)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months',
+            type=int,
+            default=getattr(settings, 'MESSAGE_ARCHIVE_AFTER_MONTHS', 0),
+            help='Meses completos que se conservan en la tabla además del actual (0 = no archiva)'
+        )
+        parser.add_argument('--recipient', action='append', type=int, dest='recipients',
+                            help='Solo este destinatario (id; se puede repetir)')
+        parser.add_argument('--dry-run', action='store_true', help='Muestra los meses por archivar sin moverlos')
+        parser.add_argument('--list', action='store_true', help='Lista los archivos y termina')
+
+    def handle(self, *args, **options):
+        """Pensado para ejecutarse a diario (cron), después de manage_message_partitions"""
+        service = MessageArchiveService()
+
+        if options['list']:
+            archives = MessageArchive.objects.order_by('recipient_id', 'month')  # type: ignore
+            if options['recipients']:
+                archives = archives.filter(recipient_id__in=options['recipients'])
+            for archive in archives:
+                self.stdout.write(
+                    f"{archive.recipient_id:>10}  {archive.month:%Y-%m}{archive.row_count:>12} mensajes"
+                    f"{archive.size_bytes / (1024 * 1024):>10.1f} MB  {archive.file_path}"
+                )
+            return
+
+        if not options['months']:
+            raise CommandError('Sin retención en la tabla: usar --months o MESSAGE_ARCHIVE_AFTER_MONTHS')
+
+        if options['dry_run']:
+            for group in service.pending(options['months'], options['recipients']):
+                self.stdout.write(f"[dry-run] {group['recipient_id']:>10} {group['month']:%Y-%m} {group['rows']:>10} mensajes")
+
+        def progress(stats):
+            self.stdout.write(
+                f"  {stats['files']} archivos, {stats['messages']} mensajes ({stats['rate']:,.0f}/s)"
+            )
+
+        stats = service.archive(
+            after_months=options['months'],
+            recipient_ids=options['recipients'],
+            dry_run=options['dry_run'],
+            progress=progress
+        )
+        prefix = '[dry-run] ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(  # type: ignore
+            f"{prefix}{stats['messages']} mensajes de {stats['months']} meses archivados en {stats['files']} archivos "
+            f"({stats['bytes'] / (1024 * 1024):.1f} MB) en {stats['seconds']:.1f} s"
+        ))
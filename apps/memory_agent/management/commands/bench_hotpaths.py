@@ -0,0 +1,98 @@
+import json
+import platform
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.memory_agent.benchmarks.hotpaths import HotPathBenchmark, compare_hotpaths
+
+
+class Command(BaseCommand):
+    help = 'Microbenchmarks del parseo de estrategias, detección de comandos, clasificación y resúmenes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=str, default='10,100,1000',
+                            help='Tamaños del corpus de mensajes para los resúmenes, ej: 10,100,1000')
+        parser.add_argument('--repeat', type=int, default=7, help='Repeticiones por caso')
+        parser.add_argument('--min-time', type=float, default=0.05,
+                            help='Duración mínima de cada repetición en segundos')
+        parser.add_argument('--filter', type=str, help='Solo casos cuyo nombre contenga este texto')
+        parser.add_argument('--save-baseline', type=str, help='Guarda los resultados como línea base (JSON)')
+        parser.add_argument('--compare', type=str, help='Compara contra una línea base (JSON)')
+        parser.add_argument('--max-regression', type=float, default=15.0,
+                            help='Regresión máxima permitida en %% del tiempo mínimo por operación')
+        parser.add_argument('--confirm-runs', type=int, default=2,
+                            help='Veces que se vuelven a medir los casos con regresión antes de fallar')
+        parser.add_argument('--json', action='store_true', help='Imprime los resultados en JSON')
+
+    def handle(self, *args, **options):
+        """Ejecuta los microbenchmarks (no usa la base de datos)"""
+        try:
+            sizes = tuple(int(size) for size in options['sizes'].split(','))
+        except ValueError:
+            raise CommandError(f"Formato de --sizes inválido: {options['sizes']}")
+
+        benchmark = HotPathBenchmark(
+            sizes=sizes,
+            repeat=options['repeat'],
+            min_time=options['min_time'],
+            name_filter=options['filter']
+        )
+        results = {
+            'meta': {
+                'timestamp': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'implementation': platform.python_implementation(),
+                'machine': platform.machine(),
+                'repeat': options['repeat'],
+            },
+            'cases': benchmark.run(),
+        }
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+        else:
+            self._print_report(results)
+
+        if options['save_baseline']:
+            path = Path(options['save_baseline'])
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(results, indent=2))
+            self.stdout.write(self.style.SUCCESS(f"Línea base guardada en {path}"))  # type: ignore
+
+        if options['compare']:
+            path = Path(options['compare'])
+            if not path.exists():
+                raise CommandError(f"No existe la línea base {path} (crearla con --save-baseline)")
+            baseline = json.loads(path.read_text())
+            if baseline.get('meta', {}).get('python') != results['meta']['python']:
+                self.stdout.write(self.style.WARNING(  # type: ignore
+                    f"La línea base se tomó con Python {baseline.get('meta', {}).get('python')}; "
+                    f"los resultados pueden no ser comparables"
+                ))
+            regressions = compare_hotpaths(results, baseline, options['max_regression'])
+
+            # Una regresión aislada suele ser ruido: se vuelven a medir esos casos
+            # y se conserva el mejor mínimo antes de fallar
+            for _ in range(options['confirm_runs']):
+                if not regressions:
+                    break
+                names = [regression.split(':')[0] for regression in regressions]
+                for name, row in benchmark.run(only=names).items():
+                    if row['min_us'] < results['cases'][name]['min_us']:
+                        results['cases'][name] = row
+                regressions = compare_hotpaths(results, baseline, options['max_regression'])
+
+            if regressions:
+                for regression in regressions:
+                    self.stdout.write(self.style.ERROR(f"Regresión: {regression}"))  # type: ignore
+                raise CommandError(f"{len(regressions)} casos superan {options['max_regression']}% de regresión")
+            self.stdout.write(self.style.SUCCESS('Sin regresiones respecto a la línea base'))  # type: ignore
+
+    def _print_report(self, results):
+        """Imprime los resultados en formato tabla"""
+        self.stdout.write(f"{'caso':<40}{'mediana µs':>12}{'mín µs':>12}{'desv µs':>10}{'ops/s':>14}")
+        for name, row in results['cases'].items():
+            self.stdout.write(
+                f"{name:<40}{row['median_us']:>12}{row['min_us']:>12}{row['stdev_us']:>10}{row['ops_per_second']:>14}"
+            )
@@ -0,0 +1,53 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.memory_agent.benchmarks.http_load import HttpLoadBenchmark
+
+
+class Command(BaseCommand):
+    help = 'Carga HTTP contra un servidor en ejecución (runserver o gunicorn) con mensajes de Telegram'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', type=str, default='http://127.0.0.1:8000', help='URL base del servidor')
+        parser.add_argument('--requests', type=int, default=2000, help='Cantidad de peticiones')
+        parser.add_argument('--concurrency', type=int, default=8, help='Conexiones concurrentes')
+        parser.add_argument('--command-share', type=float, default=0.1,
+                            help='Proporción de comandos (/resumen, /hoy, ...) en el tráfico')
+        parser.add_argument('--pid', type=int,
+                            help='PID del servidor (maestro de gunicorn) para medir su memoria y la de sus hijos')
+        parser.add_argument('--json', action='store_true', help='Imprime los resultados en JSON')
+
+    def handle(self, *args, **options):
+        """La fuente Telegram debe existir y estar activa en la base de datos del servidor"""
+        benchmark = HttpLoadBenchmark(
+            url=options['url'],
+            requests=options['requests'],
+            concurrency=options['concurrency'],
+            command_share=options['command_share']
+        )
+        try:
+            results = benchmark.run(pid=options['pid'])
+        except OSError as e:
+            raise CommandError(f"No se pudo conectar con {options['url']}: {str(e)}")
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        self.stdout.write(
+            f"Peticiones: {results['requests']} | Errores: {results['errors']} | "
+            f"Concurrencia: {results['concurrency']}"
+        )
+        self.stdout.write(
+            f"Throughput: {results['throughput_rps']} rps | primera petición: {results['first_request_ms']} ms | "
+            f"p50: {results['p50_ms']} ms | p95: {results['p95_ms']} ms | p99: {results['p99_ms']} ms"
+        )
+        for moment in ('memory_before', 'memory_after'):
+            memory = results[moment]
+            if memory:
+                self.stdout.write(
+                    f"Memoria ({'antes' if moment == 'memory_before' else 'después'}): "
+                    f"{memory['processes']} procesos, RSS {memory['rss_mb']} MB, PSS {memory['pss_mb']} MB"
+                )
+        if results['errors']:
+            self.stdout.write(self.style.WARNING(f"{results['errors']} peticiones con error"))  # type: ignore
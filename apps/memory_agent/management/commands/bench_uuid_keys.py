@@ -0,0 +1,58 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from apps.memory_agent.benchmarks.uuid_keys import GENERATORS, UuidKeyBenchmark
+
+
+class Command(BaseCommand):
+    help = 'Compara inserciones con claves primarias UUID v4 y v7 (throughput, tamaño del índice y WAL)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10_000_000, help='Filas a insertar por variante')
+        parser.add_argument('--batch-size', type=int, default=50_000, help='Filas por COPY (una transacción)')
+        parser.add_argument('--checkpoints', type=int, default=10,
+                            help='Cantidad de mediciones de throughput a medida que crece la tabla')
+        parser.add_argument('--variant', action='append', dest='variants', choices=sorted(GENERATORS),
+                            help='Variante a medir (por defecto uuid4 y uuid7)')
+        parser.add_argument('--keepdb', action='store_true', help='Reutiliza la base de datos de pruebas')
+        parser.add_argument('--json', action='store_true', help='Imprime los resultados en JSON')
+
+    def handle(self, *args, **options):
+        """Las tablas se crean y se eliminan en una base de datos de pruebas"""
+        if connection.vendor != 'postgresql':
+            raise CommandError('El benchmark requiere PostgreSQL')
+
+        benchmark = UuidKeyBenchmark(
+            rows=options['rows'],
+            batch_size=options['batch_size'],
+            checkpoints=options['checkpoints']
+        )
+
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            results = benchmark.run(options['variants'] or ['uuid4', 'uuid7'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        meta = results['meta']
+        self.stdout.write(f"Filas: {meta['rows']} | Lote: {meta['batch_size']} | shared_buffers: {meta['shared_buffers']}")
+        self.stdout.write('')
+        self.stdout.write(f"{'variante':<10}{'filas/s':>10}{'tabla MB':>10}{'índice MB':>11}{'WAL MB':>10}{'hojas %':>9}")
+        for variant, row in results['variants'].items():
+            density = f"{row['leaf_density']:.0f}" if row['leaf_density'] is not None else '-'
+            self.stdout.write(
+                f"{variant:<10}{row['rows_per_second']:>10}{row['table_mb']:>10}{row['index_mb']:>11}"
+                f"{row['wal_mb']:>10}{density:>9}"
+            )
+
+        self.stdout.write('')
+        self.stdout.write('Throughput (filas/s) a medida que crece la tabla:')
+        for variant, row in results['variants'].items():
+            points = ', '.join(f"{point['rows'] // 1000}k: {point['rows_per_second']}" for point in row['progress'])
+            self.stdout.write(f"  {variant}: {points}")
@@ -0,0 +1,143 @@
+import json
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from apps.memory_agent.benchmarks.webhook_bench import WebhookBenchmark, compare
+
+
+class Command(BaseCommand):
+    help = 'Benchmark de carga de los webhooks con proveedores falsos (Twilio, Google Drive, archivos)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Cantidad de peticiones')
+        parser.add_argument('--concurrency', type=int, default=8, help='Peticiones simultáneas')
+        parser.add_argument(
+            '--mix',
+            type=str,
+            default='text=70,command=10,media=20',
+            help='Peso de cada tipo de mensaje, ej: text=70,command=10,media=20'
+        )
+        parser.add_argument('--telegram-share', type=float, default=0.3,
+                            help='Proporción de texto/comandos enviados por Telegram')
+        parser.add_argument('--recipients', type=int, default=50, help='Usuarios distintos por fuente')
+        parser.add_argument('--seed-messages', type=int, default=1000,
+                            help='Ideas previas en la BD para que los comandos tengan datos')
+        parser.add_argument('--twilio-latency-ms', type=float, default=50)
+        parser.add_argument('--drive-latency-ms', type=float, default=100)
+        parser.add_argument('--media-latency-ms', type=float, default=50)
+        parser.add_argument('--conn-max-age', type=int,
+                            help='Sobrescribe CONN_MAX_AGE durante la corrida (0 = una conexión por petición)')
+        parser.add_argument('--no-drain', action='store_true',
+                            help='No procesar el outbox de transferencias al final')
+        parser.add_argument('--save-baseline', type=str, help='Guarda los resultados como línea base (JSON)')
+        parser.add_argument('--compare', type=str, help='Compara contra una línea base (JSON)')
+        parser.add_argument('--max-regression', type=float, default=10.0,
+                            help='Regresión máxima permitida en %% al comparar')
+        parser.add_argument('--check-budgets', action='store_true',
+                            help='Falla si algún webhook o comando supera QUERY_BUDGETS')
+        parser.add_argument('--json', action='store_true', help='Imprime los resultados en JSON')
+        parser.add_argument('--keepdb', action='store_true', help='Reutiliza la base de datos de pruebas')
+
+    def handle(self, *args, **options):
+        """Ejecuta el benchmark sobre una base de datos de pruebas"""
+
+        try:
+            mix = {
+                name.strip(): float(weight)
+                for name, weight in (item.split('=') for item in options['mix'].split(','))
+            }
+        except ValueError:
+            raise CommandError(f"Formato de --mix inválido: {options['mix']}")
+
+        benchmark = WebhookBenchmark(
+            requests=options['requests'],
+            concurrency=options['concurrency'],
+            mix=mix,
+            telegram_share=options['telegram_share'],
+            recipients=options['recipients'],
+            seed_messages=options['seed_messages'],
+            twilio_latency=options['twilio_latency_ms'] / 1000,
+            drive_latency=options['drive_latency_ms'] / 1000,
+            media_latency=options['media_latency_ms'] / 1000,
+            drain=not options['no_drain']
+        )
+
+        # El benchmark escribe datos: siempre sobre una base de datos de pruebas
+        old_name = connection.settings_dict['NAME']
+        if options['conn_max_age'] is not None:
+            # Los hilos del benchmark comparten este diccionario de configuración
+            connection.settings_dict['CONN_MAX_AGE'] = options['conn_max_age']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            results = benchmark.run()
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+        else:
+            self._print_report(results)
+
+        if options['save_baseline']:
+            path = Path(options['save_baseline'])
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(results, indent=2))
+            self.stdout.write(self.style.SUCCESS(f"Línea base guardada en {path}"))  # type: ignore
+
+        if options['check_budgets']:
+            violations = results['budget_violations']
+            if violations:
+                for violation in violations:
+                    self.stdout.write(self.style.ERROR(violation['report']))  # type: ignore
+                raise CommandError(f"{len(violations)} tipos de webhook superan su presupuesto de consultas")
+            self.stdout.write(self.style.SUCCESS('Todos los webhooks dentro de su presupuesto de consultas'))  # type: ignore
+
+        if options['compare']:
+            baseline = json.loads(Path(options['compare']).read_text())
+            regressions = compare(results, baseline, options['max_regression'])
+            if regressions:
+                for regression in regressions:
+                    self.stdout.write(self.style.ERROR(f"Regresión: {regression}"))  # type: ignore
+                raise CommandError(f"{len(regressions)} métricas superan {options['max_regression']}% de regresión")
+            self.stdout.write(self.style.SUCCESS('Sin regresiones respecto a la línea base'))  # type: ignore
+
+    def _print_report(self, results):
+        """Imprime los resultados en formato tabla"""
+        meta = results['meta']
+        self.stdout.write(
+            f"Peticiones: {meta['requests']} | Concurrencia: {meta['concurrency']} | BD: {meta['database']}"
+        )
+        self.stdout.write('')
+        self.stdout.write(f"{'tipo':<10}{'n':>7}{'err':>6}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>9}")
+
+        rows = list(results['by_type'].items()) + [('total', results['overall'])]
+        for name, row in rows:
+            self.stdout.write(
+                f"{name:<10}{row['requests']:>7}{row['errors']:>6}{row['throughput_rps']:>10}"
+                f"{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}{row['queries_avg']:>9}"
+            )
+
+        connections = results['connections']
+        self.stdout.write('')
+        self.stdout.write(
+            f"Conexiones BD (CONN_MAX_AGE={connections['conn_max_age']}): {connections['opened']} abiertas "
+            f"({connections['connect_ms_avg']} ms promedio), reutilizadas en {connections['reused']} peticiones "
+            f"({connections['reuse_ratio']:.0%}), health checks fallidos: {connections['health_check_failures']}"
+        )
+
+        drain = results.get('drain')
+        if drain:
+            self.stdout.write('')
+            self.stdout.write(
+                f"Outbox: {drain['done']}/{drain['transfers']} transferencias en {drain['wall_seconds']}s "
+                f"({drain['throughput_tps']} por segundo), pendientes: {drain['pending']}"
+            )
+
+        self.stdout.write(f"Peticiones a proveedores: {results['provider_requests']}")
+
+        for violation in results['budget_violations']:
+            self.stdout.write(self.style.WARNING(  # type: ignore
+                f"Presupuesto de consultas superado: {violation['label']} "
+                f"({violation['queries']} de {violation['budget']})"
+            ))
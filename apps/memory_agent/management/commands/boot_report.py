@@ -0,0 +1,61 @@
+import json
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.memory_agent.benchmarks.boot import BOOT_CODE, BootReport
+
+
+class Command(BaseCommand):
+    help = 'Reporta el tiempo de arranque, los imports más costosos y la memoria (RSS) de los procesos web y worker'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', choices=list(BOOT_CODE), action='append',
+                            help='Arranque a medir (se puede repetir; por defecto todos)')
+        parser.add_argument('--runs', type=int, default=5, help='Arranques por medición (se reporta la mediana)')
+        parser.add_argument('--top', type=int, default=10, help='Paquetes más costosos a mostrar')
+        parser.add_argument('--fail-on-heavy', action='store_true',
+                            help='Falla si algún SDK de proveedor se importa al arrancar web o worker')
+        parser.add_argument('--save', type=str, help='Guarda los resultados en un archivo JSON')
+        parser.add_argument('--json', action='store_true', help='Imprime los resultados en JSON')
+
+    def handle(self, *args, **options):
+        """Arranca intérpretes nuevos y mide el costo de cada arranque"""
+        try:
+            results = BootReport(runs=options['runs'], top=options['top']).run(options['target'])
+        except RuntimeError as e:
+            raise CommandError(str(e))
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+        else:
+            self._print_report(results)
+
+        if options['save']:
+            path = Path(options['save'])
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(results, indent=2))
+            self.stdout.write(self.style.SUCCESS(f"Resultados guardados en {path}"))  # type: ignore
+
+        if options['fail_on_heavy']:
+            loaded = {
+                target: result['heavy_modules'] for target, result in results.items()
+                if target != 'web+sdks' and result['heavy_modules']
+            }
+            if loaded:
+                raise CommandError(f"SDKs importados al arrancar: {loaded}")
+            self.stdout.write(self.style.SUCCESS('Ningún SDK de proveedor se importa al arrancar'))  # type: ignore
+
+    def _print_report(self, results):
+        """Imprime los resultados en formato tabla"""
+        self.stdout.write(f"{'arranque':<12}{'mediana ms':>12}{'mín ms':>10}{'imports ms':>12}"
+                          f"{'RSS MB':>9}{'módulos':>9}  SDKs cargados")
+        for target, row in results.items():
+            self.stdout.write(
+                f"{target:<12}{row['boot_ms']:>12}{row['boot_min_ms']:>10}{row['import_ms']:>12}"
+                f"{row['rss_mb'] or '-':>9}{row['module_count']:>9}  {', '.join(row['heavy_modules']) or '-'}"
+            )
+
+        for target, row in results.items():
+            self.stdout.write(f"\nImports más costosos ({target}):")
+            for item in row['top_packages']:
+                self.stdout.write(f"  {item['package']:<30}{item['import_ms']:>10} ms")
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.memory_agent.services.compression_service import MessageCompressionService
+
+
+class Command(BaseCommand):
+    help = 'Entrena el diccionario de zstd y comprime los contenidos largos ya guardados'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--train', action='store_true',
+                            help='Entrena y activa un diccionario nuevo antes de comprimir')
+        parser.add_argument('--samples', type=int, default=5000, help='Contenidos largos usados para entrenar')
+        parser.add_argument('--dict-size', type=int, default=112640, help='Tamaño del diccionario en bytes')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Mensajes por lote')
+        parser.add_argument('--decompress', action='store_true',
+                            help='Vuelve a guardar como texto los contenidos comprimidos')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Calcula el ahorro sin escribir los mensajes (--train guarda igual el diccionario)')
+
+    def handle(self, *args, **options):
+        service = MessageCompressionService()
+
+        try:
+            if options['train']:
+                dictionary = service.train(options['samples'], options['dict_size'])
+                self.stdout.write(
+                    f"Diccionario {dictionary.dict_id}: {len(dictionary.data) // 1024} KB, "
+                    f"{dictionary.sample_count} contenidos ({dictionary.sample_bytes / (1024 * 1024):.1f} MB)"
+                )
+
+            def progress(stats):
+                self.stdout.write(
+                    f"  {stats['messages']} mensajes revisados, {stats['compressed']} "
+                    f"{'descomprimidos' if options['decompress'] else 'comprimidos'} ({stats['rate']:,.0f}/s)"
+                )
+
+            stats = service.compress(
+                batch_size=options['batch_size'],
+                decompress=options['decompress'],
+                dry_run=options['dry_run'],
+                progress=progress
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        prefix = '[dry-run] ' if options['dry_run'] else ''
+        action = 'descomprimidos' if options['decompress'] else 'comprimidos'
+        ratio = stats['bytes_before'] / stats['bytes_after'] if stats['bytes_after'] else 0.0
+        self.stdout.write(self.style.SUCCESS(  # type: ignore
+            f"{prefix}{stats['compressed']} contenidos {action}: {stats['bytes_before'] / (1024 * 1024):.1f} MB -> "
+            f"{stats['bytes_after'] / (1024 * 1024):.1f} MB ({ratio:.2f}x) en {stats['seconds']:.1f} s"
+        ))
@@ -0,0 +1,61 @@
+import sys
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from apps.memory_agent.services.export_service import EXPORT_FORMATS, MessageExportService
+from apps.memory_agent.services.message_query_service import MessageQueryService
+
+
+class Command(BaseCommand):
+    help = 'Exporta todas las ideas de un destinatario en NDJSON o CSV (en streaming, con gzip opcional)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', required=True, help='Nombre de la fuente (ej: WhatsApp)')
+        parser.add_argument('--recipient', required=True, help='Identificador del destinatario en la fuente')
+        parser.add_argument('--format', choices=list(EXPORT_FORMATS), default='ndjson', dest='export_format',
+                            help='Formato de salida (ndjson por defecto)')
+        parser.add_argument('--since', help='Solo ideas desde esta fecha (ISO 8601)')
+        parser.add_argument('--until', help='Solo ideas anteriores a esta fecha (ISO 8601)')
+        parser.add_argument('--gzip', action='store_true', help='Comprime la salida con gzip')
+        parser.add_argument('--output', default='-', help="Archivo de salida ('-' para stdout)")
+
+    def handle(self, *args, **options):
+        """Escribe cada bloque apenas se genera: la memoria no depende del total de ideas"""
+        recipient = MessageQueryService().get_recipient(options['source'], options['recipient'])
+        if recipient is None:
+            raise CommandError(f"No existe el destinatario '{options['recipient']}' en '{options['source']}'")
+
+        chunks = MessageExportService().export(
+            recipient,
+            options['export_format'],
+            since=self._parse_date(options['since'], '--since'),
+            until=self._parse_date(options['until'], '--until'),
+            compress=options['gzip']
+        )
+
+        started = time.perf_counter()
+        written = 0
+        output = sys.stdout.buffer if options['output'] == '-' else open(options['output'], 'wb')
+        try:
+            for chunk in chunks:
+                output.write(chunk)
+                written += len(chunk)
+        finally:
+            if output is not sys.stdout.buffer:
+                output.close()
+
+        # Con stdout el resumen va a stderr para no mezclarse con la exportación
+        log = self.stderr if options['output'] == '-' else self.stdout
+        log.write(self.style.SUCCESS(  # type: ignore
+            f"{written / 1024 / 1024:.1f} MB exportados en {time.perf_counter() - started:.1f} s"
+        ))
+
+    def _parse_date(self, value, option):
+        if value is None:
+            return None
+        date = parse_datetime(value)
+        if date is None:
+            raise CommandError(f"Fecha inválida en {option}: {value}")
+        return timezone.make_aware(date) if timezone.is_naive(date) else date
@@ -0,0 +1,57 @@
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.memory_agent.selectors.message_selector import MessageSelector
+from apps.memory_agent.services.chat_import_service import ChatImportService
+
+
+class Command(BaseCommand):
+    help = 'Importa un chat exportado de WhatsApp (.txt o .zip) como ideas de un destinatario'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Archivo de "Exportar chat" (.txt o .zip)')
+        parser.add_argument('--source', default='WhatsApp', help='Nombre de la fuente (por defecto WhatsApp)')
+        parser.add_argument('--recipient', required=True,
+                            help='Identificador del destinatario en la fuente (ej: whatsapp:+573001234567)')
+        parser.add_argument('--sender', help='Importar solo los mensajes de este autor (como aparece en el chat)')
+        parser.add_argument('--timezone', help='Zona horaria del teléfono (por defecto CHAT_IMPORT_TIMEZONE)')
+        order = parser.add_mutually_exclusive_group()
+        order.add_argument('--dayfirst', action='store_true', dest='dayfirst', default=None,
+                           help='Fechas día/mes (por defecto se deduce del archivo)')
+        order.add_argument('--monthfirst', action='store_false', dest='dayfirst', help='Fechas mes/día')
+
+    def handle(self, *args, **options):
+        """Muestra el avance después de cada bloque insertado con COPY"""
+        source = MessageSelector.get_source_by_name(options['source'])
+        if source is None:
+            raise CommandError(f"No existe la fuente activa '{options['source']}'")
+        if options['timezone']:
+            try:
+                ZoneInfo(options['timezone'])
+            except (ZoneInfoNotFoundError, ValueError):
+                raise CommandError(f"Zona horaria desconocida: {options['timezone']}")
+
+        def progress(stats):
+            rate = stats['imported'] / stats['seconds'] if stats['seconds'] else 0
+            self.stdout.write(f"  {stats['imported']} mensajes importados ({rate:,.0f}/s)")
+
+        try:
+            with open(options['path'], 'rb') as file:
+                stats = ChatImportService().import_whatsapp(
+                    file,
+                    source,
+                    options['recipient'],
+                    sender=options['sender'],
+                    dayfirst=options['dayfirst'],
+                    tz=options['timezone'],
+                    progress=progress
+                )
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        rate = stats['imported'] / stats['seconds'] if stats['seconds'] else 0
+        self.stdout.write(self.style.SUCCESS(  # type: ignore
+            f"{stats['imported']} mensajes importados ({stats['commands']} comandos, "
+            f"{stats['attachments']} adjuntos), {stats['skipped']} omitidos en {stats['seconds']:.1f} s "
+            f"({rate * 60:,.0f} por minuto)"
+        ))
@@ -0,0 +1,72 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.memory_agent.services.partition_service import MessagePartitionService
+
+
+class Command(BaseCommand):
+    help = 'Crea las particiones mensuales futuras de los mensajes y separa o elimina las vencidas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months-ahead',
+            type=int,
+            default=getattr(settings, 'MESSAGE_PARTITION_MONTHS_AHEAD', 3),
+            help='Meses futuros con partición creada'
+        )
+        parser.add_argument(
+            '--retention-months',
+            type=int,
+            default=getattr(settings, 'MESSAGE_PARTITION_RETENTION_MONTHS', 0),
+            help='Meses completos que se conservan además del actual (0 = sin retención)'
+        )
+        parser.add_argument('--drop', action='store_true',
+                            help='Elimina las particiones vencidas en lugar de solo separarlas')
+        parser.add_argument('--drive-files', action='store_true',
+                            help='Con --drop o --drop-detached, elimina también de Google Drive los archivos huérfanos')
+        parser.add_argument('--drop-detached', metavar='PARTICION',
+                            help='Elimina una partición separada (ya archivada) y sus adjuntos, y termina')
+        parser.add_argument('--dry-run', action='store_true', help='Muestra los cambios sin aplicarlos')
+        parser.add_argument('--list', action='store_true', help='Lista las particiones y termina')
+
+    def handle(self, *args, **options):
+        """Pensado para ejecutarse a diario (cron) o antes de cada despliegue"""
+        service = MessagePartitionService()
+        if not service.is_partitioned():
+            raise CommandError('La tabla de mensajes no está particionada (requiere PostgreSQL y la migración 0009)')
+
+        if options['list']:
+            for partition in service.list_partitions():
+                month = f"{partition.month:%Y-%m}" if partition.month else 'por defecto'
+                self.stdout.write(
+                    f"{partition.name:<40}{month:>12}{partition.rows:>12} filas"
+                    f"{partition.size_bytes / (1024 * 1024):>10.1f} MB"
+                )
+            for name in service.list_detached():
+                self.stdout.write(f"{name:<40}{'separada':>12}")
+            return
+
+        if options['drop_detached']:
+            try:
+                service.drop_detached(options['drop_detached'], drive_files=options['drive_files'])
+            except ValueError as e:
+                raise CommandError(str(e))
+            self.stdout.write(self.style.SUCCESS(f"Eliminada: {options['drop_detached']}"))  # type: ignore
+            return
+
+        created = service.ensure_partitions(months_ahead=options['months_ahead'], dry_run=options['dry_run'])
+        expired = service.expire_partitions(
+            retention_months=options['retention_months'],
+            drop=options['drop'],
+            dry_run=options['dry_run'],
+            drive_files=options['drive_files']
+        )
+
+        prefix = '[dry-run] ' if options['dry_run'] else ''
+        for name in created:
+            self.stdout.write(f"{prefix}Creada: {name}")
+        for name in expired:
+            self.stdout.write(f"{prefix}{'Eliminada' if options['drop'] else 'Separada'}: {name}")
+        self.stdout.write(self.style.SUCCESS(  # type: ignore
+            f"{prefix}{len(created)} particiones creadas, {len(expired)} vencidas"
+        ))
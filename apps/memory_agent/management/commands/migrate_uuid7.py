@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.memory_agent.selectors.message_selector import MessageSelector
+from apps.memory_agent.services.key_migration_service import KeyMigrationService
+
+
+class Command(BaseCommand):
+    help = 'Reescribe las claves primarias UUID v4 existentes como UUID v7 según su created_at'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', action='append', dest='models',
+                            help='Modelo a migrar (ej: Message); se puede repetir. Por defecto todos')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Filas por transacción')
+        parser.add_argument('--dry-run', action='store_true', help='Solo cuenta las filas a migrar')
+        parser.add_argument('--reindex', action='store_true',
+                            help='Reconstruye los índices al terminar (REINDEX CONCURRENTLY, PostgreSQL)')
+
+    def handle(self, *args, **options):
+        """
+        Detener process_media_transfers durante la migración: las transferencias en
+        curso guardan el id anterior de su mensaje. Los ids de mensajes retornados
+        antes por el webhook dejan de ser válidos.
+        """
+        service = KeyMigrationService(batch_size=options['batch_size'])
+        models = service.get_models()
+        if options['models']:
+            by_name = {model.__name__.lower(): model for model in models}
+            try:
+                models = [by_name[name.lower()] for name in options['models']]
+            except KeyError as e:
+                raise CommandError(f"Modelo desconocido: {e.args[0]}. Opciones: {', '.join(sorted(by_name))}")
+
+        for model in models:
+            counts = service.migrate_model(model, dry_run=options['dry_run'])
+            action = 'por migrar' if options['dry_run'] else 'migradas'
+            self.stdout.write(f"{model.__name__}: {counts['migrated']} de {counts['scanned']} filas {action}")
+
+            if options['reindex'] and counts['migrated'] and not options['dry_run']:
+                service.reindex(model)
+                self.stdout.write(f"{model.__name__}: índices reconstruidos")
+
+        # La caché de fuentes guarda objetos con el id anterior
+        MessageSelector.clear_source_cache()
+        self.stdout.write(self.style.SUCCESS('Migración a UUID v7 completada'))  # type: ignore
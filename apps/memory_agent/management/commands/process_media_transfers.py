@@ -0,0 +1,68 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from apps.memory_agent.services.media_transfer_service import MediaTransferService
+
+
+class Command(BaseCommand):
+    help = 'Procesa el outbox de transferencias de archivos hacia Google Drive'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=getattr(settings, 'MEDIA_TRANSFER_WORKERS', 4),
+            help='Transferencias procesadas en paralelo'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=20,
+            help='Máximo de transferencias reclamadas por iteración'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2.0,
+            help='Segundos de espera cuando no hay transferencias pendientes'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Procesa una sola iteración y termina'
+        )
+
+    def handle(self, *args, **options):
+        """Drena el outbox de transferencias de forma continua"""
+        
+        service = MediaTransferService()
+        
+        self.stdout.write(
+            self.style.SUCCESS(f"Procesando transferencias con {options['workers']} workers...")  # type: ignore
+        )
+        
+        try:
+            while True:
+                # Fuera de una petición nadie cierra las conexiones viejas o caídas:
+                # se aplica CONN_MAX_AGE y el health check en cada iteración
+                close_old_connections()
+                counts = service.process_due(
+                    batch_size=options['batch_size'],
+                    max_workers=options['workers']
+                )
+                
+                if counts['claimed']:
+                    self.stdout.write(
+                        f"Reclamadas: {counts['claimed']} | Completadas: {counts['done']} | "
+                        f"Reintentos: {counts['retry']} | Dead-letter: {counts['dead']} | Lease vencido: {counts['lost']}"
+                    )
+                
+                if options['once']:
+                    break
+                
+                if not counts['claimed']:
+                    time.sleep(options['interval'])
+                    
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('Procesamiento detenido'))  # type: ignore
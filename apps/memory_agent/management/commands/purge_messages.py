@@ -0,0 +1,72 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.memory_agent.services.retention_service import RetentionService
+
+
+class Command(BaseCommand):
+    help = 'Borra en lotes pequeños las ideas más antiguas que la retención de su fuente o destinatario'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', action='append', dest='sources',
+                            help='Solo los destinatarios de esta fuente (se puede repetir)')
+        parser.add_argument('--recipient', action='append', type=int, dest='recipients',
+                            help='Solo este destinatario (id; se puede repetir)')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=getattr(settings, 'PURGE_BATCH_SIZE', 1000),
+            help='Mensajes borrados por transacción'
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=getattr(settings, 'PURGE_SLEEP_SECONDS', 0.2),
+            help='Segundos de pausa entre lotes'
+        )
+        parser.add_argument('--drive-files', action='store_true',
+                            help='Elimina también los archivos de Google Drive que ningún otro adjunto usa')
+        parser.add_argument('--max-seconds', type=float,
+                            help='Se detiene después de este tiempo (la próxima ejecución continúa)')
+        parser.add_argument('--dry-run', action='store_true', help='Cuenta las ideas vencidas sin borrarlas')
+
+    def handle(self, *args, **options):
+        """Pensado para ejecutarse a diario (cron), también en horario de oficina"""
+        service = RetentionService()
+
+        def progress(stats):
+            self.stdout.write(
+                f"  {stats['messages']} mensajes borrados ({stats['rate']:,.0f} filas/s, "
+                f"{stats['seconds']:.1f} s con pausas)"
+            )
+
+        stats = service.purge(
+            source_names=options['sources'],
+            recipient_ids=options['recipients'],
+            batch_size=options['batch_size'],
+            sleep=options['sleep'],
+            drive_files=options['drive_files'],
+            dry_run=options['dry_run'],
+            max_seconds=options['max_seconds'],
+            progress=None if options['dry_run'] else progress
+        )
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(  # type: ignore
+                f"[dry-run] {stats['messages']} ideas vencidas en {stats['recipients']} destinatarios"
+            ))
+            return
+
+        summary = (
+            f"{stats['messages']} mensajes y {stats['attachments']} adjuntos borrados de "
+            f"{stats['recipients']} destinatarios en {stats['seconds']:.1f} s ({stats['rate']:,.0f} filas/s)"
+        )
+        if stats['archived']:
+            summary += f", {stats['archived']} mensajes archivados eliminados"
+        if options['drive_files']:
+            summary += f", {stats['drive_files']} archivos eliminados de Drive"
+        if stats['drive_errors']:
+            summary += f" ({stats['drive_errors']} con error)"
+        if not stats['complete']:
+            summary += '; quedan ideas vencidas (--max-seconds)'
+        self.stdout.write(self.style.SUCCESS(summary))  # type: ignore
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from apps.memory_agent.selectors.recipient_selector import RecipientSelector
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los contadores de ideas y la última actividad de los destinatarios'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipient', action='append', type=int, dest='recipients',
+                            help='Id del destinatario a recalcular (por defecto todos)')
+
+    def handle(self, *args, **options):
+        """Necesario después de borrar mensajes en bloque fuera de la aplicación"""
+        updated = RecipientSelector.refresh_counters(options['recipients'])
+        self.stdout.write(self.style.SUCCESS(f"{updated} destinatarios actualizados"))  # type: ignore
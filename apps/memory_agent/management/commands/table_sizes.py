@@ -0,0 +1,75 @@
+import json
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+MB = 1024 * 1024
+
+
+class Command(BaseCommand):
+    help = 'Muestra el tamaño de tabla, índices y TOAST de cada modelo y los bytes por fila (PostgreSQL)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', action='append', dest='models',
+                            help='Modelo de memory_agent a medir (por defecto todos)')
+        parser.add_argument('--analyze', action='store_true',
+                            help='Ejecuta ANALYZE antes de medir para que el conteo de filas sea exacto')
+        parser.add_argument('--json', action='store_true', help='Imprime los resultados en JSON')
+
+    def handle(self, *args, **options):
+        """Las tablas particionadas suman el tamaño de todas sus particiones"""
+        if connection.vendor != 'postgresql':
+            raise CommandError('El comando requiere PostgreSQL')
+
+        config = apps.get_app_config('memory_agent')
+        if options['models']:
+            try:
+                models = [config.get_model(name) for name in options['models']]
+            except LookupError as e:
+                raise CommandError(str(e))
+        else:
+            models = [model for model in config.get_models() if not model._meta.proxy]
+
+        results = {}
+        with connection.cursor() as cursor:
+            for model in models:
+                table = model._meta.db_table
+                if options['analyze']:
+                    cursor.execute(f'ANALYZE {connection.ops.quote_name(table)}')
+                results[model.__name__] = self._measure(cursor, table)
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        self.stdout.write(
+            f"{'modelo':<28}{'filas':>12}{'tabla MB':>10}{'índices MB':>12}{'TOAST MB':>10}"
+            f"{'total MB':>10}{'bytes/fila':>12}"
+        )
+        for name, row in results.items():
+            self.stdout.write(
+                f"{name:<28}{row['rows']:>12}{row['heap_bytes'] / MB:>10.1f}{row['index_bytes'] / MB:>12.1f}"
+                f"{row['toast_bytes'] / MB:>10.1f}{row['total_bytes'] / MB:>10.1f}{row['bytes_per_row']:>12}"
+            )
+
+    def _measure(self, cursor, table):
+        """Tamaños de la tabla (o de todas sus particiones) en bytes"""
+        cursor.execute(
+            'SELECT coalesce(sum(greatest(c.reltuples, 0)), 0), '
+            'coalesce(sum(pg_relation_size(c.oid)), 0), coalesce(sum(pg_indexes_size(c.oid)), 0), '
+            'coalesce(sum(pg_total_relation_size(c.oid)), 0) FROM pg_class c '
+            'WHERE (c.oid = %s::regclass OR c.oid IN (SELECT relid FROM pg_partition_tree(%s::regclass))) '
+            "AND c.relkind = 'r'",  # La tabla particionada no tiene datos propios
+            [connection.ops.quote_name(table)] * 2
+        )
+        rows, heap, indexes, total = cursor.fetchone()
+        rows = int(rows)
+        return {
+            'rows': rows,
+            'heap_bytes': int(heap),
+            'index_bytes': int(indexes),
+            'toast_bytes': int(total - heap - indexes),
+            'total_bytes': int(total),
+            # Incluye el espacio libre de las páginas (fillfactor, filas muertas)
+            'bytes_per_row': round(heap / rows) if rows else 0,
+        }
@@ -0,0 +1,197 @@
+import os
+import time
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+from prometheus_client import (
+    CollectorRegistry, Counter, Histogram, REGISTRY, generate_latest, multiprocess
+)
+from prometheus_client.core import GaugeMetricFamily
+
+logger = logging.getLogger(__name__)
+
+# Buckets en segundos: desde consultas rápidas hasta subidas a Drive de varios minutos
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+STAGE_LATENCY = Histogram(
+    'memory_agent_stage_seconds',
+    'Duración de cada etapa del procesamiento de mensajes',
+    ['stage', 'source', 'message_type'],
+    buckets=STAGE_BUCKETS
+)
+
+PROVIDER_ERRORS = Counter(
+    'memory_agent_provider_errors_total',
+    'Errores de los proveedores externos (Twilio, Google Drive)',
+    ['provider', 'operation', 'source']
+)
+
+# Conexiones a PostgreSQL (ver apps.memory_agent.db.postgresql). Con conexiones
+# persistentes casi no hay aperturas y la edad de la conexión crece entre peticiones
+DB_CONNECT_LATENCY = Histogram(
+    'memory_agent_db_connect_seconds',
+    'Tiempo de abrir una conexión nueva a la base de datos (la petición espera por ella)',
+    ['alias'],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+)
+
+DB_CONNECTION_AGE = Histogram(
+    'memory_agent_db_connection_age_seconds',
+    'Edad de la conexión a la base de datos cada vez que una petición la reutiliza',
+    ['alias'],
+    buckets=(0.1, 1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600)
+)
+
+DB_CONNECTION_REQUESTS = Histogram(
+    'memory_agent_db_connection_requests',
+    'Peticiones atendidas por cada conexión a la base de datos antes de cerrarse',
+    ['alias'],
+    buckets=(1, 2, 5, 10, 50, 100, 500, 1000, 5000)
+)
+
+DB_HEALTH_CHECK_FAILURES = Counter(
+    'memory_agent_db_health_check_failures_total',
+    'Conexiones persistentes descartadas por fallar el health check',
+    ['alias']
+)
+
+# Lecturas que toleran retraso (ver apps.memory_agent.db.routers): a qué base de
+# datos fueron y, si fueron al primario, por qué
+DB_READ_ROUTING = Counter(
+    'memory_agent_db_read_routing_total',
+    'Lecturas enrutadas a la réplica o al primario',
+    ['database', 'reason']
+)
+
+# Etiquetas del mensaje en curso; se completan a medida que se conoce el tipo de mensaje
+_labels: ContextVar[Optional[Dict[str, str]]] = ContextVar('memory_agent_metric_labels', default=None)
+# Duración (ms) de cada etapa del mensaje en curso, para el log de la petición
+_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar('memory_agent_stage_timings', default=None)
+
+
+@contextmanager
+def metric_labels(source: str, message_type: str = 'unknown') -> Iterator[Dict[str, str]]:
+    """
+    Define las etiquetas source/message_type de las etapas medidas dentro del bloque
+
+    Si ya hay etiquetas activas (por ejemplo, definidas por la vista) se reutilizan,
+    de modo que el tipo de mensaje detectado por el servicio también aplique a las
+    etapas externas.
+    """
+    current = _labels.get()
+    if current is not None:
+        current['source'] = source
+        yield current
+        return
+
+    labels = {'source': source, 'message_type': message_type}
+    token = _labels.set(labels)
+    timings_token = _timings.set({})
+    try:
+        yield labels
+    finally:
+        _labels.reset(token)
+        _timings.reset(timings_token)
+
+
+def set_source(source: str) -> None:
+    """
+    Actualiza la fuente de las etapas en curso
+
+    Se llama con el nombre de la fuente ya validada: el segmento de la URL del
+    webhook no se usa como etiqueta (cada nombre inventado sería una serie nueva).
+    """
+    labels = _labels.get()
+    if labels is not None:
+        labels['source'] = source
+
+
+def set_message_type(message_type: str) -> None:
+    """Actualiza el tipo de mensaje de las etapas en curso"""
+    labels = _labels.get()
+    if labels is not None:
+        labels['message_type'] = message_type
+
+
+def stage_timings() -> Dict[str, float]:
+    """Duración en ms de las etapas medidas hasta ahora en el mensaje en curso"""
+    return {stage: round(value, 2) for stage, value in (_timings.get() or {}).items()}
+
+
+def current_source() -> str:
+    labels = _labels.get()
+    return labels['source'] if labels else 'unknown'
+
+
+@contextmanager
+def observe_stage(stage: str) -> Iterator[None]:
+    """
+    Mide la duración de una etapa en memory_agent_stage_seconds
+
+    Las etiquetas se leen al terminar la etapa, así una etapa que detecta el tipo
+    de mensaje (por ejemplo, el parseo) ya queda registrada con él.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        labels = _labels.get() or {'source': 'unknown', 'message_type': 'unknown'}
+        STAGE_LATENCY.labels(stage=stage, **labels).observe(elapsed)
+
+        timings = _timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + elapsed * 1000
+
+
+def record_provider_error(provider: str, operation: str, source: Optional[str] = None) -> None:
+    """Incrementa el contador de errores de un proveedor externo"""
+    PROVIDER_ERRORS.labels(provider=provider, operation=operation, source=source or current_source()).inc()
+
+
+class MediaTransferQueueCollector:
+    """
+    Profundidad del outbox de transferencias por estado
+
+    Se consulta la base de datos en cada scrape, por lo que el valor es el mismo
+    sin importar qué proceso atiende /metrics.
+    """
+
+    def collect(self):
+        from apps.memory_agent.models import MediaTransfer
+        from apps.memory_agent.selectors.media_transfer_selector import MediaTransferSelector
+
+        gauge = GaugeMetricFamily(
+            'memory_agent_media_transfer_queue',
+            'Transferencias de archivos en el outbox por estado',
+            labels=['status']
+        )
+        try:
+            counts = MediaTransferSelector.count_by_status()
+        except Exception as e:
+            logger.warning(f"No se pudo consultar el outbox para las métricas: {str(e)}")
+            return
+
+        for status, _ in MediaTransfer.STATUS_CHOICES:
+            gauge.add_metric([status], counts.get(status, 0))
+        yield gauge
+
+
+def render_metrics() -> bytes:
+    """
+    Genera la exposición de métricas en formato Prometheus
+
+    Con PROMETHEUS_MULTIPROC_DIR (varios workers de gunicorn) se agregan los
+    valores escritos por todos los procesos; si no, se usa el registro del proceso.
+    """
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    queue_registry = CollectorRegistry()
+    queue_registry.register(MediaTransferQueueCollector())
+
+    return generate_latest(registry) + generate_latest(queue_registry)
@@ -0,0 +1,165 @@
+import os
+import re
+import uuid
+import random
+import logging
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils import timezone
+
+from apps.memory_agent.models import RequestProfile
+from apps.memory_agent.profiler import SamplingProfiler
+from apps.memory_agent.query_budget import QueryBudgetExceeded, get_budget, record_queries, webhook_label
+from apps.memory_agent.selectors.profile_selector import ProfileSelector
+from utils.logging import request_id_var
+
+logger = logging.getLogger(__name__)
+
+# IDs de petición aceptados desde el header X-Request-ID (proxy / balanceador)
+REQUEST_ID_PATTERN = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+
+class RequestIdMiddleware:
+    """
+    Asigna un ID a cada petición para correlacionar sus registros de log
+
+    Reutiliza el header X-Request-ID si viene de un proxy; si no, genera uno.
+    El ID se devuelve en la respuesta en el mismo header.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_id = request.META.get('HTTP_X_REQUEST_ID', '')
+        if not REQUEST_ID_PATTERN.match(request_id):
+            request_id = uuid.uuid4().hex
+
+        token = request_id_var.set(request_id)
+        try:
+            response = self.get_response(request)
+        finally:
+            request_id_var.reset(token)
+
+        response['X-Request-ID'] = request_id
+        return response
+
+
+class QueryBudgetMiddleware:
+    """
+    Modo de depuración que cuenta las consultas SQL de cada webhook
+
+    Con QUERY_BUDGET_MODE='log' se registra un warning con las consultas y sus stack
+    traces cuando un webhook supera su presupuesto (QUERY_BUDGETS); con 'raise' la
+    petición falla con QueryBudgetExceeded. Con 'off' el middleware se desactiva.
+    """
+
+    def __init__(self, get_response):
+        self.mode = getattr(settings, 'QUERY_BUDGET_MODE', 'off')
+        if self.mode not in ('log', 'raise'):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with record_queries() as recorder:
+            response = self.get_response(request)
+
+        match = getattr(request, 'resolver_match', None)
+        if not match or match.url_name != 'webhook_receiver':
+            return response
+
+        data = getattr(response, 'data', None)
+        label = webhook_label(data.get('result') if isinstance(data, dict) else None)
+        response['X-Query-Count'] = str(recorder.count)
+        if not label:
+            return response
+
+        budget = get_budget(label)
+        if budget is not None and recorder.count > budget:
+            if self.mode == 'raise':
+                raise QueryBudgetExceeded(recorder, label, budget)
+            logger.warning(recorder.report(label, budget))
+
+        return response
+
+
+class SamplingProfilerMiddleware:
+    """
+    Perfila peticiones al webhook con un profiler por muestreo
+
+    Una petición se perfila si trae el header `X-Profile` con PROFILER_TOKEN (o la
+    envía un usuario staff), o al azar con probabilidad PROFILER_SAMPLE_RATE. Cada
+    perfil se guarda en PROFILER_DIR/<tipo de petición>/ en formato folded y se
+    registra en RequestProfile para listarlo y descargarlo desde el admin.
+
+    Con PROFILER_ENABLED=False el middleware se desactiva y no agrega costo.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILER_ENABLED', False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.token = getattr(settings, 'PROFILER_TOKEN', '')
+        self.sample_rate = getattr(settings, 'PROFILER_SAMPLE_RATE', 0.0)
+        self.interval = getattr(settings, 'PROFILER_INTERVAL', 0.005)
+        self.directory = getattr(settings, 'PROFILER_DIR', 'profiles')
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        profiler = getattr(request, '_sampling_profiler', None)
+        if profiler is not None:
+            profiler.stop()
+            try:
+                self._save(request, response, profiler)
+            except Exception as e:
+                logger.warning(f"No se pudo guardar el perfil de {request.path}: {str(e)}")
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = getattr(request, 'resolver_match', None)
+        if not match or match.url_name != 'webhook_receiver':
+            return None
+
+        trigger = self._get_trigger(request)
+        if trigger:
+            request._sampling_profiler = SamplingProfiler(interval=self.interval).start()
+            request._profile_trigger = trigger
+        return None
+
+    def _get_trigger(self, request):
+        """Determina si la petición se perfila y por qué"""
+        header = request.META.get('HTTP_X_PROFILE')
+        if header is not None:
+            user = getattr(request, 'user', None)
+            if (self.token and header == self.token) or (user is not None and user.is_staff):
+                return RequestProfile.TRIGGER_HEADER
+
+        if self.sample_rate and random.random() < self.sample_rate:
+            return RequestProfile.TRIGGER_SAMPLING
+        return None
+
+    def _save(self, request, response, profiler: SamplingProfiler):
+        """Escribe el perfil en disco y lo registra en la base de datos"""
+        data = getattr(response, 'data', None)
+        label = webhook_label(data.get('result') if isinstance(data, dict) else None) or 'other'
+
+        directory = os.path.join(self.directory, re.sub(r'[^a-z0-9_-]', '', label.lower()) or 'other')
+        os.makedirs(directory, exist_ok=True)
+        file_path = os.path.join(
+            directory, f"{timezone.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}.folded"
+        )
+        with open(file_path, 'w') as profile_file:
+            profile_file.write(profiler.folded())
+
+        ProfileSelector.create_profile(
+            label=label,
+            source_name=request.resolver_match.kwargs.get('source_name', ''),
+            path=request.path,
+            status_code=response.status_code,
+            trigger=request._profile_trigger,
+            duration_ms=profiler.duration * 1000,
+            sample_count=profiler.samples,
+            file_path=file_path
+        )
@@ -0,0 +1,51 @@
+# Generated by Django 5.0.2 on 2026-10-19 03:48
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        (
+            "memory_agent",
+            "0002_message_file_name_message_file_type_message_file_url_and_more",
+        ),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MediaHash",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("sha256", models.CharField(max_length=64, unique=True)),
+                ("prefix_sha256", models.CharField(max_length=64)),
+                ("size", models.BigIntegerField()),
+                ("mime_type", models.CharField(blank=True, max_length=100, null=True)),
+                ("file_name", models.CharField(blank=True, max_length=255, null=True)),
+                ("google_drive_id", models.CharField(max_length=255)),
+                ("google_drive_link", models.URLField(blank=True, null=True)),
+                ("hit_count", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "verbose_name": "Hash de Archivo",
+                "verbose_name_plural": "Hashes de Archivos",
+                "indexes": [
+                    models.Index(
+                        fields=["size", "prefix_sha256"],
+                        name="mediahash_size_prefix_idx",
+                    )
+                ],
+            },
+        ),
+    ]
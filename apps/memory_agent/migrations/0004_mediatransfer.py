@@ -0,0 +1,97 @@
+# Generated by Django 5.0.2 on 2026-10-19 03:50
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("memory_agent", "0003_mediahash"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MediaTransfer",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("recipient", models.CharField(max_length=100)),
+                ("file_url", models.URLField(max_length=1000)),
+                ("file_name", models.CharField(max_length=255)),
+                ("file_type", models.CharField(blank=True, max_length=50, null=True)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pendiente"),
+                            ("processing", "En proceso"),
+                            ("done", "Completada"),
+                            ("dead", "Fallida (dead-letter)"),
+                        ],
+                        default="pending",
+                        max_length=20,
+                    ),
+                ),
+                ("attempts", models.PositiveIntegerField(default=0)),
+                (
+                    "next_attempt_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("last_error", models.TextField(blank=True, null=True)),
+                ("completed_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "message",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="media_transfers",
+                        to="memory_agent.message",
+                    ),
+                ),
+                (
+                    "source",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="media_transfers",
+                        to="memory_agent.source",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Transferencia de Archivo",
+                "verbose_name_plural": "Transferencias de Archivos",
+                "ordering": ["-created_at"],
+            },
+        ),
+        migrations.CreateModel(
+            name="DeadLetterMediaTransfer",
+            fields=[],
+            options={
+                "verbose_name": "Transferencia Fallida",
+                "verbose_name_plural": "Transferencias Fallidas (dead-letter)",
+                "proxy": True,
+                "indexes": [],
+                "constraints": [],
+            },
+            bases=("memory_agent.mediatransfer",),
+        ),
+        migrations.AddIndex(
+            model_name="mediatransfer",
+            index=models.Index(
+                fields=["status", "next_attempt_at"], name="mediatransfer_due_idx"
+            ),
+        ),
+    ]
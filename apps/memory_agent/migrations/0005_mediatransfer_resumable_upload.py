@@ -0,0 +1,33 @@
+# Generated by Django 5.0.2 on 2026-10-19 03:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("memory_agent", "0004_mediatransfer"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="mediatransfer",
+            name="content_sha256",
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name="mediatransfer",
+            name="upload_offset",
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="mediatransfer",
+            name="upload_session_uri",
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="mediatransfer",
+            name="upload_total_bytes",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.0.2 on 2026-10-19 03:54
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("memory_agent", "0005_mediatransfer_resumable_upload"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="mediatransfer",
+            name="bytes_saved",
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name="MediaProcessingProfile",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("is_enabled", models.BooleanField(default=False)),
+                ("min_size_bytes", models.PositiveIntegerField(default=1048576)),
+                ("max_dimension", models.PositiveIntegerField(default=2048)),
+                ("jpeg_quality", models.PositiveSmallIntegerField(default=82)),
+                ("keep_original", models.BooleanField(default=False)),
+                (
+                    "source",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="media_profile",
+                        to="memory_agent.source",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Perfil de Procesamiento de Archivos",
+                "verbose_name_plural": "Perfiles de Procesamiento de Archivos",
+            },
+        ),
+    ]
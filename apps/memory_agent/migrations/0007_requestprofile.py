@@ -0,0 +1,52 @@
+# Generated by Django 5.0.2 on 2026-10-19 04:05
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("memory_agent", "0006_mediaprocessingprofile"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RequestProfile",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("label", models.CharField(db_index=True, max_length=50)),
+                ("source_name", models.CharField(max_length=100)),
+                ("path", models.CharField(max_length=255)),
+                ("status_code", models.PositiveSmallIntegerField()),
+                (
+                    "trigger",
+                    models.CharField(
+                        choices=[
+                            ("header", "Header de administrador"),
+                            ("sampling", "Muestreo"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("duration_ms", models.FloatField()),
+                ("sample_count", models.PositiveIntegerField()),
+                ("file_path", models.CharField(max_length=500)),
+            ],
+            options={
+                "verbose_name": "Perfil de Petición",
+                "verbose_name_plural": "Perfiles de Peticiones",
+                "ordering": ["-created_at"],
+            },
+        ),
+    ]
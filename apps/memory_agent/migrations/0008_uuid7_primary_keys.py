@@ -0,0 +1,74 @@
+# Generated by Django 5.0.2 on 2026-10-19 04:43
+
+import utils.uuid7
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("memory_agent", "0007_requestprofile"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="mediahash",
+            name="id",
+            field=models.UUIDField(
+                default=utils.uuid7.uuid7,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="mediaprocessingprofile",
+            name="id",
+            field=models.UUIDField(
+                default=utils.uuid7.uuid7,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="mediatransfer",
+            name="id",
+            field=models.UUIDField(
+                default=utils.uuid7.uuid7,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="message",
+            name="id",
+            field=models.UUIDField(
+                default=utils.uuid7.uuid7,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="requestprofile",
+            name="id",
+            field=models.UUIDField(
+                default=utils.uuid7.uuid7,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="source",
+            name="id",
+            field=models.UUIDField(
+                default=utils.uuid7.uuid7,
+                editable=False,
+                primary_key=True,
+                serialize=False,
+            ),
+        ),
+    ]
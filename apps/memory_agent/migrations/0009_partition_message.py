@@ -0,0 +1,218 @@
+# Particionado mensual de memory_agent_message por created_at (solo PostgreSQL)
+
+import re
+from datetime import date, datetime, timezone
+
+import django.db.models.deletion
+from django.db import migrations, models, transaction
+
+TABLE = "memory_agent_message"
+# Meses creados por adelantado; luego los mantiene manage_message_partitions
+MONTHS_AHEAD = 3
+
+
+def add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_bound(month):
+    return datetime(month.year, month.month, 1, tzinfo=timezone.utc).isoformat()
+
+
+# Filas por lote al copiar: cada lote es una transacción corta, así que la tabla
+# sigue recibiendo mensajes mientras se copia (ver copy_table)
+BATCH_SIZE = 5000
+# Índice del modelo que agrega esta migración: se crea en la tabla nueva antes de
+# copiar (crearlo después bloquearía las escrituras mientras recorre la tabla)
+RECIPIENT_INDEX = ("message_recipient_created_idx", "USING btree (recipient, created_at DESC)")
+INDEX_DEFINITION = re.compile(r"^CREATE INDEX \S+ ON (?:ONLY )?\S+ (USING .+)$")
+
+
+def table_constraints(schema_editor, table):
+    """PK, índices (con su definición completa) y claves foráneas de la tabla"""
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, table)
+        cursor.execute(
+            "SELECT indexrelid::regclass::text, pg_get_indexdef(indexrelid) FROM pg_index "
+            "WHERE indrelid = %s::regclass AND NOT indisprimary",
+            [table]
+        )
+        definitions = dict(cursor.fetchall())
+    primary_key = next(name for name, info in constraints.items() if info["primary_key"])
+    foreign_keys = {
+        name: (info["columns"], info["foreign_key"])
+        for name, info in constraints.items()
+        if info["foreign_key"]
+    }
+    unique = [
+        name
+        for name, info in constraints.items()
+        if info["unique"] and not info["primary_key"]
+    ]
+    if unique:
+        raise RuntimeError(f"{table} tiene restricciones unique incompatibles con el particionado: {unique}")
+    # pg_get_indexdef conserva opclasses, índices parciales, INCLUDE y expresiones
+    indexes = {
+        name.split(".")[-1].strip('"'): INDEX_DEFINITION.match(definition).group(1)
+        for name, definition in definitions.items()
+    }
+    return primary_key, foreign_keys, indexes
+
+
+def copy_table(schema_editor, partitioned):
+    """
+    Crea la tabla nueva (particionada o no) y reemplaza a la actual sin bloquearla
+
+    La tabla nueva se crea con otro nombre, con PK, índices y FKs desde el inicio.
+    Un trigger replica en ella las escrituras que llegan durante la copia y las
+    filas se copian en lotes por id (FOR SHARE: un UPDATE o DELETE concurrente de
+    una fila del lote espera a que el lote termine y el trigger lo aplica después).
+    Solo el intercambio final toma el lock exclusivo, durante milisegundos.
+    """
+    quote = schema_editor.quote_name
+    primary_key, foreign_keys, indexes = table_constraints(schema_editor, TABLE)
+    if partitioned:
+        indexes[RECIPIENT_INDEX[0]] = RECIPIENT_INDEX[1]
+    else:
+        indexes.pop(RECIPIENT_INDEX[0], None)
+    new_table = f"{TABLE}_new"
+    function = f"{TABLE}_copy_writes"
+
+    # Restos de una ejecución interrumpida: la tabla actual sigue completa
+    schema_editor.execute(f"DROP TRIGGER IF EXISTS {quote(function)} ON {quote(TABLE)}")
+    schema_editor.execute(f"DROP FUNCTION IF EXISTS {quote(function)}()")
+    schema_editor.execute(f"DROP TABLE IF EXISTS {quote(new_table)} CASCADE")
+
+    if partitioned:
+        schema_editor.execute(
+            f"CREATE TABLE {quote(new_table)} (LIKE {quote(TABLE)} INCLUDING DEFAULTS) "
+            f"PARTITION BY RANGE (created_at)"
+        )
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f"SELECT min(created_at), max(created_at), now() FROM {quote(TABLE)}")
+            oldest, newest, now = cursor.fetchone()
+        month = date((oldest or now).year, (oldest or now).month, 1)
+        last = add_months(date(max(newest or now, now).year, max(newest or now, now).month, 1), MONTHS_AHEAD)
+        while month <= last:
+            schema_editor.execute(
+                f"CREATE TABLE {quote(f'{TABLE}_p{month.year:04d}_{month.month:02d}')} PARTITION OF {quote(new_table)} "
+                f"FOR VALUES FROM ('{month_bound(month)}') TO ('{month_bound(add_months(month, 1))}')"
+            )
+            month = add_months(month, 1)
+        schema_editor.execute(f"CREATE TABLE {quote(f'{TABLE}_default')} PARTITION OF {quote(new_table)} DEFAULT")
+    else:
+        schema_editor.execute(f"CREATE TABLE {quote(new_table)} (LIKE {quote(TABLE)} INCLUDING DEFAULTS)")
+
+    key = "id, created_at" if partitioned else "id"
+    schema_editor.execute(
+        f"ALTER TABLE {quote(new_table)} ADD CONSTRAINT {quote(f'{primary_key}_new')} PRIMARY KEY ({key})"
+    )
+    for name, definition in indexes.items():
+        schema_editor.execute(f"CREATE INDEX {quote(f'{name}_new')} ON {quote(new_table)} {definition}")
+    for name, (columns, (target_table, target_column)) in foreign_keys.items():
+        schema_editor.execute(
+            f"ALTER TABLE {quote(new_table)} ADD CONSTRAINT {quote(f'{name}_new')} FOREIGN KEY ({quote(columns[0])}) "
+            f"REFERENCES {quote(target_table)} ({quote(target_column)}) DEFERRABLE INITIALLY DEFERRED"
+        )
+
+    schema_editor.execute(
+        f"CREATE FUNCTION {quote(function)}() RETURNS trigger LANGUAGE plpgsql AS $$ BEGIN "
+        f"IF TG_OP IN ('UPDATE', 'DELETE') THEN "
+        f"DELETE FROM {quote(new_table)} WHERE id = OLD.id AND created_at = OLD.created_at; END IF; "
+        f"IF TG_OP IN ('INSERT', 'UPDATE') THEN "
+        f"INSERT INTO {quote(new_table)} SELECT NEW.* ON CONFLICT DO NOTHING; END IF; "
+        f"RETURN NULL; END $$"
+    )
+    schema_editor.execute(
+        f"CREATE TRIGGER {quote(function)} AFTER INSERT OR UPDATE OR DELETE ON {quote(TABLE)} "
+        f"FOR EACH ROW EXECUTE FUNCTION {quote(function)}()"
+    )
+
+    last_id = None
+    with schema_editor.connection.cursor() as cursor:
+        while True:
+            cursor.execute(
+                f"WITH batch AS (SELECT * FROM {quote(TABLE)} "
+                f"{'WHERE id > %s ' if last_id is not None else ''}ORDER BY id LIMIT {BATCH_SIZE} FOR SHARE), "
+                f"copied AS (INSERT INTO {quote(new_table)} SELECT * FROM batch ON CONFLICT DO NOTHING) "
+                f"SELECT id FROM batch ORDER BY id DESC LIMIT 1",
+                [last_id] if last_id is not None else []
+            )
+            row = cursor.fetchone()
+            if row is None:
+                break
+            last_id = row[0]
+
+    # Intercambio: los nombres de la PK, los índices y las FKs se liberan al borrar la tabla anterior
+    with transaction.atomic(using=schema_editor.connection.alias):
+        schema_editor.execute(f"LOCK TABLE {quote(TABLE)} IN ACCESS EXCLUSIVE MODE")
+        schema_editor.execute(f"DROP TABLE {quote(TABLE)} CASCADE")
+        schema_editor.execute(f"DROP FUNCTION {quote(function)}()")
+        schema_editor.execute(f"ALTER TABLE {quote(new_table)} RENAME TO {quote(TABLE)}")
+        for name in [primary_key, *foreign_keys]:
+            schema_editor.execute(
+                f"ALTER TABLE {quote(TABLE)} RENAME CONSTRAINT {quote(f'{name}_new')} TO {quote(name)}"
+            )
+        for name in indexes:
+            schema_editor.execute(f"ALTER INDEX {quote(f'{name}_new')} RENAME TO {quote(name)}")
+
+
+def partition_message(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        copy_table(schema_editor, partitioned=True)
+
+
+def unpartition_message(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        copy_table(schema_editor, partitioned=False)
+
+
+def recipient_index():
+    return models.Index(fields=["recipient", "-created_at"], name=RECIPIENT_INDEX[0])
+
+
+def add_recipient_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        schema_editor.add_index(apps.get_model("memory_agent", "Message"), recipient_index())
+
+
+def remove_recipient_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        schema_editor.remove_index(apps.get_model("memory_agent", "Message"), recipient_index())
+
+
+class Migration(migrations.Migration):
+    # Cada paso de la copia hace commit: la tabla de mensajes no queda bloqueada durante la copia
+    atomic = False
+
+    dependencies = [
+        ("memory_agent", "0008_uuid7_primary_keys"),
+    ]
+
+    operations = [
+        # Una clave foránea hacia una tabla particionada debe incluir created_at
+        migrations.AlterField(
+            model_name="mediatransfer",
+            name="message",
+            field=models.ForeignKey(
+                blank=True,
+                db_constraint=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="media_transfers",
+                to="memory_agent.message",
+            ),
+        ),
+        migrations.RunPython(partition_message, unpartition_message),
+        migrations.SeparateDatabaseAndState(
+            # En PostgreSQL lo crea copy_table (RECIPIENT_INDEX)
+            database_operations=[
+                migrations.RunPython(add_recipient_index, remove_recipient_index),
+            ],
+            state_operations=[
+                migrations.AddIndex(model_name="message", index=recipient_index()),
+            ],
+        ),
+    ]
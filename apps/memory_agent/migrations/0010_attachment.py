@@ -0,0 +1,65 @@
+# Generated by Django 5.0.2 on 2026-10-19 04:58
+
+import django.db.models.deletion
+import utils.uuid7
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("memory_agent", "0009_partition_message"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Attachment",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=utils.uuid7.uuid7,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("position", models.PositiveSmallIntegerField(default=0)),
+                ("file_type", models.CharField(blank=True, max_length=50, null=True)),
+                ("file_name", models.CharField(blank=True, max_length=255, null=True)),
+                ("file_url", models.URLField(blank=True, max_length=1000, null=True)),
+                (
+                    "google_drive_id",
+                    models.CharField(blank=True, max_length=255, null=True),
+                ),
+                ("google_drive_link", models.URLField(blank=True, null=True)),
+                (
+                    "message",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="attachments",
+                        to="memory_agent.message",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Adjunto",
+                "verbose_name_plural": "Adjuntos",
+                "ordering": ["position"],
+            },
+        ),
+        migrations.AddField(
+            model_name="mediatransfer",
+            name="attachment",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="media_transfers",
+                to="memory_agent.attachment",
+            ),
+        ),
+    ]
@@ -0,0 +1,89 @@
+# Copia los campos de archivo de los mensajes a Attachment, en lotes
+
+from django.db import migrations, transaction
+from django.db.models import OuterRef, Q, Subquery
+
+# Cada lote es una transacción corta: no se bloquea la tabla de mensajes mientras
+# se copian millones de filas y una interrupción no pierde lo ya copiado
+BATCH_SIZE = 5000
+FILE_FIELDS = ["file_type", "file_name", "file_url", "google_drive_id", "google_drive_link"]
+
+
+def copy_attachments(apps, schema_editor):
+    Message = apps.get_model("memory_agent", "Message")
+    Attachment = apps.get_model("memory_agent", "Attachment")
+    MediaTransfer = apps.get_model("memory_agent", "MediaTransfer")
+    db = schema_editor.connection.alias
+
+    last_id = None
+    while True:
+        messages = Message.objects.using(db).filter(Q(is_file=True) | Q(file_url__isnull=False))
+        if last_id is not None:
+            messages = messages.filter(id__gt=last_id)
+        batch = list(messages.order_by("id").values("id", *FILE_FIELDS)[:BATCH_SIZE])
+        if not batch:
+            break
+        last_id = batch[-1]["id"]
+        message_ids = [row["id"] for row in batch]
+
+        with transaction.atomic(using=db):
+            # Permite volver a ejecutar la migración si se interrumpió
+            copied = set(
+                Attachment.objects.using(db)
+                .filter(message_id__in=message_ids)
+                .values_list("message_id", flat=True)
+            )
+            Attachment.objects.using(db).bulk_create(
+                [
+                    Attachment(message_id=row["id"], position=0, **{field: row[field] for field in FILE_FIELDS})
+                    for row in batch
+                    if row["id"] not in copied
+                ]
+            )
+            MediaTransfer.objects.using(db).filter(
+                message_id__in=message_ids, attachment__isnull=True
+            ).update(
+                attachment_id=Subquery(
+                    Attachment.objects.using(db)
+                    .filter(message_id=OuterRef("message_id"), position=0)
+                    .values("id")[:1]
+                )
+            )
+
+
+def restore_message_fields(apps, schema_editor):
+    Message = apps.get_model("memory_agent", "Message")
+    Attachment = apps.get_model("memory_agent", "Attachment")
+    db = schema_editor.connection.alias
+
+    last_id = None
+    while True:
+        attachments = Attachment.objects.using(db).filter(position=0)
+        if last_id is not None:
+            attachments = attachments.filter(id__gt=last_id)
+        batch = list(attachments.order_by("id").values("id", "message_id", *FILE_FIELDS)[:BATCH_SIZE])
+        if not batch:
+            break
+        last_id = batch[-1]["id"]
+
+        messages = []
+        for row in batch:
+            message = Message(id=row["message_id"], is_file=True)
+            for field in FILE_FIELDS:
+                setattr(message, field, row[field])
+            messages.append(message)
+        with transaction.atomic(using=db):
+            Message.objects.using(db).bulk_update(messages, ["is_file", *FILE_FIELDS])
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ("memory_agent", "0010_attachment"),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_attachments, restore_message_fields),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.2 on 2026-10-19 04:58
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("memory_agent", "0011_copy_message_attachments"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="message",
+            name="file_name",
+        ),
+        migrations.RemoveField(
+            model_name="message",
+            name="file_type",
+        ),
+        migrations.RemoveField(
+            model_name="message",
+            name="file_url",
+        ),
+        migrations.RemoveField(
+            model_name="message",
+            name="google_drive_id",
+        ),
+        migrations.RemoveField(
+            model_name="message",
+            name="google_drive_link",
+        ),
+        migrations.RemoveField(
+            model_name="message",
+            name="is_file",
+        ),
+    ]
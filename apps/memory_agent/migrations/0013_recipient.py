@@ -0,0 +1,55 @@
+# Generated by Django 5.0.2 on 2026-10-19 05:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("memory_agent", "0012_remove_message_file_fields"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Recipient",
+            fields=[
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("identifier", models.CharField(max_length=100)),
+                ("message_count", models.PositiveIntegerField(default=0)),
+                ("last_message_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "source",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="recipients",
+                        to="memory_agent.source",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Destinatario",
+                "verbose_name_plural": "Destinatarios",
+            },
+        ),
+        migrations.AddField(
+            model_name="message",
+            name="recipient_ref",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="messages",
+                to="memory_agent.recipient",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="recipient",
+            constraint=models.UniqueConstraint(
+                fields=("source", "identifier"), name="recipient_source_identifier_uniq"
+            ),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Crea un Recipient por cada (fuente, destinatario) de los mensajes y los enlaza
+
+from django.db import migrations, transaction
+from django.db.models import Count, Max, Q
+
+
+def copy_recipients(apps, schema_editor):
+    Message = apps.get_model("memory_agent", "Message")
+    Recipient = apps.get_model("memory_agent", "Recipient")
+    db = schema_editor.connection.alias
+
+    pairs = (
+        Message.objects.using(db)
+        .order_by()
+        .values("source_id", "recipient")
+        .annotate(ideas=Count("id", filter=Q(is_command=False)), last=Max("created_at"))
+    )
+    # ignore_conflicts: permite volver a ejecutar la migración si se interrumpió
+    Recipient.objects.using(db).bulk_create(
+        [
+            Recipient(
+                source_id=pair["source_id"],
+                identifier=pair["recipient"],
+                message_count=pair["ideas"],
+                last_message_at=pair["last"],
+            )
+            for pair in pairs
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+    # Un UPDATE por destinatario, cada uno en su propia transacción
+    for recipient in Recipient.objects.using(db).values("id", "source_id", "identifier").iterator():
+        with transaction.atomic(using=db):
+            Message.objects.using(db).filter(
+                source_id=recipient["source_id"],
+                recipient=recipient["identifier"],
+                recipient_ref__isnull=True,
+            ).update(recipient_ref_id=recipient["id"])
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ("memory_agent", "0013_recipient"),
+    ]
+
+    operations = [
+        # Al revertir no hay nada que restaurar: la columna recipient no se modifica
+        # (la restaura 0015 si ya se había eliminado)
+        migrations.RunPython(copy_recipients, migrations.RunPython.noop),
+    ]
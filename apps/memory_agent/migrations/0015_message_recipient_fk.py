@@ -0,0 +1,62 @@
+# Reemplaza el destinatario de texto de Message por la clave entera de Recipient
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def restore_message_recipients(apps, schema_editor):
+    """Al revertir: vuelve a llenar la columna de texto desde Recipient"""
+    Message = apps.get_model("memory_agent", "Message")
+    Recipient = apps.get_model("memory_agent", "Recipient")
+    db = schema_editor.connection.alias
+
+    for recipient in Recipient.objects.using(db).values("id", "identifier").iterator():
+        Message.objects.using(db).filter(recipient_ref_id=recipient["id"]).update(
+            recipient=recipient["identifier"]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("memory_agent", "0014_copy_message_recipients"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="message",
+            name="message_recipient_created_idx",
+        ),
+        # Nullable antes de eliminarla para que al revertir se pueda agregar vacía
+        migrations.AlterField(
+            model_name="message",
+            name="recipient",
+            field=models.CharField(max_length=100, null=True),
+        ),
+        migrations.RunPython(migrations.RunPython.noop, restore_message_recipients),
+        migrations.RemoveField(
+            model_name="message",
+            name="recipient",
+        ),
+        migrations.RenameField(
+            model_name="message",
+            old_name="recipient_ref",
+            new_name="recipient",
+        ),
+        migrations.AlterField(
+            model_name="message",
+            name="recipient",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="messages",
+                to="memory_agent.recipient",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                fields=["recipient", "-created_at"], name="message_recipient_created_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.2 on 2026-10-19 05:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("memory_agent", "0015_message_recipient_fk"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="message",
+            name="theme",
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+    ]
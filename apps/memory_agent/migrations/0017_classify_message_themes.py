@@ -0,0 +1,50 @@
+# Guarda el tema de las ideas existentes, en lotes
+
+from collections import defaultdict
+
+from django.db import migrations, transaction
+from django.db.models import Q
+
+from apps.memory_agent.classifiers import get_theme_classifier
+
+# Lotes ordenados por (created_at, id): cada UPDATE lleva el rango de fechas del
+# lote y PostgreSQL solo toca las particiones de ese rango
+BATCH_SIZE = 5000
+
+
+def classify_themes(apps, schema_editor):
+    Message = apps.get_model("memory_agent", "Message")
+    db = schema_editor.connection.alias
+    classifier = get_theme_classifier()
+
+    last = None
+    while True:
+        messages = Message.objects.using(db).filter(is_command=False, theme__isnull=True)
+        if last is not None:
+            messages = messages.filter(Q(created_at__gt=last[0]) | Q(created_at=last[0], id__gt=last[1]))
+        batch = list(messages.order_by("created_at", "id").values_list("created_at", "id", "content")[:BATCH_SIZE])
+        if not batch:
+            break
+        last = batch[-1][:2]
+
+        by_theme = defaultdict(list)
+        for _, message_id, content in batch:
+            by_theme[classifier.classify(content)].append(message_id)
+        with transaction.atomic(using=db):
+            for theme, ids in by_theme.items():
+                Message.objects.using(db).filter(
+                    id__in=ids, created_at__gte=batch[0][0], created_at__lte=last[0]
+                ).update(theme=theme)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ("memory_agent", "0016_message_theme"),
+    ]
+
+    operations = [
+        migrations.RunPython(classify_themes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.0.2 on 2026-10-19 05:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("memory_agent", "0017_classify_message_themes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                fields=["recipient", "theme", "-created_at"],
+                name="message_recipient_theme_idx",
+            ),
+        ),
+    ]
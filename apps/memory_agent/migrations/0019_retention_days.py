@@ -0,0 +1,31 @@
+# Generated by Django 5.0.2 on 2026-10-19 05:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("memory_agent", "0018_message_recipient_theme_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipient",
+            name="retention_days",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="source",
+            name="retention_days",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="attachment",
+            index=models.Index(
+                condition=models.Q(("google_drive_id__isnull", False)),
+                fields=["google_drive_id"],
+                name="attachment_drive_id_idx",
+            ),
+        ),
+    ]
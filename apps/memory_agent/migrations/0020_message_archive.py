@@ -0,0 +1,58 @@
+# Generated by Django 5.0.2 on 2026-10-19 06:09
+
+import django.db.models.deletion
+import utils.uuid7
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("memory_agent", "0019_retention_days"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MessageArchive",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=utils.uuid7.uuid7,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("month", models.DateField()),
+                ("file_path", models.CharField(max_length=500)),
+                ("size_bytes", models.BigIntegerField(default=0)),
+                ("row_count", models.PositiveIntegerField(default=0)),
+                ("message_count", models.PositiveIntegerField(default=0)),
+                ("theme_counts", models.JSONField(default=dict)),
+                ("first_message_at", models.DateTimeField()),
+                ("last_message_at", models.DateTimeField()),
+                (
+                    "recipient",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archives",
+                        to="memory_agent.recipient",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Archivo de Mensajes",
+                "verbose_name_plural": "Archivos de Mensajes",
+                "ordering": ["-month"],
+                "indexes": [
+                    models.Index(
+                        fields=["recipient", "-month"],
+                        name="messagearchive_recipient_idx",
+                    )
+                ],
+            },
+        ),
+    ]
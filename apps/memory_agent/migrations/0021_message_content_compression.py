@@ -0,0 +1,56 @@
+# Generated by Django 5.0.2 on 2026-10-19 06:51
+
+import apps.memory_agent.compression
+import utils.uuid7
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("memory_agent", "0020_message_archive"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CompressionDictionary",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=utils.uuid7.uuid7,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("dict_id", models.PositiveBigIntegerField(unique=True)),
+                ("data", models.BinaryField()),
+                ("sample_count", models.PositiveIntegerField()),
+                ("sample_bytes", models.BigIntegerField()),
+                ("is_active", models.BooleanField(default=True)),
+            ],
+            options={
+                "verbose_name": "Diccionario de Compresión",
+                "verbose_name_plural": "Diccionarios de Compresión",
+                "ordering": ["-created_at"],
+            },
+        ),
+        migrations.AddField(
+            model_name="message",
+            name="content_preview",
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name="message",
+            name="content_zstd",
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name="message",
+            name="content",
+            field=apps.memory_agent.compression.CompressedTextField(),
+        ),
+    ]
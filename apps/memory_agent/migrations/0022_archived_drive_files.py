@@ -0,0 +1,79 @@
+# Generated by Django 5.0.2 on 2026-10-19 07:05
+
+import django.db.models.deletion
+import utils.uuid7
+from django.core.files.storage import storages
+from django.db import migrations, models
+
+
+# Los archivos escritos antes de esta migración solo tienen los IDs de Drive en el Parquet
+def collect_archived_drive_files(apps, schema_editor):
+    MessageArchive = apps.get_model("memory_agent", "MessageArchive")
+    ArchivedDriveFile = apps.get_model("memory_agent", "ArchivedDriveFile")
+    db = schema_editor.connection.alias
+
+    archives = list(MessageArchive.objects.using(db).only("id", "file_path"))
+    if not archives:
+        return
+    import pyarrow.parquet as pq
+
+    storage = storages["message_archive"]
+    for archive in archives:
+        with storage.open(archive.file_path, "rb") as file:
+            table = pq.ParquetFile(file).read(columns=["attachments"])
+        drive_ids = {
+            attachment["google_drive_id"]
+            for attachments in table["attachments"].to_pylist()
+            for attachment in attachments
+            if attachment["google_drive_id"]
+        }
+        ArchivedDriveFile.objects.using(db).bulk_create(
+            [ArchivedDriveFile(archive_id=archive.id, google_drive_id=drive_id) for drive_id in drive_ids],
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("memory_agent", "0021_message_content_compression"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedDriveFile",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=utils.uuid7.uuid7,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("google_drive_id", models.CharField(db_index=True, max_length=255)),
+                (
+                    "archive",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="drive_files",
+                        to="memory_agent.messagearchive",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Archivo de Drive Archivado",
+                "verbose_name_plural": "Archivos de Drive Archivados",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="archiveddrivefile",
+            constraint=models.UniqueConstraint(
+                fields=("archive", "google_drive_id"), name="archiveddrivefile_unique"
+            ),
+        ),
+        migrations.RunPython(collect_archived_drive_files, migrations.RunPython.noop),
+    ]
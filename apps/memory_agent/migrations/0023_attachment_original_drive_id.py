@@ -0,0 +1,31 @@
+# Generated by Django 5.0.2 on 2026-10-19 07:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("memory_agent", "0022_archived_drive_files"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="attachment",
+            name="original_google_drive_id",
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name="mediahash",
+            name="original_google_drive_id",
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="attachment",
+            index=models.Index(
+                condition=models.Q(("original_google_drive_id__isnull", False)),
+                fields=["original_google_drive_id"],
+                name="attachment_original_drive_idx",
+            ),
+        ),
+    ]
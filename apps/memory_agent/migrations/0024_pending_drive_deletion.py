@@ -0,0 +1,36 @@
+# Generated by Django 5.0.2 on 2026-10-19 07:23
+
+import utils.uuid7
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("memory_agent", "0023_attachment_original_drive_id"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PendingDriveDeletion",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=utils.uuid7.uuid7,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("google_drive_id", models.CharField(max_length=255, unique=True)),
+                ("attempts", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "verbose_name": "Eliminación de Drive Pendiente",
+                "verbose_name_plural": "Eliminaciones de Drive Pendientes",
+            },
+        ),
+    ]
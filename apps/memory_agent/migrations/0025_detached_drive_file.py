@@ -0,0 +1,42 @@
+# Generated by Django 5.0.2 on 2026-10-19 07:30
+
+import utils.uuid7
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("memory_agent", "0024_pending_drive_deletion"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DetachedDriveFile",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=utils.uuid7.uuid7,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("partition", models.CharField(db_index=True, max_length=63)),
+                ("google_drive_id", models.CharField(db_index=True, max_length=255)),
+            ],
+            options={
+                "verbose_name": "Archivo de Drive de Partición Separada",
+                "verbose_name_plural": "Archivos de Drive de Particiones Separadas",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="detacheddrivefile",
+            constraint=models.UniqueConstraint(
+                fields=("partition", "google_drive_id"), name="detacheddrivefile_unique"
+            ),
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.db import models
+from django.utils import timezone
 from typing import Optional
+from apps.memory_agent.compression import PREVIEW_LENGTH, CompressedTextField
 from utils.models import BaseModel
 
 class Source(BaseModel):
@@ -10,6 +12,8 @@ class Source(BaseModel):
     additional1 = models.TextField(blank=True, null=True)
     additional2 = models.TextField(blank=True, null=True)
     is_active = models.BooleanField(default=True)  # type: ignore
+    # Días que se conservan las ideas (vacío: MESSAGE_RETENTION_DAYS); ver purge_messages
+    retention_days = models.PositiveIntegerField(blank=True, null=True)
 
     class Meta:
         verbose_name = "Fuente de Mensajería"
@@ -18,29 +22,407 @@ class Source(BaseModel):
     def __str__(self):
         return self.name
 
+class MediaProcessingProfile(BaseModel):
+    """Configuración de procesamiento de archivos de una fuente antes de subirlos a Drive"""
+    source = models.OneToOneField(Source, on_delete=models.CASCADE, related_name='media_profile')
+    is_enabled = models.BooleanField(default=False)  # type: ignore
+    min_size_bytes = models.PositiveIntegerField(default=1024 * 1024)  # type: ignore  # Solo archivos mayores
+    max_dimension = models.PositiveIntegerField(default=2048)  # type: ignore  # Lado mayor en píxeles
+    jpeg_quality = models.PositiveSmallIntegerField(default=82)  # type: ignore
+    keep_original = models.BooleanField(default=False)  # type: ignore  # Subir también el original
+
+    class Meta:
+        verbose_name = "Perfil de Procesamiento de Archivos"
+        verbose_name_plural = "Perfiles de Procesamiento de Archivos"
+
+    def __str__(self):
+        return f"{self.source.name} - {'activo' if self.is_enabled else 'inactivo'}"
+
+
+class Recipient(BaseModel):
+    """
+    Usuario de una fuente (número de WhatsApp, chat de Telegram)
+
+    Los mensajes guardan su clave entera en vez del identificador de hasta 100
+    caracteres. Los contadores los actualiza MessageSelector.create_message y los
+    recalcula RecipientSelector.refresh_counters (comando refresh_recipient_counters).
+    """
+    id = models.BigAutoField(primary_key=True)
+    source = models.ForeignKey(Source, on_delete=models.CASCADE, related_name='recipients')
+    identifier = models.CharField(max_length=100)  # número/chat_id del usuario
+    message_count = models.PositiveIntegerField(default=0)  # type: ignore  # Ideas guardadas (sin comandos)
+    last_message_at = models.DateTimeField(blank=True, null=True)  # Último mensaje recibido
+    # Días que se conservan sus ideas; vacío usa la retención de la fuente
+    retention_days = models.PositiveIntegerField(blank=True, null=True)
+
+    class Meta:
+        verbose_name = "Destinatario"
+        verbose_name_plural = "Destinatarios"
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'identifier'], name='recipient_source_identifier_uniq'),
+        ]
+
+    def __str__(self):
+        return self.identifier
+
+
 class Message(BaseModel):
-    """Registra cada idea recibida desde las fuentes"""
-    content = models.TextField()
+    """
+    Registra cada idea recibida desde las fuentes
+
+    En PostgreSQL la tabla está particionada por mes según created_at (ver
+    MessagePartitionService): la clave primaria real es (id, created_at), así que
+    las claves foráneas hacia Message usan db_constraint=False y no se pueden
+    agregar campos unique que no incluyan created_at.
+    """
+    content = CompressedTextField()  # Vacío si el texto está en content_zstd
     source = models.ForeignKey(Source, on_delete=models.CASCADE, related_name='messages')
-    recipient = models.CharField(max_length=100)  # número/chat_id del usuario
+    # Sin índice propio: lo cubre message_recipient_created_idx
+    recipient = models.ForeignKey(Recipient, on_delete=models.CASCADE, related_name='messages',
+                                  db_index=False)
     
     # Campos adicionales para análisis
     is_command = models.BooleanField(default=False)  # type: ignore  # Si es un comando especial
     command_type = models.CharField(max_length=50, blank=True, null=True)  # /resumen, /hoy, etc.
+    theme = models.CharField(max_length=50, blank=True, null=True)  # Tema según classifiers (ideas)
+
+    # Contenidos largos comprimidos con zstd (MESSAGE_COMPRESSION_*); `content` los
+    # descomprime al leerlo. Definidos después de content (ver CompressedTextField)
+    content_zstd = models.BinaryField(blank=True, null=True)
+    content_preview = models.CharField(max_length=PREVIEW_LENGTH, blank=True, null=True)  # Solo si está comprimido
     
-    # Campos para archivos
-    is_file = models.BooleanField(default=False)  # type: ignore  # Si es un archivo
+    # Los archivos están en Attachment (uno o varios por mensaje)
+    
+    class Meta:
+        verbose_name = "Mensaje"
+        verbose_name_plural = "Mensajes"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['recipient', '-created_at'], name='message_recipient_created_idx'),
+            # Filtro por tema del listado de la API sin recorrer las ideas de otros temas
+            models.Index(fields=['recipient', 'theme', '-created_at'], name='message_recipient_theme_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.source.name} - {self.preview[:50]}..."
+
+    def save(self, *args, update_fields=None, **kwargs):
+        # pre_save de content también decide content_zstd y content_preview: se
+        # guardan juntos, o save(update_fields=['content']) perdería el texto comprimido
+        if update_fields is not None and 'content' in update_fields:
+            update_fields = {*update_fields, 'content_zstd', 'content_preview'}
+        super().save(*args, update_fields=update_fields, **kwargs)
+
+    @property
+    def preview(self) -> str:
+        """
+        Contenido recortado a PREVIEW_LENGTH caracteres ('...' si sigue)
+
+        Los contenidos comprimidos usan content_preview y no se descomprimen; el
+        resto (y las ideas archivadas) se recortan aquí.
+        """
+        if self.content_preview is not None:
+            return f"{self.content_preview}..."
+        content = self.content
+        return f"{content[:PREVIEW_LENGTH]}..." if len(content) > PREVIEW_LENGTH else content
+
+    # Compatibilidad con los campos de archivo que tenía el mensaje: se leen del
+    # primer adjunto (usar prefetch_related('attachments') al listar mensajes)
+    @property
+    def first_attachment(self) -> Optional['Attachment']:
+        attachments = list(self.attachments.all())  # type: ignore
+        return attachments[0] if attachments else None
+
+    @property
+    def is_file(self) -> bool:
+        return self.first_attachment is not None
+
+    @property
+    def file_type(self) -> Optional[str]:
+        return getattr(self.first_attachment, 'file_type', None)
+
+    @property
+    def file_name(self) -> Optional[str]:
+        return getattr(self.first_attachment, 'file_name', None)
+
+    @property
+    def file_url(self) -> Optional[str]:
+        return getattr(self.first_attachment, 'file_url', None)
+
+    @property
+    def google_drive_id(self) -> Optional[str]:
+        return getattr(self.first_attachment, 'google_drive_id', None)
+
+    @property
+    def google_drive_link(self) -> Optional[str]:
+        return getattr(self.first_attachment, 'google_drive_link', None)
+
+
+class Attachment(BaseModel):
+    """Archivo recibido con un mensaje (WhatsApp permite varios por mensaje)"""
+    # Sin restricción en la BD: la tabla de mensajes está particionada (ver Message)
+    message = models.ForeignKey(Message, on_delete=models.CASCADE, related_name='attachments',
+                                db_constraint=False)
+    position = models.PositiveSmallIntegerField(default=0)  # type: ignore  # Orden en el mensaje (MediaUrlN)
     file_type = models.CharField(max_length=50, blank=True, null=True)  # image, document, audio, etc.
     file_name = models.CharField(max_length=255, blank=True, null=True)  # Nombre del archivo
-    file_url = models.URLField(blank=True, null=True)  # URL del archivo original
+    file_url = models.URLField(max_length=1000, blank=True, null=True)  # URL del archivo original
     google_drive_id = models.CharField(max_length=255, blank=True, null=True)  # ID en Google Drive
     google_drive_link = models.URLField(blank=True, null=True)  # Link de Google Drive
-    
+    # Original sin procesar (perfiles con keep_original, ver MediaProcessingProfile)
+    original_google_drive_id = models.CharField(max_length=255, blank=True, null=True)
+
     class Meta:
-        verbose_name = "Mensaje"
-        verbose_name_plural = "Mensajes"
+        verbose_name = "Adjunto"
+        verbose_name_plural = "Adjuntos"
+        ordering = ['position']
+        indexes = [
+            # La retención borra un archivo de Drive solo si ningún otro adjunto lo usa (deduplicación)
+            models.Index(fields=['google_drive_id'], name='attachment_drive_id_idx',
+                         condition=models.Q(google_drive_id__isnull=False)),
+            models.Index(fields=['original_google_drive_id'], name='attachment_original_drive_idx',
+                         condition=models.Q(original_google_drive_id__isnull=False)),
+        ]
+
+    def __str__(self):
+        return f"{self.file_name} ({self.file_type})"
+
+
+class CompressionDictionary(BaseModel):
+    """Diccionario de zstd entrenado con contenidos largos (ver compress_message_contents)"""
+    dict_id = models.PositiveBigIntegerField(unique=True)  # ID que zstd guarda en cada frame
+    data = models.BinaryField()
+    sample_count = models.PositiveIntegerField()
+    sample_bytes = models.BigIntegerField()
+    is_active = models.BooleanField(default=True)  # type: ignore  # Se usa para comprimir (solo uno)
+
+    class Meta:
+        verbose_name = "Diccionario de Compresión"
+        verbose_name_plural = "Diccionarios de Compresión"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.dict_id} ({len(self.data) // 1024} KB)"
+
+
+class MessageArchive(BaseModel):
+    """
+    Archivo Parquet con los mensajes de un mes de un destinatario (capa fría)
+
+    Los mensajes archivados salen de la tabla de mensajes (ver MessageArchiveService);
+    las estadísticas de cada archivo permiten resumir sin leerlo. Un mes grande o
+    archivado en varias ejecuciones puede tener varios archivos.
+    """
+    recipient = models.ForeignKey(Recipient, on_delete=models.CASCADE, related_name='archives')
+    month = models.DateField()  # Primer día del mes (UTC)
+    file_path = models.CharField(max_length=500)  # Nombre en el storage 'message_archive'
+    size_bytes = models.BigIntegerField(default=0)  # type: ignore
+    row_count = models.PositiveIntegerField(default=0)  # type: ignore  # Mensajes (ideas y comandos)
+    message_count = models.PositiveIntegerField(default=0)  # type: ignore  # Ideas (sin comandos)
+    theme_counts = models.JSONField(default=dict)  # Ideas por tema: {"Trabajo": 12, ...}
+    first_message_at = models.DateTimeField()
+    last_message_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Archivo de Mensajes"
+        verbose_name_plural = "Archivos de Mensajes"
+        ordering = ['-month']
+        indexes = [
+            models.Index(fields=['recipient', '-month'], name='messagearchive_recipient_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.recipient_id} - {self.month:%Y-%m} ({self.row_count} mensajes)"
+
+
+class ArchivedDriveFile(BaseModel):
+    """
+    Archivo de Drive referenciado por los adjuntos de un MessageArchive
+
+    Al archivar, los Attachment se borran y sus IDs de Drive (también los de los
+    originales) quedan solo en el Parquet: esta tabla los mantiene consultables
+    para que la retención no borre de Drive un archivo que un archivo de la capa
+    fría todavía enlaza.
+    """
+    archive = models.ForeignKey(MessageArchive, on_delete=models.CASCADE, related_name='drive_files')
+    google_drive_id = models.CharField(max_length=255, db_index=True)
+
+    class Meta:
+        verbose_name = "Archivo de Drive Archivado"
+        verbose_name_plural = "Archivos de Drive Archivados"
+        constraints = [
+            models.UniqueConstraint(fields=['archive', 'google_drive_id'], name='archiveddrivefile_unique'),
+        ]
+
+    def __str__(self):
+        return self.google_drive_id
+
+
+class MediaHash(BaseModel):
+    """Índice de contenido de los archivos subidos a Google Drive (deduplicación por SHA-256)"""
+    sha256 = models.CharField(max_length=64, unique=True)  # Hash del contenido completo
+    prefix_sha256 = models.CharField(max_length=64)  # Hash del primer bloque (prefiltro)
+    size = models.BigIntegerField()  # Tamaño en bytes
+    mime_type = models.CharField(max_length=100, blank=True, null=True)
+    file_name = models.CharField(max_length=255, blank=True, null=True)  # Nombre del primer archivo subido
+    google_drive_id = models.CharField(max_length=255)  # ID en Google Drive
+    google_drive_link = models.URLField(blank=True, null=True)  # Link de Google Drive
+    original_google_drive_id = models.CharField(max_length=255, blank=True, null=True)  # Original sin procesar
+    hit_count = models.PositiveIntegerField(default=0)  # type: ignore  # Veces que se reutilizó
+
+    class Meta:
+        verbose_name = "Hash de Archivo"
+        verbose_name_plural = "Hashes de Archivos"
+        indexes = [
+            models.Index(fields=['size', 'prefix_sha256'], name='mediahash_size_prefix_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.sha256[:12]} - {self.file_name}"
+
+
+class DetachedDriveFile(BaseModel):
+    """
+    Archivo de Drive referenciado por los adjuntos de una partición separada
+
+    Al separar una partición vencida (ver MessagePartitionService) sus adjuntos
+    pasan a la tabla `<partición>_attachments`, junto a sus mensajes; esta tabla
+    mantiene consultables sus IDs de Drive para que la retención no los borre
+    mientras la partición separada exista.
+    """
+    partition = models.CharField(max_length=63, db_index=True)  # Nombre de la tabla separada
+    google_drive_id = models.CharField(max_length=255, db_index=True)
+
+    class Meta:
+        verbose_name = "Archivo de Drive de Partición Separada"
+        verbose_name_plural = "Archivos de Drive de Particiones Separadas"
+        constraints = [
+            models.UniqueConstraint(fields=['partition', 'google_drive_id'], name='detacheddrivefile_unique'),
+        ]
+
+    def __str__(self):
+        return self.google_drive_id
+
+
+class PendingDriveDeletion(BaseModel):
+    """
+    Archivo de Drive huérfano que la retención todavía no pudo eliminar
+
+    Su MediaHash y sus adjuntos ya no existen: esta fila es la única referencia al
+    archivo. Se borra cuando Drive confirma la eliminación; si falla, la próxima
+    ejecución de la retención lo vuelve a intentar.
+    """
+    google_drive_id = models.CharField(max_length=255, unique=True)
+    attempts = models.PositiveIntegerField(default=0)  # type: ignore  # Eliminaciones fallidas
+
+    class Meta:
+        verbose_name = "Eliminación de Drive Pendiente"
+        verbose_name_plural = "Eliminaciones de Drive Pendientes"
+
+    def __str__(self):
+        return self.google_drive_id
+
+
+class MediaTransfer(BaseModel):
+    """Outbox de transferencias de archivos pendientes hacia Google Drive"""
+    STATUS_PENDING = 'pending'
+    STATUS_PROCESSING = 'processing'
+    STATUS_DONE = 'done'
+    STATUS_DEAD = 'dead'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pendiente'),
+        (STATUS_PROCESSING, 'En proceso'),
+        (STATUS_DONE, 'Completada'),
+        (STATUS_DEAD, 'Fallida (dead-letter)'),
+    ]
+
+    # Sin restricción en la BD: la tabla de mensajes está particionada (ver Message)
+    message = models.ForeignKey(Message, on_delete=models.CASCADE, related_name='media_transfers',
+                                blank=True, null=True, db_constraint=False)
+    attachment = models.ForeignKey(Attachment, on_delete=models.CASCADE, related_name='media_transfers',
+                                   blank=True, null=True)
+    source = models.ForeignKey(Source, on_delete=models.CASCADE, related_name='media_transfers')
+    recipient = models.CharField(max_length=100)  # número/chat_id del usuario
+    file_url = models.URLField(max_length=1000)  # URL del archivo original
+    file_name = models.CharField(max_length=255)
+    file_type = models.CharField(max_length=50, blank=True, null=True)  # image, document, audio, etc.
+
+    # Estado de la transferencia
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)  # type: ignore
+    next_attempt_at = models.DateTimeField(default=timezone.now)  # Próximo intento (o fin del lease)
+    last_error = models.TextField(blank=True, null=True)
+    completed_at = models.DateTimeField(blank=True, null=True)
+
+    # Estado de la subida resumible a Google Drive
+    content_sha256 = models.CharField(max_length=64, blank=True, null=True)  # Contenido de la sesión
+    upload_session_uri = models.TextField(blank=True, null=True)
+    upload_offset = models.BigIntegerField(default=0)  # type: ignore  # Bytes confirmados por Drive
+    upload_total_bytes = models.BigIntegerField(blank=True, null=True)
+    bytes_saved = models.BigIntegerField(default=0)  # type: ignore  # Ahorro por recompresión
+
+    class Meta:
+        verbose_name = "Transferencia de Archivo"
+        verbose_name_plural = "Transferencias de Archivos"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='mediatransfer_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.file_name} - {self.status}"
+
+    @property
+    def upload_progress(self) -> Optional[float]:
+        """Porcentaje de la subida confirmado por Google Drive"""
+        if not self.upload_total_bytes:
+            return None
+        return round(100 * self.upload_offset / self.upload_total_bytes, 1)  # type: ignore
+
+    @property
+    def resume_state(self) -> Optional[dict]:
+        """Estado de la subida resumible en el formato de GoogleDriveService"""
+        if not self.upload_session_uri:
+            return None
+        return {
+            'sha256': self.content_sha256,
+            'session_uri': self.upload_session_uri,
+            'offset': self.upload_offset,
+            'total_bytes': self.upload_total_bytes,
+        }
+
+
+class DeadLetterMediaTransfer(MediaTransfer):
+    """Vista de transferencias que agotaron sus reintentos"""
+
+    class Meta:
+        proxy = True
+        verbose_name = "Transferencia Fallida"
+        verbose_name_plural = "Transferencias Fallidas (dead-letter)"
+
+
+class RequestProfile(BaseModel):
+    """Perfil por muestreo de una petición al webhook (stacks en formato folded)"""
+    TRIGGER_HEADER = 'header'
+    TRIGGER_SAMPLING = 'sampling'
+    TRIGGER_CHOICES = [
+        (TRIGGER_HEADER, 'Header de administrador'),
+        (TRIGGER_SAMPLING, 'Muestreo'),
+    ]
+
+    label = models.CharField(max_length=50, db_index=True)  # text, media, /resumen, etc.
+    source_name = models.CharField(max_length=100)
+    path = models.CharField(max_length=255)
+    status_code = models.PositiveSmallIntegerField()
+    trigger = models.CharField(max_length=20, choices=TRIGGER_CHOICES)
+    duration_ms = models.FloatField()
+    sample_count = models.PositiveIntegerField()
+    file_path = models.CharField(max_length=500)  # Archivo .folded en PROFILER_DIR
+
+    class Meta:
+        verbose_name = "Perfil de Petición"
+        verbose_name_plural = "Perfiles de Peticiones"
         ordering = ['-created_at']
 
     def __str__(self):
-        content_preview = str(self.content)[:50] if self.content else ""
-        return f"{self.source.name} - {content_preview}..."
\ No newline at end of file
+        return f"{self.label} - {self.duration_ms:.0f} ms"
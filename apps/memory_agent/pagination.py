@@ -0,0 +1,16 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class MessageCursorPagination(CursorPagination):
+    """
+    Paginación por keyset sobre created_at (índice recipient, created_at)
+
+    El cursor guarda la posición de la última idea de la página: cada página es
+    un rango del índice sin OFFSET, y cuesta lo mismo la primera que la de un
+    destinatario con millones de ideas.
+    """
+    ordering = '-created_at'
+    page_size = getattr(settings, 'MESSAGE_LIST_PAGE_SIZE', 50)
+    page_size_query_param = 'page_size'
+    max_page_size = getattr(settings, 'MESSAGE_LIST_MAX_PAGE_SIZE', 200)
@@ -0,0 +1,93 @@
+import os
+import sys
+import time
+import sysconfig
+import threading
+from collections import Counter
+from typing import Iterable, Optional
+
+
+class SamplingProfiler:
+    """
+    Profiler por muestreo de un solo hilo
+
+    Un hilo auxiliar lee el stack del hilo perfilado (sys._current_frames) cada
+    `interval` segundos y acumula los stacks en formato "folded" (una línea por
+    stack: `frame;frame;frame conteo`), compatible con flamegraph.pl y speedscope.
+    El hilo perfilado no se instrumenta, por lo que el costo no depende de la
+    cantidad de llamadas que haga la petición.
+    """
+
+    def __init__(self, thread_id: Optional[int] = None, interval: float = 0.005):
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> 'SamplingProfiler':
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='memory-agent-profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> 'SamplingProfiler':
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        if self.started_at is not None:
+            self.duration = time.perf_counter() - self.started_at
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            # Sin hilo, o el hilo ya está en stop(): no es parte de la petición
+            if frame is None or self._stop.is_set():
+                return
+            self.stacks[_fold(frame)] += 1
+            self.samples += 1
+
+    def folded(self) -> str:
+        """Stacks en formato folded, del más frecuente al menos frecuente"""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def _fold(frame) -> str:
+    """Convierte un frame en `raíz;...;hoja`"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+_STDLIB = sysconfig.get_paths()['stdlib'] + os.sep
+
+
+def _short_path(filename: str) -> str:
+    """Ruta corta: desde site-packages, la librería estándar o el directorio de trabajo"""
+    marker = 'site-packages' + os.sep
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    if filename.startswith(_STDLIB):
+        return filename[len(_STDLIB):]
+    try:
+        return os.path.relpath(filename)
+    except ValueError:
+        return filename
+
+
+def merge_folded(contents: Iterable[str]) -> str:
+    """Suma varios perfiles folded (por ejemplo, todas las peticiones de un mismo tipo)"""
+    totals: Counter = Counter()
+    for content in contents:
+        for line in content.splitlines():
+            stack, _, count = line.rpartition(' ')
+            if stack and count.isdigit():
+                totals[stack] += int(count)
+    return ''.join(f"{stack} {count}\n" for stack, count in totals.most_common())
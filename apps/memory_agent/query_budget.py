@@ -0,0 +1,136 @@
+import os
+import re
+import time
+import logging
+import traceback
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Cantidad de frames del proyecto que se guardan por consulta
+STACK_DEPTH = 8
+
+# Control de transacciones (BEGIN de SQLite, savepoints de atomic): no cuenta para el presupuesto
+TRANSACTION_CONTROL = re.compile(r'^\s*(BEGIN|COMMIT|ROLLBACK|SAVEPOINT|RELEASE)\b', re.IGNORECASE)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Se lanza cuando un webhook o comando supera su presupuesto de consultas SQL"""
+
+    def __init__(self, recorder: 'QueryRecorder', label: str, budget: int):
+        self.recorder = recorder
+        self.label = label
+        self.budget = budget
+        super().__init__(recorder.report(label, budget))
+
+
+class QueryRecorder:
+    """
+    Registra las consultas SQL ejecutadas en una conexión junto con su stack trace
+
+    Se instala con `connection.execute_wrapper`, por lo que funciona también con
+    DEBUG=False. Solo se guardan los frames del proyecto (sin Django ni librerías).
+    Las sentencias de control de transacciones no se registran: dependen del motor
+    y de si la petición ya corre dentro de una transacción, no del código.
+    """
+
+    def __init__(self):
+        self.queries: List[Dict[str, Any]] = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if TRANSACTION_CONTROL.match(sql):
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'sql': sql,
+                'duration': time.perf_counter() - started,
+                'stack': _project_stack(),
+            })
+
+    @property
+    def count(self) -> int:
+        return len(self.queries)
+
+    def report(self, label: str, budget: Optional[int] = None) -> str:
+        """Reporte legible con cada consulta y el código que la originó"""
+        header = f"'{label}' ejecutó {self.count} consultas SQL"
+        if budget is not None:
+            header += f" (presupuesto: {budget})"
+
+        lines = [header]
+        for index, query in enumerate(self.queries, start=1):
+            lines.append(f"  {index}. [{query['duration'] * 1000:.1f} ms] {query['sql']}")
+            for frame in query['stack']:
+                lines.append(f"       {frame}")
+        return '\n'.join(lines)
+
+
+def _project_stack() -> List[str]:
+    """Frames del código del proyecto que llevaron a la consulta (el más reciente al final)"""
+    base_dir = str(settings.BASE_DIR)
+    frames = []
+    for frame in traceback.extract_stack()[:-2]:
+        filename = frame.filename
+        if not filename.startswith(base_dir) or 'site-packages' in filename or filename == __file__:
+            continue
+        frames.append(f"{os.path.relpath(filename, base_dir)}:{frame.lineno} in {frame.name}")
+    return frames[-STACK_DEPTH:]
+
+
+def get_budget(label: str) -> Optional[int]:
+    """Presupuesto declarado en QUERY_BUDGETS para un tipo de webhook o comando"""
+    return getattr(settings, 'QUERY_BUDGETS', {}).get(label)
+
+
+def webhook_label(result: Optional[Dict[str, Any]]) -> Optional[str]:
+    """
+    Clave de QUERY_BUDGETS para el resultado de MessageService.process_message
+
+    Returns:
+        'text', 'media', el comando ('/resumen', '/hoy', ...) o None si no aplica
+    """
+    if not result:
+        return None
+
+    status = result.get('status')
+    if status == 'command_processed':
+        return result.get('command_type') or 'command'
+    elif status in ('file_queued', 'file_upload_error'):
+        return 'media'
+    elif status == 'message_stored':
+        return 'text'
+    return None
+
+
+@contextmanager
+def record_queries(using: str = 'default') -> Iterator[QueryRecorder]:
+    """Registra las consultas ejecutadas dentro del bloque"""
+    recorder = QueryRecorder()
+    with connections[using].execute_wrapper(recorder):
+        yield recorder
+
+
+@contextmanager
+def query_budget(label: str, budget: Optional[int] = None, using: str = 'default') -> Iterator[QueryRecorder]:
+    """
+    Falla si el bloque ejecuta más consultas que el presupuesto
+
+    Args:
+        label: Tipo de webhook o comando (clave de QUERY_BUDGETS)
+        budget: Presupuesto explícito; por defecto el de QUERY_BUDGETS
+
+    Raises:
+        QueryBudgetExceeded: Con el detalle de las consultas y sus stack traces
+    """
+    budget = budget if budget is not None else get_budget(label)
+    with record_queries(using) as recorder:
+        yield recorder
+
+    if budget is not None and recorder.count > budget:
+        raise QueryBudgetExceeded(recorder, label, budget)
@@ -0,0 +1,54 @@
+from typing import List, Optional
+from django.db.models import F
+
+from apps.memory_agent.models import MediaHash
+
+
+class MediaSelector:
+    """Selector para el índice de hashes de archivos subidos"""
+
+    @staticmethod
+    def get_by_digest(sha256: str) -> Optional[MediaHash]:
+        """Obtiene un archivo ya subido por su hash SHA-256"""
+        return MediaHash.objects.filter(sha256=sha256).first()  # type: ignore
+
+    @staticmethod
+    def lock_by_digest(sha256: str) -> Optional[MediaHash]:
+        """
+        Bloquea el hash de un archivo hasta el fin de la transacción en curso
+
+        Retorna None si la retención ya lo borró (ver RetentionService._delete_drive_files).
+        """
+        return MediaHash.objects.select_for_update().filter(sha256=sha256).first()  # type: ignore
+
+    @staticmethod
+    def find_by_prefix(size: int, prefix_sha256: str) -> List[MediaHash]:
+        """Obtiene candidatos con el mismo tamaño y el mismo hash del primer bloque"""
+        return list(MediaHash.objects.filter(  # type: ignore
+            size=size,
+            prefix_sha256=prefix_sha256
+        )[:2])
+
+    @staticmethod
+    def register(sha256: str, prefix_sha256: str, size: int, google_drive_id: str,
+                 google_drive_link: Optional[str] = None, mime_type: Optional[str] = None,
+                 file_name: Optional[str] = None, original_google_drive_id: Optional[str] = None) -> MediaHash:
+        """Registra un archivo subido; si otro worker ya lo registró, retorna el existente"""
+        media_hash, _ = MediaHash.objects.get_or_create(  # type: ignore
+            sha256=sha256,
+            defaults={
+                'prefix_sha256': prefix_sha256,
+                'size': size,
+                'google_drive_id': google_drive_id,
+                'google_drive_link': google_drive_link,
+                'mime_type': mime_type,
+                'file_name': file_name,
+                'original_google_drive_id': original_google_drive_id,
+            }
+        )
+        return media_hash
+
+    @staticmethod
+    def record_hit(media_hash: MediaHash) -> None:
+        """Incrementa el contador de reutilizaciones de un archivo"""
+        MediaHash.objects.filter(pk=media_hash.pk).update(hit_count=F('hit_count') + 1)  # type: ignore
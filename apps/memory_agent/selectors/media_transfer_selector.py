@@ -0,0 +1,165 @@
+from typing import Dict, List, Optional
+from datetime import datetime, timedelta
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from apps.memory_agent.models import Attachment, MediaTransfer, Message, Source
+
+
+class MediaTransferSelector:
+    """Selector para el outbox de transferencias de archivos"""
+
+    @staticmethod
+    def create_transfer(source: Source, recipient: str, file_url: str, file_name: str,
+                        file_type: Optional[str] = None, message: Optional[Message] = None,
+                        attachment: Optional[Attachment] = None) -> MediaTransfer:
+        """Registra una transferencia pendiente"""
+        return MediaTransfer.objects.create(  # type: ignore
+            source=source,
+            recipient=recipient,
+            file_url=file_url,
+            file_name=file_name,
+            file_type=file_type,
+            message=message,
+            attachment=attachment
+        )
+
+    @staticmethod
+    def create_message_transfers(source: Source, recipient: str, message: Message) -> List[MediaTransfer]:
+        """Registra una transferencia pendiente por adjunto del mensaje, en un solo INSERT"""
+        return MediaTransfer.objects.bulk_create([  # type: ignore
+            MediaTransfer(
+                source=source,
+                recipient=recipient,
+                file_url=attachment.file_url,
+                file_name=attachment.file_name,
+                file_type=attachment.file_type,
+                message=message,
+                attachment=attachment
+            )
+            for attachment in message.attachments.all()  # type: ignore
+        ])
+
+    @staticmethod
+    def claim_due(batch_size: int, lease_seconds: int) -> List[MediaTransfer]:
+        """
+        Reclama transferencias listas para procesar
+
+        Las transferencias 'processing' cuyo lease venció (worker caído) se vuelven
+        a reclamar. El lease se guarda en next_attempt_at.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            transfers = list(
+                MediaTransfer.objects.select_for_update(skip_locked=True, of=('self',))  # type: ignore
+                .select_related('source', 'source__media_profile')
+                .filter(
+                    Q(status=MediaTransfer.STATUS_PENDING) | Q(status=MediaTransfer.STATUS_PROCESSING),
+                    next_attempt_at__lte=now
+                )
+                .order_by('next_attempt_at')[:batch_size]
+            )
+            if transfers:
+                lease_until = now + timedelta(seconds=lease_seconds)
+                MediaTransfer.objects.filter(pk__in=[t.pk for t in transfers]).update(  # type: ignore
+                    status=MediaTransfer.STATUS_PROCESSING,
+                    attempts=F('attempts') + 1,
+                    next_attempt_at=lease_until
+                )
+                for transfer in transfers:
+                    transfer.status = MediaTransfer.STATUS_PROCESSING
+                    transfer.attempts += 1
+                    transfer.next_attempt_at = lease_until
+        return transfers
+
+    @staticmethod
+    def _leased(transfer: MediaTransfer):
+        """
+        La transferencia solo si sigue siendo el reclamo de este worker
+
+        Cada reclamo incrementa attempts y fija un lease nuevo en next_attempt_at:
+        si el lease venció y otro worker la reclamó, el filtro no encuentra la fila.
+        """
+        return MediaTransfer.objects.filter(  # type: ignore
+            pk=transfer.pk,
+            status=MediaTransfer.STATUS_PROCESSING,
+            attempts=transfer.attempts,
+            next_attempt_at=transfer.next_attempt_at
+        )
+
+    @staticmethod
+    def save_upload_progress(transfer: MediaTransfer, state: dict, lease_seconds: int) -> bool:
+        """
+        Guarda el estado de la subida resumible y extiende el lease de la transferencia
+
+        Returns:
+            bool: False si el worker ya no tiene el lease
+        """
+        lease_until = timezone.now() + timedelta(seconds=lease_seconds)
+        updated = MediaTransferSelector._leased(transfer).update(
+            content_sha256=state.get('sha256'),
+            upload_session_uri=state.get('session_uri'),
+            upload_offset=state.get('offset') or 0,
+            upload_total_bytes=state.get('total_bytes'),
+            next_attempt_at=lease_until
+        )
+        if updated:
+            transfer.next_attempt_at = lease_until
+        return bool(updated)
+
+    @staticmethod
+    def mark_done(transfer: MediaTransfer, bytes_saved: int = 0) -> bool:
+        """
+        Marca una transferencia como completada y descarta la sesión de subida
+
+        Returns:
+            bool: False si el worker ya no tiene el lease (no se modifica nada)
+        """
+        return bool(MediaTransferSelector._leased(transfer).update(
+            status=MediaTransfer.STATUS_DONE,
+            completed_at=timezone.now(),
+            last_error=None,
+            upload_session_uri=None,
+            bytes_saved=bytes_saved
+        ))
+
+    @staticmethod
+    def mark_failed(transfer: MediaTransfer, error: str, retry_at: Optional[datetime] = None) -> bool:
+        """
+        Programa un reintento o, sin retry_at, envía la transferencia al dead-letter
+
+        Returns:
+            bool: False si el worker ya no tiene el lease (no se modifica nada)
+        """
+        return bool(MediaTransferSelector._leased(transfer).update(
+            status=MediaTransfer.STATUS_PENDING if retry_at else MediaTransfer.STATUS_DEAD,
+            next_attempt_at=retry_at or timezone.now(),
+            last_error=error
+        ))
+
+    @staticmethod
+    def requeue(transfer_ids: List) -> int:
+        """Vuelve a encolar transferencias fallidas reiniciando sus intentos"""
+        return MediaTransfer.objects.filter(  # type: ignore
+            pk__in=transfer_ids,
+            status=MediaTransfer.STATUS_DEAD
+        ).update(
+            status=MediaTransfer.STATUS_PENDING,
+            attempts=0,
+            next_attempt_at=timezone.now(),
+            last_error=None
+        )
+
+    @staticmethod
+    def pending_count() -> int:
+        """Cantidad de transferencias pendientes o en proceso"""
+        return MediaTransfer.objects.filter(  # type: ignore
+            status__in=[MediaTransfer.STATUS_PENDING, MediaTransfer.STATUS_PROCESSING]
+        ).count()
+
+    @staticmethod
+    def count_by_status() -> Dict[str, int]:
+        """Cantidad de transferencias por estado"""
+        rows = MediaTransfer.objects.order_by().values('status').annotate(total=Count('id'))  # type: ignore
+        return {row['status']: row['total'] for row in rows}
@@ -1,9 +1,43 @@
-from typing import List, Optional
-from django.db.models import Q
+import io
+import re
+import time
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Prefetch, Q, QuerySet
 from django.utils import timezone
-from datetime import timedelta
+from datetime import datetime, timedelta
 
-from apps.memory_agent.models import Message, Source
+from apps.memory_agent.classifiers import get_theme_classifier
+from apps.memory_agent.compression import load_content, stored_content
+from apps.memory_agent.db.routers import read_database
+from apps.memory_agent.models import Attachment, MediaTransfer, Message, Source
+from apps.memory_agent.selectors.recipient_selector import RecipientSelector
+
+ATTACHMENT_FIELDS = ['file_type', 'file_name', 'file_url', 'google_drive_id', 'google_drive_link',
+                     'original_google_drive_id']
+
+# Caché de fuentes activas por proceso: {nombre: (expira_en, fuente)}
+_source_cache: Dict[str, Tuple[float, Source]] = {}
+
+
+# Caracteres con escape en el formato de texto de COPY (translate solo si aparecen)
+_COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+_COPY_SPECIAL = re.compile(r'[\\\t\n\r]')
+
+
+def _copy_value(value: Any) -> str:
+    """Valor de una columna en el formato de texto de COPY (\\N es NULL)"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (bytes, memoryview)):
+        # bytea en formato hex; la barra va escapada como cualquier otra
+        return '\\\\x' + bytes(value).hex()
+    value = str(value)
+    return value.translate(_COPY_ESCAPES) if _COPY_SPECIAL.search(value) else value
 
 
 class MessageSelector:
@@ -14,62 +48,288 @@ class MessageSelector:
                       is_command: bool = False, command_type: Optional[str] = None,
                       is_file: bool = False, file_type: Optional[str] = None,
                       file_name: Optional[str] = None, file_url: Optional[str] = None,
-                      google_drive_id: Optional[str] = None, google_drive_link: Optional[str] = None) -> Message:
-        """Crea un nuevo mensaje en la base de datos"""
-        return Message.objects.create(  # type: ignore
-            content=content,
-            source=source,
-            recipient=recipient,
-            is_command=is_command,
-            command_type=command_type,
-            is_file=is_file,
-            file_type=file_type,
-            file_name=file_name,
-            file_url=file_url,
+                      google_drive_id: Optional[str] = None, google_drive_link: Optional[str] = None,
+                      attachments: Optional[List[Dict[str, Any]]] = None) -> Message:
+        """
+        Crea un nuevo mensaje en la base de datos
+
+        `recipient` es el identificador de la fuente (número, chat_id); su clave
+        entera se resuelve con la caché de RecipientSelector y sus contadores se
+        actualizan en la misma transacción que el mensaje.
+
+        Los archivos se guardan en Attachment: `attachments` recibe uno o varios
+        (file_type, file_name, file_url...). Los parámetros file_* se mantienen por
+        compatibilidad y crean un único adjunto.
+        """
+        if attachments is None and (is_file or file_url):
+            attachments = [{
+                'file_type': file_type,
+                'file_name': file_name,
+                'file_url': file_url,
+                'google_drive_id': google_drive_id,
+                'google_drive_link': google_drive_link,
+            }]
+
+        recipient_id = RecipientSelector.get_recipient_id(source, recipient)
+
+        # Sin savepoint: si se llama dentro de otra transacción (enqueue) no agrega consultas
+        with transaction.atomic(savepoint=False):
+            RecipientSelector.record_message(recipient_id, is_command=is_command)
+            message = Message.objects.create(  # type: ignore
+                content=content,
+                source=source,
+                recipient_id=recipient_id,
+                is_command=is_command,
+                command_type=command_type,
+                theme=None if is_command else get_theme_classifier().classify(content)
+            )
+            if attachments:
+                # El mensaje queda con sus adjuntos en caché (como con prefetch_related)
+                message._prefetched_objects_cache = {'attachments': Attachment.objects.bulk_create([  # type: ignore
+                    Attachment(message=message, position=position, **{
+                        field: attachment.get(field) for field in ATTACHMENT_FIELDS
+                    })
+                    for position, attachment in enumerate(attachments)
+                ])}
+        return message
+    
+    @staticmethod
+    def copy_messages(messages: List[Dict[str, Any]], attachments: Optional[List[Dict[str, Any]]] = None) -> None:
+        """
+        Inserta mensajes y adjuntos en bloque con COPY (importación de historial)
+
+        Cada diccionario trae los campos del modelo por attname (source_id,
+        recipient_id...) incluidos id, created_at y updated_at. No pasa por
+        save() ni por las señales: los contadores del destinatario se recalculan
+        aparte. En otras bases de datos se usa bulk_create. Los contenidos
+        largos se comprimen como al guardar (ver stored_content).
+        """
+        for model, rows in ((Message, messages), (Attachment, attachments or [])):
+            if not rows:
+                continue
+            if model is Message:
+                rows = [{**row, **stored_content(row['content'])} for row in rows]
+            if connection.vendor != 'postgresql':
+                model.objects.bulk_create([model(**row) for row in rows], batch_size=1000)  # type: ignore
+                continue
+
+            fields = model._meta.concrete_fields
+            buffer = io.StringIO()
+            for row in rows:
+                buffer.write('\t'.join(_copy_value(row.get(field.attname)) for field in fields))
+                buffer.write('\n')
+            buffer.seek(0)
+
+            columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+            with connection.cursor() as cursor:
+                cursor.copy_expert(f'COPY {connection.ops.quote_name(model._meta.db_table)} ({columns}) FROM STDIN', buffer)
+
+    @staticmethod
+    def attach_drive_file(message_id, google_drive_id: str, google_drive_link: Optional[str] = None,
+                          attachment_id=None, original_google_drive_id: Optional[str] = None) -> None:
+        """
+        Asocia el archivo subido a Google Drive con su adjunto
+
+        Sin attachment_id se usa el primer adjunto del mensaje (compatibilidad).
+        original_google_drive_id es el original sin procesar, si el perfil lo conserva.
+        """
+        attachments = Attachment.objects.filter(message_id=message_id)  # type: ignore
+        attachments = attachments.filter(pk=attachment_id) if attachment_id else attachments.filter(position=0)
+        attachments.update(
             google_drive_id=google_drive_id,
-            google_drive_link=google_drive_link
+            google_drive_link=google_drive_link,
+            original_google_drive_id=original_google_drive_id
         )
     
     @staticmethod
-    def get_messages_by_recipient(recipient: str, period: str = 'all') -> List[Message]:
-        """Obtiene mensajes de un destinatario por período"""
+    def get_messages_by_recipient(recipient_id: int, period: str = 'all',
+                                  limit: Optional[int] = None) -> List[Message]:
+        """
+        Obtiene mensajes de un destinatario por período (desde la réplica si la hay)
+
+        Con `limit` solo se leen los más recientes. No se lee content_zstd: los
+        resúmenes usan content_preview y no descomprimen los contenidos largos.
+        """
         now = timezone.now()
+        messages = Message.objects.using(read_database(str(recipient_id))).filter(  # type: ignore
+            recipient_id=recipient_id,
+            is_command=False
+        )
+        # Cota superior para que PostgreSQL descarte también las particiones de
+        # meses futuros (el margen cubre diferencias de reloj entre servidores)
+        upper_bound = now + timedelta(days=1)
         
         if period == 'today':
             start_date = now.replace(hour=0, minute=0, second=0, microsecond=0)
-            return Message.objects.filter(  # type: ignore
-                recipient=recipient,
-                created_at__gte=start_date,
-                is_command=False
-            ).order_by('-created_at')
+            messages = messages.filter(created_at__gte=start_date, created_at__lt=upper_bound)
         
         elif period == 'week':
             start_date = now - timedelta(days=7)
-            return Message.objects.filter(  # type: ignore
-                recipient=recipient,
-                created_at__gte=start_date,
-                is_command=False
-            ).order_by('-created_at')
+            messages = messages.filter(created_at__gte=start_date, created_at__lt=upper_bound)
         
-        else:  # all
-            return Message.objects.filter(  # type: ignore
-                recipient=recipient,
-                is_command=False
-            ).order_by('-created_at')
+        messages = messages.defer('content_zstd').order_by('-created_at')
+        return messages[:limit] if limit is not None else messages
     
     @staticmethod
-    def search_messages(recipient: str, search_term: str) -> List[Message]:
-        """Busca mensajes que contengan el término de búsqueda"""
-        return Message.objects.filter(  # type: ignore
-            recipient=recipient,
-            content__icontains=search_term,
+    def list_messages(recipient_id: int, since: Optional[datetime] = None, until: Optional[datetime] = None,
+                      theme: Optional[str] = None) -> QuerySet:
+        """
+        Ideas de un destinatario para el listado de la API (desde la réplica si la hay)
+
+        Solo carga las columnas que se devuelven; el orden y el corte de la página
+        los aplica la paginación por cursor sobre created_at.
+        """
+        messages = Message.objects.using(read_database(str(recipient_id))).filter(  # type: ignore
+            recipient_id=recipient_id,
             is_command=False
-        ).order_by('-created_at')[:10]
+        )
+        if since is not None:
+            messages = messages.filter(created_at__gte=since)
+        # Sin `until` se acota igual para que PostgreSQL descarte las particiones futuras
+        messages = messages.filter(created_at__lt=until or timezone.now() + timedelta(days=1))
+        if theme is not None:
+            messages = messages.filter(theme=theme)
+        return messages.select_related('source').only(
+            'id', 'content', 'content_zstd', 'theme', 'created_at', 'source__name'
+        ).prefetch_related(Prefetch(
+            'attachments',
+            queryset=Attachment.objects.only(  # type: ignore
+                'id', 'message_id', 'position', 'file_type', 'file_name', 'google_drive_link'
+            )
+        ))
+
+    @staticmethod
+    def iter_messages(recipient_id: int, since: Optional[datetime] = None, until: Optional[datetime] = None,
+                      chunk_size: int = 2000) -> Iterator[Dict[str, Any]]:
+        """
+        Todas las ideas de un destinatario como diccionarios, de la más antigua a la más reciente
+
+        En PostgreSQL se leen con un cursor del servidor de `chunk_size` filas y los
+        adjuntos de cada bloque con una consulta: la memoria no depende del total de
+        ideas. Se leen tuplas en lugar de modelos (la exportación de 1M de ideas
+        pasa la mayor parte del tiempo armando filas).
+
+        La lectura corre en una transacción: fuera de ella Django declara el cursor
+        WITH HOLD y PostgreSQL calcula el resultado completo antes de la primera fila.
+        """
+        database = read_database(str(recipient_id))
+        messages = Message.objects.using(database).filter(  # type: ignore
+            recipient_id=recipient_id,
+            is_command=False
+        )
+        if since is not None:
+            messages = messages.filter(created_at__gte=since)
+        messages = messages.filter(created_at__lt=until or timezone.now() + timedelta(days=1))
+        rows = messages.order_by('created_at', 'id').values_list(
+            'id', 'created_at', 'theme', 'content', 'content_zstd'
+        ).iterator(chunk_size=chunk_size)
+
+        with transaction.atomic(using=database):
+            try:
+                while True:
+                    chunk = list(islice(rows, chunk_size))
+                    if not chunk:
+                        break
+                    attachments = MessageSelector._attachments_by_message(database, [row[0] for row in chunk])
+                    for message_id, created_at, theme, content, content_zstd in chunk:
+                        yield {
+                            'id': message_id,
+                            'created_at': created_at,
+                            'theme': theme,
+                            'content': load_content(content, content_zstd),
+                            'attachments': attachments.get(message_id, []),
+                        }
+            finally:
+                # Cierra el cursor dentro de la transacción (también si se corta la descarga)
+                rows.close()
+
+    @staticmethod
+    def _attachments_by_message(database: str, message_ids: List[Any],
+                                fields: Tuple[str, ...] = ('file_type', 'file_name', 'google_drive_link')
+                                ) -> Dict[Any, List[Dict[str, Any]]]:
+        """Adjuntos de un bloque de mensajes: {id del mensaje: [adjuntos en orden]}"""
+        attachments: Dict[Any, List[Dict[str, Any]]] = {}
+        for attachment in Attachment.objects.using(database).filter(  # type: ignore
+            message_id__in=message_ids
+        ).order_by('message_id', 'position').values('message_id', *fields):
+            attachments.setdefault(attachment.pop('message_id'), []).append(attachment)
+        return attachments
+
+    @staticmethod
+    def delete_messages(recipient_id: int, keys: List[Tuple[datetime, Any]]) -> int:
+        """
+        Borra un bloque de mensajes de un destinatario con sus adjuntos y transferencias
+
+        `keys` son pares (created_at, id) ordenados por created_at. Llamar dentro de
+        una transacción; los contadores del destinatario se recalculan aparte.
+
+        Returns:
+            int: Adjuntos borrados
+        """
+        ids = [message_id for _, message_id in keys]
+        # Sin clave foránea a la tabla particionada: se borran a mano
+        MediaTransfer.objects.filter(message_id__in=ids).delete()  # type: ignore
+        attachments = Attachment.objects.filter(message_id__in=ids).delete()[1]  # type: ignore
+        # DELETE directo: Message.delete() del ORM consultaría cada relación por
+        # mensaje; el rango de created_at limita el borrado a las particiones del bloque
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {connection.ops.quote_name(Message._meta.db_table)} '
+                f'WHERE recipient_id = %s AND created_at >= %s AND created_at <= %s AND id = ANY(%s)',
+                [recipient_id, keys[0][0], keys[-1][0], ids]
+            )
+        return attachments.get(Attachment._meta.label, 0)
+
+    @staticmethod
+    def search_messages(recipient_id: int, search_term: str, limit: int = 10) -> List[Message]:
+        """
+        Busca mensajes que contengan el término de búsqueda (desde la réplica si la hay)
+
+        Los contenidos comprimidos se buscan en su content_preview (sin descomprimir)
+        y el resultado no trae content_zstd: se muestra la vista previa.
+        """
+        return Message.objects.using(read_database(str(recipient_id))).filter(  # type: ignore
+            Q(content__icontains=search_term) | Q(content_preview__icontains=search_term),
+            recipient_id=recipient_id,
+            is_command=False
+        ).defer('content_zstd').order_by('-created_at')[:limit]
     
     @staticmethod
-    def get_source_by_name(name: str) -> Optional[Source]:
-        """Obtiene una fuente por nombre"""
+    def get_source_by_name(name: str, use_cache: bool = True) -> Optional[Source]:
+        """
+        Obtiene una fuente activa por nombre
+
+        Las fuentes encontradas se guardan en una caché del proceso durante
+        SOURCE_CACHE_TTL segundos (0 la desactiva). Guardar o borrar una fuente
+        limpia la caché del proceso que la modifica; en los demás workers el
+        cambio se ve al expirar el TTL. Los nombres inexistentes no se guardan.
+        """
+        ttl = getattr(settings, 'SOURCE_CACHE_TTL', 60)
+        if use_cache and ttl > 0:
+            cached = _source_cache.get(name)
+            if cached is not None and cached[0] > time.monotonic():
+                return cached[1]
+
         try:
-            return Source.objects.get(name=name, is_active=True)  # type: ignore
+            source = Source.objects.get(name=name, is_active=True)  # type: ignore
         except Source.DoesNotExist:  # type: ignore
             return None
+
+        if ttl > 0:
+            _source_cache[name] = (time.monotonic() + ttl, source)
+        return source
+
+    @staticmethod
+    def prefetch_active_sources() -> List[Source]:
+        """Carga todas las fuentes activas en la caché con una sola consulta"""
+        ttl = getattr(settings, 'SOURCE_CACHE_TTL', 60)
+        sources = list(Source.objects.filter(is_active=True))  # type: ignore
+        if ttl > 0:
+            expires_at = time.monotonic() + ttl
+            for source in sources:
+                _source_cache[source.name] = (expires_at, source)
+        return sources
+
+    @staticmethod
+    def clear_source_cache() -> None:
+        _source_cache.clear()
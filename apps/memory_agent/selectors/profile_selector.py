@@ -0,0 +1,50 @@
+import os
+import logging
+from typing import Iterable
+
+from apps.memory_agent.models import RequestProfile
+
+logger = logging.getLogger(__name__)
+
+
+class ProfileSelector:
+    """Selector para los perfiles de peticiones"""
+
+    @staticmethod
+    def create_profile(label: str, source_name: str, path: str, status_code: int, trigger: str,
+                       duration_ms: float, sample_count: int, file_path: str) -> RequestProfile:
+        """Registra un perfil guardado en disco"""
+        return RequestProfile.objects.create(  # type: ignore
+            label=label,
+            source_name=source_name,
+            path=path,
+            status_code=status_code,
+            trigger=trigger,
+            duration_ms=duration_ms,
+            sample_count=sample_count,
+            file_path=file_path
+        )
+
+    @staticmethod
+    def read_folded(profile: RequestProfile) -> str:
+        """Contenido folded del perfil ('' si el archivo ya no existe)"""
+        try:
+            with open(profile.file_path) as profile_file:
+                return profile_file.read()
+        except FileNotFoundError:
+            return ''
+
+    @staticmethod
+    def delete_profiles(profiles: Iterable[RequestProfile]) -> int:
+        """Elimina los perfiles y sus archivos"""
+        count = 0
+        for profile in profiles:
+            try:
+                os.remove(profile.file_path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"No se pudo eliminar el perfil {profile.file_path}: {str(e)}")
+            profile.delete()
+            count += 1
+        return count
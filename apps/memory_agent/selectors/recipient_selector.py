@@ -0,0 +1,106 @@
+from typing import Dict, Iterable, Optional, Tuple
+from django.conf import settings
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.memory_agent.db.routers import read_database
+from apps.memory_agent.models import Message, MessageArchive, Recipient, Source
+
+# Caché de claves por proceso: {(id de la fuente, identificador): id del destinatario}
+# La identidad de un destinatario no cambia, así que no expira; solo se limita el tamaño
+_recipient_cache: Dict[Tuple[str, str], int] = {}
+
+
+class RecipientSelector:
+    """Selector para los destinatarios (usuarios de cada fuente) y sus contadores"""
+
+    @staticmethod
+    def get_recipient_id(source: Source, identifier: str, create: bool = True) -> Optional[int]:
+        """
+        Clave entera del destinatario de una fuente
+
+        Se busca primero en la caché del proceso (RECIPIENT_CACHE_SIZE entradas; al
+        llenarse se descartan las más antiguas). Con create=False no se crea el
+        destinatario y los identificadores desconocidos retornan None.
+        """
+        key = (str(source.pk), identifier)
+        recipient_id = _recipient_cache.get(key)
+        if recipient_id is not None:
+            return recipient_id
+
+        if create:
+            recipient, _ = Recipient.objects.get_or_create(source=source, identifier=identifier)  # type: ignore
+            recipient_id = recipient.pk
+        else:
+            recipient_id = Recipient.objects.filter(  # type: ignore
+                source=source, identifier=identifier
+            ).values_list('pk', flat=True).first()
+            if recipient_id is None:
+                return None
+
+        max_size = getattr(settings, 'RECIPIENT_CACHE_SIZE', 10000)
+        if max_size > 0:
+            while len(_recipient_cache) >= max_size:
+                _recipient_cache.pop(next(iter(_recipient_cache)), None)
+            _recipient_cache[key] = recipient_id
+        return recipient_id
+
+    @staticmethod
+    def get_recipient(recipient_id: int) -> Optional[Recipient]:
+        """Destinatario con sus contadores (desde la réplica si la hay)"""
+        return Recipient.objects.using(read_database(str(recipient_id))).filter(pk=recipient_id).first()  # type: ignore
+
+    @staticmethod
+    def record_message(recipient_id: int, is_command: bool = False) -> None:
+        """Suma el mensaje a los contadores del destinatario (un UPDATE, sin leer la fila)"""
+        now = timezone.now()
+        updates = {'last_message_at': now, 'updated_at': now}
+        if not is_command:
+            updates['message_count'] = F('message_count') + 1
+        Recipient.objects.filter(pk=recipient_id).update(**updates)  # type: ignore
+
+    @staticmethod
+    def touch(recipient_id: int) -> None:
+        """
+        Marca el destinatario como modificado sin cambiar sus contadores
+
+        updated_at es la versión de sus mensajes (ETag del listado de la API): se
+        actualiza al cambiar un mensaje existente, por ejemplo al subir un archivo.
+        """
+        Recipient.objects.filter(pk=recipient_id).update(updated_at=timezone.now())  # type: ignore
+
+    @staticmethod
+    def refresh_counters(recipient_ids: Optional[Iterable[int]] = None) -> int:
+        """
+        Recalcula los contadores a partir de los mensajes
+
+        Necesario después de borrar mensajes en bloque (particiones vencidas,
+        retención, archivo), que no pasan por record_message. Las ideas archivadas
+        se suman desde las estadísticas de MessageArchive sin leer los archivos.
+
+        Returns:
+            int: Destinatarios actualizados
+        """
+        messages = Message.objects.filter(recipient=OuterRef('pk')).order_by().values('recipient')  # type: ignore
+        archives = MessageArchive.objects.filter(  # type: ignore
+            recipient=OuterRef('pk')
+        ).order_by().values('recipient')
+        recipients = Recipient.objects.all()  # type: ignore
+        if recipient_ids is not None:
+            recipients = recipients.filter(pk__in=list(recipient_ids))
+        return recipients.update(
+            message_count=Coalesce(
+                Subquery(messages.annotate(total=Count('pk', filter=Q(is_command=False))).values('total')),
+                0
+            ) + Coalesce(Subquery(archives.annotate(total=Sum('message_count')).values('total')), 0),
+            last_message_at=Coalesce(
+                Subquery(messages.annotate(last=Max('created_at')).values('last')),
+                Subquery(archives.annotate(last=Max('last_message_at')).values('last'))
+            ),
+            updated_at=timezone.now()
+        )
+
+    @staticmethod
+    def clear_recipient_cache() -> None:
+        _recipient_cache.clear()
@@ -1,5 +1,9 @@
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from django.conf import settings
 from rest_framework import serializers
-from apps.memory_agent.models import Source, Message
+from apps.memory_agent.classifiers import DEFAULT_THEME, THEME_KEYWORDS
+from apps.memory_agent.models import Attachment, Source, Message
+from apps.memory_agent.services.export_service import EXPORT_FORMATS
 
 
 class SourceSerializer(serializers.ModelSerializer):
@@ -18,6 +22,7 @@ class SourceSerializer(serializers.ModelSerializer):
 class MessageSerializer(serializers.ModelSerializer):
     """Serializer para el modelo Message"""
     source_name = serializers.CharField(source='source.name', read_only=True)
+    recipient = serializers.CharField(source='recipient.identifier', read_only=True)
     
     class Meta:
         model = Message
@@ -28,6 +33,80 @@ class MessageSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
+class AttachmentSerializer(serializers.ModelSerializer):
+    """Serializer para los adjuntos de un mensaje"""
+    
+    class Meta:
+        model = Attachment
+        fields = ['position', 'file_type', 'file_name', 'google_drive_link']
+
+
+class MessageListSerializer(serializers.ModelSerializer):
+    """Serializer del listado de ideas de la API (solo las columnas que carga list_messages)"""
+    source_name = serializers.CharField(source='source.name', read_only=True)
+    attachments = AttachmentSerializer(many=True, read_only=True)
+    
+    class Meta:
+        model = Message
+        fields = ['id', 'content', 'theme', 'source_name', 'created_at', 'attachments']
+
+
+class MessageListQuerySerializer(serializers.Serializer):
+    """Parámetros del listado de ideas (query string)"""
+    source = serializers.CharField(max_length=100)
+    recipient = serializers.CharField(max_length=100)
+    since = serializers.DateTimeField(required=False)
+    until = serializers.DateTimeField(required=False)
+    theme = serializers.ChoiceField(
+        choices=[theme for theme, _ in THEME_KEYWORDS] + [DEFAULT_THEME],
+        required=False
+    )
+    
+    def validate(self, attrs):
+        if attrs.get('since') and attrs.get('until') and attrs['since'] >= attrs['until']:
+            raise serializers.ValidationError("'since' debe ser anterior a 'until'")
+        return attrs
+
+
+class MessageExportQuerySerializer(serializers.Serializer):
+    """Parámetros de la exportación de ideas (query string)"""
+    source = serializers.CharField(max_length=100)
+    recipient = serializers.CharField(max_length=100)
+    since = serializers.DateTimeField(required=False)
+    until = serializers.DateTimeField(required=False)
+    # `format` lo reserva DRF para elegir el renderer
+    export_format = serializers.ChoiceField(choices=list(EXPORT_FORMATS), default='ndjson')
+    gzip = serializers.BooleanField(default=False)
+    
+    def validate(self, attrs):
+        if attrs.get('since') and attrs.get('until') and attrs['since'] >= attrs['until']:
+            raise serializers.ValidationError("'since' debe ser anterior a 'until'")
+        return attrs
+
+
+class ChatImportSerializer(serializers.Serializer):
+    """Archivo de "Exportar chat" de WhatsApp (.txt o .zip) y destinatario de las ideas (multipart)"""
+    file = serializers.FileField()
+    source = serializers.CharField(max_length=100)
+    recipient = serializers.CharField(max_length=100)
+    sender = serializers.CharField(max_length=100, required=False)
+    dayfirst = serializers.BooleanField(required=False, allow_null=True, default=None)
+    timezone = serializers.CharField(max_length=64, required=False)
+    
+    def validate_file(self, value):
+        max_mb = getattr(settings, 'CHAT_IMPORT_MAX_UPLOAD_MB', 100)
+        if value.size > max_mb * 1024 * 1024:
+            raise serializers.ValidationError(f"El archivo supera {max_mb} MB")
+        return value
+    
+    def validate_timezone(self, value):
+        try:
+            ZoneInfo(value)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise serializers.ValidationError(f"Zona horaria desconocida: {value}")
+        return value
+
+
 class MessageCreateSerializer(serializers.ModelSerializer):
     """Serializer para crear mensajes desde webhooks"""
     
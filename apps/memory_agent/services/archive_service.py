@@ -0,0 +1,338 @@
+import logging
+import tempfile
+import time
+from collections import Counter
+from datetime import date, datetime, timezone as dt_timezone
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import storages
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from apps.memory_agent.classifiers import get_theme_classifier
+from apps.memory_agent.compression import load_content
+from apps.memory_agent.models import ArchivedDriveFile, Message, MessageArchive
+from apps.memory_agent.selectors.message_selector import ATTACHMENT_FIELDS, MessageSelector
+from apps.memory_agent.selectors.recipient_selector import RecipientSelector
+from apps.memory_agent.services.partition_service import add_months, month_bound, month_start
+from utils.uuid7 import uuid7
+
+logger = logging.getLogger(__name__)
+
+# Columnas de la tabla de mensajes que se guardan en cada archivo (más los adjuntos)
+MESSAGE_COLUMNS = ['id', 'created_at', 'updated_at', 'source_id', 'is_command', 'command_type', 'theme', 'content']
+
+# Filas leídas por bloque del cursor del servidor (cada bloque es un row group del Parquet)
+CHUNK_SIZE = 10000
+
+
+def _schema():
+    import pyarrow as pa
+
+    text = pa.string()
+    return pa.schema([
+        ('id', text),
+        ('created_at', pa.timestamp('us', tz='UTC')),
+        ('updated_at', pa.timestamp('us', tz='UTC')),
+        ('source_id', text),
+        ('is_command', pa.bool_()),
+        ('command_type', text),
+        ('theme', text),
+        ('content', text),
+        ('attachments', pa.list_(pa.struct([('position', pa.int16())] + [(field, text) for field in ATTACHMENT_FIELDS]))),
+    ])
+
+
+class MessageArchiveService:
+    """
+    Capa fría de los mensajes: archivos Parquet (zstd) por destinatario y mes
+
+    Los mensajes de meses anteriores a los últimos MESSAGE_ARCHIVE_AFTER_MONTHS se
+    escriben en el storage 'message_archive' (disco local o S3) y se borran de la
+    tabla en la misma transacción, así que la tabla caliente no crece con la
+    historia. El total de ideas y los temas de cada archivo quedan en
+    MessageArchive: /resumen usa esas estadísticas sin leer los archivos y
+    /buscar lee los más recientes solo cuando las ideas de la tabla no alcanzan.
+
+    pyarrow se importa al usarlo: no pesa en el arranque de los workers.
+    """
+
+    def __init__(self):
+        self.selector = MessageSelector()
+        self.recipient_selector = RecipientSelector()
+
+    @property
+    def storage(self):
+        return storages['message_archive']
+
+    def pending(self, after_months: Optional[int] = None, recipient_ids: Optional[Iterable[int]] = None,
+                now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """
+        Meses por archivar de cada destinatario
+
+        Returns:
+            Lista de dicts con recipient_id, month (date) y rows
+        """
+        if after_months is None:
+            after_months = getattr(settings, 'MESSAGE_ARCHIVE_AFTER_MONTHS', 0)
+        if not after_months:
+            return []
+        cutoff = add_months(month_start(now or timezone.now()), -after_months)
+        messages = Message.objects.filter(created_at__lt=month_bound(cutoff))  # type: ignore
+        if recipient_ids is not None:
+            messages = messages.filter(recipient_id__in=list(recipient_ids))
+        groups = messages.annotate(
+            month=TruncMonth('created_at', tzinfo=dt_timezone.utc)
+        ).values('recipient_id', 'month').annotate(rows=Count('id')).order_by('recipient_id', 'month')
+        return [
+            {'recipient_id': group['recipient_id'], 'month': month_start(group['month']), 'rows': group['rows']}
+            for group in groups
+        ]
+
+    def archive(self, after_months: Optional[int] = None, recipient_ids: Optional[Iterable[int]] = None,
+                dry_run: bool = False, now: Optional[datetime] = None,
+                progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Archiva los meses vencidos
+
+        Cada archivo (hasta MESSAGE_ARCHIVE_FILE_ROWS mensajes) se escribe y sus
+        mensajes se borran en una transacción: si algo falla el mes queda en la
+        tabla y la ejecución siguiente lo vuelve a intentar.
+
+        Returns:
+            Dict con months, files, messages, bytes, seconds y rate (mensajes por segundo)
+        """
+        groups = self.pending(after_months, recipient_ids, now)
+        stats: Dict[str, Any] = {'months': len(groups), 'files': 0, 'messages': 0, 'bytes': 0,
+                                 'seconds': 0.0, 'rate': 0.0}
+        if dry_run:
+            stats['messages'] = sum(group['rows'] for group in groups)
+            return stats
+
+        started = time.perf_counter()
+        max_rows = getattr(settings, 'MESSAGE_ARCHIVE_FILE_ROWS', 200000)
+        archived_recipients = set()
+        for group in groups:
+            while True:
+                archive = self._archive_file(group['recipient_id'], group['month'], max_rows)
+                if archive is None:
+                    break
+                archived_recipients.add(group['recipient_id'])
+                stats['files'] += 1
+                stats['messages'] += archive.row_count
+                stats['bytes'] += archive.size_bytes
+                stats['seconds'] = time.perf_counter() - started
+                stats['rate'] = stats['messages'] / stats['seconds']
+                if progress is not None:
+                    progress(stats)
+                if archive.row_count < max_rows:
+                    break
+
+        if archived_recipients:
+            self.recipient_selector.refresh_counters(archived_recipients)
+        stats['seconds'] = time.perf_counter() - started
+        return stats
+
+    def _archive_file(self, recipient_id: int, month: date, max_rows: int) -> Optional[MessageArchive]:
+        """Escribe un archivo con los mensajes más antiguos del mes y los borra de la tabla"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = _schema()
+        classifier = get_theme_classifier()
+        rows = Message.objects.filter(  # type: ignore
+            recipient_id=recipient_id,
+            created_at__gte=month_bound(month),
+            created_at__lt=month_bound(add_months(month, 1))
+        ).order_by('created_at', 'id').values_list(
+            *MESSAGE_COLUMNS, 'content_zstd'
+        )[:max_rows].iterator(chunk_size=CHUNK_SIZE)
+
+        name = None
+        with tempfile.TemporaryFile() as buffer:
+            try:
+                with transaction.atomic():
+                    writer = None
+                    row_count = message_count = 0
+                    themes: Counter = Counter()
+                    drive_ids: Set[str] = set()
+                    first = last = None
+                    try:
+                        while True:
+                            # El archivo guarda el texto: los contenidos comprimidos se descomprimen
+                            chunk = [(*row[:-2], load_content(row[-2], row[-1])) for row in islice(rows, CHUNK_SIZE)]
+                            if not chunk:
+                                break
+                            ids = [row[0] for row in chunk]
+                            attachments = self.selector._attachments_by_message(
+                                DEFAULT_DB_ALIAS, ids, fields=('position', *ATTACHMENT_FIELDS)
+                            )
+                            columns: Dict[str, list] = {column: [] for column in schema.names}
+                            for row in chunk:
+                                for column, value in zip(MESSAGE_COLUMNS, row):
+                                    columns[column].append(str(value) if column in ('id', 'source_id') else value)
+                                columns['attachments'].append(attachments.get(row[0], []))
+                                drive_ids.update(
+                                    drive_id for attachment in attachments.get(row[0], [])
+                                    for drive_id in (attachment['google_drive_id'], attachment['original_google_drive_id'])
+                                    if drive_id
+                                )
+                                if not row[4]:
+                                    message_count += 1
+                                    themes[row[6] or classifier.classify(row[7])] += 1
+                            if writer is None:
+                                writer = pq.ParquetWriter(
+                                    buffer, schema, compression='zstd',
+                                    compression_level=getattr(settings, 'MESSAGE_ARCHIVE_COMPRESSION_LEVEL', 9)
+                                )
+                            writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+
+                            first = first or chunk[0][1]
+                            last = chunk[-1][1]
+                            row_count += len(chunk)
+                            self.selector.delete_messages(recipient_id, [(row[1], row[0]) for row in chunk])
+                    finally:
+                        rows.close()
+                    if writer is None:
+                        return None
+                    writer.close()
+
+                    size = buffer.tell()
+                    buffer.seek(0)
+                    name = self.storage.save(f"{recipient_id}/{month:%Y-%m}/{uuid7()}.parquet", File(buffer))
+                    archive = MessageArchive.objects.create(  # type: ignore
+                        recipient_id=recipient_id,
+                        month=month,
+                        file_path=name,
+                        size_bytes=size,
+                        row_count=row_count,
+                        message_count=message_count,
+                        theme_counts=dict(themes),
+                        first_message_at=first,
+                        last_message_at=last
+                    )
+                    # Los adjuntos se borraron con los mensajes: sus archivos de Drive
+                    # siguen en uso mientras exista el archivo (ver RetentionService)
+                    ArchivedDriveFile.objects.bulk_create([  # type: ignore
+                        ArchivedDriveFile(archive=archive, google_drive_id=drive_id) for drive_id in drive_ids
+                    ])
+            except Exception:
+                # Sin el COMMIT los mensajes siguen en la tabla: el archivo sobra
+                if name is not None:
+                    self.storage.delete(name)
+                raise
+
+        logger.info(f"Archivados {row_count} mensajes de {month:%Y-%m} del destinatario {recipient_id} "
+                    f"en {name} ({size / 1024 / 1024:.1f} MB)")
+        return archive
+
+    def get_archives(self, recipient_id: int) -> List[MessageArchive]:
+        """Archivos de un destinatario, del más reciente al más antiguo"""
+        return list(MessageArchive.objects.filter(  # type: ignore
+            recipient_id=recipient_id
+        ).order_by('-month', '-last_message_at'))
+
+    def read(self, archive: MessageArchive, columns: Optional[List[str]] = None,
+             ideas_only: bool = True):
+        """Tabla de pyarrow con las columnas pedidas de un archivo"""
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+
+        read_columns = None if columns is None else sorted(set(columns) | ({'is_command'} if ideas_only else set()))
+        with self.storage.open(archive.file_path, 'rb') as file:
+            table = pq.ParquetFile(file).read(columns=read_columns)
+        if ideas_only:
+            table = table.filter(pc.invert(table['is_command']))
+        return table
+
+    def iter_messages(self, recipient_id: int, since: Optional[datetime] = None,
+                      until: Optional[datetime] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Ideas archivadas como diccionarios, de la más antigua a la más reciente
+
+        Mismo formato que MessageSelector.iter_messages (exportación); se lee un
+        archivo a la vez.
+        """
+        for archive in reversed(self.get_archives(recipient_id)):
+            if (since is not None and archive.last_message_at < since) or \
+                    (until is not None and archive.first_message_at >= until):
+                continue
+            table = self.read(archive, ['id', 'created_at', 'theme', 'content', 'attachments'])
+            for row in table.to_pylist():
+                if (since is not None and row['created_at'] < since) or \
+                        (until is not None and row['created_at'] >= until):
+                    continue
+                row['attachments'] = [
+                    {field: attachment[field] for field in ('file_type', 'file_name', 'google_drive_link')}
+                    for attachment in row['attachments']
+                ]
+                yield row
+
+    def theme_counts(self, recipient_id: int) -> Counter:
+        """Ideas archivadas por tema, de las estadísticas de MessageArchive (no lee los archivos)"""
+        themes: Counter = Counter()
+        for counts in MessageArchive.objects.filter(  # type: ignore
+            recipient_id=recipient_id
+        ).values_list('theme_counts', flat=True):
+            themes.update(counts)
+        return themes
+
+    def search_messages(self, recipient_id: int, search_term: str, limit: int = 10,
+                        max_files: Optional[int] = None) -> List[Message]:
+        """
+        Ideas archivadas que contienen el término (sin distinguir mayúsculas), de la más reciente
+
+        Se leen como máximo `max_files` archivos, los más recientes (por defecto
+        MESSAGE_ARCHIVE_SEARCH_MAX_FILES): /buscar corre dentro del webhook y cada
+        archivo es una descarga completa en S3.
+        """
+        import pyarrow.compute as pc
+
+        if max_files is None:
+            max_files = getattr(settings, 'MESSAGE_ARCHIVE_SEARCH_MAX_FILES', 3)
+        messages: List[Message] = []
+        for archive in self.get_archives(recipient_id)[:max_files]:
+            table = self.read(archive, ['id', 'created_at', 'theme', 'content'])
+            table = table.filter(pc.match_substring(table['content'], search_term, ignore_case=True))
+            for row in reversed(table.to_pylist()):
+                messages.append(self._message(recipient_id, row))
+                if len(messages) >= limit:
+                    return messages
+        return messages
+
+    def count_expired(self, recipient_id: int, before: datetime) -> int:
+        """Mensajes de los archivos que delete_archives eliminaría"""
+        return MessageArchive.objects.filter(  # type: ignore
+            recipient_id=recipient_id, last_message_at__lt=before
+        ).aggregate(total=Sum('row_count'))['total'] or 0
+
+    def delete_archives(self, recipient_id: int, before: datetime) -> Tuple[int, Set[str]]:
+        """
+        Elimina los archivos cuyas ideas son todas anteriores a `before` (retención)
+
+        Returns:
+            Tupla (mensajes eliminados, IDs de Drive que enlazaban sus adjuntos)
+        """
+        deleted = 0
+        drive_ids: Set[str] = set()
+        for archive in MessageArchive.objects.filter(  # type: ignore
+            recipient_id=recipient_id, last_message_at__lt=before
+        ):
+            drive_ids.update(archive.drive_files.values_list('google_drive_id', flat=True))
+            self.storage.delete(archive.file_path)
+            archive.delete()
+            deleted += archive.row_count
+        return deleted, drive_ids
+
+    def _message(self, recipient_id: int, row: Dict[str, Any]) -> Message:
+        return Message(
+            id=row['id'],
+            recipient_id=recipient_id,
+            created_at=row['created_at'],
+            theme=row['theme'],
+            content=row['content']
+        )
@@ -0,0 +1,180 @@
+import io
+import logging
+import mimetypes
+import time
+import zipfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional
+from zoneinfo import ZoneInfo
+from django.conf import settings
+from django.db import transaction
+
+from apps.memory_agent.chat_export import WhatsAppExportParser
+from apps.memory_agent.classifiers import get_theme_classifier
+from apps.memory_agent.db.routers import mark_write
+from apps.memory_agent.models import Source
+from apps.memory_agent.selectors.message_selector import MessageSelector
+from apps.memory_agent.selectors.recipient_selector import RecipientSelector
+from apps.memory_agent.services.partition_service import MessagePartitionService, month_start
+from apps.memory_agent.strategies.message_strategies import WhatsAppStrategy
+from utils.uuid7 import uuid7
+
+logger = logging.getLogger(__name__)
+
+# Contenido de los mensajes que solo traen un archivo (igual que en el webhook); del
+# export solo se conoce el nombre del archivo, que no se sube a Drive
+FILE_CONTENT = "Archivo cargado"
+
+
+class ChatImportService:
+    """
+    Importa el historial de un chat exportado de WhatsApp ("Exportar chat", .txt o .zip)
+
+    El archivo se lee en streaming y las ideas se insertan con COPY en bloques de
+    CHAT_IMPORT_BATCH_SIZE filas, todo en una transacción: si algo falla no queda
+    una importación a medias y se puede repetir. Importar dos veces el mismo
+    archivo duplica las ideas.
+    """
+
+    def __init__(self):
+        self.selector = MessageSelector()
+        self.recipient_selector = RecipientSelector()
+        self.partition_service = MessagePartitionService()
+
+    def import_whatsapp(self, file: BinaryIO, source: Source, recipient: str, sender: Optional[str] = None,
+                        dayfirst: Optional[bool] = None, tz: Optional[str] = None,
+                        progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Importa los mensajes como ideas (o comandos) del destinatario
+
+        Args:
+            file: Archivo binario (.txt o .zip con el .txt y los archivos)
+            recipient: Identificador del destinatario en la fuente (ej: whatsapp:+57...)
+            sender: Autor cuyos mensajes se importan, como aparece en el chat; sin
+                valor se importan los de todos (un chat con uno mismo tiene un solo autor)
+            dayfirst: Orden de las fechas; sin valor se deduce del archivo
+            tz: Zona horaria del teléfono (por defecto CHAT_IMPORT_TIMEZONE)
+            progress: Se llama después de cada bloque con las estadísticas parciales
+
+        Returns:
+            Dict con imported, commands, attachments, skipped y seconds
+        """
+        zone = ZoneInfo(tz or getattr(settings, 'CHAT_IMPORT_TIMEZONE', 'UTC'))
+        batch_size = getattr(settings, 'CHAT_IMPORT_BATCH_SIZE', 10000)
+        parser = WhatsAppExportParser(dayfirst)
+        strategy = WhatsAppStrategy(source)
+        classifier = get_theme_classifier()
+        # Abrir el archivo antes de crear el destinatario valida el .zip
+        lines = self._read_lines(file)
+        recipient_id = self.recipient_selector.get_recipient_id(source, recipient)
+
+        stats: Dict[str, Any] = {'imported': 0, 'commands': 0, 'attachments': 0, 'skipped': 0, 'seconds': 0.0}
+        started = time.perf_counter()
+
+        # Las particiones de los meses del historial se crean antes, fuera de la
+        # transacción: crearlas bloquea la tabla de mensajes hasta el COMMIT
+        if self.partition_service.is_partitioned():
+            created = self.partition_service.ensure_months({
+                month_start(self._to_utc(timestamp, zone)) for timestamp in parser.timestamps(lines)
+            })
+            if created:
+                logger.info(f"Particiones creadas para la importación: {', '.join(created)}")
+            lines = self._read_lines(file)
+
+        messages: List[Dict[str, Any]] = []
+        attachments: List[Dict[str, Any]] = []
+
+        def flush():
+            self.selector.copy_messages(messages, attachments)
+            stats['imported'] += len(messages)
+            stats['attachments'] += len(attachments)
+            stats['seconds'] = time.perf_counter() - started
+            messages.clear()
+            attachments.clear()
+            if progress is not None:
+                progress(stats)
+
+        previous, offset = None, 0
+        with transaction.atomic():
+            for chat_message in parser.parse(lines):
+                if (chat_message.author is None or chat_message.deleted
+                        or (sender is not None and chat_message.author != sender)
+                        or not (chat_message.text or chat_message.attachments)):
+                    stats['skipped'] += 1
+                    continue
+
+                # Los mensajes del mismo minuto se separan por milisegundos para
+                # conservar el orden del chat en created_at y en el id
+                offset = offset + 1 if chat_message.timestamp == previous else 0
+                previous = chat_message.timestamp
+                created_at = self._to_utc(chat_message.timestamp + timedelta(milliseconds=offset), zone)
+
+                content = chat_message.text or FILE_CONTENT
+                is_command, command_type = strategy._detect_command(content)
+                message_id = uuid7(int(created_at.timestamp() * 1000))
+                messages.append({
+                    'id': message_id,
+                    'created_at': created_at,
+                    'updated_at': created_at,
+                    'content': content,
+                    'source_id': source.pk,
+                    'recipient_id': recipient_id,
+                    'is_command': is_command,
+                    'command_type': command_type,
+                    'theme': None if is_command else classifier.classify(content),
+                })
+                stats['commands'] += is_command
+                for position, file_name in enumerate(chat_message.attachments):
+                    attachments.append({
+                        'id': uuid7(int(created_at.timestamp() * 1000)),
+                        'created_at': created_at,
+                        'updated_at': created_at,
+                        'message_id': message_id,
+                        'position': position,
+                        'file_type': strategy._get_file_type(mimetypes.guess_type(file_name)[0] or ''),
+                        'file_name': file_name[:255],
+                    })
+
+                if len(messages) >= batch_size:
+                    flush()
+            flush()
+            self.recipient_selector.refresh_counters([recipient_id])
+
+        # Las lecturas siguientes de este destinatario van al primario
+        mark_write(str(recipient_id))
+        logger.info(f"Chat de WhatsApp importado para el destinatario {recipient_id}", extra={
+            key: round(value, 1) if isinstance(value, float) else value for key, value in stats.items()
+        })
+        return stats
+
+    def _read_lines(self, file: BinaryIO) -> Iterator[str]:
+        """
+        Líneas del .txt desde el comienzo del archivo (se puede llamar de nuevo para
+        releerlo); en un .zip se lee el chat sin extraer los archivos
+        """
+        file.seek(0)
+        if zipfile.is_zipfile(file):
+            archive = zipfile.ZipFile(file)
+            names = [name for name in archive.namelist() if name.lower().endswith('.txt')]
+            if not names:
+                raise ValueError("El .zip no contiene el chat exportado (.txt)")
+            # iOS lo llama _chat.txt; Android "Chat de WhatsApp con X.txt"
+            name = next((name for name in names if name.endswith('_chat.txt')), names[0])
+            return self._iter_text(archive.open(name), detach=False)
+        file.seek(0)
+        return self._iter_text(file, detach=True)
+
+    def _iter_text(self, binary: BinaryIO, detach: bool) -> Iterator[str]:
+        text = io.TextIOWrapper(binary, encoding='utf-8-sig', errors='replace')
+        try:
+            yield from text
+        finally:
+            if detach:
+                # Sin detach el wrapper cierra el archivo al liberarse y no se puede volver a leer
+                text.detach()
+            else:
+                text.close()
+
+    def _to_utc(self, timestamp: datetime, zone: ZoneInfo) -> datetime:
+        """Hora local del teléfono a UTC"""
+        return timestamp.replace(tzinfo=zone).astimezone(dt_timezone.utc)
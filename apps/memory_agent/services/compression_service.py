@@ -0,0 +1,163 @@
+import logging
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max, Min, Q
+from django.db.models.functions import Length
+
+from apps.memory_agent.compression import clear_dictionary_cache, decompress_text, load_content, stored_content
+from apps.memory_agent.models import CompressionDictionary, Message
+from apps.memory_agent.services.partition_service import add_months, month_bound, month_start
+
+logger = logging.getLogger(__name__)
+
+
+class MessageCompressionService:
+    """
+    Diccionario de zstd y compresión de los contenidos ya guardados
+
+    Los mensajes nuevos se comprimen al guardarse (ver CompressedTextField); este
+    servicio entrena el diccionario con una muestra de los contenidos largos y
+    recorre la tabla en lotes cortos ordenados por (created_at, id) para comprimir
+    (o descomprimir) los que ya estaban.
+    """
+
+    def train(self, samples: int = 5000, dict_size: int = 112640) -> CompressionDictionary:
+        """
+        Entrena un diccionario con `samples` contenidos largos al azar y lo activa
+
+        El anterior queda inactivo pero se conserva: los contenidos que comprimió
+        siguen apuntando a él por su dict_id.
+        """
+        import zstandard
+
+        min_bytes = getattr(settings, 'MESSAGE_COMPRESSION_MIN_BYTES', 2048)
+        # Al volver a entrenar la muestra incluye los contenidos ya comprimidos
+        rows = Message.objects.annotate(length=Length('content')).filter(  # type: ignore
+            Q(length__gte=min_bytes) | Q(content_zstd__isnull=False)
+        ).order_by('?').values_list('content', 'content_zstd')[:samples]
+        data = [load_content(content, content_zstd).encode('utf-8') for content, content_zstd in rows]
+        data = [content for content in data if len(content) >= min_bytes]
+        if not data:
+            raise ValueError(f'No hay contenidos de al menos {min_bytes} bytes para entrenar el diccionario')
+
+        started = time.perf_counter()
+        trained = zstandard.train_dictionary(dict_size, data)
+        with transaction.atomic():
+            CompressionDictionary.objects.filter(is_active=True).update(is_active=False)  # type: ignore
+            dictionary = CompressionDictionary.objects.create(  # type: ignore
+                dict_id=trained.dict_id(),
+                data=trained.as_bytes(),
+                sample_count=len(data),
+                sample_bytes=sum(len(content) for content in data),
+            )
+        clear_dictionary_cache()
+        logger.info(f"Diccionario {dictionary.dict_id} entrenado con {len(data)} contenidos "
+                    f"en {time.perf_counter() - started:.1f} s")
+        return dictionary
+
+    def compress(self, batch_size: int = 1000, decompress: bool = False, dry_run: bool = False,
+                 progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Comprime los contenidos largos que todavía están como texto
+
+        Args:
+            batch_size: Mensajes por lote (cada lote es una transacción)
+            decompress: Vuelve a guardar como texto los contenidos comprimidos
+                (antes de desactivar MESSAGE_COMPRESSION_ENABLED o quitar zstandard)
+            dry_run: Comprime en memoria y cuenta el ahorro sin escribir
+            progress: Se llama después de cada lote con las estadísticas parciales
+
+        Returns:
+            Dict con messages (revisados), compressed (o descomprimidos), bytes_before,
+            bytes_after, seconds y rate (mensajes por segundo)
+        """
+        if decompress:
+            messages = Message.objects.filter(content_zstd__isnull=False)  # type: ignore
+        else:
+            if not getattr(settings, 'MESSAGE_COMPRESSION_ENABLED', False):
+                raise ValueError('La compresión está desactivada (MESSAGE_COMPRESSION_ENABLED)')
+            # Un carácter ocupa hasta 4 bytes: el filtro por caracteres no deja afuera
+            # ningún candidato y compress_text descarta los que no llegan en bytes
+            min_bytes = getattr(settings, 'MESSAGE_COMPRESSION_MIN_BYTES', 2048)
+            messages = Message.objects.annotate(length=Length('content')).filter(  # type: ignore
+                length__gte=min_bytes // 4, content_zstd__isnull=True
+            )
+
+        stats: Dict[str, Any] = {
+            'messages': 0, 'compressed': 0, 'bytes_before': 0, 'bytes_after': 0, 'seconds': 0.0, 'rate': 0.0,
+        }
+        started = time.perf_counter()
+        bounds = Message.objects.aggregate(first=Min('created_at'), last=Max('created_at'))  # type: ignore
+        month = month_start(bounds['first']) if bounds['first'] is not None else None
+        # Mes por mes: ningún índice empieza por created_at y cada lote recorre solo su partición
+        while month is not None and month <= month_start(bounds['last']):
+            month_messages = messages.filter(
+                created_at__gte=month_bound(month), created_at__lt=month_bound(add_months(month, 1))
+            )
+            for rows in self._batches(month_messages, batch_size):
+                updates = self._decompress_rows(rows, stats) if decompress else self._compress_rows(rows, stats)
+                if updates and not dry_run:
+                    with transaction.atomic(), connection.cursor() as cursor:
+                        # Una sentencia por fila: created_at en el WHERE limita cada UPDATE a su partición
+                        cursor.executemany(
+                            f'UPDATE {connection.ops.quote_name(Message._meta.db_table)} '
+                            f'SET content = %s, content_zstd = %s, content_preview = %s '
+                            f'WHERE created_at = %s AND id = %s',
+                            updates
+                        )
+
+                stats['messages'] += len(rows)
+                stats['seconds'] = time.perf_counter() - started
+                stats['rate'] = stats['messages'] / stats['seconds'] if stats['seconds'] else 0.0
+                if progress is not None:
+                    progress(stats)
+            month = add_months(month, 1)
+
+        stats['seconds'] = time.perf_counter() - started
+        return stats
+
+    @staticmethod
+    def _batches(messages, batch_size: int) -> Iterator[List[tuple]]:
+        """Lotes de (created_at, id, content, content_zstd) ordenados por (created_at, id)"""
+        last = None
+        while True:
+            batch = messages
+            if last is not None:
+                batch = batch.filter(Q(created_at__gt=last[0]) | Q(created_at=last[0], id__gt=last[1]))
+            rows = list(batch.order_by('created_at', 'id').values_list(
+                'created_at', 'id', 'content', 'content_zstd'
+            )[:batch_size])
+            if not rows:
+                return
+            last = rows[-1][:2]
+            yield rows
+            if len(rows) < batch_size:
+                return
+
+    @staticmethod
+    def _compress_rows(rows: List[tuple], stats: Dict[str, Any]) -> List[tuple]:
+        updates = []
+        for created_at, message_id, content, _ in rows:
+            stored = stored_content(content)
+            if stored['content_zstd'] is None:
+                continue
+            stats['compressed'] += 1
+            stats['bytes_before'] += len(content.encode('utf-8'))
+            stats['bytes_after'] += len(stored['content_zstd'])
+            updates.append((
+                stored['content'], stored['content_zstd'], stored['content_preview'], created_at, message_id
+            ))
+        return updates
+
+    @staticmethod
+    def _decompress_rows(rows: List[tuple], stats: Dict[str, Any]) -> List[tuple]:
+        updates = []
+        for created_at, message_id, _, compressed in rows:
+            content = decompress_text(compressed)
+            stats['compressed'] += 1
+            stats['bytes_before'] += len(compressed)
+            stats['bytes_after'] += len(content.encode('utf-8'))
+            updates.append((content, None, None, created_at, message_id))
+        return updates
@@ -0,0 +1,119 @@
+import csv
+import io
+import json
+import logging
+import zlib
+from datetime import datetime
+from itertools import chain
+from typing import Any, Dict, Iterator, Optional
+from django.conf import settings
+
+from apps.memory_agent.models import Recipient
+from apps.memory_agent.selectors.message_selector import MessageSelector
+from apps.memory_agent.services.archive_service import MessageArchiveService
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+CSV_FIELDS = ['id', 'created_at', 'source', 'theme', 'content', 'file_names', 'drive_links']
+
+# Bytes que se acumulan antes de entregar un bloque (y de comprimirlo)
+BUFFER_SIZE = 64 * 1024
+
+
+class MessageExportService:
+    """Exportación completa de las ideas de un destinatario en NDJSON o CSV"""
+
+    def __init__(self):
+        self.selector = MessageSelector()
+        self.archive_service = MessageArchiveService()
+
+    def export(self, recipient: Recipient, export_format: str = 'ndjson', since: Optional[datetime] = None,
+               until: Optional[datetime] = None, compress: bool = False) -> Iterator[bytes]:
+        """
+        Genera el archivo por bloques de ~64 KB (gzip si compress=True)
+
+        Las ideas se leen con un cursor del servidor de EXPORT_CHUNK_SIZE filas y cada
+        bloque se entrega apenas se llena: la memoria del worker es la misma para 100
+        ideas que para 1M. La lectura empieza al consumir el generador. Las ideas
+        archivadas (las más antiguas) van primero, leídas de a un archivo.
+        """
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Formato de exportación no soportado: {export_format}")
+
+        messages = chain(
+            self.archive_service.iter_messages(recipient.pk, since=since, until=until),
+            self.selector.iter_messages(
+                recipient.pk, since=since, until=until,
+                chunk_size=getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+            )
+        )
+        # wbits=31: flujo gzip (encabezado y CRC) en lugar de zlib
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+        buffer = io.StringIO()
+        writer = csv.writer(buffer) if export_format == 'csv' else None
+        if writer is not None:
+            writer.writerow(CSV_FIELDS)
+
+        source_name = recipient.source.name
+        total = 0
+        for message in messages:
+            row = self._row(message, source_name)
+            if writer is not None:
+                writer.writerow(self._csv_row(row))
+            else:
+                buffer.write(json.dumps(row, ensure_ascii=False))
+                buffer.write('\n')
+            total += 1
+
+            if buffer.tell() >= BUFFER_SIZE:
+                chunk = self._flush(buffer, compressor)
+                if chunk:
+                    yield chunk
+
+        chunk = self._flush(buffer, compressor)
+        if compressor is not None:
+            chunk += compressor.flush()
+        if chunk:
+            yield chunk
+        logger.info(f"Exportadas {total} ideas del destinatario {recipient.pk} ({export_format})")
+
+    def content_type(self, export_format: str, compress: bool = False) -> str:
+        return 'application/gzip' if compress else EXPORT_FORMATS[export_format]
+
+    def filename(self, recipient: Recipient, export_format: str, compress: bool = False) -> str:
+        name = f"ideas-{recipient.pk}.{export_format}"
+        return f"{name}.gz" if compress else name
+
+    def _row(self, message: Dict[str, Any], source_name: str) -> Dict[str, Any]:
+        return {
+            'id': str(message['id']),
+            'created_at': message['created_at'].isoformat(),
+            'source': source_name,
+            'theme': message['theme'],
+            'content': message['content'],
+            'attachments': message['attachments'],
+        }
+
+    def _csv_row(self, row: Dict[str, Any]) -> list:
+        """Los adjuntos van en dos columnas separadas por ' | '"""
+        attachments = row['attachments']
+        return [
+            row['id'],
+            row['created_at'],
+            row['source'],
+            row['theme'] or '',
+            row['content'],
+            ' | '.join(attachment['file_name'] or '' for attachment in attachments),
+            ' | '.join(attachment['google_drive_link'] or '' for attachment in attachments),
+        ]
+
+    def _flush(self, buffer: io.StringIO, compressor) -> bytes:
+        """Vacía el buffer de texto y retorna sus bytes (comprimidos si corresponde)"""
+        data = buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+        return compressor.compress(data) if compressor is not None else data
@@ -1,20 +1,55 @@
 import os
 import io
+import json
+import time
+import random
+import hashlib
+import tempfile
 from datetime import datetime
-from typing import Optional, Dict, Any
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseUpload
+from typing import TYPE_CHECKING, Optional, Dict, Any, Union, BinaryIO, Callable, Tuple, List
 from django.conf import settings
+from apps.memory_agent.services.upload_scheduler_service import get_upload_scheduler
+from apps.memory_agent.metrics import record_provider_error
 import logging
 
+if TYPE_CHECKING:
+    # Los SDKs de Google se importan al usarse: cargarlos cuesta ~150 ms y varios MB
+    # por proceso, y solo los necesitan los workers que suben archivos
+    from googleapiclient.errors import HttpError
+    from googleapiclient.http import MediaIoBaseUpload
+
 logger = logging.getLogger(__name__)
 
 # Scopes necesarios para Google Drive
 SCOPES = ['https://www.googleapis.com/auth/drive.file']
 
+# Razones de error 403 que indican límite de cuota de la API
+RATE_LIMIT_REASONS = {'rateLimitExceeded', 'userRateLimitExceeded'}
+
+# Los chunks de una subida resumible deben ser múltiplos de 256 KiB
+UPLOAD_CHUNK_ALIGNMENT = 256 * 1024
+
+
+def _upload_chunk_size() -> int:
+    """Tamaño de chunk de subida, redondeado al múltiplo de 256 KiB que exige Drive"""
+    chunk_size = getattr(settings, 'GOOGLE_DRIVE_UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024)
+    return max(UPLOAD_CHUNK_ALIGNMENT, chunk_size - chunk_size % UPLOAD_CHUNK_ALIGNMENT)
+
+
+def _is_rate_limited(error: 'HttpError') -> bool:
+    """Indica si el error de Drive corresponde a throttling (429 o 403 por cuota)"""
+    status = getattr(error.resp, 'status', None)
+    if status == 429:
+        return True
+    if status != 403:
+        return False
+    try:
+        details = json.loads(error.content.decode('utf-8'))
+        reasons = {item.get('reason') for item in details.get('error', {}).get('errors', [])}
+    except (ValueError, AttributeError):
+        return False
+    return bool(reasons & RATE_LIMIT_REASONS)
+
 
 class GoogleDriveService:
     """Servicio para manejar archivos en Google Drive"""
@@ -32,6 +67,11 @@ class GoogleDriveService:
     
     def _authenticate(self):
         """Autentica con Google Drive API"""
+        from google.oauth2.credentials import Credentials
+        from google_auth_oauthlib.flow import InstalledAppFlow
+        from google.auth.transport.requests import Request
+        from googleapiclient.discovery import build
+
         try:
             creds = None
             
@@ -148,16 +188,28 @@ class GoogleDriveService:
             logger.error(f"Error obteniendo/creando carpeta '{folder_name}': {str(e)}")
             raise
     
-    def upload_file(self, file_content: bytes, filename: str, date: datetime, 
-                   mime_type: Optional[str] = None) -> Dict[str, Any]:
+    def upload_file(self, file_content: Union[bytes, BinaryIO], filename: str, date: datetime, 
+                   mime_type: Optional[str] = None, resume_state: Optional[Dict[str, Any]] = None,
+                   on_progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
         """
         Sube un archivo a Google Drive
         
+        La subida espera un slot del scheduler de subidas (concurrencia adaptativa
+        compartida entre workers). Si Drive responde con throttling se reintenta
+        con backoff exponencial hasta DRIVE_UPLOAD_THROTTLE_RETRIES veces.
+        
+        El archivo se sube por chunks de GOOGLE_DRIVE_UPLOAD_CHUNK_SIZE bytes en una
+        sesión resumible. Tras cada chunk confirmado se actualiza `resume_state`
+        (session_uri, offset, total_bytes) y se llama a `on_progress`, de modo que el
+        llamador pueda persistirlo y reanudar la subida después de un reinicio.
+        
         Args:
-            file_content: Contenido del archivo en bytes
+            file_content: Contenido del archivo en bytes o un archivo abierto en modo binario
             filename: Nombre del archivo
             date: Fecha del archivo
             mime_type: Tipo MIME del archivo
+            resume_state: Estado de una subida anterior del mismo contenido (opcional)
+            on_progress: Callback invocado con el estado tras cada chunk (opcional)
             
         Returns:
             Dict con información del archivo subido
@@ -165,60 +217,174 @@ class GoogleDriveService:
         if not self.service:
             raise Exception("Servicio de Google Drive no inicializado")
         
-        try:
+        from googleapiclient.errors import HttpError
+        
+        stream = io.BytesIO(file_content) if isinstance(file_content, bytes) else file_content
+        stream.seek(0, io.SEEK_END)
+        size = stream.tell()
+        
+        # Una sesión guardada solo sirve para un contenido del mismo tamaño
+        state = resume_state if resume_state is not None else {}
+        if state.get('total_bytes') not in (None, size):
+            state.update({'session_uri': None, 'offset': 0})
+        state['total_bytes'] = size
+        
+        scheduler = get_upload_scheduler()
+        max_retries = getattr(settings, 'DRIVE_UPLOAD_THROTTLE_RETRIES', 5)
+        
+        for attempt in range(max_retries + 1):
+            try:
+                with scheduler.slot(size) as upload_slot:
+                    try:
+                        return self._upload_stream(stream, filename, date, mime_type, state, on_progress)
+                    except HttpError as e:
+                        if _is_rate_limited(e):
+                            upload_slot.mark_throttled()
+                            record_provider_error('google_drive', 'upload_throttled')
+                        raise
+                        
+            except HttpError as e:
+                if not _is_rate_limited(e) or attempt >= max_retries:
+                    logger.error(f"Error subiendo archivo '{filename}': {str(e)}")
+                    raise
+                delay = min(2 ** attempt, 64) * random.uniform(0.5, 1.5)
+                logger.warning(f"Google Drive limitó la subida de '{filename}', reintento en {delay:.1f}s")
+                time.sleep(delay)
+                
+            except Exception as e:
+                logger.error(f"Error subiendo archivo '{filename}': {str(e)}")
+                raise
+        
+        raise Exception(f"No se pudo subir el archivo '{filename}'")
+    
+    def _upload_stream(self, stream: BinaryIO, filename: str, date: datetime,
+                       mime_type: Optional[str], state: Dict[str, Any],
+                       on_progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """Sube el contenido del stream por chunks, reanudando la sesión guardada si existe"""
+        from googleapiclient.http import MediaIoBaseUpload
+        
+        stream.seek(0)
+        size = state['total_bytes']
+        folder_id = None
+        
+        # Crear objeto de media
+        media = MediaIoBaseUpload(
+            stream,
+            mimetype=mime_type or 'application/octet-stream',
+            chunksize=_upload_chunk_size(),
+            resumable=True
+        )
+        
+        session_uri = state.get('session_uri')
+        file = None
+        
+        if session_uri:
+            request = self._create_upload_request(media, filename, parents=[])
+            offset, file = self._query_upload_offset(request.http, session_uri, size)
+            
+            if offset is not None:
+                request.resumable_uri = session_uri
+                request.resumable_progress = offset
+                logger.info(f"Reanudando subida de '{filename}' desde el byte {offset} de {size}")
+            elif file is None:
+                logger.info(f"Sesión de subida de '{filename}' expirada, se inicia una nueva")
+                session_uri = None
+        
+        if file is None and not session_uri:
             # Crear estructura de carpetas
             folder_id = self.create_folder_structure(date)
-            
-            # Preparar metadatos del archivo
-            file_metadata = {
-                'name': filename,
-                'parents': [folder_id]
-            }
-            
-            # Crear objeto de media
-            media = MediaIoBaseUpload(
-                io.BytesIO(file_content),
-                mimetype=mime_type or 'application/octet-stream',
-                resumable=True
-            )
-            
-            # Subir archivo
-            file = self.service.files().create(
-                body=file_metadata,
-                media_body=media,
-                fields='id,name,webViewLink,size'
-            ).execute()
-            
-            logger.info(f"Archivo '{filename}' subido exitosamente. ID: {file.get('id')}")
-            
-            return {
-                'id': file.get('id'),
-                'name': file.get('name'),
-                'web_view_link': file.get('webViewLink'),
-                'size': file.get('size'),
-                'folder_id': folder_id
-            }
-            
-        except Exception as e:
-            logger.error(f"Error subiendo archivo '{filename}': {str(e)}")
-            raise
+            state.update({'session_uri': None, 'offset': 0})
+            request = self._create_upload_request(media, filename, parents=[folder_id])
+        
+        # Subir archivo chunk a chunk
+        while file is None:
+            _, file = request.next_chunk()
+            state['session_uri'] = request.resumable_uri
+            state['offset'] = size if file is not None else request.resumable_progress
+            if on_progress:
+                on_progress(state)
+        
+        logger.info(f"Archivo '{filename}' subido exitosamente. ID: {file.get('id')}")
+        
+        return {
+            'id': file.get('id'),
+            'name': file.get('name'),
+            'web_view_link': file.get('webViewLink'),
+            'size': file.get('size'),
+            'folder_id': folder_id
+        }
+    
+    def _create_upload_request(self, media: 'MediaIoBaseUpload', filename: str, parents: List[str]):
+        """Prepara la petición de creación del archivo con su contenido"""
+        # Preparar metadatos del archivo
+        file_metadata = {
+            'name': filename,
+            'parents': parents
+        }
+        
+        return self.service.files().create(
+            body=file_metadata,
+            media_body=media,
+            fields='id,name,webViewLink,size'
+        )
+    
+    def _query_upload_offset(self, http, session_uri: str, size: int) -> Tuple[Optional[int], Optional[Dict[str, Any]]]:
+        """
+        Consulta a Drive cuántos bytes de una sesión resumible fueron confirmados
+        
+        Returns:
+            (offset, None) si la sesión sigue activa, (None, archivo) si ya se completó
+            o (None, None) si la sesión expiró
+        """
+        resp, content = http.request(
+            session_uri, 'PUT',
+            headers={'Content-Range': f'bytes */{size}', 'Content-Length': '0'}
+        )
+        
+        if resp.status == 308:
+            confirmed = resp.get('range')
+            return (int(confirmed.rsplit('-', 1)[1]) + 1 if confirmed else 0), None
+        if resp.status in (200, 201):
+            return None, json.loads(content)
+        if resp.status in (404, 410):
+            return None, None
+        from googleapiclient.errors import HttpError
+        raise HttpError(resp, content, uri=session_uri)
     
     def download_file_from_url(self, file_url: str, filename: str, date: datetime, 
-                              auth_username: Optional[str] = None, auth_password: Optional[str] = None) -> Dict[str, Any]:
+                              auth_username: Optional[str] = None, auth_password: Optional[str] = None,
+                              resume_state: Optional[Dict[str, Any]] = None,
+                              on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+                              processor: Optional[Callable[[BinaryIO, str], Any]] = None) -> Dict[str, Any]:
         """
         Descarga un archivo desde una URL y lo sube a Google Drive
         
+        El contenido se hashea (SHA-256) mientras se descarga. Si el archivo ya fue
+        subido antes se reutiliza el archivo existente en Drive en lugar de subirlo
+        otra vez. Cuando el proveedor informa el tamaño y coincide junto con el hash
+        del primer bloque, la descarga se interrumpe sin leer el resto del archivo.
+        
         Args:
             file_url: URL del archivo
             filename: Nombre del archivo
             date: Fecha del archivo
             auth_username: Usuario para autenticación HTTP (opcional)
             auth_password: Contraseña para autenticación HTTP (opcional)
+            resume_state: Estado de una subida resumible anterior (ver upload_file)
+            on_progress: Callback invocado con el estado tras cada chunk subido
+            processor: Callable(archivo, content_type) que retorna un ProcessedMedia
+                para subir en lugar del original, o None para subirlo sin cambios
             
         Returns:
-            Dict con información del archivo subido
+            Dict con información del archivo subido (o reutilizado)
         """
         import requests
+        from apps.memory_agent.selectors.media_selector import MediaSelector
+        
+        dedup_enabled = getattr(settings, 'MEDIA_DEDUP_ENABLED', True)
+        prefilter_enabled = getattr(settings, 'MEDIA_DEDUP_PREFILTER', True)
+        prefix_bytes = getattr(settings, 'MEDIA_DEDUP_PREFIX_BYTES', 64 * 1024)
+        spool_max_memory = getattr(settings, 'MEDIA_SPOOL_MAX_MEMORY', 10 * 1024 * 1024)
         
         try:
             # Preparar headers y autenticación
@@ -232,19 +398,138 @@ class GoogleDriveService:
             response = requests.get(file_url, stream=True, auth=auth, headers=headers)
             response.raise_for_status()
             
-            # Obtener tipo MIME
+            # Obtener tipo MIME y tamaño informado por el proveedor
             content_type = response.headers.get('content-type', 'application/octet-stream')
+            content_length = int(response.headers.get('content-length') or 0) or None
             
-            # Leer contenido
-            file_content = response.content
+            digest = hashlib.sha256()
+            prefix_digest = hashlib.sha256()
+            prefix_hex = None
+            size = 0
             
-            # Subir a Google Drive
-            return self.upload_file(file_content, filename, date, content_type)
+            with tempfile.SpooledTemporaryFile(max_size=spool_max_memory) as spool:
+                try:
+                    for chunk in response.iter_content(chunk_size=prefix_bytes):
+                        if not chunk:
+                            continue
+                        spool.write(chunk)
+                        digest.update(chunk)
+                        
+                        if prefix_hex is None:
+                            prefix_digest.update(chunk[:prefix_bytes - size])
+                        size += len(chunk)
+                        
+                        if prefix_hex is None and size >= prefix_bytes:
+                            prefix_hex = prefix_digest.hexdigest()
+                            
+                            # Prefiltro: mismo tamaño y mismo primer bloque, no hace falta seguir descargando
+                            if dedup_enabled and prefilter_enabled and content_length:
+                                candidates = MediaSelector.find_by_prefix(content_length, prefix_hex)
+                                if len(candidates) == 1:
+                                    logger.info(f"Archivo '{filename}' duplicado (prefiltro), descarga interrumpida")
+                                    return self._reuse_media(candidates[0])
+                finally:
+                    response.close()
+                
+                if prefix_hex is None:
+                    prefix_hex = prefix_digest.hexdigest()
+                sha256 = digest.hexdigest()
+                
+                if dedup_enabled:
+                    existing = MediaSelector.get_by_digest(sha256)
+                    if existing:
+                        logger.info(f"Archivo '{filename}' duplicado, se reutiliza {existing.google_drive_id}")
+                        return self._reuse_media(existing)
+                
+                # La sesión guardada solo se reanuda si el contenido es el mismo
+                state = {'sha256': sha256}
+                if resume_state and resume_state.get('sha256') == sha256:
+                    state.update(resume_state)
+                
+                # Procesamiento opcional (recompresión) antes de subir
+                processed = processor(spool, content_type) if processor else None
+                
+                try:
+                    # Subir a Google Drive
+                    file_info = self.upload_file(processed.file if processed else spool, filename, date,
+                                                 content_type, resume_state=state, on_progress=on_progress)
+                    file_info['bytes_saved'] = processed.bytes_saved if processed else 0
+                    
+                    if processed and processed.keep_original:
+                        original_info = self.upload_file(spool, f"original_{filename}", date, content_type)
+                        file_info['original_id'] = original_info['id']
+                finally:
+                    if processed:
+                        processed.close()
+            
+            if dedup_enabled:
+                MediaSelector.register(
+                    sha256=sha256,
+                    prefix_sha256=prefix_hex,
+                    size=size,
+                    google_drive_id=file_info['id'],
+                    google_drive_link=file_info.get('web_view_link'),
+                    mime_type=content_type,
+                    file_name=filename,
+                    original_google_drive_id=file_info.get('original_id')
+                )
+            
+            file_info.update({'sha256': sha256, 'deduplicated': False})
+            return file_info
             
         except Exception as e:
             logger.error(f"Error descargando archivo desde URL: {str(e)}")
             raise
     
+    def _reuse_media(self, media_hash) -> Dict[str, Any]:
+        """Construye la respuesta de un archivo ya existente en Google Drive"""
+        from apps.memory_agent.selectors.media_selector import MediaSelector
+        
+        MediaSelector.record_hit(media_hash)
+        
+        return {
+            'id': media_hash.google_drive_id,
+            'name': media_hash.file_name,
+            'web_view_link': media_hash.google_drive_link,
+            'size': str(media_hash.size),
+            'folder_id': None,
+            'sha256': media_hash.sha256,
+            'original_id': media_hash.original_google_drive_id,
+            'deduplicated': True
+        }
+    
+    def delete_file(self, file_id: str) -> bool:
+        """
+        Elimina un archivo de Google Drive (retención de mensajes)
+        
+        Un archivo que ya no existe (404) cuenta como eliminado. Con throttling se
+        reintenta con el mismo backoff que las subidas.
+        
+        Returns:
+            bool: True si el archivo ya no está en Drive
+        """
+        if not self.service:
+            raise Exception("Servicio de Google Drive no inicializado")
+        
+        from googleapiclient.errors import HttpError
+        
+        max_retries = getattr(settings, 'DRIVE_UPLOAD_THROTTLE_RETRIES', 5)
+        for attempt in range(max_retries + 1):
+            try:
+                self.service.files().delete(fileId=file_id).execute()
+                return True
+            except HttpError as e:
+                if getattr(e.resp, 'status', None) == 404:
+                    return True
+                if not _is_rate_limited(e) or attempt >= max_retries:
+                    logger.error(f"Error eliminando el archivo {file_id} de Google Drive: {str(e)}")
+                    record_provider_error('google_drive', 'delete')
+                    return False
+                delay = min(2 ** attempt, 64) * random.uniform(0.5, 1.5)
+                logger.warning(f"Google Drive limitó la eliminación de {file_id}, reintento en {delay:.1f}s")
+                time.sleep(delay)
+        return False
+    
     def get_file_info(self, file_id: str) -> Dict[str, Any]:
         """
         Obtiene información de un archivo
@@ -0,0 +1,98 @@
+import logging
+from typing import Dict, List, Type
+from django.apps import apps
+from django.db import connection, models, transaction
+from django.db.models import Case, Q, Value, When
+
+from utils.models import BaseModel
+from utils.uuid7 import uuid7
+
+logger = logging.getLogger(__name__)
+
+
+class KeyMigrationService:
+    """
+    Reescribe las claves primarias UUID v4 existentes como UUID v7
+
+    Cada id nuevo se deriva del created_at de la fila, así que después de migrar
+    el orden por id coincide con el orden de creación también para las filas
+    antiguas. Las claves foráneas que apuntan al modelo se actualizan en la misma
+    transacción (las restricciones de Django son DEFERRABLE INITIALLY DEFERRED).
+    """
+
+    def __init__(self, batch_size: int = 1000):
+        self.batch_size = batch_size
+
+    @staticmethod
+    def get_models(app_label: str = 'memory_agent') -> List[Type[BaseModel]]:
+        """Modelos concretos del app que heredan de BaseModel con clave UUID"""
+        return [
+            model for model in apps.get_app_config(app_label).get_models()
+            if issubclass(model, BaseModel) and not model._meta.proxy
+            and isinstance(model._meta.pk, models.UUIDField)
+        ]
+
+    def migrate_model(self, model: Type[BaseModel], dry_run: bool = False) -> Dict[str, int]:
+        """
+        Migra las filas del modelo en lotes ordenados por (created_at, id)
+
+        Returns:
+            Dict con filas revisadas y migradas
+        """
+        counts = {'scanned': 0, 'migrated': 0}
+        relations = self._relations(model)
+        last = None
+
+        while True:
+            rows = model._base_manager.order_by('created_at', 'id')
+            if last is not None:
+                rows = rows.filter(Q(created_at__gt=last[0]) | Q(created_at=last[0], id__gt=last[1]))
+            batch = list(rows.values_list('created_at', 'id')[:self.batch_size])
+            if not batch:
+                break
+            last = batch[-1]
+            counts['scanned'] += len(batch)
+
+            mapping = {
+                old_id: uuid7(int(created_at.timestamp() * 1000))
+                for created_at, old_id in batch if old_id.version != 7
+            }
+            if mapping and not dry_run:
+                self._rewrite(model, relations, mapping)
+            counts['migrated'] += len(mapping)
+
+        return counts
+
+    def reindex(self, model: Type[BaseModel]) -> None:
+        """Reconstruye los índices del modelo (PostgreSQL) para compactar el índice de la clave primaria"""
+        if connection.vendor != 'postgresql':
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f'REINDEX TABLE CONCURRENTLY {connection.ops.quote_name(model._meta.db_table)}')
+
+    @staticmethod
+    def _relations(model: Type[BaseModel]) -> List[models.Field]:
+        """Claves foráneas (y uno a uno) de otros modelos que apuntan al modelo"""
+        return [
+            relation.field for relation in model._meta.related_objects
+            if not relation.many_to_many and relation.field.concrete
+        ]
+
+    @staticmethod
+    def _rewrite(model: Type[BaseModel], relations: List[models.Field], mapping: Dict) -> None:
+        """Un UPDATE por tabla con CASE para todo el lote (como bulk_update)"""
+        old_ids = list(mapping)
+
+        def case(column: str, output_field: models.Field) -> Case:
+            return Case(
+                *[When(**{column: old_id}, then=Value(new_id)) for old_id, new_id in mapping.items()],
+                output_field=output_field
+            )
+
+        with transaction.atomic():
+            model._base_manager.filter(pk__in=old_ids).update(id=case('id', model._meta.pk))
+            for field in relations:
+                field.model._base_manager.filter(**{f'{field.attname}__in': old_ids}).update(
+                    **{field.attname: case(field.attname, field.target_field)}
+                )
+        logger.info(f"{model.__name__}: {len(mapping)} claves migradas a UUID v7")
@@ -0,0 +1,151 @@
+import os
+import shutil
+import logging
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Dict, Any, BinaryIO
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Formatos que se recomprimen (tipo MIME -> formato de Pillow)
+IMAGE_FORMATS = {
+    'image/jpeg': 'JPEG',
+    'image/png': 'PNG',
+}
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """Pool de procesos del worker; cada proceso decodifica una sola imagen a la vez"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(
+                    max_workers=getattr(settings, 'MEDIA_PROCESSING_WORKERS', 2),
+                    mp_context=multiprocessing.get_context('spawn'),
+                    max_tasks_per_child=getattr(settings, 'MEDIA_PROCESSING_TASKS_PER_CHILD', 50)
+                )
+    return _pool
+
+
+def compress_image(input_path: str, output_path: str, image_format: str, options: Dict[str, Any]) -> int:
+    """
+    Recomprime una imagen limitando su resolución y sin metadatos EXIF
+
+    Se ejecuta en un proceso del pool. Para JPEG se usa `draft` para decodificar
+    directamente a una escala reducida y no cargar la imagen completa en memoria.
+
+    Args:
+        input_path: Ruta de la imagen original
+        output_path: Ruta donde escribir la imagen procesada
+        image_format: Formato de Pillow ('JPEG' o 'PNG')
+        options: max_dimension y jpeg_quality
+
+    Returns:
+        int: Tamaño en bytes de la imagen procesada
+    """
+    from PIL import Image, ImageOps
+
+    max_dimension = options['max_dimension']
+
+    with Image.open(input_path) as image:
+        if image_format == 'JPEG':
+            image.draft('RGB', (max_dimension, max_dimension))
+
+        # Aplicar la orientación EXIF antes de descartar los metadatos
+        processed = ImageOps.exif_transpose(image)
+        processed.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+
+        if image_format == 'JPEG':
+            processed.convert('RGB').save(
+                output_path, 'JPEG',
+                quality=options['jpeg_quality'],
+                optimize=True,
+                progressive=True
+            )
+        else:
+            processed.save(output_path, 'PNG', optimize=True)
+
+    return os.path.getsize(output_path)
+
+
+class ProcessedMedia:
+    """Resultado del procesamiento de un archivo antes de subirlo a Drive"""
+
+    def __init__(self, file: BinaryIO, original_size: int, processed_size: int, keep_original: bool):
+        self.file = file
+        self.original_size = original_size
+        self.processed_size = processed_size
+        self.keep_original = keep_original
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_size - self.processed_size
+
+    def close(self):
+        self.file.close()
+
+
+class MediaProcessingService:
+    """Servicio para recomprimir imágenes antes de subirlas a Google Drive"""
+
+    def __init__(self, profile):
+        """
+        Args:
+            profile: MediaProcessingProfile de la fuente
+        """
+        self.profile = profile
+
+    def process(self, stream: BinaryIO, content_type: str) -> Optional[ProcessedMedia]:
+        """
+        Recomprime el archivo si el perfil de la fuente lo indica
+
+        Args:
+            stream: Archivo descargado
+            content_type: Tipo MIME del archivo
+
+        Returns:
+            ProcessedMedia o None si el archivo se sube sin cambios
+        """
+        image_format = IMAGE_FORMATS.get(content_type.split(';')[0].strip().lower())
+        if not self.profile.is_enabled or not image_format:
+            return None
+
+        stream.seek(0, os.SEEK_END)
+        original_size = stream.tell()
+        if original_size < self.profile.min_size_bytes:
+            return None
+
+        suffix = '.jpg' if image_format == 'JPEG' else '.png'
+        with tempfile.NamedTemporaryFile(suffix=suffix) as source_file:
+            # Copiar por bloques: el pool trabaja con rutas, no con el contenido en memoria
+            stream.seek(0)
+            shutil.copyfileobj(stream, source_file)
+            source_file.flush()
+
+            output = tempfile.NamedTemporaryFile(suffix=suffix)
+            try:
+                processed_size = _get_pool().submit(
+                    compress_image, source_file.name, output.name, image_format, {
+                        'max_dimension': self.profile.max_dimension,
+                        'jpeg_quality': self.profile.jpeg_quality,
+                    }
+                ).result()
+            except Exception as e:
+                output.close()
+                logger.warning(f"No se pudo procesar la imagen, se sube la original: {str(e)}")
+                return None
+
+        if processed_size >= original_size:
+            output.close()
+            return None
+
+        logger.info(f"Imagen recomprimida: {original_size} -> {processed_size} bytes "
+                    f"({original_size - processed_size} bytes ahorrados)")
+        return ProcessedMedia(output, original_size, processed_size, self.profile.keep_original)
@@ -0,0 +1,214 @@
+import random
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.memory_agent.models import MediaTransfer, Source
+from apps.memory_agent.selectors.media_selector import MediaSelector
+from apps.memory_agent.selectors.media_transfer_selector import MediaTransferSelector
+from apps.memory_agent.selectors.message_selector import MessageSelector
+from apps.memory_agent.selectors.recipient_selector import RecipientSelector
+from apps.memory_agent.strategies.message_strategies import MessageStrategyFactory
+from apps.memory_agent.metrics import metric_labels, observe_stage, record_provider_error
+
+logger = logging.getLogger(__name__)
+
+
+class MediaTransferService:
+    """Servicio para encolar y procesar las transferencias de archivos hacia Google Drive"""
+
+    def __init__(self):
+        self.selector = MediaTransferSelector()
+        self.message_selector = MessageSelector()
+        self.recipient_selector = RecipientSelector()
+        self.strategy_factory = MessageStrategyFactory()
+        self.max_attempts = getattr(settings, 'MEDIA_TRANSFER_MAX_ATTEMPTS', 8)
+        self.backoff_base = getattr(settings, 'MEDIA_TRANSFER_BACKOFF_BASE', 30)
+        self.backoff_max = getattr(settings, 'MEDIA_TRANSFER_BACKOFF_MAX', 3600)
+        self.lease_seconds = getattr(settings, 'MEDIA_TRANSFER_LEASE_SECONDS', 600)
+
+    def enqueue(self, processed_data: Dict[str, Any], source: Source) -> List[MediaTransfer]:
+        """
+        Registra el mensaje, sus adjuntos y una transferencia pendiente por adjunto en una sola transacción
+
+        Args:
+            processed_data: Datos del mensaje procesados por la estrategia
+                (`files` con uno o varios archivos, o los campos file_* de uno solo)
+            source: Fuente del mensaje
+
+        Returns:
+            List[MediaTransfer]: Transferencias creadas, en el orden de los archivos
+        """
+        files = processed_data.get('files') or [processed_data]
+        with transaction.atomic():
+            message = self.message_selector.create_message(
+                content=processed_data['content'],
+                source=source,
+                recipient=processed_data['recipient'],
+                is_command=False,
+                attachments=[
+                    {'file_type': file.get('file_type'), 'file_name': file['file_name'], 'file_url': file['file_url']}
+                    for file in files
+                ]
+            )
+            return self.selector.create_message_transfers(source, processed_data['recipient'], message)
+
+    def process_due(self, batch_size: int = 10, max_workers: int = 4) -> Dict[str, int]:
+        """
+        Reclama y procesa en paralelo las transferencias listas
+
+        Args:
+            batch_size: Máximo de transferencias a reclamar
+            max_workers: Hilos que procesan transferencias en paralelo
+
+        Returns:
+            Dict con el conteo de transferencias por resultado
+        """
+        transfers = self.selector.claim_due(batch_size, self.lease_seconds)
+        counts = {'claimed': len(transfers), 'done': 0, 'retry': 0, 'dead': 0, 'lost': 0}
+
+        if not transfers:
+            return counts
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for outcome in executor.map(self._run_in_thread, transfers):
+                counts[outcome] += 1
+
+        return counts
+
+    def _run_in_thread(self, transfer: MediaTransfer) -> str:
+        """Procesa una transferencia y cierra la conexión a BD del hilo"""
+        try:
+            return self.process_transfer(transfer)
+        except Exception as e:
+            # Un error fuera de process_transfer (p. ej. la BD caída al marcar el fallo)
+            # no corta el lote: la transferencia se vuelve a reclamar cuando venza el lease
+            logger.error(f"Error procesando la transferencia {transfer.id}: {str(e)}")
+            return 'retry'
+        finally:
+            connection.close()
+
+    def process_transfer(self, transfer: MediaTransfer) -> str:
+        """
+        Descarga el archivo, lo sube a Google Drive y lo asocia con su mensaje
+
+        Returns:
+            str: 'done', 'retry', 'dead' o 'lost' (otro worker reclamó la transferencia)
+        """
+        from apps.memory_agent.services.google_drive_service import GoogleDriveService
+
+        source = transfer.source
+
+        with metric_labels(source.name, 'media'):  # type: ignore
+            try:
+                with observe_stage('drive_transfer'):
+                    drive_service = GoogleDriveService()
+
+                    # Las credenciales de Twilio autentican la descarga del archivo
+                    file_info = drive_service.download_file_from_url(
+                        file_url=transfer.file_url,
+                        filename=transfer.file_name,
+                        date=timezone.localtime(transfer.created_at).replace(tzinfo=None),
+                        auth_username=source.additional1,  # type: ignore
+                        auth_password=source.additional2,  # type: ignore
+                        resume_state=transfer.resume_state,
+                        on_progress=lambda state: self._save_progress(transfer, state),
+                        processor=self._get_processor(source)
+                    )
+            except Exception as e:
+                record_provider_error('google_drive', 'transfer', source.name)  # type: ignore
+                return self._handle_failure(transfer, e)
+
+            try:
+                # mark_done va primero y en la misma transacción: si el lease venció
+                # y otro worker reclamó la transferencia, este no toca el adjunto
+                with transaction.atomic():
+                    if not self.selector.mark_done(transfer, bytes_saved=file_info.get('bytes_saved', 0)):
+                        logger.warning(f"Transferencia {transfer.id}: lease vencido en el intento {transfer.attempts}, "
+                                       f"se descarta el resultado")
+                        return 'lost'
+                    # Un archivo reutilizado se asocia con su hash bloqueado: si la
+                    # retención lo borró mientras tanto, se reintenta y se sube de nuevo
+                    if file_info.get('deduplicated') and not MediaSelector.lock_by_digest(file_info['sha256']):
+                        raise ValueError(f"El archivo {file_info['id']} se eliminó de Drive durante la transferencia")
+                    if transfer.message_id:  # type: ignore
+                        self.message_selector.attach_drive_file(
+                            transfer.message_id,  # type: ignore
+                            google_drive_id=file_info['id'],
+                            google_drive_link=file_info.get('web_view_link'),
+                            attachment_id=transfer.attachment_id,  # type: ignore
+                            original_google_drive_id=file_info.get('original_id')
+                        )
+                        # El enlace de Drive cambia el listado de ideas del destinatario (ETag)
+                        recipient_id = self.recipient_selector.get_recipient_id(
+                            source, transfer.recipient, create=False
+                        )
+                        if recipient_id is not None:
+                            self.recipient_selector.touch(recipient_id)
+            except Exception as e:
+                return self._handle_failure(transfer, e)
+
+            self._notify(transfer, f"Archivo cargado exitosamente: {transfer.file_name}")
+        logger.info(f"Transferencia {transfer.id} completada en el intento {transfer.attempts}")
+        return 'done'
+
+    def _get_processor(self, source: Source):
+        """Retorna el procesador de archivos de la fuente si tiene un perfil activo"""
+        from apps.memory_agent.models import MediaProcessingProfile
+        from apps.memory_agent.services.media_processing_service import MediaProcessingService
+
+        try:
+            profile = source.media_profile  # type: ignore
+        except MediaProcessingProfile.DoesNotExist:  # type: ignore
+            return None
+
+        return MediaProcessingService(profile).process if profile.is_enabled else None
+
+    def _save_progress(self, transfer: MediaTransfer, state: Dict[str, Any]) -> None:
+        """Persiste el avance de la subida para reanudarla si el worker se reinicia"""
+        if not self.selector.save_upload_progress(transfer, state, self.lease_seconds):
+            logger.warning(f"Transferencia {transfer.id}: lease vencido, no se guarda el avance de la subida")
+            return
+        logger.info(
+            f"Transferencia {transfer.id}: {state.get('offset')} de {state.get('total_bytes')} bytes subidos"
+        )
+
+    def _handle_failure(self, transfer: MediaTransfer, error: Exception) -> str:
+        """Programa el reintento con backoff exponencial o envía al dead-letter"""
+        if transfer.attempts >= self.max_attempts:
+            if not self.selector.mark_failed(transfer, str(error)):
+                return self._lease_lost(transfer, error)
+            logger.error(f"Transferencia {transfer.id} enviada al dead-letter tras {transfer.attempts} intentos: {str(error)}")
+            self._notify(transfer, f"Error al cargar archivo: {transfer.file_name}")
+            return 'dead'
+
+        retry_at = self._next_retry_at(transfer.attempts)
+        if not self.selector.mark_failed(transfer, str(error), retry_at=retry_at):
+            return self._lease_lost(transfer, error)
+        logger.warning(f"Transferencia {transfer.id} falló (intento {transfer.attempts}), reintento a las {retry_at.isoformat()}: {str(error)}")
+        return 'retry'
+
+    @staticmethod
+    def _lease_lost(transfer: MediaTransfer, error: Exception) -> str:
+        """El fallo llegó con el lease vencido: el estado lo decide el worker que la reclamó después"""
+        logger.warning(f"Transferencia {transfer.id} falló con el lease vencido (intento {transfer.attempts}): {str(error)}")
+        return 'lost'
+
+    def _next_retry_at(self, attempts: int) -> datetime:
+        """Calcula el próximo intento con backoff exponencial y jitter"""
+        delay = min(self.backoff_base * (2 ** (attempts - 1)), self.backoff_max)
+        delay = delay * random.uniform(0.5, 1.0)
+        return timezone.now() + timedelta(seconds=delay)
+
+    def _notify(self, transfer: MediaTransfer, response: str) -> Optional[bool]:
+        """Envía el resultado de la transferencia al usuario"""
+        try:
+            strategy = self.strategy_factory.get_strategy(transfer.source)
+            return strategy.send_response(transfer.recipient, response)  # type: ignore
+        except Exception as e:
+            logger.error(f"Error notificando la transferencia {transfer.id}: {str(e)}")
+            return None
@@ -0,0 +1,41 @@
+import hashlib
+from datetime import datetime
+from typing import Optional
+from django.db.models import QuerySet
+
+from apps.memory_agent.models import Recipient
+from apps.memory_agent.selectors.message_selector import MessageSelector
+from apps.memory_agent.selectors.recipient_selector import RecipientSelector
+
+
+class MessageQueryService:
+    """Servicio de lectura de ideas para la API (listado del dashboard)"""
+
+    def __init__(self):
+        self.selector = MessageSelector()
+        self.recipient_selector = RecipientSelector()
+
+    def get_recipient(self, source_name: str, identifier: str) -> Optional[Recipient]:
+        """Destinatario con sus contadores, o None si la fuente o el usuario no existen"""
+        source = self.selector.get_source_by_name(source_name)
+        if source is None:
+            return None
+        recipient_id = self.recipient_selector.get_recipient_id(source, identifier, create=False)
+        if recipient_id is None:
+            return None
+        return self.recipient_selector.get_recipient(recipient_id)
+
+    def list_messages(self, recipient: Recipient, since: Optional[datetime] = None,
+                      until: Optional[datetime] = None, theme: Optional[str] = None) -> QuerySet:
+        return self.selector.list_messages(recipient.pk, since=since, until=until, theme=theme)
+
+    def get_etag(self, recipient: Recipient, query: str) -> str:
+        """
+        ETag de una página del listado
+
+        Depende solo de la versión del destinatario (contador de ideas y
+        updated_at, que cambian con cada idea nueva, archivo subido o recálculo)
+        y de los parámetros de la página: se calcula sin leer mensajes.
+        """
+        version = f"{recipient.pk}:{recipient.message_count}:{recipient.updated_at.isoformat()}:{query}"
+        return f'W/"{hashlib.sha1(version.encode()).hexdigest()}"'
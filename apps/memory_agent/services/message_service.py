@@ -1,9 +1,10 @@
-from typing import Dict, Any, Tuple
-from datetime import datetime
+from typing import Dict, Any, Optional, Tuple
 from apps.memory_agent.models import Source
 from apps.memory_agent.selectors.message_selector import MessageSelector
+from apps.memory_agent.selectors.recipient_selector import RecipientSelector
 from apps.memory_agent.strategies.message_strategies import MessageStrategyFactory
-from apps.memory_agent.services.google_drive_service import GoogleDriveService
+from apps.memory_agent.services.media_transfer_service import MediaTransferService
+from apps.memory_agent.metrics import metric_labels, observe_stage, set_message_type, set_source
 
 
 class MessageService:
@@ -11,30 +12,54 @@ class MessageService:
     
     def __init__(self):
         self.selector = MessageSelector()
+        self.recipient_selector = RecipientSelector()
         self.strategy_factory = MessageStrategyFactory()
+        self.media_transfer_service = MediaTransferService()
     
-    def process_message(self, source_name: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    def process_message(self, source_name: str, data: Dict[str, Any],
+                        source: Optional[Source] = None) -> Dict[str, Any]:
         """
         Procesa un mensaje entrante y determina si almacenar o devolver resumen
+
+        Cada etapa se mide en memory_agent_stage_seconds (ver apps.memory_agent.metrics)
+
+        Args:
+            source_name: Nombre de la fuente
+            data: Datos del webhook
+            source: Fuente ya validada por la vista (evita consultarla de nuevo)
         """
-        # Obtener fuente
-        source = self.selector.get_source_by_name(source_name)
-        if not source:
-            raise ValueError(f"Source '{source_name}' not found or inactive")
-        
-        # Obtener estrategia para la fuente
-        strategy = self.strategy_factory.get_strategy(source)
-        
-        # Procesar mensaje con la estrategia
-        processed_data = strategy.process_message(data)
-        
-        # Determinar si es comando, archivo o mensaje normal
+        with metric_labels(source.name if source else 'unknown'), observe_stage('process_message'):  # type: ignore
+            # Obtener fuente
+            if source is None:
+                with observe_stage('source_lookup'):
+                    source = self.selector.get_source_by_name(source_name)
+            if not source:
+                raise ValueError(f"Source '{source_name}' not found or inactive")
+            set_source(source.name)  # type: ignore
+            
+            # Obtener estrategia para la fuente
+            strategy = self.strategy_factory.get_strategy(source)
+            
+            # Procesar mensaje con la estrategia
+            with observe_stage('parse'):
+                processed_data = strategy.process_message(data)
+                set_message_type(self._get_message_type(processed_data))
+            
+            # Determinar si es comando, archivo o mensaje normal
+            if processed_data['is_command']:
+                return self._handle_command(processed_data, source)
+            elif processed_data.get('is_file', False):
+                return self._handle_file_message(processed_data, source)
+            else:
+                return self._handle_regular_message(processed_data, source)
+    
+    def _get_message_type(self, processed_data: Dict[str, Any]) -> str:
+        """Tipo de mensaje usado como etiqueta de las métricas"""
         if processed_data['is_command']:
-            return self._handle_command(processed_data, source)
+            return 'command'
         elif processed_data.get('is_file', False):
-            return self._handle_file_message(processed_data, source)
-        else:
-            return self._handle_regular_message(processed_data, source)
+            return 'media'
+        return 'text'
     
     def _handle_command(self, processed_data: Dict[str, Any], source: Source) -> Dict[str, Any]:
         """Maneja comandos especiales como /resumen, /hoy, etc."""
@@ -44,17 +69,20 @@ class MessageService:
         # Obtener estrategia para enviar respuesta
         strategy = self.strategy_factory.get_strategy(source)
         
-        if command_type == '/resumen':
-            response = self._generate_summary(recipient, 'all')
-        elif command_type == '/hoy':
-            response = self._generate_summary(recipient, 'today')
-        elif command_type == '/semana':
-            response = self._generate_summary(recipient, 'week')
-        elif command_type == '/buscar':
-            search_term = processed_data['content'].replace('/buscar', '').strip()
-            response = self._search_messages(recipient, search_term)
-        else:
-            response = "Comando no reconocido."
+        with observe_stage('command'):
+            # Sin crear el destinatario: un usuario sin ideas no tiene nada que resumir
+            recipient_id = self.recipient_selector.get_recipient_id(source, recipient, create=False)
+            if command_type == '/resumen':
+                response = self._generate_summary(recipient_id, 'all')
+            elif command_type == '/hoy':
+                response = self._generate_summary(recipient_id, 'today')
+            elif command_type == '/semana':
+                response = self._generate_summary(recipient_id, 'week')
+            elif command_type == '/buscar':
+                search_term = processed_data['content'].replace('/buscar', '').strip()
+                response = self._search_messages(recipient_id, search_term)
+            else:
+                response = "Comando no reconocido."
         
         # Enviar respuesta
         strategy.send_response(recipient, response)
@@ -68,12 +96,13 @@ class MessageService:
     def _handle_regular_message(self, processed_data: Dict[str, Any], source: Source) -> Dict[str, Any]:
         """Maneja mensajes regulares (almacenar idea)"""
         # Crear mensaje en la base de datos
-        message = self.selector.create_message(
-            content=processed_data['content'],
-            source=source,
-            recipient=processed_data['recipient'],
-            is_command=False
-        )
+        with observe_stage('db_insert'):
+            message = self.selector.create_message(
+                content=processed_data['content'],
+                source=source,
+                recipient=processed_data['recipient'],
+                is_command=False
+            )
         
         # Obtener estrategia para enviar respuesta
         strategy = self.strategy_factory.get_strategy(source)
@@ -89,56 +118,39 @@ class MessageService:
         }
     
     def _handle_file_message(self, processed_data: Dict[str, Any], source: Source) -> Dict[str, Any]:
-        """Maneja mensajes con archivos (subir a Google Drive)"""
+        """
+        Maneja mensajes con archivos
+
+        El archivo se registra en el outbox de transferencias y se responde de inmediato;
+        un worker lo sube a Google Drive y lo asocia con el mensaje al completar.
+        """
         try:
-            # Obtener información del archivo
-            file_url = processed_data.get('file_url')
-            file_name = processed_data.get('file_name')
-            file_type = processed_data.get('file_type')
+            # Obtener información de los archivos (WhatsApp puede enviar varios)
+            files = processed_data.get('files') or [processed_data]
             
-            if not file_url or not file_name:
+            if any(not file.get('file_url') or not file.get('file_name') for file in files):
                 raise ValueError("Información de archivo incompleta")
             
-            # Subir archivo a Google Drive
-            drive_service = GoogleDriveService()
-            
-            # Obtener credenciales de Twilio para autenticación
-            account_sid = source.additional1  # type: ignore
-            auth_token = source.additional2  # type: ignore
-            
-            file_info = drive_service.download_file_from_url(
-                file_url=file_url,
-                filename=file_name,
-                date=datetime.now(),
-                auth_username=account_sid,
-                auth_password=auth_token
-            )
-            
-            # Crear mensaje en la base de datos con información del archivo
-            message = self.selector.create_message(
-                content=processed_data['content'],
-                source=source,
-                recipient=processed_data['recipient'],
-                is_command=False,
-                is_file=True,
-                file_type=file_type,
-                file_name=file_name,
-                file_url=file_url,
-                google_drive_id=file_info['id'],
-                google_drive_link=file_info['web_view_link']
-            )
+            # Registrar mensaje, adjuntos y transferencias pendientes
+            with observe_stage('enqueue_transfer'):
+                transfers = self.media_transfer_service.enqueue(processed_data, source)
             
             # Obtener estrategia para enviar respuesta
             strategy = self.strategy_factory.get_strategy(source)
             
             # Enviar confirmación
-            response = f"Archivo cargado exitosamente: {file_name}"
+            if len(transfers) == 1:
+                response = f"Archivo recibido: {transfers[0].file_name}. Se está cargando a Google Drive."
+            else:
+                names = ', '.join(transfer.file_name for transfer in transfers)
+                response = f"Archivos recibidos ({len(transfers)}): {names}. Se están cargando a Google Drive."
             strategy.send_response(processed_data['recipient'], response)
             
             return {
-                'status': 'file_uploaded',
-                'message_id': str(message.id),
-                'file_info': file_info,
+                'status': 'file_queued',
+                'message_id': str(transfers[0].message_id),  # type: ignore
+                'transfer_id': str(transfers[0].id),
+                'transfer_ids': [str(transfer.id) for transfer in transfers],
                 'response': response
             }
             
@@ -154,16 +166,16 @@ class MessageService:
                 'response': error_response
             }
     
-    def _generate_summary(self, recipient: str, period: str) -> str:
+    def _generate_summary(self, recipient_id: Optional[int], period: str) -> str:
         """Genera un resumen estructurado"""
         from apps.memory_agent.services.summary_service import SummaryService
         
         summary_service = SummaryService()
-        return summary_service.generate_summary(recipient, period)
+        return summary_service.generate_summary(recipient_id, period)
     
-    def _search_messages(self, recipient: str, search_term: str) -> str:
+    def _search_messages(self, recipient_id: Optional[int], search_term: str) -> str:
         """Busca mensajes por término"""
         from apps.memory_agent.services.summary_service import SummaryService
         
         summary_service = SummaryService()
-        return summary_service.search_messages(recipient, search_term)
+        return summary_service.search_messages(recipient_id, search_term)
@@ -0,0 +1,283 @@
+import re
+import logging
+from dataclasses import dataclass
+from datetime import date, datetime, timezone as dt_timezone
+from typing import Iterable, List, Optional, Set
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.memory_agent.models import Attachment, DetachedDriveFile, MediaTransfer, Message
+from apps.memory_agent.selectors.recipient_selector import RecipientSelector
+
+logger = logging.getLogger(__name__)
+
+PARTITION_NAME = re.compile(r'_p(\d{4})_(\d{2})$')
+
+
+@dataclass
+class Partition:
+    name: str
+    month: Optional[date]  # None para la partición por defecto
+    rows: int  # Estimación de pg_class.reltuples
+    size_bytes: int
+
+
+def month_start(moment: datetime) -> date:
+    return date(moment.year, moment.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_bound(month: date) -> str:
+    """Límite de la partición como timestamptz en UTC"""
+    return datetime(month.year, month.month, 1, tzinfo=dt_timezone.utc).isoformat()
+
+
+class MessagePartitionService:
+    """
+    Particiones mensuales de la tabla de mensajes (PostgreSQL, por rango de created_at)
+
+    La migración 0009 convierte la tabla en particionada. Este servicio crea las
+    particiones de los próximos meses antes de que lleguen mensajes (los que no
+    tienen partición caen en la partición por defecto) y separa o elimina las
+    particiones que superan la retención sin recorrer el resto de la tabla.
+    """
+
+    def __init__(self):
+        self.table = Message._meta.db_table
+        self.default_partition = f'{self.table}_default'
+        self.quote = connection.ops.quote_name
+
+    def is_partitioned(self) -> bool:
+        if connection.vendor != 'postgresql':
+            return False
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid '
+                'WHERE c.relname = %s AND c.relnamespace = current_schema()::regnamespace',
+                [self.table]
+            )
+            return cursor.fetchone() is not None
+
+    def list_partitions(self) -> List[Partition]:
+        """Particiones adjuntas, de la más antigua a la más nueva (la de por defecto al final)"""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT child.relname, child.reltuples, pg_total_relation_size(child.oid) '
+                'FROM pg_inherits i JOIN pg_class parent ON parent.oid = i.inhparent '
+                'JOIN pg_class child ON child.oid = i.inhrelid '
+                'WHERE parent.relname = %s AND parent.relnamespace = current_schema()::regnamespace',
+                [self.table]
+            )
+            rows = cursor.fetchall()
+
+        partitions = []
+        for name, tuples, size in rows:
+            match = PARTITION_NAME.search(name)
+            month = date(int(match.group(1)), int(match.group(2)), 1) if match else None
+            partitions.append(Partition(name=name, month=month, rows=max(0, int(tuples)), size_bytes=size))
+        return sorted(partitions, key=lambda partition: (partition.month is None, partition.month or date.min))
+
+    def partition_name(self, month: date) -> str:
+        return f'{self.table}_p{month.year:04d}_{month.month:02d}'
+
+    def ensure_partitions(self, months_ahead: Optional[int] = None, now: Optional[datetime] = None,
+                          dry_run: bool = False) -> List[str]:
+        """
+        Crea las particiones del mes actual y de los próximos `months_ahead` meses
+
+        Returns:
+            Nombres de las particiones creadas
+        """
+        if months_ahead is None:
+            months_ahead = getattr(settings, 'MESSAGE_PARTITION_MONTHS_AHEAD', 3)
+        current = month_start(now or timezone.now())
+        existing = {partition.month for partition in self.list_partitions()}
+
+        created = []
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            if month in existing:
+                continue
+            if not dry_run:
+                self._create_partition(month)
+            created.append(self.partition_name(month))
+        return created
+
+    def ensure_months(self, months: Iterable[date]) -> List[str]:
+        """
+        Crea las particiones que falten de meses puntuales (ej: al importar historial)
+
+        Sin esto las filas de meses pasados caen en la partición por defecto.
+
+        Returns:
+            Nombres de las particiones creadas
+        """
+        if not self.is_partitioned():
+            return []
+        existing = {partition.month for partition in self.list_partitions()}
+        created = []
+        for month in sorted(set(months) - existing):
+            self._create_partition(month)
+            created.append(self.partition_name(month))
+        return created
+
+    def expire_partitions(self, retention_months: Optional[int] = None, drop: bool = False,
+                          now: Optional[datetime] = None, dry_run: bool = False,
+                          drive_files: bool = False) -> List[str]:
+        """
+        Separa (o elimina) las particiones anteriores a la retención
+
+        Se conservan el mes actual y los `retention_months` meses anteriores
+        completos; 0 desactiva la retención. Una partición separada queda como
+        tabla independiente (para archivarla) y sus adjuntos pasan a la tabla
+        `<partición>_attachments`; sus IDs de Drive quedan en DetachedDriveFile
+        para que la retención no los borre. Con drop=True se elimina junto con las
+        transferencias y los adjuntos de sus mensajes.
+
+        Args:
+            drive_files: Con drop=True, también elimina de Google Drive los archivos
+                que ningún otro adjunto usa (ver RetentionService)
+
+        Returns:
+            Nombres de las particiones separadas o eliminadas
+        """
+        if retention_months is None:
+            retention_months = getattr(settings, 'MESSAGE_PARTITION_RETENTION_MONTHS', 0)
+        if not retention_months:
+            return []
+
+        cutoff = add_months(month_start(now or timezone.now()), -retention_months)
+        expired = [
+            partition for partition in self.list_partitions()
+            if partition.month is not None and partition.month < cutoff
+        ]
+        if dry_run:
+            return [partition.name for partition in expired]
+
+        for partition in expired:
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f'ALTER TABLE {self.quote(self.table)} DETACH PARTITION {self.quote(partition.name)}'
+                    )
+                drive_ids = self._move_attachments(partition.name, keep=not drop)
+                if drop:
+                    with connection.cursor() as cursor:
+                        cursor.execute(f'DROP TABLE {self.quote(partition.name)}')
+            logger.info(f"Partición {partition.name} {'eliminada' if drop else 'separada'}")
+            if drop and drive_files:
+                self._delete_drive_files(partition.name, drive_ids)
+        if expired:
+            # Los mensajes separados o eliminados dejan de contar para sus destinatarios
+            RecipientSelector.refresh_counters()
+        return [partition.name for partition in expired]
+
+    def list_detached(self) -> List[str]:
+        """Particiones separadas por expire_partitions que todavía existen"""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT relname FROM pg_class WHERE relkind = 'r' AND NOT relispartition "
+                "AND relnamespace = current_schema()::regnamespace AND relname LIKE %s",
+                [f'{self.table}\\_p%']
+            )
+            names = [name for name, in cursor.fetchall() if PARTITION_NAME.search(name)]
+        return sorted(names)
+
+    def drop_detached(self, name: str, drive_files: bool = False) -> None:
+        """
+        Elimina una partición separada (ya archivada) y la tabla de sus adjuntos
+
+        Args:
+            drive_files: También elimina de Google Drive los archivos que ningún
+                otro adjunto usa
+        """
+        if name not in self.list_detached():
+            raise ValueError(f"'{name}' no es una partición separada")
+        with transaction.atomic():
+            files = DetachedDriveFile.objects.filter(partition=name)  # type: ignore
+            drive_ids = set(files.values_list('google_drive_id', flat=True))
+            files.delete()
+            with connection.cursor() as cursor:
+                cursor.execute(f'DROP TABLE {self.quote(name)}')
+                cursor.execute(f'DROP TABLE IF EXISTS {self.quote(f"{name}_attachments")}')
+        logger.info(f"Partición separada {name} eliminada")
+        if drive_files:
+            self._delete_drive_files(name, drive_ids)
+
+    def _move_attachments(self, partition_name: str, keep: bool) -> Set[str]:
+        """
+        Saca de las tablas los adjuntos y transferencias de una partición ya separada
+
+        Con keep=True los adjuntos se copian antes a `<partición>_attachments` y sus
+        IDs de Drive se registran en DetachedDriveFile.
+
+        Returns:
+            IDs de Drive de los adjuntos y de sus originales
+        """
+        attachments = self.quote(Attachment._meta.db_table)
+        in_partition = f'message_id IN (SELECT id FROM {self.quote(partition_name)})'
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT google_drive_id, original_google_drive_id FROM {attachments} WHERE {in_partition}'
+            )
+            drive_ids = {drive_id for row in cursor.fetchall() for drive_id in row if drive_id}
+            if keep:
+                cursor.execute(
+                    f'CREATE TABLE {self.quote(f"{partition_name}_attachments")} AS '
+                    f'SELECT * FROM {attachments} WHERE {in_partition}'
+                )
+                DetachedDriveFile.objects.bulk_create([  # type: ignore
+                    DetachedDriveFile(partition=partition_name, google_drive_id=drive_id) for drive_id in drive_ids
+                ], ignore_conflicts=True)
+            # Sin clave foránea a la tabla particionada: se borran a mano (las transferencias primero)
+            cursor.execute(f'DELETE FROM {self.quote(MediaTransfer._meta.db_table)} WHERE {in_partition}')
+            cursor.execute(f'DELETE FROM {attachments} WHERE {in_partition}')
+        return drive_ids
+
+    @staticmethod
+    def _delete_drive_files(name: str, drive_ids: Set[str]) -> None:
+        from apps.memory_agent.services.retention_service import RetentionService
+
+        stats = RetentionService().delete_drive_files(drive_ids)
+        logger.info(f"Partición {name}: {stats['drive_files']} archivos eliminados de Drive "
+                    f"({stats['drive_errors']} con error)")
+
+    def _create_partition(self, month: date) -> None:
+        """
+        Crea la partición de un mes
+
+        Si la partición por defecto tiene filas de ese mes, PostgreSQL no permite
+        crearla: se separa la partición por defecto, se mueven sus filas del mes a
+        la partición nueva y se vuelve a adjuntar, todo en una transacción.
+        """
+        name = self.partition_name(month)
+        start, end = month_bound(month), month_bound(add_months(month, 1))
+        table, default = self.quote(self.table), self.quote(self.default_partition)
+        create_sql = (
+            f'CREATE TABLE {self.quote(name)} PARTITION OF {table} '
+            f"FOR VALUES FROM ('{start}') TO ('{end}')"
+        )
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT 1 FROM {default} WHERE created_at >= %s AND created_at < %s LIMIT 1',
+                [start, end]
+            )
+            if cursor.fetchone() is None:
+                cursor.execute(create_sql)
+            else:
+                cursor.execute(f'ALTER TABLE {table} DETACH PARTITION {default}')
+                cursor.execute(create_sql)
+                cursor.execute(
+                    f'INSERT INTO {table} SELECT * FROM {default} WHERE created_at >= %s AND created_at < %s',
+                    [start, end]
+                )
+                cursor.execute(f'DELETE FROM {default} WHERE created_at >= %s AND created_at < %s', [start, end])
+                cursor.execute(f'ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT')
+                logger.warning(f"Filas de {month:%Y-%m} movidas desde la partición por defecto a {name}")
+        logger.info(f"Partición {name} creada")
@@ -0,0 +1,262 @@
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.memory_agent.models import (
+    ArchivedDriveFile, Attachment, DetachedDriveFile, MediaHash, Message, PendingDriveDeletion, Recipient
+)
+from apps.memory_agent.selectors.message_selector import MessageSelector
+from apps.memory_agent.selectors.recipient_selector import RecipientSelector
+from apps.memory_agent.services.archive_service import MessageArchiveService
+
+logger = logging.getLogger(__name__)
+
+
+class RetentionService:
+    """
+    Borra las ideas más antiguas que la retención de su destinatario
+
+    La retención es retention_days del destinatario, si no la de su fuente y si no
+    MESSAGE_RETENTION_DAYS (0 o vacío = sin límite). A diferencia de las particiones
+    vencidas (ver MessagePartitionService), se borra por destinatario y por días, en
+    lotes cortos ordenados por (created_at, id): cada lote es una transacción de
+    milisegundos y entre lotes se hace una pausa, así que se puede ejecutar en
+    horario de oficina sin bloquear la recepción de mensajes.
+    """
+
+    def __init__(self):
+        self.selector = MessageSelector()
+        self.recipient_selector = RecipientSelector()
+        self.archive_service = MessageArchiveService()
+        self._drive_service = None
+
+    def recipients_due(self, source_names: Optional[Iterable[str]] = None,
+                       recipient_ids: Optional[Iterable[int]] = None) -> List[Dict[str, Any]]:
+        """
+        Destinatarios con retención
+
+        Returns:
+            Lista de dicts con id, identifier, source_name y days
+        """
+        days = Coalesce('retention_days', 'source__retention_days',
+                        Value(getattr(settings, 'MESSAGE_RETENTION_DAYS', 0)))
+        recipients = Recipient.objects.annotate(days=days).filter(days__gt=0)  # type: ignore
+        if source_names is not None:
+            recipients = recipients.filter(source__name__in=list(source_names))
+        if recipient_ids is not None:
+            recipients = recipients.filter(pk__in=list(recipient_ids))
+        return list(recipients.order_by('pk').values('id', 'identifier', 'days', source_name=F('source__name')))
+
+    def purge(self, source_names: Optional[Iterable[str]] = None, recipient_ids: Optional[Iterable[int]] = None,
+              batch_size: Optional[int] = None, sleep: Optional[float] = None, drive_files: bool = False,
+              dry_run: bool = False, max_seconds: Optional[float] = None, now: Optional[datetime] = None,
+              progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Borra las ideas vencidas de cada destinatario
+
+        Args:
+            batch_size: Mensajes por lote (por defecto PURGE_BATCH_SIZE)
+            sleep: Segundos de pausa entre lotes (por defecto PURGE_SLEEP_SECONDS)
+            drive_files: También elimina de Google Drive los archivos que ningún
+                otro adjunto usa (de la tabla o de los archivos de la capa fría) y
+                reintenta las eliminaciones que fallaron antes (PendingDriveDeletion)
+            dry_run: Solo cuenta los mensajes que se borrarían
+            max_seconds: Se detiene después del lote que supere este tiempo (la
+                ejecución siguiente continúa donde quedó)
+            progress: Se llama después de cada lote con las estadísticas parciales
+
+        Returns:
+            Dict con recipients, messages, archived (mensajes de archivos de la capa
+            fría eliminados), attachments, drive_files, drive_errors, seconds, rate
+            (mensajes por segundo sin contar las pausas) y complete
+        """
+        batch_size = batch_size or getattr(settings, 'PURGE_BATCH_SIZE', 1000)
+        sleep = getattr(settings, 'PURGE_SLEEP_SECONDS', 0.2) if sleep is None else sleep
+        now = now or timezone.now()
+
+        stats: Dict[str, Any] = {
+            'recipients': 0, 'messages': 0, 'archived': 0, 'attachments': 0, 'drive_files': 0, 'drive_errors': 0,
+            'seconds': 0.0, 'rate': 0.0, 'complete': True,
+        }
+        started = time.perf_counter()
+        working = 0.0  # Tiempo borrando, sin las pausas entre lotes
+        if drive_files and not dry_run:
+            self.retry_drive_deletions(stats)
+
+        for recipient in self.recipients_due(source_names, recipient_ids):
+            cutoff = now - timedelta(days=recipient['days'])
+            expired = Message.objects.filter(  # type: ignore
+                recipient_id=recipient['id'], created_at__lt=cutoff
+            )
+            if dry_run:
+                count = expired.count() + self.archive_service.count_expired(recipient['id'], cutoff)
+                if count:
+                    stats['recipients'] += 1
+                    stats['messages'] += count
+                continue
+
+            deleted = 0
+            last = None
+            while True:
+                batch_started = time.perf_counter()
+                # El lote empieza en el último created_at borrado: sin eso cada consulta
+                # volvería a recorrer en el índice las filas muertas de los lotes anteriores
+                batch = expired.filter(created_at__gte=last) if last is not None else expired
+                keys = list(batch.order_by('created_at', 'id').values_list('created_at', 'id')[:batch_size])
+                if not keys:
+                    break
+                last = keys[-1][0]
+                drive_ids = self._delete_batch(recipient['id'], keys, drive_files, stats)
+                if drive_ids:
+                    self._delete_drive_files(drive_ids, stats)
+
+                deleted += len(keys)
+                stats['messages'] += len(keys)
+                working += time.perf_counter() - batch_started
+                stats['seconds'] = time.perf_counter() - started
+                stats['rate'] = stats['messages'] / working if working else 0.0
+                if progress is not None:
+                    progress(stats)
+
+                if max_seconds is not None and stats['seconds'] >= max_seconds:
+                    stats['complete'] = False
+                    break
+                if len(keys) < batch_size:
+                    break
+                if sleep:
+                    time.sleep(sleep)
+
+            # Los archivos de la capa fría se eliminan completos cuando todas sus ideas vencieron
+            archived, drive_ids = self.archive_service.delete_archives(recipient['id'], cutoff)
+            stats['archived'] += archived
+            deleted += archived
+            if drive_files and drive_ids:
+                self._delete_drive_files(drive_ids, stats)
+
+            if deleted:
+                stats['recipients'] += 1
+                self.recipient_selector.refresh_counters([recipient['id']])
+                logger.info(f"Retención: {deleted} mensajes borrados del destinatario {recipient['id']} "
+                            f"(anteriores a {cutoff:%Y-%m-%d})")
+            if not stats['complete']:
+                break
+
+        stats['seconds'] = time.perf_counter() - started
+        return stats
+
+    def _delete_batch(self, recipient_id: int, keys: List[tuple], drive_files: bool,
+                      stats: Dict[str, Any]) -> Set[str]:
+        """
+        Borra un lote de mensajes con sus adjuntos y transferencias
+
+        Returns:
+            IDs de Drive de los adjuntos borrados y de sus originales (si drive_files)
+        """
+        drive_ids: Set[str] = set()
+        with transaction.atomic():
+            if drive_files:
+                for drive_id, original_id in Attachment.objects.filter(  # type: ignore
+                    message_id__in=[message_id for _, message_id in keys], google_drive_id__isnull=False
+                ).values_list('google_drive_id', 'original_google_drive_id'):
+                    drive_ids.add(drive_id)
+                    if original_id:
+                        drive_ids.add(original_id)
+            stats['attachments'] += self.selector.delete_messages(recipient_id, keys)
+        return drive_ids
+
+    def delete_drive_files(self, drive_ids: Iterable[str]) -> Dict[str, int]:
+        """
+        Elimina de Drive los archivos de adjuntos borrados fuera de purge (ej: particiones eliminadas)
+
+        Returns:
+            Dict con drive_files (eliminados) y drive_errors
+        """
+        stats = {'drive_files': 0, 'drive_errors': 0}
+        drive_ids = set(drive_ids)
+        if drive_ids:
+            self._delete_drive_files(drive_ids, stats)
+        return stats
+
+    def _delete_drive_files(self, drive_ids: Set[str], stats: Dict[str, Any]) -> None:
+        """
+        Elimina de Drive los archivos que ya no usa ningún adjunto
+
+        Con la deduplicación varios adjuntos comparten un archivo: se conserva
+        mientras otro adjunto lo use, también los adjuntos de los archivos de la
+        capa fría (ArchivedDriveFile). Sus hashes se bloquean y se vuelve a revisar
+        el uso antes de borrarlos: una transferencia que reutiliza el archivo
+        bloquea el mismo hash al asociarlo (ver MediaTransferService), así que o
+        bien ya lo asoció y el archivo se conserva, o bien encuentra el hash
+        borrado y sube el archivo de nuevo. En la misma transacción los huérfanos
+        quedan en PendingDriveDeletion hasta que Drive confirma la eliminación.
+        """
+        candidates = drive_ids - self._drive_ids_in_use(drive_ids)
+        if not candidates:
+            return
+        with transaction.atomic():
+            list(MediaHash.objects.select_for_update().filter(  # type: ignore
+                Q(google_drive_id__in=candidates) | Q(original_google_drive_id__in=candidates)
+            ).values_list('pk', flat=True))
+            orphans = candidates - self._drive_ids_in_use(candidates)
+            MediaHash.objects.filter(  # type: ignore
+                Q(google_drive_id__in=orphans) | Q(original_google_drive_id__in=orphans)
+            ).delete()
+            PendingDriveDeletion.objects.bulk_create(  # type: ignore
+                [PendingDriveDeletion(google_drive_id=drive_id) for drive_id in orphans],
+                ignore_conflicts=True
+            )
+        if orphans:
+            self._delete_pending(orphans, stats)
+
+    def retry_drive_deletions(self, stats: Dict[str, Any], limit: int = 1000) -> None:
+        """Reintenta las eliminaciones de Drive que fallaron en ejecuciones anteriores"""
+        drive_ids = set(PendingDriveDeletion.objects.order_by('created_at').values_list(  # type: ignore
+            'google_drive_id', flat=True
+        )[:limit])
+        if not drive_ids:
+            return
+        # Sin hash no se reutilizan, pero se revisa igual antes de borrarlos
+        in_use = self._drive_ids_in_use(drive_ids)
+        PendingDriveDeletion.objects.filter(google_drive_id__in=in_use).delete()  # type: ignore
+        if drive_ids - in_use:
+            self._delete_pending(drive_ids - in_use, stats)
+
+    def _delete_pending(self, drive_ids: Set[str], stats: Dict[str, Any]) -> None:
+        """Elimina de Drive archivos registrados en PendingDriveDeletion; los que fallan quedan para reintentar"""
+        if self._drive_service is None:
+            from apps.memory_agent.services.google_drive_service import GoogleDriveService
+            self._drive_service = GoogleDriveService()
+        deleted = set()
+        for drive_id in drive_ids:
+            if self._drive_service.delete_file(drive_id):
+                deleted.add(drive_id)
+                stats['drive_files'] += 1
+            else:
+                stats['drive_errors'] += 1
+        PendingDriveDeletion.objects.filter(google_drive_id__in=deleted).delete()  # type: ignore
+        PendingDriveDeletion.objects.filter(  # type: ignore
+            google_drive_id__in=drive_ids - deleted
+        ).update(attempts=F('attempts') + 1)
+
+    @staticmethod
+    def _drive_ids_in_use(drive_ids: Set[str]) -> Set[str]:
+        """IDs de Drive que todavía usa un adjunto o su original (tabla, capa fría o partición separada)"""
+        in_use = set(Attachment.objects.filter(  # type: ignore
+            google_drive_id__in=drive_ids
+        ).values_list('google_drive_id', flat=True))
+        in_use.update(Attachment.objects.filter(  # type: ignore
+            original_google_drive_id__in=drive_ids
+        ).values_list('original_google_drive_id', flat=True))
+        in_use.update(ArchivedDriveFile.objects.filter(  # type: ignore
+            google_drive_id__in=drive_ids
+        ).values_list('google_drive_id', flat=True))
+        in_use.update(DetachedDriveFile.objects.filter(  # type: ignore
+            google_drive_id__in=drive_ids
+        ).values_list('google_drive_id', flat=True))
+        return in_use
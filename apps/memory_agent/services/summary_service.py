@@ -1,5 +1,13 @@
-from typing import List
+from collections import Counter
+from typing import List, Optional
+from django.conf import settings
+from apps.memory_agent.classifiers import get_theme_classifier
 from apps.memory_agent.selectors.message_selector import MessageSelector
+from apps.memory_agent.selectors.recipient_selector import RecipientSelector
+from apps.memory_agent.services.archive_service import MessageArchiveService
+
+# Resultados de /buscar
+SEARCH_LIMIT = 10
 
 
 class SummaryService:
@@ -7,16 +15,44 @@ class SummaryService:
     
     def __init__(self):
         self.selector = MessageSelector()
+        self.recipient_selector = RecipientSelector()
+        self.archive_service = MessageArchiveService()
     
-    def generate_summary(self, recipient: str, period: str) -> str:
-        """Genera un resumen estructurado de las ideas del usuario"""
-        messages = self.selector.get_messages_by_recipient(recipient, period)
+    def generate_summary(self, recipient_id: Optional[int], period: str) -> str:
+        """
+        Genera un resumen estructurado de las ideas del usuario
+
+        Para el período completo el total sale del contador del destinatario (incluye
+        las ideas archivadas) y los temas se arman con las SUMMARY_MAX_MESSAGES ideas
+        más recientes; si la tabla tiene menos, se suman los temas de las archivadas
+        desde las estadísticas de MessageArchive (sin leer los archivos).
+        """
+        total = None
+        limit = None
+        if recipient_id is not None and period == 'all':
+            recipient = self.recipient_selector.get_recipient(recipient_id)
+            total = recipient.message_count if recipient else 0
+            limit = getattr(settings, 'SUMMARY_MAX_MESSAGES', 500)
         
-        if not messages:
+        if recipient_id is None or total == 0:
+            return f"No hay ideas registradas para el período: {period}"
+        
+        messages = self.selector.get_messages_by_recipient(recipient_id, period, limit=limit)
+        archived: Counter = Counter()
+        if limit is not None:
+            messages = list(messages)
+            # El contador incluye las archivadas: sin archivos no se consulta nada más
+            if len(messages) < min(limit, total or 0):
+                archived = self.archive_service.theme_counts(recipient_id)
+        
+        if not messages and not archived:
             return f"No hay ideas registradas para el período: {period}"
         
         # Organizar por temas
         themes = self._organize_by_themes(messages)
+        # Temas que solo tienen ideas archivadas, de más a menos ideas
+        for theme, _ in archived.most_common():
+            themes.setdefault(theme, [])
         
         # Construir resumen
         summary = f"📑 **Resumen de Ideas ({period})**\n\n"
@@ -25,19 +61,25 @@ class SummaryService:
             summary += f"**{theme}:**\n"
             for idea in ideas[:3]:  # Máximo 3 ideas por tema
                 summary += f"- {idea}\n"
+            if archived.get(theme):
+                summary += f"- _{archived[theme]} ideas archivadas_\n"
             summary += "\n"
         
-        summary += f"**Total de ideas:** {len(messages)}\n"
+        summary += f"**Total de ideas:** {total if total is not None else len(messages)}\n"
         summary += f"**Período:** {period}"
         
         return summary
     
-    def search_messages(self, recipient: str, search_term: str) -> str:
+    def search_messages(self, recipient_id: Optional[int], search_term: str) -> str:
         """Busca mensajes que contengan el término de búsqueda"""
         if not search_term:
             return "Por favor proporciona un término de búsqueda."
         
-        messages = self.selector.search_messages(recipient, search_term)
+        messages = list(self.selector.search_messages(recipient_id, search_term, limit=SEARCH_LIMIT)) if recipient_id is not None else []
+        if recipient_id is not None and len(messages) < SEARCH_LIMIT:
+            # Las ideas archivadas son más antiguas: se buscan solo si faltan resultados
+            # (en los archivos más recientes, ver MESSAGE_ARCHIVE_SEARCH_MAX_FILES)
+            messages += self.archive_service.search_messages(recipient_id, search_term, SEARCH_LIMIT - len(messages))
         
         if not messages:
             return f"No se encontraron ideas relacionadas con '{search_term}'."
@@ -45,7 +87,7 @@ class SummaryService:
         result = f"🔍 **Resultados para '{search_term}':**\n\n"
         
         for message in messages:
-            result += f"- {message.content[:100]}{'...' if len(message.content) > 100 else ''}\n"  # type: ignore
+            result += f"- {message.preview}\n"  # type: ignore
             result += f"  *{message.created_at.strftime('%d/%m/%Y %H:%M')}*\n\n"  # type: ignore
         
         return result
@@ -53,29 +95,16 @@ class SummaryService:
     def _organize_by_themes(self, messages: List) -> dict:
         """Organiza los mensajes por temas"""
         themes = {}
+        classifier = get_theme_classifier()
         
         for message in messages:
-            content_lower = message.content.lower()  # type: ignore
-            
-            # Clasificación por palabras clave
-            if any(word in content_lower for word in ['trabajo', 'proyecto', 'oficina', 'empresa']):
-                theme = 'Trabajo'
-            elif any(word in content_lower for word in ['personal', 'familia', 'amigos', 'casa']):
-                theme = 'Personal'
-            elif any(word in content_lower for word in ['idea', 'invento', 'crear', 'innovar']):
-                theme = 'Ideas'
-            elif any(word in content_lower for word in ['estudio', 'aprender', 'curso', 'libro']):
-                theme = 'Educación'
-            elif any(word in content_lower for word in ['salud', 'ejercicio', 'dieta', 'médico']):
-                theme = 'Salud'
-            else:
-                theme = 'General'
+            # Tema guardado al recibir la idea; si falta, clasificación por palabras clave
+            theme = message.theme or classifier.classify(message.content)  # type: ignore
             
             if theme not in themes:
                 themes[theme] = []
             
-            # Truncar contenido si es muy largo
-            content = message.content[:100] + '...' if len(message.content) > 100 else message.content
-            themes[theme].append(content)
+            # Los contenidos comprimidos traen su vista previa guardada: no se descomprimen
+            themes[theme].append(message.preview)  # type: ignore
         
         return themes
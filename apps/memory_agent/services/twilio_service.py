@@ -1,14 +1,26 @@
-from twilio.rest import Client
-from twilio.base.exceptions import TwilioException
 from django.conf import settings
 import logging
-from typing import Optional
+import threading
+from typing import Any, Dict, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Clientes de Twilio por credenciales, reutilizados entre peticiones del proceso
+_clients: Dict[Tuple[str, str], Any] = {}
+_clients_lock = threading.Lock()
+
 
 class TwilioService:
-    """Servicio para manejar comunicación con Twilio"""
+    """
+    Servicio para manejar comunicación con Twilio
+    
+    El SDK de Twilio se importa al crear el servicio y no al importar el módulo:
+    arrastra requests/aiohttp (~120 ms y varios MB por proceso) y solo se usa al
+    enviar respuestas.
+    
+    El cliente se reutiliza por credenciales (ver get_client): su sesión HTTP
+    mantiene la conexión TLS con la API abierta entre respuestas.
+    """
     
     def __init__(self, account_sid: str, auth_token: str):
         """
@@ -18,9 +30,28 @@ class TwilioService:
             account_sid: Account SID de Twilio
             auth_token: Auth Token de Twilio
         """
-        self.client = Client(account_sid, auth_token)
+        self.client = self.get_client(account_sid, auth_token)
         self.account_sid = account_sid
     
+    @staticmethod
+    def get_client(account_sid: str, auth_token: str):
+        """Cliente de Twilio del proceso para estas credenciales (se crea en el primer uso)"""
+        key = (account_sid, auth_token)
+        client = _clients.get(key)
+        if client is None:
+            from twilio.rest import Client
+            
+            with _clients_lock:
+                client = _clients.get(key)
+                if client is None:
+                    client = _clients[key] = Client(account_sid, auth_token)
+        return client
+    
+    @staticmethod
+    def clear_clients() -> None:
+        with _clients_lock:
+            _clients.clear()
+    
     def send_whatsapp_message(self, to: str, message: str, from_number: Optional[str] = None) -> bool:
         """
         Envía un mensaje de WhatsApp
@@ -33,6 +64,8 @@ class TwilioService:
         Returns:
             bool: True si se envió correctamente, False en caso contrario
         """
+        from twilio.base.exceptions import TwilioException
+        
         try:
             # Si no se especifica número de origen, usar el sandbox
             if not from_number:
@@ -72,6 +105,8 @@ class TwilioService:
         Returns:
             dict: Información del estado del mensaje
         """
+        from twilio.base.exceptions import TwilioException
+        
         try:
             message = self.client.messages(message_sid).fetch()
             return {
@@ -0,0 +1,304 @@
+import time
+import uuid
+import random
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'memory_agent:drive_upload'
+
+# Elimina esperas/leases vencidos y concede el slot si el token está entre los
+# primeros `free` de la cola de espera (ordenada por prioridad)
+ACQUIRE_SCRIPT = """
+local inflight, waiting, heartbeat, limit_key = KEYS[1], KEYS[2], KEYS[3], KEYS[4]
+local token, score, now = ARGV[1], tonumber(ARGV[2]), tonumber(ARGV[3])
+local lease_until, stale_before, default_limit = ARGV[4], tonumber(ARGV[5]), ARGV[6]
+
+redis.call('ZREMRANGEBYSCORE', inflight, '-inf', now)
+local stale = redis.call('ZRANGEBYSCORE', heartbeat, '-inf', stale_before)
+for _, stale_token in ipairs(stale) do
+    redis.call('ZREM', waiting, stale_token)
+    redis.call('ZREM', heartbeat, stale_token)
+end
+
+redis.call('ZADD', waiting, 'NX', score, token)
+redis.call('ZADD', heartbeat, now, token)
+
+local limit = math.floor(tonumber(redis.call('GET', limit_key) or default_limit))
+local free = limit - redis.call('ZCARD', inflight)
+if free <= 0 then
+    return 0
+end
+
+local rank = redis.call('ZRANK', waiting, token)
+if rank == false or rank >= free then
+    return 0
+end
+
+redis.call('ZREM', waiting, token)
+redis.call('ZREM', heartbeat, token)
+redis.call('ZADD', inflight, lease_until, token)
+return 1
+"""
+
+# Ajuste AIMD del límite: incremento aditivo (1/limit por subida rápida),
+# decremento multiplicativo ante throttling o latencia alta
+ADJUST_SCRIPT = """
+local limit_key = KEYS[1]
+local factor, increase = tonumber(ARGV[1]), tonumber(ARGV[2])
+local min_limit, max_limit, default_limit = tonumber(ARGV[3]), tonumber(ARGV[4]), ARGV[5]
+
+local limit = tonumber(redis.call('GET', limit_key) or default_limit)
+if increase > 0 then
+    limit = limit + increase / limit
+else
+    limit = limit * factor
+end
+limit = math.max(min_limit, math.min(max_limit, limit))
+redis.call('SET', limit_key, tostring(limit))
+return tostring(limit)
+"""
+
+
+class UploadSlot:
+    """Resultado de una subida, informado al scheduler al liberar el slot"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.throttled = False
+
+    def mark_throttled(self):
+        """Marca que Drive respondió con 429 / rateLimitExceeded"""
+        self.throttled = True
+
+
+class _LocalBackend:
+    """Estado del scheduler en memoria (un solo proceso, sin Redis)"""
+
+    def __init__(self, initial_limit: float):
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, float] = {}
+        self._waiting: Dict[str, float] = {}
+        self._limit = initial_limit
+
+    def try_acquire(self, token: str, score: float, now: float, lease_until: float) -> bool:
+        with self._lock:
+            self._inflight = {t: exp for t, exp in self._inflight.items() if exp > now}
+            self._waiting.setdefault(token, score)
+
+            free = int(self._limit) - len(self._inflight)
+            if free <= 0:
+                return False
+
+            queue = sorted(self._waiting, key=self._waiting.__getitem__)
+            if queue.index(token) >= free:
+                return False
+
+            del self._waiting[token]
+            self._inflight[token] = lease_until
+            return True
+
+    def release(self, token: str):
+        with self._lock:
+            self._inflight.pop(token, None)
+            self._waiting.pop(token, None)
+
+    def adjust(self, factor: float, increase: float, min_limit: float, max_limit: float) -> float:
+        with self._lock:
+            if increase > 0:
+                self._limit = self._limit + increase / self._limit
+            else:
+                self._limit = self._limit * factor
+            self._limit = max(min_limit, min(max_limit, self._limit))
+            return self._limit
+
+    def get_limit(self) -> float:
+        return self._limit
+
+
+class _RedisBackend:
+    """Estado del scheduler compartido entre workers a través de Redis"""
+
+    def __init__(self, redis_url: str, initial_limit: float):
+        import redis
+
+        self.client = redis.Redis.from_url(redis_url)
+        self.initial_limit = initial_limit
+        self.keys = {
+            'inflight': f'{KEY_PREFIX}:inflight',
+            'waiting': f'{KEY_PREFIX}:waiting',
+            'heartbeat': f'{KEY_PREFIX}:heartbeat',
+            'limit': f'{KEY_PREFIX}:limit',
+        }
+        self._acquire = self.client.register_script(ACQUIRE_SCRIPT)
+        self._adjust = self.client.register_script(ADJUST_SCRIPT)
+
+    def try_acquire(self, token: str, score: float, now: float, lease_until: float) -> bool:
+        granted = self._acquire(
+            keys=[self.keys['inflight'], self.keys['waiting'], self.keys['heartbeat'], self.keys['limit']],
+            args=[token, score, now, lease_until, now - 30, self.initial_limit]
+        )
+        return bool(granted)
+
+    def release(self, token: str):
+        pipe = self.client.pipeline()
+        pipe.zrem(self.keys['inflight'], token)
+        pipe.zrem(self.keys['waiting'], token)
+        pipe.zrem(self.keys['heartbeat'], token)
+        pipe.execute()
+
+    def adjust(self, factor: float, increase: float, min_limit: float, max_limit: float) -> float:
+        limit = self._adjust(
+            keys=[self.keys['limit']],
+            args=[factor, increase, min_limit, max_limit, self.initial_limit]
+        )
+        return float(limit)
+
+    def get_limit(self) -> float:
+        value = self.client.get(self.keys['limit'])
+        return float(value) if value else self.initial_limit
+
+
+class DriveUploadScheduler:
+    """
+    Limita las peticiones concurrentes a Google Drive con concurrencia adaptativa (AIMD)
+
+    El límite sube de forma aditiva mientras las subidas son rápidas y baja de forma
+    multiplicativa ante respuestas de throttling (403 rateLimitExceeded / 429) o
+    latencia alta. Con REDIS_URL el límite y los slots se comparten entre workers.
+    Los archivos pequeños tienen prioridad: cada archivo espera como si hubiera
+    llegado `size / DRIVE_UPLOAD_PRIORITY_BYTES_PER_SECOND` segundos más tarde.
+    """
+
+    def __init__(self, redis_url: Optional[str] = None):
+        self.min_limit = float(getattr(settings, 'DRIVE_UPLOAD_MIN_CONCURRENCY', 1))
+        self.max_limit = float(getattr(settings, 'DRIVE_UPLOAD_MAX_CONCURRENCY', 16))
+        self.initial_limit = float(getattr(settings, 'DRIVE_UPLOAD_INITIAL_CONCURRENCY', 4))
+        self.latency_target = getattr(settings, 'DRIVE_UPLOAD_LATENCY_TARGET', 2.0)
+        self.acquire_timeout = getattr(settings, 'DRIVE_UPLOAD_ACQUIRE_TIMEOUT', 300)
+        self.lease_seconds = getattr(settings, 'DRIVE_UPLOAD_LEASE_SECONDS', 900)
+        self.priority_rate = getattr(settings, 'DRIVE_UPLOAD_PRIORITY_BYTES_PER_SECOND', 1024 * 1024)
+
+        redis_url = redis_url if redis_url is not None else getattr(settings, 'REDIS_URL', '')
+        self.local = _LocalBackend(self.initial_limit)
+        self.backend = _RedisBackend(redis_url, self.initial_limit) if redis_url else self.local
+        # Backend que concedió cada slot: se libera en el mismo aunque Redis vuelva o se caiga
+        self._granted: Dict[str, Any] = {}
+        self._granted_lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, size: int) -> Iterator[UploadSlot]:
+        """
+        Reserva un slot de subida durante el bloque
+
+        Args:
+            size: Tamaño del archivo en bytes (define la prioridad)
+
+        Raises:
+            TimeoutError: Si no se obtiene un slot en DRIVE_UPLOAD_ACQUIRE_TIMEOUT segundos
+        """
+        token = self.acquire(size)
+        upload_slot = UploadSlot(size)
+        started = time.monotonic()
+        try:
+            yield upload_slot
+        finally:
+            self.release(token)
+            self.record(upload_slot, time.monotonic() - started)
+
+    def acquire(self, size: int) -> str:
+        """Espera un slot libre respetando la prioridad por tamaño"""
+        token = uuid.uuid4().hex
+        score = time.time() + size / self.priority_rate
+        deadline = time.monotonic() + self.acquire_timeout
+        delay = 0.02
+        # Si Redis se cae (o vuelve) durante la espera, el token queda en la cola de ambos
+        backends = set()
+
+        while True:
+            now = time.time()
+            granted, backend = self._dispatch('try_acquire', token, score, now, now + self.lease_seconds)
+            backends.add(backend)
+            if granted:
+                for other in backends - {backend}:
+                    self._release_on(other, token)
+                with self._granted_lock:
+                    self._granted[token] = backend
+                return token
+
+            if time.monotonic() >= deadline:
+                for backend in backends:
+                    self._release_on(backend, token)
+                raise TimeoutError("No hay capacidad de subida disponible en Google Drive")
+
+            time.sleep(delay * random.uniform(0.5, 1.5))
+            delay = min(delay * 2, 0.5)
+
+    def release(self, token: str):
+        """Libera un slot de subida en el backend que lo concedió"""
+        with self._granted_lock:
+            backend = self._granted.pop(token, None)
+        if backend is None:
+            self._call('release', token)
+        else:
+            self._release_on(backend, token)
+
+    def record(self, upload_slot: UploadSlot, latency: float) -> float:
+        """
+        Ajusta el límite según el resultado de la subida
+
+        La latencia se normaliza por MiB (mínimo 1 MiB) para no penalizar archivos grandes.
+        """
+        seconds_per_mib = latency / max(upload_slot.size / (1024 * 1024), 1)
+
+        if upload_slot.throttled:
+            limit = self._call('adjust', 0.5, 0, self.min_limit, self.max_limit)
+            logger.warning(f"Throttling de Google Drive, concurrencia reducida a {limit:.2f}")
+        elif seconds_per_mib > self.latency_target:
+            limit = self._call('adjust', 0.9, 0, self.min_limit, self.max_limit)
+        else:
+            limit = self._call('adjust', 1.0, 1, self.min_limit, self.max_limit)
+
+        return limit
+
+    def get_limit(self) -> float:
+        """Límite de concurrencia actual"""
+        return self._call('get_limit')
+
+    def _call(self, method: str, *args):
+        """Ejecuta la operación en Redis; si no está disponible usa el estado local"""
+        return self._dispatch(method, *args)[0]
+
+    def _dispatch(self, method: str, *args) -> Tuple[Any, Any]:
+        """Como _call, pero retorna también el backend que ejecutó la operación"""
+        if self.backend is not self.local:
+            try:
+                return getattr(self.backend, method)(*args), self.backend
+            except Exception as e:
+                logger.warning(f"Redis no disponible para el scheduler de subidas: {str(e)}")
+        return getattr(self.local, method)(*args), self.local
+
+    def _release_on(self, backend, token: str):
+        """Libera el token en un backend dado; en Redis, si falla, el lease vence solo"""
+        try:
+            backend.release(token)
+        except Exception as e:
+            logger.warning(f"No se pudo liberar el slot de subida {token}: {str(e)}")
+
+
+_scheduler: Optional[DriveUploadScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_upload_scheduler() -> DriveUploadScheduler:
+    """Retorna el scheduler de subidas del proceso"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = DriveUploadScheduler()
+    return _scheduler
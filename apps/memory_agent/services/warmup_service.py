@@ -0,0 +1,83 @@
+import time
+import logging
+from contextlib import contextmanager
+from typing import Dict, Iterator
+from django.db import close_old_connections
+
+from apps.memory_agent.classifiers import get_theme_classifier
+from apps.memory_agent.selectors.message_selector import MessageSelector
+from apps.memory_agent.strategies.message_strategies import MessageStrategyFactory, WhatsAppStrategy
+
+logger = logging.getLogger(__name__)
+
+
+class WarmupService:
+    """
+    Prepara un proceso web antes de que reciba tráfico
+
+    `preload` se ejecuta una vez en el proceso maestro de gunicorn (preload_app),
+    antes de crear los workers: lo que carga se comparte con ellos por
+    copy-on-write. No debe abrir conexiones (ni a la base de datos ni a
+    proveedores) porque no sobreviven al fork.
+
+    `warm_up` se ejecuta en cada worker antes de aceptar peticiones: llena la
+    caché de fuentes y crea los clientes de los proveedores.
+    """
+
+    def preload(self) -> Dict[str, float]:
+        """Importa el SDK de Twilio, resuelve las URLs y compila los clasificadores"""
+        steps: Dict[str, float] = {}
+
+        with self._step(steps, 'classifiers'):
+            get_theme_classifier()
+
+        with self._step(steps, 'urls'):
+            from django.urls import get_resolver
+            get_resolver().url_patterns
+
+        with self._step(steps, 'provider_sdks'):
+            import twilio.rest  # noqa: F401
+
+        logger.info(f"Precarga del proceso maestro completada en {sum(steps.values()):.1f} ms",
+                    extra={'steps_ms': steps})
+        return steps
+
+    def warm_up(self) -> Dict[str, float]:
+        """Carga las fuentes activas y los clientes de Twilio de cada fuente de WhatsApp"""
+        from apps.memory_agent.services.twilio_service import TwilioService
+
+        steps: Dict[str, float] = {}
+        try:
+            with self._step(steps, 'sources'):
+                sources = MessageSelector.prefetch_active_sources()
+
+            with self._step(steps, 'provider_clients'):
+                clients = 0
+                factory = MessageStrategyFactory()
+                for source in sources:
+                    try:
+                        strategy = factory.get_strategy(source)
+                    except ValueError:
+                        continue
+                    if isinstance(strategy, WhatsAppStrategy) and source.additional1 and source.additional2:  # type: ignore
+                        TwilioService.get_client(source.additional1, source.additional2)  # type: ignore
+                        clients += 1
+        except Exception as e:
+            # Un worker sin warm-up sigue funcionando: las cachés se llenan con las primeras peticiones
+            logger.warning(f"Warm-up incompleto: {str(e)}")
+            return steps
+        finally:
+            # La conexión se cierra o se conserva según CONN_MAX_AGE, como al final de una petición
+            close_old_connections()
+
+        logger.info(f"Warm-up del worker completado en {sum(steps.values()):.1f} ms "
+                    f"({len(sources)} fuentes, {clients} clientes de Twilio)", extra={'steps_ms': steps})
+        return steps
+
+    @contextmanager
+    def _step(self, steps: Dict[str, float], name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            steps[name] = round((time.perf_counter() - started) * 1000, 2)
@@ -0,0 +1,37 @@
+from django.core.signals import request_started
+from django.db import connections
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.memory_agent.db.routers import mark_write
+from apps.memory_agent.models import Message, Recipient, Source
+from apps.memory_agent.selectors.message_selector import MessageSelector
+from apps.memory_agent.selectors.recipient_selector import RecipientSelector
+
+
+@receiver(post_save, sender=Source)
+@receiver(post_delete, sender=Source)
+def clear_source_cache(sender, **kwargs):
+    """Una fuente modificada (credenciales, is_active) no debe seguir en la caché"""
+    MessageSelector.clear_source_cache()
+
+
+@receiver(post_delete, sender=Source)
+@receiver(post_delete, sender=Recipient)
+def clear_recipient_cache(sender, **kwargs):
+    """Un destinatario borrado no debe seguir en la caché de claves"""
+    RecipientSelector.clear_recipient_cache()
+
+
+@receiver(request_started)
+def track_connection_reuse(sender, **kwargs):
+    """Métricas de reutilización de las conexiones persistentes (backend con métricas)"""
+    for connection in connections.all(initialized_only=True):
+        if hasattr(connection, 'request_started'):
+            connection.request_started()
+
+
+@receiver(post_save, sender=Message)
+def track_recent_write(sender, instance, **kwargs):
+    """Las lecturas del destinatario van al primario mientras la réplica se pone al día"""
+    mark_write(str(instance.recipient_id))
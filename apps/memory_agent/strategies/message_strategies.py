@@ -1,7 +1,13 @@
+import logging
 from abc import ABC, abstractmethod
 from typing import Dict, Any
 from apps.memory_agent.models import Source
-from apps.memory_agent.services.twilio_service import TwilioService
+from apps.memory_agent.metrics import observe_stage, record_provider_error
+
+logger = logging.getLogger(__name__)
+
+# Máximo de archivos que Twilio adjunta a un mensaje de WhatsApp
+MAX_MEDIA_PER_MESSAGE = 10
 
 
 class MessageStrategy(ABC):
@@ -57,55 +63,69 @@ class WhatsAppStrategy(MessageStrategy):
     
     def send_response(self, recipient: str, message: str) -> bool:
         """Envía respuesta vía WhatsApp usando Twilio"""
-        try:
-            # Obtener credenciales de Twilio desde la fuente
-            account_sid = self.source.additional1  # type: ignore
-            auth_token = self.source.additional2  # type: ignore
-            
-            if not account_sid or not auth_token:
-                print(f"Error: Credenciales de Twilio no configuradas para {self.source.name}")
+        from apps.memory_agent.services.twilio_service import TwilioService
+        
+        with observe_stage('send_response'):
+            try:
+                # Obtener credenciales de Twilio desde la fuente
+                account_sid = self.source.additional1  # type: ignore
+                auth_token = self.source.additional2  # type: ignore
+                
+                if not account_sid or not auth_token:
+                    logger.error(f"Credenciales de Twilio no configuradas para {self.source.name}")
+                    record_provider_error('twilio', 'credentials', self.source.name)  # type: ignore
+                    return False
+                
+                # Crear servicio de Twilio
+                twilio_service = TwilioService(account_sid, auth_token)  # type: ignore
+                
+                # Enviar mensaje
+                success = twilio_service.send_whatsapp_message(recipient, message)
+                
+                if success:
+                    logger.info(f"Respuesta de WhatsApp enviada a {recipient}",
+                                extra={'recipient': recipient, 'content': message})
+                else:
+                    logger.warning(f"No se pudo enviar la respuesta de WhatsApp a {recipient}",
+                                   extra={'recipient': recipient})
+                    record_provider_error('twilio', 'send_message', self.source.name)  # type: ignore
+                
+                return success
+                
+            except Exception as e:
+                logger.exception(f"Error enviando respuesta de WhatsApp: {str(e)}")
+                record_provider_error('twilio', 'send_message', self.source.name)  # type: ignore
                 return False
-            
-            # Crear servicio de Twilio
-            twilio_service = TwilioService(account_sid, auth_token)  # type: ignore
-            
-            # Enviar mensaje
-            success = twilio_service.send_whatsapp_message(recipient, message)
-            
-            if success:
-                print(f"WhatsApp response sent to {recipient}: {message}")
-            else:
-                print(f"Failed to send WhatsApp response to {recipient}")
-            
-            return success
-            
-        except Exception as e:
-            print(f"Error sending WhatsApp response: {str(e)}")
-            return False
     
     def _extract_file_info(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        """Extrae información de archivos del webhook de WhatsApp"""
-        num_media = int(data.get('NumMedia', '0'))
+        """
+        Extrae información de archivos del webhook de WhatsApp
+
+        Twilio envía hasta 10 archivos por mensaje (MediaUrl0..N). Todos quedan en
+        `files`; los campos del primero se mantienen en el nivel superior.
+        """
+        num_media = min(int(data.get('NumMedia', '0')), MAX_MEDIA_PER_MESSAGE)
         
         if num_media == 0:
             return {}
         
-        # Obtener información del primer archivo (WhatsApp permite múltiples)
-        media_content_type = data.get('MediaContentType0', '')
-        media_url = data.get('MediaUrl0', '')
-        
-        # Determinar tipo de archivo
-        file_type = self._get_file_type(media_content_type)
-        
-        # Generar nombre de archivo
-        file_name = self._generate_filename(media_content_type, data.get('MessageSid', ''))
+        files = []
+        for index in range(num_media):
+            media_url = data.get(f'MediaUrl{index}', '')
+            if not media_url:
+                continue
+            media_content_type = data.get(f'MediaContentType{index}', '')
+            files.append({
+                'file_type': self._get_file_type(media_content_type),
+                'file_name': self._generate_filename(media_content_type, data.get('MessageSid', '')),
+                'file_url': media_url,
+                'file_content_type': media_content_type
+            })
+        
+        if not files:
+            return {}
         
-        return {
-            'file_type': file_type,
-            'file_name': file_name,
-            'file_url': media_url,
-            'file_content_type': media_content_type
-        }
+        return dict(files[0], files=files)
     
     def _get_file_type(self, content_type: str) -> str:
         """Determina el tipo de archivo basado en el content-type"""
@@ -180,8 +200,10 @@ class TelegramStrategy(MessageStrategy):
     def send_response(self, recipient: str, message: str) -> bool:
         """Envía respuesta vía Telegram (implementar con Bot API)"""
         # TODO: Implementar envío real con Telegram Bot API
-        print(f"Telegram response to {recipient}: {message}")
-        return True
+        with observe_stage('send_response'):
+            logger.info(f"Respuesta de Telegram para {recipient}",
+                        extra={'recipient': recipient, 'content': message})
+            return True
     
     def _detect_command(self, content: str) -> tuple[bool, str]:
         """Detecta si el mensaje es un comando especial"""
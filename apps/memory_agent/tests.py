@@ -1,3 +1,360 @@
-from django.test import TestCase
+import sys
+import json
+import time
+import logging
+from unittest import mock, skipUnless
+from urllib.parse import urlencode
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import OperationalError, connections
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from apps.memory_agent.benchmarks.fakes import FakeProviderServer, fake_providers
+from apps.memory_agent.benchmarks.payloads import SAMPLE_IDEAS, PayloadFactory
+from apps.memory_agent.db import routers
+from apps.memory_agent.db.routers import PRIMARY_DATABASE, REPLICA_DATABASE, ReplicaRouter, mark_write, read_database
+from apps.memory_agent.models import Message, Recipient, Source
+from apps.memory_agent.query_budget import query_budget, webhook_label
+from apps.memory_agent.selectors.message_selector import MessageSelector
+from apps.memory_agent.selectors.recipient_selector import RecipientSelector
+from apps.memory_agent.services.message_query_service import MessageQueryService
+from utils.logging import JsonFormatter, RedactionFilter
+
+
+class FakeConnection:
+    """Conexión con lo que usa el router: vendor, in_atomic_block y una consulta del retraso"""
+
+    def __init__(self, lag=0.0, error=None):
+        self.vendor = 'postgresql'
+        self.in_atomic_block = False
+        self.lag = lag
+        self.error = error
+        self.queries = 0
+        self.cursor = mock.MagicMock(side_effect=self._cursor)
+
+    def _cursor(self):
+        self.queries += 1
+        if self.error is not None:
+            raise self.error
+        cursor = mock.MagicMock()
+        cursor.__enter__.return_value.fetchone.return_value = (self.lag,)
+        return cursor
+
+
+class FailingWrites:
+    """Registro de escrituras recientes cuyo backend (Redis) no responde"""
+
+    def mark(self, recipient, seconds):
+        raise ConnectionError('redis caído')
+
+    def recent(self, recipient):
+        raise ConnectionError('redis caído')
+
+    def clear(self):
+        pass
+
+
+@override_settings(
+    REDIS_URL='',
+    REPLICA_READ_YOUR_WRITES_SECONDS=5,
+    REPLICA_MAX_LAG_SECONDS=5.0,
+    REPLICA_LAG_CHECK_INTERVAL=0,
+)
+class ReadDatabaseTests(SimpleTestCase):
+    """read_database(): cuándo una lectura va a la réplica y cuándo al primario"""
+
+    recipient = 'whatsapp:+5491155551234'
+
+    def setUp(self):
+        self.primary = FakeConnection()
+        self.replica = FakeConnection()
+        patches = [
+            mock.patch.object(routers, 'connections', {PRIMARY_DATABASE: self.primary, REPLICA_DATABASE: self.replica}),
+            mock.patch.object(routers, 'replica_configured', return_value=True),
+            mock.patch.object(routers, '_writes', None),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        routers.reset_replica_state()
+        self.addCleanup(routers.reset_replica_state)
+
+    def test_reads_from_replica_when_in_sync(self):
+        self.assertEqual(read_database(self.recipient), REPLICA_DATABASE)
+
+    def test_without_replica_reads_from_primary(self):
+        with mock.patch.object(routers, 'replica_configured', return_value=False):
+            self.assertEqual(read_database(self.recipient), PRIMARY_DATABASE)
+        self.assertEqual(self.replica.queries, 0)
+
+    def test_recent_write_reads_from_primary(self):
+        mark_write(self.recipient)
+
+        self.assertEqual(read_database(self.recipient), PRIMARY_DATABASE)
+        # Los demás destinatarios siguen leyendo de la réplica
+        self.assertEqual(read_database('whatsapp:+5491100000000'), REPLICA_DATABASE)
+        self.assertEqual(read_database(), REPLICA_DATABASE)
+
+    @override_settings(REPLICA_READ_YOUR_WRITES_SECONDS=0.05)
+    def test_recent_write_expires(self):
+        mark_write(self.recipient)
+        self.assertEqual(read_database(self.recipient), PRIMARY_DATABASE)
+
+        time.sleep(0.1)
+        self.assertEqual(read_database(self.recipient), REPLICA_DATABASE)
+
+    def test_unknown_recent_writes_read_from_primary(self):
+        # Sin el registro no se sabe si la réplica ya tiene la escritura
+        with mock.patch.object(routers, '_writes', FailingWrites()), \
+                self.assertLogs('apps.memory_agent.db.routers', 'WARNING'):
+            mark_write(self.recipient)
+            self.assertEqual(read_database(self.recipient), PRIMARY_DATABASE)
+
+    def test_lag_over_threshold_reads_from_primary(self):
+        self.replica.lag = 12.5
+        self.assertEqual(read_database(self.recipient), PRIMARY_DATABASE)
+
+        self.replica.lag = 5.0
+        self.assertEqual(read_database(self.recipient), REPLICA_DATABASE)
+
+    @override_settings(REPLICA_LAG_CHECK_INTERVAL=60)
+    def test_lag_is_checked_once_per_interval(self):
+        read_database()
+        read_database()
+        self.assertEqual(self.replica.queries, 1)
+
+    def test_unreachable_replica_reads_from_primary(self):
+        self.replica.error = OperationalError('could not connect to server')
+
+        with self.assertLogs('apps.memory_agent.db.routers', 'WARNING'):
+            self.assertEqual(read_database(self.recipient), PRIMARY_DATABASE)
+
+    @override_settings(REPLICA_LAG_CHECK_INTERVAL=60)
+    def test_unreachable_replica_is_not_retried_until_next_check(self):
+        self.replica.error = OperationalError('could not connect to server')
+
+        with self.assertLogs('apps.memory_agent.db.routers', 'WARNING'):
+            read_database()
+        self.replica.error = None
+        self.assertEqual(read_database(), PRIMARY_DATABASE)
+        self.assertEqual(self.replica.queries, 1)
+
+    def test_transaction_reads_from_primary(self):
+        self.primary.in_atomic_block = True
+
+        self.assertEqual(read_database(self.recipient), PRIMARY_DATABASE)
+        # Dentro de la transacción ni siquiera se consulta el retraso
+        self.assertEqual(self.replica.queries, 0)
+
+
+class ReplicaRouterTests(SimpleTestCase):
+    """ReplicaRouter: escrituras y migraciones solo en el primario"""
+
+    router = ReplicaRouter()
+
+    def test_writes_go_to_primary(self):
+        self.assertEqual(self.router.db_for_write(None), PRIMARY_DATABASE)
+
+    def test_reads_use_default_unless_read_database_is_used(self):
+        self.assertIsNone(self.router.db_for_read(None))
+
+    def test_migrations_skip_replica(self):
+        self.assertTrue(self.router.allow_migrate(PRIMARY_DATABASE, 'memory_agent'))
+        self.assertFalse(self.router.allow_migrate(REPLICA_DATABASE, 'memory_agent'))
+        self.assertFalse(self.router.allow_migrate(REPLICA_DATABASE, 'memory_agent', model_name='message'))
+
+
+@skipUnless(routers.replica_configured(), 'sin alias de réplica (ver core.test_settings)')
+@override_settings(REDIS_URL='', REPLICA_READ_YOUR_WRITES_SECONDS=5, REPLICA_LAG_CHECK_INTERVAL=0)
+class ReplicaReadTests(TransactionTestCase):
+    """
+    Selectores de lectura contra la réplica (alias espejo del primario en los tests)
+
+    Sin la transacción de TestCase: dentro de una transacción del primario
+    read_database() no usa la réplica.
+    """
+
+    # Sin réplica configurada el runner no debe crear ni validar el alias
+    databases = {PRIMARY_DATABASE, REPLICA_DATABASE} & set(settings.DATABASES)
+
+    def setUp(self):
+        source = Source.objects.create(name='whatsapp')
+        self.recipient = Recipient.objects.create(source=source, identifier='whatsapp:+5491155551234')
+        Message.objects.create(source=source, recipient=self.recipient, content='comprar pan')
+        routers.reset_replica_state()
+        self.addCleanup(routers.reset_replica_state)
+
+    def test_selectors_read_from_replica(self):
+        messages = MessageSelector.get_messages_by_recipient(self.recipient.id)
+        results = MessageSelector.search_messages(self.recipient.id, 'pan')
+
+        self.assertEqual(messages.db, REPLICA_DATABASE)
+        self.assertEqual(results.db, REPLICA_DATABASE)
+        with CaptureQueriesContext(connections[REPLICA_DATABASE]) as replica:
+            self.assertEqual([m.content for m in messages], ['comprar pan'])
+            self.assertEqual([m.content for m in results], ['comprar pan'])
+        self.assertEqual(len(replica), 2)
+
+    def test_selectors_read_from_primary_after_write(self):
+        mark_write(str(self.recipient.id))
+
+        self.assertEqual(MessageSelector.get_messages_by_recipient(self.recipient.id).db, PRIMARY_DATABASE)
+        self.assertEqual(MessageSelector.search_messages(self.recipient.id, 'pan').db, PRIMARY_DATABASE)
+
+
+@override_settings(REDIS_URL='')
+class QueryBudgetTests(TestCase):
+    """Consultas SQL de cada tipo de webhook y comando dentro de QUERY_BUDGETS"""
+
+    @classmethod
+    def setUpClass(cls):
+        # Twilio, Google Drive y las URLs de archivos del benchmark, sin latencia
+        server = FakeProviderServer()
+        server.start()
+        cls.addClassCleanup(server.stop)
+        cls.enterClassContext(fake_providers(server))
+        cls.factory = PayloadFactory(server.media_url, recipients=1)
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        whatsapp = Source.objects.create(name='WhatsApp', additional1='ACbenchmark', additional2='benchmark-token')
+        telegram = Source.objects.create(name='Telegram')
+        for source, identifier in [(whatsapp, f"whatsapp:{cls.factory.phone_numbers[0]}"),
+                                   (telegram, cls.factory.chat_ids[0])]:
+            recipient = Recipient.objects.create(source=source, identifier=identifier)
+            Message.objects.bulk_create([
+                Message(source=source, recipient=recipient, content=idea) for idea in SAMPLE_IDEAS
+            ])
+        RecipientSelector.refresh_counters()
+
+    def assertWithinBudget(self, label, payload, source_name='WhatsApp'):
+        # Peor caso: fuente y destinatario sin cachear en el proceso
+        MessageSelector.clear_source_cache()
+        RecipientSelector.clear_recipient_cache()
+        routers.reset_replica_state()
+        if source_name == 'Telegram':
+            body, content_type = json.dumps(payload), 'application/json'
+        else:
+            body, content_type = urlencode(payload), 'application/x-www-form-urlencoded'
+
+        # Los callbacks de on_commit también corren en la petición real
+        with query_budget(label), self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f"/api/v1/webhook/{source_name}/", data=body, content_type=content_type)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(webhook_label(response.data.get('result')), label)
+
+    def test_text(self):
+        self.assertWithinBudget('text', self.factory._twilio_base(SAMPLE_IDEAS[0]))
+        self.assertWithinBudget('text', self.factory._telegram_base(SAMPLE_IDEAS[0]), 'Telegram')
+
+    def test_media(self):
+        self.assertWithinBudget('media', self.factory.twilio_media())
+
+    def test_commands(self):
+        for command in ['/resumen', '/hoy', '/semana', '/buscar']:
+            with self.subTest(command=command):
+                text = '/buscar idea' if command == '/buscar' else command
+                self.assertWithinBudget(command, self.factory._twilio_base(text))
+                self.assertWithinBudget(command, self.factory._telegram_base(text), 'Telegram')
+
+
+@override_settings(MESSAGE_COMPRESSION_ENABLED=True, MESSAGE_COMPRESSION_MIN_BYTES=64)
+class CompressedContentTests(TestCase):
+    """Contenidos largos guardados en content_zstd"""
+
+    def setUp(self):
+        source = Source.objects.create(name='whatsapp')
+        recipient = Recipient.objects.create(source=source, identifier='whatsapp:+5491155551234')
+        self.message = Message.objects.create(source=source, recipient=recipient, content='idea corta')
+
+    def test_update_fields_content_saves_compressed_text(self):
+        text = ' '.join(SAMPLE_IDEAS)
+        self.message.content = text
+        self.message.save(update_fields=['content'])
+
+        stored = Message.objects.get(pk=self.message.pk)
+        self.assertIsNotNone(stored.content_zstd)
+        self.assertEqual(stored.content_preview, text[:len(stored.content_preview)])
+        self.assertEqual(stored.content, text)
+
+
+class MessageAdminTests(TestCase):
+    """Cambios de mensajes desde el admin y el ETag del listado de la API"""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'admin'))
+        self.source = Source.objects.create(name='whatsapp')
+        self.recipient = Recipient.objects.create(source=self.source, identifier='whatsapp:+5491155551234')
+        self.message = Message.objects.create(source=self.source, recipient=self.recipient, content='comprar pan')
+        RecipientSelector.refresh_counters()
+
+    def etag(self):
+        recipient = Recipient.objects.get(pk=self.recipient.pk)
+        return MessageQueryService().get_etag(recipient, '/api/v1/messages/')
+
+    def test_edit_changes_etag(self):
+        before = self.etag()
+        response = self.client.post(reverse('admin:memory_agent_message_change', args=[self.message.pk]), {
+            'content': 'comprar pan integral',
+            'source': self.source.pk,
+            'recipient': self.recipient.pk,
+            'attachments-TOTAL_FORMS': 0,
+            'attachments-INITIAL_FORMS': 0,
+        })
+
+        self.assertEqual(response.status_code, 302)
+        self.assertNotEqual(self.etag(), before)
+
+    def test_delete_changes_etag(self):
+        before = self.etag()
+        response = self.client.post(reverse('admin:memory_agent_message_delete', args=[self.message.pk]),
+                                    {'post': 'yes'})
+
+        self.assertEqual(response.status_code, 302)
+        self.assertNotEqual(self.etag(), before)
+        self.assertEqual(Recipient.objects.get(pk=self.recipient.pk).message_count, 0)
+
+
+class MetricsViewTests(SimpleTestCase):
+    """Acceso a /api/v1/metrics/"""
+
+    url = '/api/v1/metrics/'
+
+    @override_settings(METRICS_TOKEN='', DEBUG=False)
+    def test_without_token_is_closed_in_production(self):
+        with self.assertLogs('django.request', 'WARNING'):
+            self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    @override_settings(METRICS_TOKEN='', DEBUG=True)
+    def test_without_token_is_open_in_development(self):
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    @override_settings(METRICS_TOKEN='secreto', DEBUG=False)
+    def test_token_is_required(self):
+        with self.assertLogs('django.request', 'WARNING'):
+            self.assertEqual(self.client.get(self.url).status_code, 401)
+        response = self.client.get(self.url, HTTP_AUTHORIZATION='Bearer secreto')
+        self.assertEqual(response.status_code, 200)
+
+
+class RedactionFilterTests(SimpleTestCase):
+    """Datos personales fuera de los logs"""
+
+    def test_exception_text_is_masked(self):
+        try:
+            raise ValueError('chat 987654321 sin whatsapp:+5491155551234')
+        except ValueError:
+            record = logging.LogRecord('apps', logging.ERROR, __file__, 0, 'falló', (), sys.exc_info())
+        record.recipient = '987654321'
+
+        RedactionFilter().filter(record)
+        output = JsonFormatter().format(record)
+
+        self.assertIn('chat ***4321 sin whatsapp:***1234', output)
+        self.assertNotIn('987654321', output)
+        self.assertNotIn('5491155551234', output)
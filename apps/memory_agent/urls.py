@@ -1,5 +1,7 @@
 from django.urls import path
-from apps.memory_agent.views import AgentWebhookView, HealthCheckView
+from apps.memory_agent.views import (
+    AgentWebhookView, ChatImportView, HealthCheckView, MessageExportView, MessageListView, MetricsView
+)
 
 app_name = 'memory_agent'
 
@@ -8,6 +10,18 @@ urlpatterns = [
     # El source viene en el path: /api/v1/webhook/{source_name}/
     path('webhook/<str:source_name>/', AgentWebhookView.as_view(), name='webhook_receiver'),
     
+    # Ideas de un destinatario: ?source=WhatsApp&recipient=whatsapp:+57...&cursor=...
+    path('messages/', MessageListView.as_view(), name='message_list'),
+    
+    # Exportación completa en streaming: mismos filtros + export_format=ndjson|csv y gzip=true
+    path('messages/export/', MessageExportView.as_view(), name='message_export'),
+    
+    # Importación de un chat exportado de WhatsApp (multipart: file, source, recipient)
+    path('messages/import/', ChatImportView.as_view(), name='message_import'),
+    
     # Endpoint de salud
     path('health/', HealthCheckView.as_view(), name='health_check'),
+    
+    # Métricas en formato Prometheus
+    path('metrics/', MetricsView.as_view(), name='metrics'),
 ]
@@ -1,13 +1,25 @@
+import logging
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
 from django.utils import timezone
-from django.shortcuts import get_object_or_404
+from django.utils.http import parse_etags
+from prometheus_client import CONTENT_TYPE_LATEST
 
-from apps.memory_agent.serializers import WebhookSerializer
+from apps.memory_agent.pagination import MessageCursorPagination
+from apps.memory_agent.serializers import (
+    ChatImportSerializer, MessageExportQuerySerializer, MessageListQuerySerializer, MessageListSerializer, WebhookSerializer
+)
+from apps.memory_agent.services.chat_import_service import ChatImportService
+from apps.memory_agent.services.export_service import MessageExportService
+from apps.memory_agent.services.message_query_service import MessageQueryService
 from apps.memory_agent.services.message_service import MessageService
-from apps.memory_agent.models import Source
+from apps.memory_agent.metrics import metric_labels, observe_stage, render_metrics, set_source, stage_timings
+
+logger = logging.getLogger(__name__)
 
 
 class AgentWebhookView(APIView):
@@ -23,19 +35,41 @@ class AgentWebhookView(APIView):
     
     def post(self, request, source_name):
         """Procesa mensajes entrantes desde webhooks"""
-        # Validar que la fuente exista y esté activa
+        # La etiqueta source es 'unknown' hasta validar la fuente: las fuentes
+        # inexistentes (404) no crean series nuevas en las métricas
+        with metric_labels('unknown') as labels:
+            with observe_stage('webhook'):
+                response = self._process(request, source_name)
+            
+            logger.info(f"Webhook de {source_name} procesado", extra={
+                'source': labels['source'],
+                'message_type': labels['message_type'],
+                'status_code': response.status_code,
+                'stages_ms': stage_timings(),
+            })
+        return response
+    
+    def _process(self, request, source_name):
+        """Valida la fuente y los datos y delega el procesamiento al servicio"""
+        # Validar que la fuente exista y esté activa (caché de fuentes del proceso)
         try:
-            source = get_object_or_404(Source, name=source_name, is_active=True)
+            with observe_stage('source_check'):
+                source = self.message_service.selector.get_source_by_name(source_name)
         except Exception:
+            source = None
+        
+        if source is None:
             return Response({
                 'status': 'error',
                 'message': f"Source '{source_name}' not found or inactive"
             }, status=status.HTTP_404_NOT_FOUND)
+        set_source(source.name)  # type: ignore
         
-        serializer = WebhookSerializer(data=request.data)
-
+        with observe_stage('validate'):
+            serializer = WebhookSerializer(data=request.data)
+            is_valid = serializer.is_valid()
         
-        if not serializer.is_valid():
+        if not is_valid:
             return Response(
                 {'error': 'Invalid data', 'details': serializer.errors},
                 status=status.HTTP_400_BAD_REQUEST
@@ -45,7 +79,8 @@ class AgentWebhookView(APIView):
             # Delegar procesamiento al servicio
             result = self.message_service.process_message(
                 source_name=source_name,
-                data=serializer.validated_data['data']  # type: ignore
+                data=serializer.validated_data['data'],  # type: ignore
+                source=source
             )
             
             return Response({
@@ -68,6 +103,156 @@ class AgentWebhookView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class MessageListView(APIView):
+    """
+    Ideas de un destinatario paginadas por cursor (GET /api/v1/messages/)
+
+    Requiere API key. Responde 304 si el If-None-Match coincide con el ETag de la
+    página, que se calcula con la fila del destinatario sin leer sus mensajes.
+    """
+    
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.query_service = MessageQueryService()
+    
+    def get(self, request):
+        query = MessageListQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response(
+                {'error': 'Invalid parameters', 'details': query.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        params = query.validated_data
+        
+        recipient = self.query_service.get_recipient(params['source'], params['recipient'])  # type: ignore
+        if recipient is None:
+            return Response({
+                'status': 'error',
+                'message': f"Recipient '{params['recipient']}' not found in source '{params['source']}'"  # type: ignore
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        etag = self.query_service.get_etag(recipient, request.get_full_path())
+        headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+        if self._etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        
+        paginator = MessageCursorPagination()
+        page = paginator.paginate_queryset(
+            self.query_service.list_messages(
+                recipient,
+                since=params.get('since'),  # type: ignore
+                until=params.get('until'),  # type: ignore
+                theme=params.get('theme')  # type: ignore
+            ),
+            request,
+            view=self
+        )
+        response = paginator.get_paginated_response(MessageListSerializer(page, many=True).data)
+        for header, value in headers.items():
+            response[header] = value
+        return response
+    
+    def _etag_matches(self, request, etag: str) -> bool:
+        """Comparación débil (RFC 9110): se ignora el prefijo W/"""
+        header = request.META.get('HTTP_IF_NONE_MATCH')
+        if not header:
+            return False
+        if header.strip() == '*':
+            return True
+        return etag.removeprefix('W/') in {tag.removeprefix('W/') for tag in parse_etags(header)}
+
+
+class MessageExportView(APIView):
+    """
+    Exportación de todas las ideas de un destinatario (GET /api/v1/messages/export/)
+
+    Requiere API key. La respuesta se transmite por bloques mientras se lee el
+    cursor del servidor, sin cargar el historial completo en memoria.
+    """
+    
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.query_service = MessageQueryService()
+        self.export_service = MessageExportService()
+    
+    def get(self, request):
+        query = MessageExportQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response(
+                {'error': 'Invalid parameters', 'details': query.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        params = query.validated_data
+        
+        recipient = self.query_service.get_recipient(params['source'], params['recipient'])  # type: ignore
+        if recipient is None:
+            return Response({
+                'status': 'error',
+                'message': f"Recipient '{params['recipient']}' not found in source '{params['source']}'"  # type: ignore
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        export_format, compress = params['export_format'], params['gzip']  # type: ignore
+        response = StreamingHttpResponse(
+            self.export_service.export(
+                recipient,
+                export_format,
+                since=params.get('since'),  # type: ignore
+                until=params.get('until'),  # type: ignore
+                compress=compress
+            ),
+            content_type=self.export_service.content_type(export_format, compress)
+        )
+        filename = self.export_service.filename(recipient, export_format, compress)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response['Cache-Control'] = 'private, no-store'
+        # Evita que nginx acumule la respuesta completa antes de enviarla
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+class ChatImportView(APIView):
+    """
+    Importa un chat exportado de WhatsApp como ideas de un destinatario (POST /api/v1/messages/import/)
+
+    Requiere API key. El archivo se procesa en la petición (COPY en una transacción)
+    y la respuesta trae cuántos mensajes se importaron y omitieron.
+    """
+    
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.import_service = ChatImportService()
+    
+    def post(self, request):
+        serializer = ChatImportSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(
+                {'error': 'Invalid data', 'details': serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        params = serializer.validated_data
+        
+        source = self.import_service.selector.get_source_by_name(params['source'])  # type: ignore
+        if source is None:
+            return Response({
+                'status': 'error',
+                'message': f"Source '{params['source']}' not found or inactive"  # type: ignore
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        try:
+            result = self.import_service.import_whatsapp(
+                params['file'],  # type: ignore
+                source,
+                params['recipient'],  # type: ignore
+                sender=params.get('sender'),  # type: ignore
+                dayfirst=params.get('dayfirst'),  # type: ignore
+                tz=params.get('timezone')  # type: ignore
+            )
+        except ValueError as e:
+            return Response({'status': 'error', 'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({'status': 'success', 'result': result}, status=status.HTTP_201_CREATED)
+
+
 class HealthCheckView(APIView):
     """
     Vista para verificar el estado del servicio
@@ -82,3 +267,25 @@ class HealthCheckView(APIView):
             'timestamp': timezone.now().isoformat(),
             'version': '1.0.0'
         }, status=status.HTTP_200_OK)
+
+
+class MetricsView(APIView):
+    """
+    Vista que expone las métricas en formato Prometheus
+    
+    Exige el header `Authorization: Bearer <METRICS_TOKEN>`. Sin METRICS_TOKEN
+    solo responde con DEBUG (desarrollo); en producción queda cerrada.
+    """
+    permission_classes = [AllowAny]
+    authentication_classes = []
+    
+    def get(self, request):
+        """Métricas de latencia por etapa, errores de proveedores y profundidad del outbox"""
+        token = getattr(settings, 'METRICS_TOKEN', '')
+        if not token and not settings.DEBUG:
+            return Response({'error': 'Metrics disabled: METRICS_TOKEN is not set'},
+                            status=status.HTTP_403_FORBIDDEN)
+        if token and request.META.get('HTTP_AUTHORIZATION') != f"Bearer {token}":
+            return Response({'error': 'Unauthorized'}, status=status.HTTP_401_UNAUTHORIZED)
+        
+        return HttpResponse(render_metrics(), content_type=CONTENT_TYPE_LATEST)
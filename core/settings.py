@@ -21,12 +21,13 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # See https://docs.djangoproject.com/en/5.0/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = "django-insecure-8bp^1*m2p91d-x&g_!dm5__g%szh%q0fey&l!v1p6)gp9qd(^t"
+SECRET_KEY = os.getenv("SECRET_KEY", "django-insecure-8bp^1*m2p91d-x&g_!dm5__g%szh%q0fey&l!v1p6)gp9qd(^t")
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# Con DEBUG=True Django guarda en memoria cada consulta SQL de la petición
+DEBUG = os.getenv("DEBUG", "true").lower() == "true"
 
-ALLOWED_HOSTS = ["*"]
+ALLOWED_HOSTS = os.getenv("ALLOWED_HOSTS", "*").split(",")
 
 
 # Application definition
@@ -49,6 +50,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "apps.memory_agent.middleware.RequestIdMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -57,6 +59,8 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "apps.memory_agent.middleware.SamplingProfilerMiddleware",
+    "apps.memory_agent.middleware.QueryBudgetMiddleware",
 ]
 
 ROOT_URLCONF = "core.urls"
@@ -83,17 +87,89 @@ WSGI_APPLICATION = "core.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# Conexiones persistentes: cada hilo de un worker reutiliza su conexión durante
+# DB_CONN_MAX_AGE segundos y la valida al inicio de cada petición (health check).
+# Conexiones máximas por instancia = workers * hilos de gunicorn (ver DB_MAX_CONNECTIONS
+# en gunicorn.conf.py). runserver crea un hilo por petición, por eso en desarrollo es 0
+DB_CONN_MAX_AGE = int(os.getenv("DB_CONN_MAX_AGE", "0" if DEBUG else "300"))
+DB_CONN_HEALTH_CHECKS = os.getenv("DB_CONN_HEALTH_CHECKS", "true").lower() == "true"
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        # Backend de PostgreSQL de Django con métricas de conexiones
+        'ENGINE': 'apps.memory_agent.db.postgresql',
         'NAME': os.getenv("POSTGRES_DB", "echo_agent_db"),
         'USER': os.getenv("POSTGRES_USER", "postgres"),
         'PASSWORD': os.getenv("POSTGRES_PASSWORD", "postgres"),
         'HOST': os.getenv("POSTGRES_HOST", "jr_echo_agent_db"),
         'PORT': 5432,
+        'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': DB_CONN_HEALTH_CHECKS,
+        'OPTIONS': {
+            'connect_timeout': int(os.getenv("DB_CONNECT_TIMEOUT", "5")),
+            # Keepalives TCP: detectan conexiones persistentes cortadas por la red o un proxy
+            'keepalives': 1,
+            'keepalives_idle': 60,
+        },
     }
 }
 
+# Réplica de lectura (opcional): resúmenes, búsquedas, listados del admin y
+# exportaciones leen de ella (ver apps.memory_agent.db.routers). En los tests el
+# alias apunta a la base de datos de pruebas del primario (MIRROR)
+POSTGRES_REPLICA_HOST = os.getenv("POSTGRES_REPLICA_HOST", "")
+if POSTGRES_REPLICA_HOST:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': POSTGRES_REPLICA_HOST,
+        'PORT': int(os.getenv("POSTGRES_REPLICA_PORT", "5432")),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['apps.memory_agent.db.routers.ReplicaRouter']
+
+# Read-your-writes: segundos que las lecturas de un destinatario van al primario
+# después de que escribe (compartido entre workers con REDIS_URL)
+REPLICA_READ_YOUR_WRITES_SECONDS = float(os.getenv("REPLICA_READ_YOUR_WRITES_SECONDS", "5"))
+# Retraso máximo tolerado; con más retraso (o sin respuesta) se lee del primario
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+REPLICA_LAG_CHECK_INTERVAL = float(os.getenv("REPLICA_LAG_CHECK_INTERVAL", "2"))
+
+# Particiones mensuales de los mensajes (PostgreSQL, ver manage_message_partitions):
+# meses futuros creados por adelantado y meses completos conservados (0 = todos)
+MESSAGE_PARTITION_MONTHS_AHEAD = int(os.getenv("MESSAGE_PARTITION_MONTHS_AHEAD", "3"))
+MESSAGE_PARTITION_RETENTION_MONTHS = int(os.getenv("MESSAGE_PARTITION_RETENTION_MONTHS", "0"))
+
+# Retención por fuente o destinatario (purge_messages): días que se conservan las ideas
+# si la fuente y el destinatario no definen retention_days (0 = sin límite). Se borra en
+# lotes de PURGE_BATCH_SIZE mensajes con PURGE_SLEEP_SECONDS de pausa entre lotes
+MESSAGE_RETENTION_DAYS = int(os.getenv("MESSAGE_RETENTION_DAYS", "0"))
+PURGE_BATCH_SIZE = int(os.getenv("PURGE_BATCH_SIZE", "1000"))
+PURGE_SLEEP_SECONDS = float(os.getenv("PURGE_SLEEP_SECONDS", "0.2"))
+
+# Capa fría (archive_messages): los mensajes de meses anteriores a los últimos
+# MESSAGE_ARCHIVE_AFTER_MONTHS (0 = no se archiva) pasan a archivos Parquet por
+# destinatario y mes, de hasta MESSAGE_ARCHIVE_FILE_ROWS mensajes cada uno
+MESSAGE_ARCHIVE_AFTER_MONTHS = int(os.getenv("MESSAGE_ARCHIVE_AFTER_MONTHS", "0"))
+MESSAGE_ARCHIVE_FILE_ROWS = int(os.getenv("MESSAGE_ARCHIVE_FILE_ROWS", "200000"))
+MESSAGE_ARCHIVE_COMPRESSION_LEVEL = int(os.getenv("MESSAGE_ARCHIVE_COMPRESSION_LEVEL", "9"))  # zstd
+# /buscar lee como máximo estos archivos (los más recientes) cuando la tabla no alcanza
+MESSAGE_ARCHIVE_SEARCH_MAX_FILES = int(os.getenv("MESSAGE_ARCHIVE_SEARCH_MAX_FILES", "3"))
+# Disco local por defecto; para S3 o compatibles (MinIO, R2):
+# MESSAGE_ARCHIVE_BACKEND=storages.backends.s3.S3Storage, MESSAGE_ARCHIVE_BUCKET y
+# MESSAGE_ARCHIVE_ENDPOINT_URL (credenciales en AWS_ACCESS_KEY_ID / AWS_SECRET_ACCESS_KEY)
+MESSAGE_ARCHIVE_BACKEND = os.getenv("MESSAGE_ARCHIVE_BACKEND", "django.core.files.storage.FileSystemStorage")
+MESSAGE_ARCHIVE_LOCATION = os.getenv("MESSAGE_ARCHIVE_LOCATION", str(BASE_DIR / "archive"))
+MESSAGE_ARCHIVE_BUCKET = os.getenv("MESSAGE_ARCHIVE_BUCKET", "")
+MESSAGE_ARCHIVE_ENDPOINT_URL = os.getenv("MESSAGE_ARCHIVE_ENDPOINT_URL", "")
+
+# Compresión del contenido (compress_message_contents): con MESSAGE_COMPRESSION_ENABLED
+# los contenidos de al menos MESSAGE_COMPRESSION_MIN_BYTES se guardan con zstd y el
+# diccionario activo; los resúmenes y búsquedas usan content_preview sin descomprimir
+MESSAGE_COMPRESSION_ENABLED = os.getenv("MESSAGE_COMPRESSION_ENABLED", "false").lower() == "true"
+MESSAGE_COMPRESSION_MIN_BYTES = int(os.getenv("MESSAGE_COMPRESSION_MIN_BYTES", "2048"))
+MESSAGE_COMPRESSION_LEVEL = int(os.getenv("MESSAGE_COMPRESSION_LEVEL", "3"))
+
 # Twilio Configuration
 TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID", "")
 TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN", "")
@@ -102,6 +178,133 @@ TWILIO_WHATSAPP_FROM = os.getenv("TWILIO_WHATSAPP_FROM", "whatsapp:+14155238886"
 # Google Drive Configuration
 GOOGLE_DRIVE_CREDENTIALS_PATH = os.getenv("GOOGLE_DRIVE_CREDENTIALS_PATH", "credentials.json")
 GOOGLE_DRIVE_TOKEN_PATH = os.getenv("GOOGLE_DRIVE_TOKEN_PATH", "token.json")
+# Tamaño de chunk de las subidas resumibles (múltiplo de 256 KiB)
+GOOGLE_DRIVE_UPLOAD_CHUNK_SIZE = int(os.getenv("GOOGLE_DRIVE_UPLOAD_CHUNK_SIZE", str(8 * 1024 * 1024)))
+
+# Redis (estado compartido entre workers)
+REDIS_URL = os.getenv("REDIS_URL", "")
+
+# Drive Upload Scheduler (concurrencia adaptativa AIMD)
+DRIVE_UPLOAD_MIN_CONCURRENCY = int(os.getenv("DRIVE_UPLOAD_MIN_CONCURRENCY", "1"))
+DRIVE_UPLOAD_MAX_CONCURRENCY = int(os.getenv("DRIVE_UPLOAD_MAX_CONCURRENCY", "16"))
+DRIVE_UPLOAD_INITIAL_CONCURRENCY = int(os.getenv("DRIVE_UPLOAD_INITIAL_CONCURRENCY", "4"))
+# Latencia objetivo en segundos por MiB subido; por encima el límite se reduce
+DRIVE_UPLOAD_LATENCY_TARGET = float(os.getenv("DRIVE_UPLOAD_LATENCY_TARGET", "2.0"))
+DRIVE_UPLOAD_ACQUIRE_TIMEOUT = int(os.getenv("DRIVE_UPLOAD_ACQUIRE_TIMEOUT", "300"))
+DRIVE_UPLOAD_LEASE_SECONDS = int(os.getenv("DRIVE_UPLOAD_LEASE_SECONDS", "900"))
+# Prioridad: un archivo espera como si hubiera llegado size / rate segundos más tarde
+DRIVE_UPLOAD_PRIORITY_BYTES_PER_SECOND = int(os.getenv("DRIVE_UPLOAD_PRIORITY_BYTES_PER_SECOND", str(1024 * 1024)))
+DRIVE_UPLOAD_THROTTLE_RETRIES = int(os.getenv("DRIVE_UPLOAD_THROTTLE_RETRIES", "5"))
+
+# Media Deduplication
+# Los archivos se hashean (SHA-256) mientras se descargan para no subir duplicados a Drive
+MEDIA_DEDUP_ENABLED = os.getenv("MEDIA_DEDUP_ENABLED", "true").lower() == "true"
+# Omitir la descarga cuando coinciden el tamaño informado y el hash del primer bloque
+MEDIA_DEDUP_PREFILTER = os.getenv("MEDIA_DEDUP_PREFILTER", "true").lower() == "true"
+MEDIA_DEDUP_PREFIX_BYTES = int(os.getenv("MEDIA_DEDUP_PREFIX_BYTES", str(64 * 1024)))
+# Tamaño máximo en memoria antes de volcar la descarga a disco
+MEDIA_SPOOL_MAX_MEMORY = int(os.getenv("MEDIA_SPOOL_MAX_MEMORY", str(10 * 1024 * 1024)))
+
+# Media Processing (recompresión opcional por fuente, ver MediaProcessingProfile en el admin)
+MEDIA_PROCESSING_WORKERS = int(os.getenv("MEDIA_PROCESSING_WORKERS", "2"))
+MEDIA_PROCESSING_TASKS_PER_CHILD = int(os.getenv("MEDIA_PROCESSING_TASKS_PER_CHILD", "50"))
+
+# Media Transfer Outbox
+# Las transferencias a Drive se procesan con: python manage.py process_media_transfers
+MEDIA_TRANSFER_WORKERS = int(os.getenv("MEDIA_TRANSFER_WORKERS", "4"))
+MEDIA_TRANSFER_MAX_ATTEMPTS = int(os.getenv("MEDIA_TRANSFER_MAX_ATTEMPTS", "8"))
+MEDIA_TRANSFER_BACKOFF_BASE = int(os.getenv("MEDIA_TRANSFER_BACKOFF_BASE", "30"))  # segundos
+MEDIA_TRANSFER_BACKOFF_MAX = int(os.getenv("MEDIA_TRANSFER_BACKOFF_MAX", "3600"))  # segundos
+MEDIA_TRANSFER_LEASE_SECONDS = int(os.getenv("MEDIA_TRANSFER_LEASE_SECONDS", "600"))
+
+# Caché de fuentes por proceso (segundos); 0 la desactiva. Los cambios hechos desde
+# otro proceso (admin) se ven en los workers al expirar el TTL
+SOURCE_CACHE_TTL = int(os.getenv("SOURCE_CACHE_TTL", "60"))
+
+# Caché por proceso de las claves de destinatarios (entradas); 0 la desactiva
+RECIPIENT_CACHE_SIZE = int(os.getenv("RECIPIENT_CACHE_SIZE", "10000"))
+
+# Listado de ideas de la API (paginación por cursor)
+MESSAGE_LIST_PAGE_SIZE = int(os.getenv("MESSAGE_LIST_PAGE_SIZE", "50"))
+MESSAGE_LIST_MAX_PAGE_SIZE = int(os.getenv("MESSAGE_LIST_MAX_PAGE_SIZE", "200"))
+
+# Exportación de ideas: filas por lectura del cursor del servidor
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "2000"))
+
+# Importación de chats exportados de WhatsApp: filas por COPY, zona horaria del
+# teléfono que exportó el chat (las fechas del archivo no la incluyen) y tamaño
+# máximo del archivo subido a la API
+CHAT_IMPORT_BATCH_SIZE = int(os.getenv("CHAT_IMPORT_BATCH_SIZE", "10000"))
+CHAT_IMPORT_TIMEZONE = os.getenv("CHAT_IMPORT_TIMEZONE", "America/Bogota")
+CHAT_IMPORT_MAX_UPLOAD_MB = int(os.getenv("CHAT_IMPORT_MAX_UPLOAD_MB", "100"))
+
+# Ideas más recientes usadas para armar los temas de /resumen (el total sale del contador)
+SUMMARY_MAX_MESSAGES = int(os.getenv("SUMMARY_MAX_MESSAGES", "500"))
+
+# Métricas Prometheus (/api/v1/metrics/). Con varios workers de gunicorn definir
+# PROMETHEUS_MULTIPROC_DIR para agregar las métricas de todos los procesos.
+# Sin METRICS_TOKEN el endpoint solo responde con DEBUG=true
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Presupuesto de consultas SQL por tipo de webhook y comando
+# QUERY_BUDGET_MODE: off | log (warning con stack traces) | raise (la petición falla)
+# La consulta de la fuente solo ocurre con la caché de fuentes fría (ver SOURCE_CACHE_TTL)
+# y la del destinatario la primera vez en cada proceso (RECIPIENT_CACHE_SIZE); el primer
+# mensaje de un usuario nuevo agrega el INSERT del destinatario
+QUERY_BUDGET_MODE = os.getenv("QUERY_BUDGET_MODE", "off")
+QUERY_BUDGETS = {
+    'text': 4,      # fuente + destinatario + contadores + INSERT del mensaje
+    'media': 6,     # fuente + destinatario + contadores + INSERT del mensaje, adjuntos y transferencias
+    '/resumen': 5,  # fuente + destinatario + contadores + consulta de mensajes (+ temas archivados si no alcanzan)
+    '/hoy': 3,      # fuente + destinatario + consulta de mensajes
+    '/semana': 3,
+    '/buscar': 4,   # fuente + destinatario + consulta de mensajes + archivos (con menos de 10 resultados)
+}
+
+# Profiler por muestreo del webhook (perfiles en formato folded para flamegraphs)
+# Se perfila con el header X-Profile: <PROFILER_TOKEN> o al azar con PROFILER_SAMPLE_RATE
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "false").lower() == "true"
+PROFILER_TOKEN = os.getenv("PROFILER_TOKEN", "")
+PROFILER_SAMPLE_RATE = float(os.getenv("PROFILER_SAMPLE_RATE", "0"))  # 0.01 = 1% de las peticiones
+PROFILER_INTERVAL = float(os.getenv("PROFILER_INTERVAL", "0.005"))  # segundos entre muestras
+PROFILER_DIR = os.getenv("PROFILER_DIR", str(BASE_DIR / "profiles"))
+
+# Logging estructurado (JSON) y no bloqueante: los registros se encolan y un hilo
+# los escribe en stdout. LOG_SAMPLING: "logger=fracción,..." (WARNING+ no se muestrea)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # json | text
+LOG_REDACT_CONTENT = os.getenv("LOG_REDACT_CONTENT", "true").lower() == "true"
+LOG_MAX_CONTENT_LENGTH = int(os.getenv("LOG_MAX_CONTENT_LENGTH", "80"))
+LOG_SAMPLING = {
+    name.strip(): float(rate)
+    for name, rate in (item.split("=") for item in os.getenv("LOG_SAMPLING", "").split(",") if item)
+}
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "filters": {
+        "request_context": {"()": "utils.logging.RequestContextFilter"},
+        "redaction": {
+            "()": "utils.logging.RedactionFilter",
+            "redact_content": LOG_REDACT_CONTENT,
+            "max_length": LOG_MAX_CONTENT_LENGTH,
+        },
+        "sampling": {"()": "utils.logging.SamplingFilter", "rates": LOG_SAMPLING},
+    },
+    "handlers": {
+        "queue": {
+            "()": "utils.logging.QueueLogHandler",
+            "json_format": LOG_FORMAT == "json",
+            "filters": ["sampling", "request_context", "redaction"],
+        },
+    },
+    "loggers": {
+        "apps": {"handlers": ["queue"], "level": LOG_LEVEL, "propagate": False},
+        "utils": {"handlers": ["queue"], "level": LOG_LEVEL, "propagate": False},
+    },
+    "root": {"handlers": ["queue"], "level": "WARNING"},
+}
 
 
 # Password validation
@@ -140,6 +343,20 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    # Archivos Parquet de la capa fría (ver MESSAGE_ARCHIVE_*)
+    "message_archive": {
+        "BACKEND": MESSAGE_ARCHIVE_BACKEND,
+        "OPTIONS": {
+            "location": MESSAGE_ARCHIVE_LOCATION,
+            **({"bucket_name": MESSAGE_ARCHIVE_BUCKET} if MESSAGE_ARCHIVE_BUCKET else {}),
+            **({"endpoint_url": MESSAGE_ARCHIVE_ENDPOINT_URL} if MESSAGE_ARCHIVE_ENDPOINT_URL else {}),
+        },
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
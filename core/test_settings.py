@@ -0,0 +1,17 @@
+"""
+Settings de los tests: SQLite en memoria, sin servidor de PostgreSQL
+
+    python manage.py test apps.memory_agent --settings=core.test_settings
+
+La réplica es un alias espejo (MIRROR) del primario: ve los mismos datos y
+permite comprobar a qué base de datos va cada lectura.
+"""
+from core.settings import *  # noqa: F401,F403
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    },
+}
+DATABASES['replica'] = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
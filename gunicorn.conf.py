@@ -0,0 +1,125 @@
+"""
+Configuración de gunicorn para producción
+
+    gunicorn -c gunicorn.conf.py core.wsgi
+
+- preload_app: Django, las URLs, los clasificadores y el SDK de Twilio se cargan
+  una vez en el proceso maestro y los workers los comparten por copy-on-write.
+- Workers: GUNICORN_WORKERS o, si no se define, 2 * CPUs + 1 limitado por la
+  memoria del contenedor (cgroup) y GUNICORN_WORKER_MEMORY_MB.
+- Warm-up: cada worker llena la caché de fuentes y crea los clientes de Twilio
+  antes de aceptar peticiones (WarmupService).
+- Conexiones a BD: cada hilo mantiene una conexión persistente (DB_CONN_MAX_AGE),
+  así que la instancia abre hasta workers * hilos. DB_MAX_CONNECTIONS reduce los
+  hilos para no superar la parte de max_connections de Postgres de esta instancia.
+- Métricas: con más de un worker se usa el modo multiproceso de prometheus_client.
+"""
+import gc
+import math
+import os
+import shutil
+import tempfile
+
+
+def _read_cgroup(*paths):
+    for path in paths:
+        try:
+            with open(path) as cgroup_file:
+                return cgroup_file.read().strip()
+        except OSError:
+            continue
+    return None
+
+
+def cpu_limit() -> int:
+    """CPUs disponibles: cuota del cgroup (v2 o v1) o CPUs asignadas al proceso"""
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+
+    cpu_max = _read_cgroup('/sys/fs/cgroup/cpu.max')
+    if cpu_max and not cpu_max.startswith('max'):
+        quota, period = cpu_max.split()[:2]
+        return max(1, min(cpus, math.ceil(int(quota) / int(period))))
+
+    quota = _read_cgroup('/sys/fs/cgroup/cpu/cpu.cfs_quota_us')
+    period = _read_cgroup('/sys/fs/cgroup/cpu/cpu.cfs_period_us')
+    if quota and period and int(quota) > 0:
+        return max(1, min(cpus, math.ceil(int(quota) / int(period))))
+    return cpus
+
+
+def memory_limit_mb():
+    """Límite de memoria del cgroup en MB, o None si no hay límite"""
+    value = _read_cgroup('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes')
+    if not value or value == 'max':
+        return None
+    limit = int(value) // (1024 * 1024)
+    # cgroup v1 reporta un valor enorme cuando no hay límite
+    return limit if limit < 1024 * 1024 else None
+
+
+def autotune_workers() -> int:
+    workers = 2 * cpu_limit() + 1
+    memory_mb = memory_limit_mb()
+    if memory_mb:
+        worker_mb = int(os.getenv('GUNICORN_WORKER_MEMORY_MB', '150'))
+        # Se reserva memoria para el proceso maestro (un worker más)
+        workers = min(workers, memory_mb // worker_mb - 1)
+    return max(1, workers)
+
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', '0')) or autotune_workers()
+# Hilos por worker: el webhook espera a la base de datos y a Twilio
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+db_max_connections = int(os.getenv('DB_MAX_CONNECTIONS', '0'))
+if db_max_connections:
+    threads = max(1, min(threads, db_max_connections // workers))
+preload_app = True
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = 30
+keepalive = 5
+# Reciclar workers acota el crecimiento de memoria; el jitter evita reinicios simultáneos
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '2000'))
+max_requests_jitter = max_requests // 10
+# Los logs de la aplicación ya registran cada webhook (ver LOGGING en settings)
+accesslog = os.getenv('GUNICORN_ACCESS_LOG') or None
+
+# prometheus_client lee la variable al importarse, antes de cargar la aplicación
+if workers > 1:
+    os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'memory_agent_prometheus'))
+
+
+def on_starting(server):
+    # Las métricas de una ejecución anterior no deben sumarse a las nuevas
+    multiproc_dir = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+    if multiproc_dir:
+        shutil.rmtree(multiproc_dir, ignore_errors=True)
+        os.makedirs(multiproc_dir, exist_ok=True)
+
+
+def when_ready(server):
+    # Se ejecuta en el maestro antes de crear los workers
+    if server.cfg.preload_app:
+        from apps.memory_agent.services.warmup_service import WarmupService
+        WarmupService().preload()
+        # Los objetos precargados pasan a la generación permanente: el GC de los
+        # workers no los recorre y sus páginas siguen compartidas con el maestro
+        gc.freeze()
+
+    memory_mb = memory_limit_mb()
+    server.log.info(f"Workers: {server.cfg.workers} x {server.cfg.threads} hilos "
+                    f"(CPUs: {cpu_limit()}, memoria: {f'{memory_mb} MB' if memory_mb else 'sin límite'})")
+    server.log.info(f"Conexiones a BD: hasta {server.cfg.workers * server.cfg.threads} "
+                    f"(CONN_MAX_AGE: {os.getenv('DB_CONN_MAX_AGE', 'por defecto')})")
+
+
+def post_worker_init(worker):
+    from apps.memory_agent.services.warmup_service import WarmupService
+    WarmupService().warm_up()
+
+
+def child_exit(server, worker):
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
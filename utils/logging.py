@@ -0,0 +1,202 @@
+import re
+import sys
+import copy
+import json
+import queue
+import random
+import logging
+import os
+import atexit
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Iterable, Optional
+
+# ID de la petición en curso (lo define RequestIdMiddleware)
+request_id_var: ContextVar[Optional[str]] = ContextVar('request_id', default=None)
+
+# Atributos propios de LogRecord; el resto son campos de `extra`
+RESERVED_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+# Números de teléfono en formato internacional (con el '+' delante, como en
+# 'whatsapp:+5491155551234'): se conservan los últimos 4 dígitos. Sin el '+' el
+# patrón alcanzaría UUIDs, IDs de Drive y tamaños en bytes
+PHONE_PATTERN = re.compile(r'(?<![\w+])\+\d[\d\s-]{5,}(\d{4})\b')
+
+# Dígitos del campo `recipient` (teléfono o chat ID de Telegram): ahí se sabe que es un dato personal
+RECIPIENT_PATTERN = re.compile(r'[+-]?\d[\d\s-]*(\d{4})')
+
+
+class RequestContextFilter(logging.Filter):
+    """Agrega el request_id de la petición en curso a cada registro"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class RedactionFilter(logging.Filter):
+    """
+    Evita que el contenido de los mensajes de los usuarios llegue completo a los logs
+
+    Los campos de `extra` listados en `content_fields` se reemplazan por su longitud
+    (redact_content=True) o se truncan a `max_length` caracteres. Se enmascaran el
+    campo `recipient` (también donde aparece en el mensaje o en la traza de la
+    excepción) y los números de teléfono con '+' del mensaje, la traza y los
+    campos de texto.
+    """
+
+    def __init__(self, content_fields: Iterable[str] = ('content', 'body'), max_length: int = 80,
+                 redact_content: bool = True, max_message_length: int = 2000):
+        super().__init__()
+        self.content_fields = set(content_fields)
+        self.max_length = max_length
+        self.redact_content = redact_content
+        self.max_message_length = max_message_length
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        recipient = getattr(record, 'recipient', None)
+        if not isinstance(recipient, str) or not recipient:
+            recipient = None
+
+        message = self._mask(record.getMessage(), recipient)
+        if len(message) > self.max_message_length:
+            message = message[:self.max_message_length] + '…'
+        record.msg, record.args = message, None
+
+        # El texto de una excepción también puede traer el destinatario o un teléfono:
+        # la traza se formatea aquí y los formatters usan este exc_text
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        if record.exc_text:
+            record.exc_text = self._mask(record.exc_text, recipient)
+
+        if recipient is not None:
+            record.recipient = mask_recipient(recipient)
+
+        for field in self.content_fields:
+            value = getattr(record, field, None)
+            if isinstance(value, str):
+                setattr(record, field, self._clean(value))
+        return True
+
+    def _mask(self, text: str, recipient: Optional[str]) -> str:
+        if recipient is not None:
+            text = text.replace(recipient, mask_recipient(recipient))
+        return mask_phone_numbers(text)
+
+    def _clean(self, value: str) -> str:
+        if self.redact_content:
+            return f"<{len(value)} caracteres>"
+        value = mask_phone_numbers(value)
+        return value if len(value) <= self.max_length else value[:self.max_length] + '…'
+
+
+def mask_phone_numbers(text: str) -> str:
+    return PHONE_PATTERN.sub(lambda match: f"***{match.group(1)}", text)
+
+
+def mask_recipient(recipient: str) -> str:
+    return RECIPIENT_PATTERN.sub(lambda match: f"***{match.group(1)}", recipient)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Muestreo de registros por logger
+
+    `rates` asocia un prefijo de logger con la fracción de registros a conservar
+    (ej: {'apps.memory_agent.strategies': 0.1}). Se usa el prefijo más largo que
+    coincida. WARNING y niveles superiores nunca se descartan.
+    """
+
+    def __init__(self, rates: Optional[Dict[str, float]] = None):
+        super().__init__()
+        self.rates = sorted((rates or {}).items(), key=lambda item: len(item[0]), reverse=True)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        for prefix, rate in self.rates:
+            if record.name == prefix or record.name.startswith(prefix + '.'):
+                return rate >= 1 or random.random() < rate
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Un objeto JSON por línea con los campos estándar y los de `extra`"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            'timestamp': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in RESERVED_ATTRS and value is not None:
+                data[key] = value
+        # exc_text primero: RedactionFilter deja ahí la traza enmascarada
+        if record.exc_text:
+            data['exception'] = record.exc_text
+        elif record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class QueueLogHandler(QueueHandler):
+    """
+    Handler no bloqueante: encola el registro y un hilo (QueueListener) lo escribe
+
+    La cola es acotada; si se llena el registro se descarta en lugar de bloquear la
+    petición. Los filtros de este handler (request_id, redacción, muestreo) se
+    ejecutan en el hilo que registra, antes de encolar. Tras un fork (gunicorn con
+    preload) el hilo escritor se vuelve a crear en el proceso hijo.
+    """
+
+    def __init__(self, json_format: bool = True, max_queue_size: int = 10000, stream=None):
+        super().__init__(queue.Queue(maxsize=max_queue_size))
+        self.dropped = 0
+        self.target = logging.StreamHandler(stream or sys.stdout)
+        self.target.setFormatter(
+            JsonFormatter() if json_format
+            else logging.Formatter('%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s')
+        )
+        self.listener: Optional[QueueListener] = None
+        self.start()
+        atexit.register(self.stop)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._restart_in_child)
+
+    def start(self):
+        if self.listener is None:
+            self.listener = QueueListener(self.queue, self.target, respect_handler_level=True)
+            self.listener.start()
+
+    def stop(self):
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+    def _restart_in_child(self):
+        # El hilo del listener no sobrevive al fork: se descarta sin esperar (join)
+        self.queue = queue.Queue(maxsize=self.queue.maxsize)
+        self.listener = None
+        self.start()
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Igual que QueueHandler.prepare, pero la traza de la excepción queda en su
+        # propio campo (exc_text) en lugar de concatenarse al mensaje
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
@@ -1,16 +1,17 @@
-import uuid
 from django.db import models
 from django.utils import timezone
+from utils.uuid7 import uuid7
 
 
 class BaseModel(models.Model):
     """
     Modelo base que proporciona campos comunes para todos los modelos:
-    - id: UUID como clave primaria
+    - id: UUID v7 como clave primaria (ordenado por tiempo: las inserciones van
+      al final del índice y ordenar por id equivale a ordenar por creación)
     - created_at: Fecha de creación automática
     - updated_at: Fecha de actualización automática
     """
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 